@@ -0,0 +1 @@
+"""Standalone benchmark scripts for the SimpleBankSystem (run with python -m benchmarks.<name>)."""
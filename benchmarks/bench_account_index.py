@@ -0,0 +1,107 @@
+"""Benchmarks top-N and threshold queries over 1M accounts: sorting all
+accounts vs the maintained index (in memory and saved), plus the cost the
+index adds to each deposit."""
+
+import gc
+import heapq
+import os
+import random
+import tempfile
+import time
+
+from models.account import BankAccount
+from models.account_index import AccountIndex, IndexReader
+from models.ledger import Ledger
+from models.user import User
+
+ACCOUNTS = 1_000_000
+CURRENCIES = ("USD", "EUR", "UAN")
+DEPOSITS = 100_000
+
+
+def build_users() -> list:
+    """Builds users with four accounts each and random balances."""
+    rng = random.Random(4)
+    ledger = Ledger()
+    users = []
+    for user_id in range(ACCOUNTS // 4):
+        user = User("u", "s", user_id)
+        for account_id in range(4):
+            account = BankAccount(
+                account_id, rng.randrange(0, 10_000_000) / 100, rng.choice(CURRENCIES)
+            )
+            account.ledger = ledger
+            user.add_account(account)
+        users.append(user)
+    return users
+
+
+def deposit_time(users: list) -> float:
+    """Times DEPOSITS deposits into random accounts."""
+    rng = random.Random(8)
+    accounts = [a for u in users for a in u.accounts]
+    picks = [rng.choice(accounts) for _ in range(DEPOSITS)]
+    begin = time.perf_counter()
+    for account in picks:
+        account.deposit(1, account.currency)
+    return time.perf_counter() - begin
+
+
+def main():
+    """Prints build, update and query timings."""
+    users = build_users()
+    # Long-lived objects go to the permanent generation before each timed
+    # run, so cyclic GC passes over millions of objects do not skew it.
+    gc.freeze()
+    plain_deposits = deposit_time(users)
+
+    index = AccountIndex()
+    begin = time.perf_counter()
+    index.reset(users)
+    build_time = time.perf_counter() - begin
+    gc.freeze()
+    indexed_deposits = deposit_time(users)
+
+    begin = time.perf_counter()
+    scan = heapq.nlargest(
+        10,
+        ((a.balance_minor, u.user_id, a.account_id) for u in users for a in u.accounts if a.currency == "USD"),
+    )
+    scan_time = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    top = index.top("balance", "USD", 10)
+    top_time = time.perf_counter() - begin
+    assert [(e.value, e.user_id, e.account_id) for e in top] == scan
+
+    begin = time.perf_counter()
+    rich = index.above("balance", "USD", 99_900_00)
+    above_time = time.perf_counter() - begin
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index.configure(os.path.join(tmp, "index"))
+        begin = time.perf_counter()
+        index.save()
+        save_time = time.perf_counter() - begin
+        begin = time.perf_counter()
+        reader = IndexReader(index.path)
+        saved_top = reader.top("balance", "USD", 10)
+        saved_rich = reader.above("balance", "USD", 99_900_00)
+        saved_time = time.perf_counter() - begin
+        assert saved_top == top and saved_rich == rich
+
+    print(f"{ACCOUNTS} accounts in {len(CURRENCIES)} currencies")
+    print(f"  build index (one sort per list):   {build_time:.3f}s")
+    print(
+        f"  {DEPOSITS} deposits: {plain_deposits:.3f}s plain, {indexed_deposits:.3f}s indexed "
+        f"(+{(indexed_deposits - plain_deposits) / DEPOSITS * 1e6:.1f}us each)"
+    )
+    print(f"  top 10 USD, scan all accounts:     {scan_time * 1e3:.1f}ms")
+    print(f"  top 10 USD, index:                 {top_time * 1e3:.3f}ms")
+    print(f"  USD >= 99,900.00 ({len(rich)} accounts), index: {above_time * 1e3:.3f}ms")
+    print(f"  save index:                        {save_time:.3f}s")
+    print(f"  open saved index + both queries:   {saved_time * 1e3:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmarks ledger recovery: full journal replay, snapshot plus suffix, and point-in-time."""
+
+import os
+import random
+import tempfile
+import time
+
+from models.ledger import JournalEntry, Ledger, Posting
+
+ENTRIES = 1_000_000
+ACCOUNTS = 10_000
+SNAPSHOT_AT = 900_000
+
+
+def write_journal(path: str) -> None:
+    """Writes ENTRIES deposits and transfers, with one snapshot at SNAPSHOT_AT."""
+    rng = random.Random(5)
+    ledger = Ledger(path, snapshot_interval=SNAPSHOT_AT)
+    for entry_id in range(1, ENTRIES + 1):
+        source = f"user:{rng.randrange(ACCOUNTS)}/account:1"
+        amount = rng.randrange(1, 100_000)
+        if entry_id % 2:
+            other = "external:USD"
+        else:
+            other = f"user:{rng.randrange(ACCOUNTS)}/account:1"
+        ledger.post(
+            JournalEntry(
+                entry_id,
+                entry_id,
+                "transfer",
+                (Posting(source, "USD", amount), Posting(other, "USD", -amount)),
+            )
+        )
+        if entry_id % 10_000 == 0:
+            ledger.flush()
+    ledger.flush()
+
+
+def timed_load(path: str) -> float:
+    """Loads a fresh ledger from path and returns the elapsed seconds."""
+    begin = time.perf_counter()
+    Ledger(path).load()
+    return time.perf_counter() - begin
+
+
+def main():
+    """Times recovery with and without a snapshot and a point-in-time restore."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.log")
+        write_journal(path)
+        size_mb = os.path.getsize(path) / 1e6
+
+        snapshot_time = timed_load(path)
+        snapshots = os.path.join(tmp, "ledger.log.snapshots")
+        os.rename(snapshots, snapshots + ".off")
+        full_time = timed_load(path)
+        os.rename(snapshots + ".off", snapshots)
+
+        begin = time.perf_counter()
+        Ledger(path).balances_at(ENTRIES // 2)
+        pit_time = time.perf_counter() - begin
+
+    suffix = ENTRIES - SNAPSHOT_AT
+    print(f"{ENTRIES} journal entries ({size_mb:.0f} MB), {ACCOUNTS} accounts")
+    print(f"  full replay:            {full_time:.3f}s  ({ENTRIES / full_time:,.0f} entries/s)")
+    print(f"  snapshot + {suffix} suffix: {snapshot_time:.3f}s  ({suffix / snapshot_time:,.0f} entries/s)")
+    print(f"  point-in-time at middle: {pit_time:.3f}s  ({ENTRIES // 2 / pit_time:,.0f} entries/s)")
+
+
+if __name__ == "__main__":
+    main()
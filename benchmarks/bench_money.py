@@ -0,0 +1,52 @@
+"""Benchmarks aggregating and converting balances with integer minor units vs Decimal."""
+
+import random
+import time
+from array import array
+from decimal import ROUND_HALF_EVEN, Decimal
+from fractions import Fraction
+
+from models.money import convert_minor
+
+ACCOUNTS = 1_000_000
+RATE = Fraction("0.92")
+CENT = Decimal("0.01")
+
+
+def main():
+    """Runs the benchmark and prints timings for both representations."""
+    rng = random.Random(42)
+    minor = array("q", (rng.randrange(0, 10_000_000) for _ in range(ACCOUNTS)))
+    decimals = [Decimal(value).scaleb(-2) for value in minor]
+
+    begin = time.perf_counter()
+    total_minor = sum(minor)
+    int_sum = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    total_decimal = sum(decimals, Decimal(0))
+    dec_sum = time.perf_counter() - begin
+    assert Decimal(total_minor).scaleb(-2) == total_decimal
+
+    begin = time.perf_counter()
+    converted = [convert_minor(value, RATE) for value in minor]
+    int_convert = time.perf_counter() - begin
+
+    decimal_rate = Decimal("0.92")
+    begin = time.perf_counter()
+    converted_decimal = [
+        (value * decimal_rate).quantize(CENT, rounding=ROUND_HALF_EVEN)
+        for value in decimals
+    ]
+    dec_convert = time.perf_counter() - begin
+    assert all(
+        Decimal(a).scaleb(-2) == b for a, b in zip(converted, converted_decimal)
+    )
+
+    print(f"{ACCOUNTS} balances")
+    print(f"  sum      int: {int_sum:.3f}s  Decimal: {dec_sum:.3f}s")
+    print(f"  convert  int: {int_convert:.3f}s  Decimal: {dec_convert:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
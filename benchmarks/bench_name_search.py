@@ -0,0 +1,122 @@
+"""Benchmarks name search over 1M users with Latin and Cyrillic names:
+scanning every user vs the name index (prefix and typo-tolerant), plus
+building the index, loading its log and adding registered users."""
+
+import gc
+import os
+import random
+import tempfile
+import time
+
+from models.name_index import NameIndex, edit_distance, normalize_name
+from models.user import User
+
+USERS = 1_000_000
+QUERIES = 200
+ADDED = 10_000
+SYLLABLES = (
+    "an", "na", "ko", "va", "li", "ser", "ma", "ri", "ol", "en", "ta", "de", "mi", "ro",
+    "ан", "на", "ко", "ва", "лі", "сер", "ма", "рі", "ол", "ен", "та", "де", "мі", "ро",
+)
+
+
+def make_name(rng: random.Random) -> str:
+    """A capitalized name of two to four syllables from one alphabet."""
+    offset = rng.choice((0, len(SYLLABLES) // 2))
+    parts = [SYLLABLES[offset + rng.randrange(len(SYLLABLES) // 2)] for _ in range(rng.randint(2, 4))]
+    return "".join(parts).capitalize()
+
+
+def with_typo(rng: random.Random, name: str) -> str:
+    """The name with one letter replaced, dropped or swapped with its neighbour."""
+    i = rng.randrange(len(name) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return name[:i] + rng.choice(name) + name[i + 1 :]
+    if kind == 1:
+        return name[:i] + name[i + 1 :]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+
+
+def timed(function, queries) -> float:
+    """Average seconds per query."""
+    begin = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - begin) / len(queries)
+
+
+def main():
+    """Prints build, load, update and query timings."""
+    rng = random.Random(49)
+    users = [User(make_name(rng), make_name(rng), user_id) for user_id in range(1, USERS + 1)]
+    # Long-lived objects go to the permanent generation before each timed
+    # run, so cyclic GC passes over millions of objects do not skew it.
+    gc.freeze()
+
+    index = NameIndex()
+    begin = time.perf_counter()
+    index.reset(users)
+    build_time = time.perf_counter() - begin
+    gc.freeze()
+
+    picks = [rng.choice(users) for _ in range(QUERIES)]
+    prefixes = [p.surname[:3] for p in picks]
+    full_prefixes = [f"{p.username[:2]} {p.surname[:4]}" for p in picks]
+    typo_names = [with_typo(rng, p.surname) for p in picks]
+    two_typos = [with_typo(rng, with_typo(rng, p.surname)) for p in picks]
+
+    def scan_prefix(query):
+        word = normalize_name(query)
+        return [
+            u for u in users
+            if normalize_name(u.username).startswith(word) or normalize_name(u.surname).startswith(word)
+        ]
+
+    def scan_fuzzy(query):
+        word = normalize_name(query)
+        return [
+            u for u in users
+            if min(edit_distance(word, normalize_name(n), 1) for n in (u.username, u.surname)) <= 1
+        ]
+
+    scan_prefix_time = timed(scan_prefix, prefixes[:3])
+    scan_fuzzy_time = timed(scan_fuzzy, typo_names[:1])
+    prefix_time = timed(index.prefix, prefixes)
+    full_time = timed(index.prefix, full_prefixes)
+    fuzzy_time = timed(index.fuzzy, typo_names)
+    fuzzy2_time = timed(lambda q: index.fuzzy(q, 2), two_typos)
+    assert all(p.user_id in {m.user_id for m in index.fuzzy(q, 1, None)} for p, q in zip(picks, typo_names))
+    assert {m.user_id for m in index.prefix(prefixes[0], None)} == {u.user_id for u in scan_prefix(prefixes[0])}
+
+    added = [User(make_name(rng), make_name(rng), USERS + i) for i in range(1, ADDED + 1)]
+    begin = time.perf_counter()
+    for user in added:
+        index.add([user])
+    add_time = (time.perf_counter() - begin) / ADDED
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index.configure(os.path.join(tmp, "names.tsv"))
+        begin = time.perf_counter()
+        index.save()
+        save_time = time.perf_counter() - begin
+        begin = time.perf_counter()
+        reloaded = NameIndex(index.path)
+        reloaded.load()
+        load_time = time.perf_counter() - begin
+        assert len(reloaded) == USERS + ADDED
+
+    print(f"{USERS} users, {len(index._terms)} distinct names")  # pylint: disable=protected-access
+    print(f"  build index from users:              {build_time:.3f}s")
+    print(f"  save / load names log:               {save_time:.3f}s / {load_time:.3f}s")
+    print(f"  add one registered user:             {add_time * 1e6:.1f}us")
+    print(f"  prefix (3 letters), scan all users:  {scan_prefix_time * 1e3:.1f}ms")
+    print(f"  prefix (3 letters), index:           {prefix_time * 1e3:.3f}ms")
+    print(f"  name + surname prefixes, index:      {full_time * 1e3:.3f}ms")
+    print(f"  1 typo, scan all users:              {scan_fuzzy_time * 1e3:.1f}ms")
+    print(f"  1 typo, index:                       {fuzzy_time * 1e3:.3f}ms")
+    print(f"  2 typos, index:                      {fuzzy2_time * 1e3:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
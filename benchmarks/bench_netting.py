@@ -0,0 +1,68 @@
+"""Benchmarks a marketplace settlement batch of 200k transfers among 1000
+accounts: one BankAccount.transfer per transfer vs one netted batch."""
+
+import random
+import time
+
+from models.account import BankAccount
+from models.ledger import Ledger
+from models.user import User
+from service.netting import NettingService
+
+ACCOUNTS = 1000
+TRANSFERS = 200_000
+
+
+def build():
+    """Builds the accounts and the batch, identical for every call."""
+    ledger = Ledger()
+    user = User("u", "s", 1)
+    for account_id in range(ACCOUNTS):
+        account = BankAccount(account_id, 10_000, "USD")
+        account.ledger = ledger
+        user.add_account(account)
+    rng = random.Random(9)
+    accounts = user.accounts
+    batch = [
+        (rng.choice(accounts), rng.choice(accounts), rng.randrange(1, 1000) / 100)
+        for _ in range(TRANSFERS)
+    ]
+    return user, [(a, b, amount) for a, b, amount in batch if a is not b]
+
+
+def main():
+    """Times both approaches and compares balance writes."""
+    user, batch = build()
+    writes = 0
+
+    def count(_account, _delta):
+        nonlocal writes
+        writes += 1
+
+    for account in user.accounts:
+        account.observers.append(count)
+    begin = time.perf_counter()
+    for source, target, amount in batch:
+        source.transfer(target, amount, source.currency)
+    loop_time = time.perf_counter() - begin
+    loop_balances = [a.balance_minor for a in user.accounts]
+    loop_writes = writes
+
+    user, batch = build()
+    begin = time.perf_counter()
+    result = NettingService.settle(batch)
+    net_time = time.perf_counter() - begin
+
+    assert [a.balance_minor for a in user.accounts] == loop_balances
+    assert not result.rejected
+    print(f"{len(batch)} transfers among {ACCOUNTS} accounts")
+    print(f"  one by one: {loop_time:.3f}s, {loop_writes} balance writes")
+    print(
+        f"  netted:     {net_time:.3f}s, {result.balance_writes} balance writes "
+        f"({loop_time / net_time:.1f}x faster, "
+        f"{1 - result.balance_writes / result.gross_balance_writes:.2%} fewer writes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmarks loading a large users file: FileManager.load_all_users vs the
+parallel chunked loader at several worker counts."""
+
+import json
+import os
+import random
+import tempfile
+import time
+from unittest.mock import patch
+
+from service.file_manager import FileManager
+
+USERS = 20_000
+ACCOUNTS_PER_USER = 2
+TRANSACTIONS_PER_ACCOUNT = 50
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def write_users_file(path: str) -> None:
+    """Writes a users file in the layout FileManager.save_all_users produces."""
+    rng = random.Random(11)
+    data = []
+    tx_id = 0
+    for user_id in range(1, USERS + 1):
+        accounts = []
+        for k in range(ACCOUNTS_PER_USER):
+            transactions = []
+            for _ in range(TRANSACTIONS_PER_ACCOUNT):
+                tx_id += 1
+                transactions.append(
+                    {
+                        "transaction_id": tx_id,
+                        "amount": rng.randrange(1, 100_000) / 100,
+                        "transaction_type": "deposit",
+                        "time_stamp": 1_700_000_000_000_000 + tx_id,
+                        "currency": "USD",
+                    }
+                )
+            accounts.append(
+                {
+                    "account_id": k + 1,
+                    "balance": 0.0,
+                    "currency": "USD",
+                    "transactions": transactions,
+                }
+            )
+        data.append(
+            {"user_id": user_id, "username": "u", "surname": "s", "version": 0, "accounts": accounts}
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+
+def main():
+    """Times the single-process loader against the parallel one."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.json")
+        write_users_file(path)
+        size_mb = os.path.getsize(path) / 1e6
+        with patch.object(FileManager, "USERS_FILE", path):
+            begin = time.perf_counter()
+            FileManager.load_all_users()
+            baseline = time.perf_counter() - begin
+
+            timings = {}
+            for workers in WORKER_COUNTS:
+                begin = time.perf_counter()
+                FileManager.load_all_users_parallel(workers)
+                timings[workers] = time.perf_counter() - begin
+
+    transactions = USERS * ACCOUNTS_PER_USER * TRANSACTIONS_PER_ACCOUNT
+    print(f"{USERS} users, {transactions} transactions ({size_mb:.0f} MB), {os.cpu_count()} CPUs")
+    print(f"  load_all_users:          {baseline:.3f}s")
+    for workers, elapsed in timings.items():
+        print(f"  parallel, {workers} worker(s):    {elapsed:.3f}s  ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
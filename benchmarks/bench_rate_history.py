@@ -0,0 +1,52 @@
+"""Benchmarks "rate at time T" lookups over years of daily rates for dozens of currencies."""
+
+import random
+import time
+from datetime import datetime
+from fractions import Fraction
+
+from models.rate_history import RateHistory
+from models.transaction import to_epoch_us
+
+CURRENCIES = [f"C{i:02d}" for i in range(40)]
+DAYS = 365 * 10
+LOOKUPS = 200_000
+DAY_US = 86_400 * 1_000_000
+
+
+def main():
+    """Builds the history and times random and clustered lookups."""
+    rng = random.Random(7)
+    start = to_epoch_us(datetime(2015, 1, 1))
+    history = RateHistory(base="USD")
+
+    begin = time.perf_counter()
+    for code in CURRENCIES:
+        for day in range(DAYS):
+            history.add_rate(
+                "USD", code, start + day * DAY_US, Fraction(rng.randrange(50, 5000), 100)
+            )
+    build = time.perf_counter() - begin
+
+    times = [start + rng.randrange(DAYS * DAY_US) for _ in range(LOOKUPS)]
+    pairs = [tuple(rng.sample(CURRENCIES, 2)) for _ in range(LOOKUPS)]
+
+    begin = time.perf_counter()
+    for (from_currency, to_currency), at_us in zip(pairs, times):
+        history.rate_at(from_currency, to_currency, at_us)
+    random_lookup = time.perf_counter() - begin
+
+    times.sort()
+    begin = time.perf_counter()
+    for at_us in times:
+        history.rate_at("C01", "C02", at_us)
+    clustered_lookup = time.perf_counter() - begin
+
+    print(f"{len(CURRENCIES)} currencies x {DAYS} days built in {build:.2f}s")
+    print(f"  random cross-rate lookup: {random_lookup / LOOKUPS * 1e6:.2f} us")
+    print(f"  time-ordered lookup:      {clustered_lookup / LOOKUPS * 1e6:.2f} us")
+    print(f"  cache hit ratio:          {history.cache_hit_ratio():.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmarks registering users with 1M existing users: loading and
+rewriting every user (largest ID + 1) vs leasing an ID from the persisted
+sequence and appending the new record."""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+from models.id_allocator import IdAllocator
+from service.file_manager import FileManager
+from service.user_service import Userservice
+
+USERS = 1_000_000
+REGISTRATIONS = 2_000
+
+
+def write_users_file(path: str) -> None:
+    """Writes a users file in the layout FileManager.save_all_users produces."""
+    data = [
+        {"user_id": user_id, "username": "u", "surname": "s", "version": 0, "accounts": []}
+        for user_id in range(1, USERS + 1)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+
+def register(count: int) -> float:
+    """Registers count users and returns registrations per second."""
+    args = MagicMock(username="Олена", surname="Коваль")
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(count):
+            Userservice.register(args)
+    return count / (time.perf_counter() - begin)
+
+
+def main():
+    """Prints registrations per second for both paths."""
+    with tempfile.TemporaryDirectory() as tmp:
+        users_path = os.path.join(tmp, "users.json")
+        write_users_file(users_path)
+        size_mb = os.path.getsize(users_path) / 1e6
+        with patch.object(FileManager, "USERS_FILE", users_path), patch.object(
+            FileManager, "TOTALS_FILE", os.path.join(tmp, "totals.json")
+        ):
+            in_memory = IdAllocator()
+            with patch("service.user_service.USER_IDS", in_memory), patch(
+                "service.file_manager.USER_IDS", in_memory
+            ):
+                full_rate = register(1)
+
+            rates = {}
+            for block_size in (1, 100):
+                ids = IdAllocator(os.path.join(tmp, f"user_ids-{block_size}.json"), block_size)
+                with patch("service.user_service.USER_IDS", ids), patch(
+                    "service.file_manager.USER_IDS", ids
+                ):
+                    # The first registration loads users once to start the sequence.
+                    begin = time.perf_counter()
+                    register(1)
+                    seed_time = time.perf_counter() - begin
+                    rates[block_size] = register(REGISTRATIONS)
+            users = FileManager.load_all_users()
+            assert len({u.user_id for u in users}) == len(users) == USERS + 1 + 2 * (REGISTRATIONS + 1)
+
+    print(f"{USERS} existing users ({size_mb:.0f} MB users file)")
+    print(f"  load + rewrite all users:            {full_rate:.2f} registrations/s")
+    print(f"  first registration (starts sequence): {seed_time:.3f}s")
+    for block_size, rate in rates.items():
+        print(f"  sequence, block of {block_size:<3} + append:   {rate:,.0f} registrations/s")
+
+
+if __name__ == "__main__":
+    main()
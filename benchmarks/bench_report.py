@@ -0,0 +1,54 @@
+"""Benchmarks rendering a 1M-transaction account to a file and reports peak extra memory."""
+
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from models.account import BankAccount
+from models.report_renderer import ReportRenderer
+from models.transaction import Transaction, to_epoch_us
+from models.user import User
+
+TRANSACTIONS = 1_000_000
+
+
+def main():
+    """Builds a large account and renders it in every format."""
+    user = User(username="Bench", surname="User", user_id=1)
+    account = BankAccount(account_id=1, balance=0, currency="USD")
+    start = to_epoch_us(datetime(2020, 1, 1))
+    account.transactions.extend(
+        Transaction.from_epoch(i, 100, "deposit", start + i * 1_000_000, "USD")
+        for i in range(TRANSACTIONS)
+    )
+    user.add_account(account)
+    account.transaction_index.sync()
+
+    handle, path = tempfile.mkstemp()
+    os.close(handle)
+    try:
+        for output_format in ("text", "json", "csv"):
+            begin = time.perf_counter()
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                ReportRenderer(output_format).render(user, f)
+            elapsed = time.perf_counter() - begin
+
+            # Second run under tracemalloc (slower) to measure peak memory.
+            tracemalloc.start()
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                ReportRenderer(output_format).render(user, f)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            size = os.path.getsize(path) / 1e6
+            print(
+                f"{output_format:>4}: {elapsed:.2f}s, {size:.0f} MB written, "
+                f"peak extra memory {peak / 1e6:.1f} MB"
+            )
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmarks the standing-order scheduler with 1M schedules: loading the
+log, adding orders, and a run that pays the 1% due (heap vs full scan)."""
+
+import heapq
+import os
+import random
+import tempfile
+import time
+
+from models.account import BankAccount
+from models.transaction import now_epoch_us
+from models.user import User
+from service.payment_scheduler import DAY_US, PaymentScheduler, SchedulerService, StandingOrder
+
+SCHEDULES = 1_000_000
+USERS = 10_000
+DUE = SCHEDULES // 100
+
+
+def write_log(path: str, now_us: int) -> None:
+    """Writes a log of weekly orders, DUE of them due now and the rest later."""
+    rng = random.Random(5)
+    with open(path, "w", encoding="utf-8") as f:
+        for order_id in range(1, SCHEDULES + 1):
+            offset = -rng.randrange(DAY_US) if order_id <= DUE else rng.randrange(1, 6 * DAY_US)
+            order = StandingOrder(
+                order_id, order_id % USERS, 1, (order_id + 1) % USERS, 1, 1.0, "weekly", now_us + offset
+            )
+            f.write(order.to_line())
+
+
+def main():
+    """Times each phase and compares the heap with a linear scan."""
+    now_us = now_epoch_us()
+    users = []
+    for user_id in range(USERS):
+        user = User("u", "s", user_id)
+        user.add_account(BankAccount(1, 1_000_000, "USD"))
+        users.append(user)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schedules.log")
+        write_log(path, now_us)
+        scheduler = PaymentScheduler(path)
+        SchedulerService.SCHEDULER = scheduler
+
+        begin = time.perf_counter()
+        scheduler.load()
+        load_time = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        scan = [o for o in scheduler.orders.values() if o.next_due_us <= now_us]
+        scan_time = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        due = []
+        while scheduler._heap and scheduler._heap[0][0] <= now_us:  # pylint: disable=protected-access
+            due.append(heapq.heappop(scheduler._heap))  # pylint: disable=protected-access
+        pop_time = time.perf_counter() - begin
+        for entry in due:
+            heapq.heappush(scheduler._heap, entry)  # pylint: disable=protected-access
+        assert len(due) == len(scan) == DUE
+
+        begin = time.perf_counter()
+        executions = SchedulerService.run_due(users, now_us)
+        run_time = time.perf_counter() - begin
+        begin = time.perf_counter()
+        scheduler.flush()
+        flush_time = time.perf_counter() - begin
+        assert len(executions) == DUE and all(e.succeeded for e in executions)
+
+        begin = time.perf_counter()
+        for k in range(10_000):
+            scheduler.add(k % USERS, 1, 1, 1.0, "monthly", now_us + DAY_US)
+        add_time = time.perf_counter() - begin
+
+    print(f"{SCHEDULES} standing orders, {DUE} due")
+    print(f"  load log + heapify:         {load_time:.3f}s")
+    print(f"  find due, full scan:        {scan_time:.3f}s")
+    print(f"  find due, heap pops:        {pop_time:.3f}s  ({scan_time / pop_time:.0f}x)")
+    print(f"  run (pay {DUE}):          {run_time:.3f}s")
+    print(f"  flush advanced orders:      {flush_time:.3f}s")
+    print(f"  add 10000 orders:           {add_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Demonstrates write latency while a full-bank report runs: deposits alone,
+next to a report that holds the write lock, and next to a report that reads
+a copy-on-write snapshot."""
+
+import gc
+import os
+import random
+import statistics
+import threading
+import time
+
+from models.account import BankAccount
+from models.ledger import Ledger
+from models.report_renderer import ReportRenderer
+from models.user import User
+from models.versioned_state import BankState
+
+USERS = 50_000
+WRITES = 20_000
+
+
+def build_bank() -> BankState:
+    """Builds users with two accounts and a few transactions each."""
+    ledger = Ledger()
+    users = []
+    for user_id in range(USERS):
+        user = User("Name", "Surname", user_id)
+        for account_id, currency in ((1, "USD"), (2, "EUR")):
+            account = BankAccount(account_id, 100, currency)
+            account.ledger = ledger
+            user.add_account(account)
+            account.deposit(5, currency)
+        users.append(user)
+    return BankState(users)
+
+
+def report(users, out) -> None:
+    """Renders the text report of every user."""
+    renderer = ReportRenderer()
+    for user in users:
+        renderer.render(user, out)
+
+
+def run_writes(bank: BankState, latencies: list, started: threading.Event) -> None:
+    """Performs deposits at a steady pace and records each one's latency."""
+    rng = random.Random(1)
+    started.wait()
+    for _ in range(WRITES):
+        user_id = rng.randrange(USERS)
+        begin = time.perf_counter()
+        with bank.write(user_id) as user:
+            user.accounts[0].deposit(1, "USD")
+        latencies.append(time.perf_counter() - begin)
+        time.sleep(0.0001)
+
+
+def measure(bank: BankState, mode: str) -> tuple:
+    """Runs the writer with an optional concurrent report and returns latencies."""
+    latencies: list = []
+    started = threading.Event()
+    writer = threading.Thread(target=run_writes, args=(bank, latencies, started))
+    writer.start()
+    report_time = 0.0
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        started.set()
+        begin = time.perf_counter()
+        if mode == "locked":
+            # pylint: disable=protected-access
+            with bank._write_lock:
+                report(list(bank.users.values()), out)
+        elif mode == "snapshot":
+            with bank.snapshot() as snap:
+                report(snap.values(), out)
+        report_time = time.perf_counter() - begin
+    writer.join()
+    ordered = sorted(latencies)
+    return (
+        statistics.median(ordered),
+        ordered[int(len(ordered) * 0.99)],
+        ordered[-1],
+        report_time,
+        bank.store.retained_versions(),
+    )
+
+
+def main():
+    """Prints write latency percentiles for each mode."""
+    bank = build_bank()
+    # Long-lived state goes to the permanent generation, as a resident
+    # process would do after start-up, so cyclic GC pauses do not mask
+    # the effect being measured.
+    gc.freeze()
+    print(f"{USERS} users, {WRITES} deposits per run")
+    for mode in ("alone", "locked", "snapshot"):
+        p50, p99, worst, report_time, retained = measure(bank, mode)
+        extra = f", report {report_time:.2f}s" if mode != "alone" else ""
+        print(
+            f"  {mode:9s} write p50 {p50 * 1e6:7.0f}us  p99 {p99 * 1e6:8.0f}us  "
+            f"max {worst * 1e3:8.1f}ms{extra}, old versions after: {retained}"
+        )
+
+
+if __name__ == "__main__":
+    main()
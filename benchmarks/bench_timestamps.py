@@ -0,0 +1,49 @@
+"""Benchmarks loading and saving a transaction-heavy account with ISO vs epoch time stamps."""
+
+import json
+import time
+from datetime import datetime, timedelta
+
+from models.account import BankAccount
+from models.transaction import Transaction
+
+TRANSACTIONS = 200_000
+
+
+def build_account() -> BankAccount:
+    """Builds an account with TRANSACTIONS deposits spread over time."""
+    account = BankAccount(account_id=1, balance=0.0, currency="USD")
+    start = datetime(2020, 1, 1)
+    for i in range(TRANSACTIONS):
+        account.transactions.append(
+            Transaction(i + 1, 1.0, "deposit", start + timedelta(seconds=i), "USD")
+        )
+    return account
+
+
+def measure(account: BankAccount, epoch: bool) -> tuple[float, float]:
+    """Returns (save seconds, load seconds) for one storage format."""
+    begin = time.perf_counter()
+    text = json.dumps(account.to_dict(epoch))
+    saved = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    BankAccount.from_dict(json.loads(text))
+    loaded = time.perf_counter() - begin
+    return saved, loaded
+
+
+def main():
+    """Runs the benchmark and prints a small comparison table."""
+    account = build_account()
+    iso_save, iso_load = measure(account, epoch=False)
+    # Fresh account so the lazily cached datetimes do not favour either side.
+    account = BankAccount.from_dict(account.to_dict(epoch=True))
+    epoch_save, epoch_load = measure(account, epoch=True)
+    print(f"{TRANSACTIONS} transactions")
+    print(f"  save  ISO: {iso_save:.3f}s  epoch: {epoch_save:.3f}s")
+    print(f"  load  ISO: {iso_load:.3f}s  epoch: {epoch_load:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Benchmarks base-currency valuation of 1M accounts: column store vs pure-Python loop."""
+
+import random
+import time
+
+from models.account import BankAccount
+from models.exchange_rates import RATE_ENGINE
+from models.user import User
+from service.valuation_service import BalanceColumns
+
+ACCOUNTS = 1_000_000
+CURRENCIES = ("USD", "EUR", "UAN")
+
+
+def build_users() -> list[User]:
+    """Builds users with four accounts each in random currencies."""
+    rng = random.Random(3)
+    users = []
+    for user_id in range(ACCOUNTS // 4):
+        user = User(username="u", surname="s", user_id=user_id)
+        for k in range(4):
+            user.add_account(
+                BankAccount(
+                    user_id * 4 + k, rng.randrange(0, 1_000_000) / 100, rng.choice(CURRENCIES)
+                )
+            )
+        users.append(user)
+    return users
+
+
+def main():
+    """Times the naive per-account loop against the columnar valuation."""
+    users = build_users()
+    table = RATE_ENGINE.table
+
+    begin = time.perf_counter()
+    naive = 0.0
+    for user in users:
+        for account in user.accounts:
+            naive += account.get_balance() * table.rate(account.currency, "USD")
+    naive_time = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    columns = BalanceColumns().add_users(users)
+    gather_time = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    value = columns.value_minor("USD", table)
+    value_time = time.perf_counter() - begin
+
+    print(f"{ACCOUNTS} accounts")
+    print(f"  pure-Python loop:  {naive_time:.3f}s  (float result {naive:.2f})")
+    print(f"  gather columns:    {gather_time:.3f}s")
+    print(f"  columnar valuation:{value_time:.3f}s  (exact result {value / 100:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,67 @@
 import argparse
-from service.file_manager import FileManager
+import atexit
+import os
+from models.account_index import ACCOUNT_INDEX, METRICS
+from models.exchange_rates import RATE_ENGINE
+from models.id_allocator import TRANSACTION_IDS, USER_IDS
+from models.ledger import LEDGER
+from models.name_index import NAME_INDEX
 from service.account_service import AccountService
+from service.export_service import ExportService
+from service.interest_service import InterestService
+from service.netting import NettingService
+from service.payment_scheduler import PERIODS, SchedulerService
+from service.reconciliation import ReconciliationService
+from service.report_service import ReportService
 from service.user_service import Userservice
+from service.valuation_service import ValuationService
 
 
 def console_vision(user_id: int):
-    users = FileManager.load_all_users()
-    user = next((u for u in users if u.user_id == user_id), None)
-    if not user:
+    summary = ReportService.cached_summary(user_id)
+    if summary is None:
         print("User not found")
         return
-    user.print_summary()
+    print(summary, end="")
+
+
+def rename_data_file(old_path: str, new_path: str) -> None:
+    """
+    Moves a data file that was renamed, with the files kept next to it
+    (snapshots, locks), unless the new name is already in use.
+
+    :param old_path: Previous file path
+    :param new_path: Current file path
+    """
+    directory, old_name = os.path.split(old_path)
+    if not os.path.exists(old_path) or os.path.exists(new_path):
+        return
+    new_name = os.path.basename(new_path)
+    for name in os.listdir(directory or "."):
+        if name.startswith(old_name):
+            os.replace(
+                os.path.join(directory, name),
+                os.path.join(directory, new_name + name[len(old_name):]),
+            )
 
 
 def main():
+    # The journal holds tab-separated lines, not JSON.
+    rename_data_file("data/ledger.jsonl", "data/ledger.log")
+    # So does the standing-order log.
+    rename_data_file("data/schedules.jsonl", "data/schedules.log")
+    TRANSACTION_IDS.configure("data/transaction_ids.json")
+    # A CLI run uses a few IDs of its block; hand the rest back on exit so
+    # transaction and correlation IDs do not jump by a block per run.
+    atexit.register(TRANSACTION_IDS.release)
+    # One CLI run registers at most one user, so it leases one ID at a time.
+    USER_IDS.configure("data/user_ids.json", block_size=1)
+    LEDGER.configure("data/ledger.log")
+    AccountService.IDEMPOTENCY.configure("data/idempotency.sqlite3")
+    SchedulerService.SCHEDULER.configure("data/schedules.log")
+    ACCOUNT_INDEX.configure("data/account_index")
+    RATE_ENGINE.configure_history("data/rate_history.csv")
+    NAME_INDEX.configure("data/names.tsv")
     parser = argparse.ArgumentParser(description="BankApp CLI")
     subparsers = parser.add_subparsers(dest="command")
 
@@ -28,6 +76,17 @@ def main():
     reg.add_argument("--surname", required=True)
     reg.set_defaults(func=Userservice.register)
 
+    imp = subparsers.add_parser("import-users", help="Bulk import users from CSV")
+    imp.add_argument("--file", type=str, required=True)
+    imp.add_argument("--report", type=str, help="Rejected rows report (CSV)")
+    imp.set_defaults(func=Userservice.bulk_import)
+
+    find = subparsers.add_parser("find-users", help="Find users by name")
+    find.add_argument("--name", type=str, required=True, help="Name prefixes, e.g. 'ann ko'")
+    find.add_argument("--typos", type=int, default=0, help="Match whole names within this many typos")
+    find.add_argument("--limit", type=int, default=20)
+    find.set_defaults(func=Userservice.find_users)
+
     log = subparsers.add_parser("login", help="Login to the system")
     log.add_argument("--user-id", type=int, required=True)
     log.set_defaults(func=Userservice.login)
@@ -36,12 +95,14 @@ def main():
     withd.add_argument("--user-id", type=int, required=True)
     withd.add_argument("--account-id", type=int, required=True)
     withd.add_argument("--amount", type=float, required=True)
+    withd.add_argument("--idempotency-key", type=str, help="Makes retries safe")
     withd.set_defaults(func=AccountService.withdraw)
 
     dep = subparsers.add_parser("deposit", help="Account replenishment")
     dep.add_argument("--user-id", type=int, required=True)
     dep.add_argument("--account-id", type=int, required=True)
     dep.add_argument("--amount", type=float, required=True)
+    dep.add_argument("--idempotency-key", type=str, help="Makes retries safe")
     dep.set_defaults(func=AccountService.deposit)
 
     trans = subparsers.add_parser("transfer", help="Transfer between accounts")
@@ -49,8 +110,106 @@ def main():
     trans.add_argument("--from-id", type=int, required=True)
     trans.add_argument("--to-id", type=int, required=True)
     trans.add_argument("--amount", type=float, required=True)
+    trans.add_argument("--idempotency-key", type=str, help="Makes retries safe")
     trans.set_defaults(func=AccountService.transfer)
 
+    hist = subparsers.add_parser("history", help="Show account transactions")
+    hist.add_argument("--user-id", type=int, required=True)
+    hist.add_argument("--account-id", type=int, required=True)
+    hist.add_argument("--since", type=str, help="ISO date, inclusive")
+    hist.add_argument("--until", type=str, help="ISO date, exclusive")
+    hist.add_argument("--type", type=str, help="Transaction type prefix")
+    hist.add_argument("--limit", type=int, default=50)
+    hist.add_argument("--cursor", type=str)
+    hist.set_defaults(func=AccountService.history)
+
+    rep = subparsers.add_parser("report", help="Render a user report")
+    rep.add_argument("--user-id", type=int, required=True)
+    rep.add_argument("--format", choices=["text", "json", "csv"], default="text")
+    rep.add_argument("--since", type=str, help="ISO date, inclusive")
+    rep.add_argument("--until", type=str, help="ISO date, exclusive")
+    rep.add_argument("--limit", type=int, help="Transactions per account per page")
+    rep.add_argument("--page", type=int, default=1)
+    rep.add_argument("--output", type=str, help="Write to this file")
+    rep.set_defaults(func=ReportService.report)
+
+    ver = subparsers.add_parser(
+        "verify-totals", help="Recompute balance totals and report drift"
+    )
+    ver.set_defaults(func=AccountService.verify_totals)
+
+    led = subparsers.add_parser(
+        "verify-ledger", help="Replay the journal and report balance drift"
+    )
+    led.set_defaults(func=AccountService.verify_ledger)
+
+    lbal = subparsers.add_parser(
+        "ledger-balances", help="Show ledger balances, optionally at a past time"
+    )
+    lbal.add_argument("--at", type=str, help="ISO date for point-in-time recovery")
+    lbal.set_defaults(func=AccountService.ledger_balances)
+
+    exp = subparsers.add_parser(
+        "export-transactions", help="Export all transactions as a flat table"
+    )
+    exp.add_argument("--out", type=str, required=True, help="Directory, or file for csv")
+    exp.add_argument("--format", choices=ExportService.FORMATS, default="columnar")
+    exp.set_defaults(func=ExportService.export)
+
+    rec = subparsers.add_parser(
+        "reconcile", help="Check balances against transactions and pair transfer legs"
+    )
+    rec.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    rec.add_argument("--full", action="store_true", help="Recheck unchanged users too")
+    rec.set_defaults(func=ReconciliationService.reconcile)
+
+    accrue = subparsers.add_parser("accrue", help="Run an interest or fee batch (once per day)")
+    accrue.add_argument("--kind", choices=("interest", "fee"), required=True)
+    accrue.add_argument("--days", type=int, default=1, help="Days of interest")
+    accrue.set_defaults(func=InterestService.accrue)
+
+    net = subparsers.add_parser("settle-batch", help="Apply a CSV batch of transfers with netting")
+    net.add_argument(
+        "--file", type=str, required=True, help="CSV: user_id,from_id,to_user_id,to_id,amount"
+    )
+    net.set_defaults(func=NettingService.settle_batch)
+
+    sch = subparsers.add_parser("schedule", help="Create a standing order")
+    sch.add_argument("--user-id", type=int, required=True)
+    sch.add_argument("--from-id", type=int, required=True)
+    sch.add_argument("--to-user-id", type=int, help="Owner of the target account")
+    sch.add_argument("--to-id", type=int, required=True)
+    sch.add_argument("--amount", type=float, required=True)
+    sch.add_argument("--period", choices=list(PERIODS), required=True)
+    sch.add_argument("--start", type=str, help="ISO date of the first payment (default: now)")
+    sch.set_defaults(func=SchedulerService.schedule)
+
+    unsch = subparsers.add_parser("cancel-schedule", help="Cancel a standing order")
+    unsch.add_argument("--order-id", type=int, required=True)
+    unsch.set_defaults(func=SchedulerService.cancel)
+
+    runsch = subparsers.add_parser("run-schedules", help="Execute due standing orders")
+    runsch.add_argument("--limit", type=int, help="Maximum payments in this run")
+    runsch.add_argument(
+        "--no-catch-up", action="store_true", help="Pay only the latest missed occurrence"
+    )
+    runsch.set_defaults(func=SchedulerService.run)
+
+    top = subparsers.add_parser(
+        "top-accounts", help="Largest balances or most active accounts per currency"
+    )
+    top.add_argument("--currency", type=str, required=True)
+    top.add_argument("--by", choices=METRICS, default="balance")
+    top.add_argument("--limit", type=int, default=10)
+    top.add_argument("--min", dest="minimum", type=float, help="Only accounts at or above")
+    top.set_defaults(func=AccountService.top_accounts)
+
+    val = subparsers.add_parser("valuation", help="Value balances in one currency")
+    val.add_argument("--user-id", type=int)
+    val.add_argument("--base", type=str, default="USD")
+    val.add_argument("--at", type=str, help="Use the rates in force at this ISO time")
+    val.set_defaults(func=ValuationService.valuation)
+
     args = parser.parse_args()
     if hasattr(args, "func"):
         args.func(args)
@@ -4,18 +4,32 @@
 transfer, and transaction history."""
 
 from datetime import datetime
-from typing import List, Optional
-from models.transaction import Transaction
+from fractions import Fraction
+from typing import Callable, List, Optional, Union
+from models.balance_checkpoints import BalanceCheckpoints
+from models.exchange_rates import RATE_ENGINE
+from models.id_allocator import TRANSACTION_IDS
+from models.ledger import EQUITY, EXTERNAL, FX, LEDGER, JournalEntry, Posting, system_account
+from models.money import convert_minor, from_minor, to_minor
+from models.transaction import Transaction, now_epoch_us, to_epoch_us
+from models.transaction_index import TransactionIndex, TransactionPage
 
 
 class BankAccount:
     """
     Represents a bank account with basic operations such as deposit, withdrawal, and transfer.
     Stores a list of transaction history.
+    The balance is kept in integer minor units (balance_minor); balance is its float view.
+    Observers registered in `observers` are called as observer(account, delta_minor)
+    after every balance change, and those in `record_observers` as
+    observer(account, transaction) after every transaction added to history.
+    Every balance change is posted to `ledger` as a balanced JournalEntry first;
+    balance_minor is the account's materialized view of its postings under
+    `ledger_key` (which User.add_account scopes to the owning user).
     """
 
     account_id: int
-    balance: float
+    balance_minor: int
     currency: str
 
     def __init__(self, account_id: int, balance: float, currency: str) -> None:
@@ -28,9 +42,87 @@ class BankAccount:
         """
 
         self.account_id = account_id
-        self.balance = balance
+        self.balance_minor = to_minor(balance)
+        # Balance the account was created with; reconciliation replays the
+        # transactions from here, so it is never derived from the balance.
+        self.opening_minor = self.balance_minor
         self.currency = currency
         self.transactions: List[Transaction] = []
+        self.ledger = LEDGER
+        self.ledger_key = f"account:{account_id}"
+        self.observers: List[Callable[["BankAccount", int], None]] = []
+        self.record_observers: List[Callable[["BankAccount", Transaction], None]] = []
+        self._index: Optional[TransactionIndex] = None
+        self._checkpoints: Optional[BalanceCheckpoints] = None
+        self._saved_checkpoints: Optional[dict] = None
+
+    def _apply_change(self, delta_minor: int) -> None:
+        """
+        Applies a signed balance change and notifies observers.
+
+        :param delta_minor: Change in minor units
+        """
+        self.balance_minor += delta_minor
+        for observer in self.observers:
+            observer(self, delta_minor)
+
+    def _post(self, entry: JournalEntry, *accounts: "BankAccount") -> None:
+        """
+        Posts a journal entry and materializes its effect on the given accounts.
+
+        :param entry: Balanced journal entry
+        :param accounts: Accounts touched by the entry
+        :raises ValueError: If the entry is unbalanced
+        """
+        self.ledger.post(entry)
+        for account in accounts:
+            # pylint: disable=protected-access
+            account._apply_change(entry.delta_for(account.ledger_key))
+
+    def _record(self, transaction: Transaction) -> None:
+        """
+        Appends a transaction to the history, extends the balance
+        checkpoints if they are in use and notifies record observers.
+
+        :param transaction: Transaction to record
+        """
+        self.transactions.append(transaction)
+        if self._checkpoints is not None:
+            self._checkpoints.sync()
+        for observer in self.record_observers:
+            observer(self, transaction)
+
+    @property
+    def balance(self) -> float:
+        """
+        Returns the balance in major units.
+
+        :return: Current balance as float
+        """
+        return from_minor(self.balance_minor)
+
+    @balance.setter
+    def balance(self, value: float) -> None:
+        """
+        Sets the balance from an amount in major units, posting the
+        difference as an adjustment against equity.
+
+        :param value: New balance
+        """
+        delta_minor = to_minor(value) - self.balance_minor
+        equity = system_account(EQUITY, self.currency)
+        self._post(
+            JournalEntry(
+                TRANSACTION_IDS.next_id(),
+                now_epoch_us(),
+                "adjustment",
+                (
+                    Posting(self.ledger_key, self.currency, delta_minor),
+                    Posting(equity, self.currency, -delta_minor),
+                ),
+            ),
+            self,
+        )
 
     def get_account_id(self) -> int:
         """
@@ -68,15 +160,27 @@ class BankAccount:
             if currency != self.currency:
                 raise ValueError("Currency mismatch")
 
-            self.balance += amount
-            transaction = Transaction(
-                transaction_id=len(self.transactions) + 1,
-                amount=amount,
+            amount_minor = to_minor(amount)
+            transaction = Transaction.from_epoch(
+                transaction_id=TRANSACTION_IDS.next_id(),
+                amount_minor=amount_minor,
                 currency=currency,
                 transaction_type="deposit",
-                time_stamp=datetime.now(),
+                time_stamp_us=now_epoch_us(),
+            )
+            self._post(
+                JournalEntry(
+                    transaction.transaction_id,
+                    transaction.time_stamp_us,
+                    "deposit",
+                    (
+                        Posting(self.ledger_key, currency, amount_minor),
+                        Posting(system_account(EXTERNAL, currency), currency, -amount_minor),
+                    ),
+                ),
+                self,
             )
-            self.transactions.append(transaction)
+            self._record(transaction)
 
             return "Deposit successful"
         except ValueError as e:
@@ -110,18 +214,30 @@ class BankAccount:
             if currency != self.currency:
                 raise ValueError("Currency cannot be changed")
 
-            if amount > self.balance:
+            amount_minor = to_minor(amount)
+            if amount_minor > self.balance_minor:
                 raise ValueError("Amount cannot be greater than balance")
 
-            self.balance -= amount
-            withdraw_transaction = Transaction(
-                transaction_id=len(self.transactions) + 1,
-                amount=amount,
+            withdraw_transaction = Transaction.from_epoch(
+                transaction_id=TRANSACTION_IDS.next_id(),
+                amount_minor=amount_minor,
                 currency=currency,
                 transaction_type="withdraw",
-                time_stamp=datetime.now(),
+                time_stamp_us=now_epoch_us(),
             )
-            self.transactions.append(withdraw_transaction)
+            self._post(
+                JournalEntry(
+                    withdraw_transaction.transaction_id,
+                    withdraw_transaction.time_stamp_us,
+                    "withdraw",
+                    (
+                        Posting(self.ledger_key, currency, -amount_minor),
+                        Posting(system_account(EXTERNAL, currency), currency, amount_minor),
+                    ),
+                ),
+                self,
+            )
+            self._record(withdraw_transaction)
             return "Withdrawal was successful"
         except ValueError as e:
             return f"Withdrawal error:{e}"
@@ -159,39 +275,69 @@ class BankAccount:
             if currency != self.currency:
                 raise ValueError("The amount must be in your account currency..")
 
-            if amount > self.balance:
+            amount_minor = to_minor(amount)
+            if amount_minor > self.balance_minor:
                 raise ValueError("Insufficient funds for transfer.")
 
-            exchange_rate = self.get_exchange_rate(
+            if target_account is not self and target_account.ledger_key == self.ledger_key:
+                raise ValueError("Both accounts have the same ledger key.")
+
+            exchange_rate = self.get_exchange_rate_fraction(
                 self.currency, target_account.currency
             )
             if exchange_rate is None:
                 raise ValueError("Unable to transfer: no exchange rate available.")
 
-            converted_amount = round(amount * exchange_rate, 2)
+            converted_minor = convert_minor(amount_minor, exchange_rate)
+            time_stamp_us = now_epoch_us()
+            correlation_id = TRANSACTION_IDS.next_id()
+
+            # One journal entry for both legs; the correlation ID is its entry ID.
+            postings = [Posting(self.ledger_key, self.currency, -amount_minor)]
+            if self.currency != target_account.currency:
+                postings += [
+                    Posting(system_account(FX, self.currency), self.currency, amount_minor),
+                    Posting(
+                        system_account(FX, target_account.currency),
+                        target_account.currency,
+                        -converted_minor,
+                    ),
+                ]
+            postings.append(
+                Posting(target_account.ledger_key, target_account.currency, converted_minor)
+            )
+            self._post(
+                JournalEntry(correlation_id, time_stamp_us, "transfer", tuple(postings)),
+                self,
+                target_account,
+            )
 
-            self.balance -= amount
-            self.transactions.append(
-                Transaction(
-                    transaction_id=len(self.transactions) + 1,
-                    amount=amount,
+            self._record(
+                Transaction.from_epoch(
+                    transaction_id=TRANSACTION_IDS.next_id(),
+                    amount_minor=amount_minor,
                     currency=self.currency,
                     transaction_type=f"transfer_to_{target_account.get_account_id()}",
-                    time_stamp=datetime.now(),
+                    time_stamp_us=time_stamp_us,
+                    exchange_rate=exchange_rate,
+                    correlation_id=correlation_id,
                 )
             )
 
-            target_account.balance += converted_amount
-            target_account.transactions.append(
-                Transaction(
-                    transaction_id=len(target_account.transactions) + 1,
-                    amount=converted_amount,
+            # pylint: disable=protected-access
+            target_account._record(
+                Transaction.from_epoch(
+                    transaction_id=TRANSACTION_IDS.next_id(),
+                    amount_minor=converted_minor,
                     currency=target_account.currency,
                     transaction_type=f"transfer_from_{self.get_account_id()}",
-                    time_stamp=datetime.now(),
+                    time_stamp_us=time_stamp_us,
+                    exchange_rate=exchange_rate,
+                    correlation_id=correlation_id,
                 )
             )
 
+            converted_amount = from_minor(converted_minor)
             formated_amount = (
                 int(converted_amount)
                 if converted_amount.is_integer()
@@ -214,19 +360,26 @@ class BankAccount:
         :param to_currency: Currency to convert to
         :return: Exchange rate as a float, or None if unavailable
         """
-
-        exchange_rates = {
-            ("USD", "UAN"): 39.5,
-            ("UAN", "USD"): 1 / 39.5,
-            ("USD", "EUR"): 0.92,
-            ("EUR", "USD"): 1 / 0.92,
-            ("UAN", "EUR"): (1 / 39.5) * 0.92,
-            ("EUR", "UAN"): (1 / 0.92) * 39.5,
-        }
         if from_currency == to_currency:
             return 1.0
 
-        return exchange_rates.get((from_currency, to_currency), None)
+        return RATE_ENGINE.table.rate(from_currency, to_currency)
+
+    @staticmethod
+    def get_exchange_rate_fraction(
+        from_currency: str, to_currency: str
+    ) -> Optional[Fraction]:
+        """
+        Retrieves the exact exchange rate between two currencies.
+
+        :param from_currency: Currency to convert from
+        :param to_currency: Currency to convert to
+        :return: Exchange rate as a Fraction, or None if unavailable
+        """
+        if from_currency == to_currency:
+            return Fraction(1)
+
+        return RATE_ENGINE.table.fraction(from_currency, to_currency)
 
     def get_balance(self) -> float:
         """
@@ -244,9 +397,114 @@ class BankAccount:
         """
         return self.transactions
 
-    def to_dict(self):
+    @property
+    def transaction_index(self) -> TransactionIndex:
+        """
+        Returns the time-ordered index of this account's transactions,
+        creating it on first use (or if the transaction list was replaced).
+
+        :return: TransactionIndex over self.transactions
+        """
+        if self._index is None or self._index.transactions is not self.transactions:
+            self._index = TransactionIndex(self.transactions)
+        return self._index
+
+    @property
+    def balance_checkpoints(self) -> BalanceCheckpoints:
+        """
+        Returns the running-balance checkpoints, restoring saved ones or
+        building them from history on first use.
+
+        :return: BalanceCheckpoints over this account's transaction index
+        """
+        index = self.transaction_index
+        if self._checkpoints is None or self._checkpoints.index is not index:
+            self._checkpoints = BalanceCheckpoints.from_dict(
+                index, self._saved_checkpoints, self.opening_minor
+            )
+            self._saved_checkpoints = None
+        return self._checkpoints
+
+    def restore_opening(self, opening: Optional[float]) -> None:
+        """
+        Restores the saved opening balance. Files written before it was
+        stored opened every account with create_account at 0, so a missing
+        opening is 0; deriving it from the balance would hide any drift from
+        reconciliation.
+
+        :param opening: Saved opening balance in major units (or None)
+        """
+        self.opening_minor = 0 if opening is None else to_minor(opening)
+
+    def restore_checkpoints(self, data: Optional[dict]) -> None:
+        """
+        Keeps saved checkpoint data to be validated and used on first balance_at call.
+
+        :param data: Dictionary produced by BalanceCheckpoints.to_dict (or None)
+        """
+        self._saved_checkpoints = data
+        self._checkpoints = None
+
+    def balance_at(self, moment: Union[datetime, int]) -> float:
+        """
+        Returns the balance right after all transactions up to the given time.
+        Uses the nearest checkpoint and replays only the transactions after it.
+
+        :param moment: Datetime or epoch microseconds
+        :return: Balance at that time
+        """
+        if isinstance(moment, datetime):
+            moment = to_epoch_us(moment)
+        return from_minor(self.balance_checkpoints.balance_at(moment))
+
+    def get_transactions_between(
+        self, start: Union[datetime, int], end: Union[datetime, int]
+    ) -> List[Transaction]:
+        """
+        Returns the transactions whose time falls in [start, end), in time order.
+
+        :param start: Inclusive lower bound (datetime or epoch microseconds)
+        :param end: Exclusive upper bound (datetime or epoch microseconds)
+        :return: List of matching Transaction objects
+        """
+        return self.query_transactions(start=start, end=end).items
+
+    def query_transactions(  # pylint: disable=too-many-arguments
+        self,
+        start: Union[datetime, int, None] = None,
+        end: Union[datetime, int, None] = None,
+        transaction_type: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> TransactionPage:
+        """
+        Queries the transaction history by time range, type prefix and amount
+        bounds, one page at a time. Uses the time-ordered index, so the cost is
+        O(log n + k) for k transactions in the time range.
+
+        :param start: Inclusive lower bound (datetime or epoch microseconds)
+        :param end: Exclusive upper bound (datetime or epoch microseconds)
+        :param transaction_type: Type prefix, e.g. "deposit" or "transfer"
+        :param min_amount: Inclusive minimum amount
+        :param max_amount: Inclusive maximum amount
+        :param limit: Maximum number of transactions per page
+        :param cursor: next_cursor returned with the previous page
+        :return: TransactionPage(items, next_cursor)
+        """
+        if isinstance(start, datetime):
+            start = to_epoch_us(start)
+        if isinstance(end, datetime):
+            end = to_epoch_us(end)
+        return self.transaction_index.query(
+            start, end, transaction_type, min_amount, max_amount, limit, cursor
+        )
+
+    def to_dict(self, epoch: bool = False):
         """
         Converts the account data to a dictionary format for serialization.
+        :param epoch: Store transaction time stamps as epoch microseconds
         :return: Dictionary with account data
         """
         # Code borrowed from: https://github.com/pjastr/PFsample/blob/master/src/user.py
@@ -262,12 +520,21 @@ class BankAccount:
         # - Added support for nested object serialization (Transaction list)
         # - Added error handling for missing or invalid data
         # - Applied PEP8 naming and static typing
-        return {
+        data = {
             "account_id": self.account_id,
             "balance": self.balance,
+            "opening": from_minor(self.opening_minor),
             "currency": self.currency,
-            "transactions": [t.to_dict() for t in self.transactions],
+            "transactions": [t.to_dict(epoch) for t in self.transactions],
         }
+        # Checkpoints are only written once built; saved ones pass through
+        # unchanged, so saving never replays an account's history.
+        checkpoints = self._checkpoints
+        if checkpoints is not None and checkpoints.index.transactions is self.transactions:
+            data["checkpoints"] = checkpoints.to_dict()
+        elif self._saved_checkpoints is not None:
+            data["checkpoints"] = self._saved_checkpoints
+        return data
 
     @staticmethod
     def from_dict(data) -> Optional["BankAccount"]:
@@ -300,8 +567,10 @@ class BankAccount:
             for tr_data in data.get("transactions", []):
                 transaction = Transaction.from_dict(tr_data)
                 account.transactions.append(transaction)
+            account.restore_opening(data.get("opening"))
+            account.restore_checkpoints(data.get("checkpoints"))
 
             return account
-        except (ValueError, KeyError):
+        except (ValueError, KeyError, TypeError):
             print("Error loading account from dict")
             return None
@@ -0,0 +1,527 @@
+"""Per-currency ordered index of account balances and transaction counts for
+top-N and threshold queries."""
+
+import heapq
+import json
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+METRICS = ("balance", "transactions")
+
+# (value, user_id, account_id)
+Item = Tuple[int, int, int]
+
+
+class IndexEntry(NamedTuple):
+    """One account in a query result; value is minor units or a transaction count."""
+
+    user_id: int
+    account_id: int
+    value: int
+
+
+class SortedItems:
+    """
+    Sorted list of items split into buckets of at most 2 * LOAD items, with
+    the largest item of each bucket kept for bisecting. Adding or removing
+    an item is a bisect plus a shift within one bucket, so updates stay
+    cheap at millions of items; iterating from the top costs O(1) per item.
+    """
+
+    LOAD = 512
+
+    def __init__(self, items: Iterable[Item] = ()) -> None:
+        """
+        :param items: Initial items in any order (sorted once)
+        """
+        ordered = sorted(items)
+        load = self.LOAD
+        self._buckets: List[List[Item]] = [
+            ordered[i : i + load] for i in range(0, len(ordered), load)
+        ]
+        self._maxes: List[Item] = [bucket[-1] for bucket in self._buckets]
+        self._len = len(ordered)
+
+    def __len__(self) -> int:
+        """Number of items."""
+        return self._len
+
+    def __iter__(self) -> Iterator[Item]:
+        """Iterates items in ascending order."""
+        for bucket in self._buckets:
+            yield from bucket
+
+    def add(self, item: Item) -> None:
+        """
+        Inserts an item.
+
+        :param item: Item to insert
+        """
+        self._len += 1
+        if not self._buckets:
+            self._buckets.append([item])
+            self._maxes.append(item)
+            return
+        k = min(bisect_left(self._maxes, item), len(self._maxes) - 1)
+        bucket = self._buckets[k]
+        insort(bucket, item)
+        self._maxes[k] = bucket[-1]
+        if len(bucket) > 2 * self.LOAD:
+            half = bucket[self.LOAD :]
+            del bucket[self.LOAD :]
+            self._buckets.insert(k + 1, half)
+            self._maxes[k] = bucket[-1]
+            self._maxes.insert(k + 1, half[-1])
+
+    def remove(self, item: Item) -> None:
+        """
+        Removes an item.
+
+        :param item: Item to remove
+        :raises ValueError: If the item is not present
+        """
+        k = bisect_left(self._maxes, item)
+        if k < len(self._maxes):
+            bucket = self._buckets[k]
+            i = bisect_left(bucket, item)
+            if i < len(bucket) and bucket[i] == item:
+                del bucket[i]
+                self._len -= 1
+                if not bucket:
+                    del self._buckets[k]
+                    del self._maxes[k]
+                elif i == len(bucket):
+                    self._maxes[k] = bucket[-1]
+                return
+        raise ValueError(f"{item} is not in the index")
+
+    def descending(self, minimum: Optional[Item] = None) -> Iterator[Item]:
+        """
+        Iterates items from the largest down, stopping below minimum.
+
+        :param minimum: Smallest item to yield (None for all)
+        :return: Iterator over items
+        """
+        for bucket in reversed(self._buckets):
+            for item in reversed(bucket):
+                if minimum is not None and item < minimum:
+                    return
+                yield item
+
+
+def _top(items: Iterable[Item], limit: Optional[int]) -> List[IndexEntry]:
+    """Turns the first limit items into entries."""
+    result = []
+    for value, user_id, account_id in items:
+        if limit is not None and len(result) >= limit:
+            break
+        result.append(IndexEntry(user_id, account_id, value))
+    return result
+
+
+class AccountIndex:
+    """
+    Ordered index of every tracked account's balance and transaction count,
+    per currency. Accounts are tracked through their observers, so each
+    balance change or new transaction moves one item (O(log n + LOAD)).
+    top() and above() walk from the top of one currency's list and cost
+    O(result size), independent of the number of accounts.
+
+    With a path, save() writes each list as sorted binary columns which
+    IndexReader queries with a bisect over memory-mapped files, so the CLI
+    can answer without loading users. The saved index records the users
+    file it matches; a load of that file only attaches the observers
+    (attach(), no sort) and the next save appends the accounts that changed
+    to a changes log (user, account, currency, balance, transaction count,
+    tab-separated, the last line per account wins). The columns are only
+    rewritten when the saved index is missing or stale, or when the log has
+    grown past 1/COMPACT_RATIO of the accounts.
+    """
+
+    COMPACT_RATIO = 16
+    COMPACT_MIN = 1024
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        :param path: Directory for the persisted index (None for in-memory)
+        """
+        self.path = path
+        # None until the first in-memory query or rewrite needs them sorted.
+        self._lists: Optional[Dict[Tuple[str, str], SortedItems]] = {}
+        # ledger key -> [account, user_id, balance_minor, transaction count]
+        self._tracked: Dict[str, list] = {}
+        # (user_id, account_id) -> tracked entry changed since the last save
+        self._changed: Dict[Tuple[int, int], list] = {}
+        # Users file stamp the saved index matches (None: rewrite on save)
+        self._stamp: Optional[List[int]] = None
+
+    def configure(self, path: Optional[str]) -> None:
+        """
+        Sets the directory for the persisted index.
+
+        :param path: Directory (None for in-memory)
+        """
+        self.path = path
+
+    def reset(self, users: Iterable) -> None:
+        """
+        Rebuilds the index from loaded users with one sort per list. The
+        next save() rewrites the saved index.
+
+        :param users: Users whose accounts are tracked
+        """
+        self.attach(users)
+        self._sorted()
+
+    def attach(self, users: Iterable, stamp: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Tracks the accounts of loaded users without sorting them; the lists
+        are built on the first in-memory query. If the saved index was
+        written for the users file they were loaded from, save() only
+        appends the accounts that change from here on.
+
+        :param users: Users whose accounts are tracked
+        :param stamp: (size, mtime_ns) of the users file they were loaded from
+        """
+        self._tracked = {}
+        self._lists = None
+        self._changed = {}
+        for user in users:
+            for account in user.accounts:
+                self._attach(user.user_id, account)
+        self._stamp = None
+        if stamp is not None:
+            manifest = self._manifest()
+            if manifest is not None and manifest.get("stamp") == list(stamp):
+                self._stamp = list(stamp)
+
+    def _sorted(self) -> Dict[Tuple[str, str], SortedItems]:
+        """Returns the lists, sorting the tracked accounts once on first use."""
+        if self._lists is None:
+            items: Dict[str, Tuple[List[Item], List[Item]]] = {}
+            for account, user_id, balance_minor, count in self._tracked.values():
+                lists = items.get(account.currency)
+                if lists is None:
+                    lists = items[account.currency] = ([], [])
+                lists[0].append((balance_minor, user_id, account.account_id))
+                lists[1].append((count, user_id, account.account_id))
+            self._lists = {
+                (metric, currency): SortedItems(values)
+                for currency, lists in items.items()
+                for metric, values in zip(METRICS, lists)
+            }
+        return self._lists
+
+    def track_users(self, users: Iterable) -> None:
+        """
+        Starts tracking accounts not tracked yet (e.g. created since load).
+
+        :param users: Users whose accounts are checked
+        """
+        for user in users:
+            for account in user.accounts:
+                tracked = self._tracked.get(account.ledger_key)
+                if tracked is None or tracked[0] is not account:
+                    if tracked is not None and self._lists is not None:
+                        self._remove(tracked)
+                    entry = self._attach(user.user_id, account)
+                    self._changed[(entry[1], account.account_id)] = entry
+                    if self._lists is None:
+                        continue
+                    for metric, value in zip(METRICS, entry[2:]):
+                        self._list(metric, account.currency).add(
+                            (value, entry[1], account.account_id)
+                        )
+
+    def _attach(self, user_id: int, account) -> list:
+        """Registers the observers of an account and records its current values."""
+        entry = [account, user_id, account.balance_minor, len(account.transactions)]
+        self._tracked[account.ledger_key] = entry
+        if self._on_balance not in account.observers:
+            account.observers.append(self._on_balance)
+            account.record_observers.append(self._on_record)
+        return entry
+
+    def _list(self, metric: str, currency: str) -> SortedItems:
+        """Returns (creating if needed) the list of one metric and currency."""
+        lists = self._sorted()
+        key = (metric, currency)
+        if key not in lists:
+            lists[key] = SortedItems()
+        return lists[key]
+
+    def _remove(self, entry: list) -> None:
+        """Removes a tracked account's items."""
+        account, user_id, balance_minor, count = entry
+        self._lists[("balance", account.currency)].remove((balance_minor, user_id, account.account_id))
+        self._lists[("transactions", account.currency)].remove((count, user_id, account.account_id))
+
+    def _move(self, entry: list, position: int, metric: str, value: int) -> None:
+        """Moves one account's item in one list to a new value."""
+        account, user_id = entry[0], entry[1]
+        if self._lists is not None:
+            items = self._list(metric, account.currency)
+            items.remove((entry[position], user_id, account.account_id))
+            items.add((value, user_id, account.account_id))
+        entry[position] = value
+        self._changed[(user_id, account.account_id)] = entry
+
+    def _on_balance(self, account, _delta_minor: int) -> None:
+        """BankAccount observer: moves the account in its balance list."""
+        entry = self._tracked.get(account.ledger_key)
+        if entry is not None and entry[0] is account:
+            self._move(entry, 2, "balance", account.balance_minor)
+
+    def _on_record(self, account, _transaction) -> None:
+        """BankAccount record observer: moves the account in its activity list."""
+        entry = self._tracked.get(account.ledger_key)
+        if entry is not None and entry[0] is account:
+            self._move(entry, 3, "transactions", len(account.transactions))
+
+    def top(self, metric: str, currency: str, limit: int = 10) -> List[IndexEntry]:
+        """
+        Returns the accounts with the largest values.
+
+        :param metric: "balance" or "transactions"
+        :param currency: Currency code
+        :param limit: Number of accounts
+        :return: Entries, largest first
+        """
+        items = self._sorted().get((metric, currency))
+        return [] if items is None else _top(items.descending(), limit)
+
+    def above(
+        self, metric: str, currency: str, threshold: int, limit: Optional[int] = None
+    ) -> List[IndexEntry]:
+        """
+        Returns the accounts whose value is at least threshold.
+
+        :param metric: "balance" (threshold in minor units) or "transactions"
+        :param currency: Currency code
+        :param threshold: Smallest value included
+        :param limit: Maximum number of accounts (None for all)
+        :return: Entries, largest first
+        """
+        items = self._sorted().get((metric, currency))
+        return [] if items is None else _top(items.descending((threshold,)), limit)
+
+    def save(self, stamp: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Brings the saved index up to date: appends the accounts changed
+        since the last load or save to the changes log if the saved index
+        still matches, otherwise rewrites every list as sorted columns.
+
+        :param stamp: (size, mtime_ns) of the users file just saved, which
+                      the next load compares (None: the next save rewrites)
+        """
+        if self.path is None:
+            return
+        manifest = self._manifest() if self._stamp is not None else None
+        if (
+            manifest is not None
+            and manifest.get("stamp") == self._stamp
+            and manifest["changes"] + len(self._changed)
+            <= max(self.COMPACT_MIN, len(self._tracked) // self.COMPACT_RATIO)
+        ):
+            self._append_changes(manifest)
+        else:
+            manifest = self._write_columns()
+        manifest["stamp"] = None if stamp is None else list(stamp)
+        self._write_manifest(manifest)
+        self._changed = {}
+        self._stamp = manifest["stamp"]
+
+    def restamp(self, old: Optional[Tuple[int, int]], new: Optional[Tuple[int, int]]) -> None:
+        """
+        Moves the saved index to a new users file stamp after a change that
+        touched no account (a user appended without accounts).
+
+        :param old: (size, mtime_ns) of the users file before the change
+        :param new: (size, mtime_ns) after it
+        """
+        if self.path is None or old is None or new is None:
+            return
+        manifest = self._manifest()
+        if manifest is not None and manifest.get("stamp") == list(old):
+            manifest["stamp"] = list(new)
+            self._write_manifest(manifest)
+        if self._stamp == list(old):
+            self._stamp = list(new)
+
+    def reader(self, stamp: Optional[Tuple[int, int]]) -> Optional["IndexReader"]:
+        """
+        Opens the saved index if it was written for the users file as it is now.
+
+        :param stamp: (size, mtime_ns) of the current users file
+        :return: IndexReader, or None if the saved index is missing or stale
+        """
+        manifest = self._manifest()
+        if manifest is None or stamp is None or manifest.get("stamp") != list(stamp):
+            return None
+        return IndexReader(self.path)
+
+    def _manifest(self) -> Optional[dict]:
+        """Reads the saved manifest; None if there is no usable one."""
+        if self.path is None:
+            return None
+        try:
+            with open(os.path.join(self.path, "index.json"), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if manifest.get("byteorder") != sys.byteorder or "changes" not in manifest:
+            return None
+        return manifest
+
+    def _write_manifest(self, manifest: dict) -> None:
+        """Replaces the saved manifest."""
+        temp_path = os.path.join(self.path, "index.json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, os.path.join(self.path, "index.json"))
+
+    def _append_changes(self, manifest: dict) -> None:
+        """Appends the changed accounts to the changes log and counts them in manifest."""
+        data = "".join(
+            f"{user_id}\t{account_id}\t{entry[0].currency}\t{entry[2]}\t{entry[3]}\n"
+            for (user_id, account_id), entry in self._changed.items()
+        ).encode("utf-8")
+        with open(os.path.join(self.path, "changes.tsv"), "ab") as f:
+            # Drops lines of a save interrupted before its manifest was written.
+            f.truncate(manifest["changes_size"])
+            f.write(data)
+        manifest["changes"] += len(self._changed)
+        manifest["changes_size"] += len(data)
+
+    def _write_columns(self) -> dict:
+        """Writes every list as sorted columns (values, user IDs, account IDs)."""
+        os.makedirs(self.path, exist_ok=True)
+        manifest = {"byteorder": sys.byteorder, "lists": {}, "changes": 0, "changes_size": 0}
+        for (metric, currency), items in self._sorted().items():
+            columns = (array("q"), array("q"), array("q"))
+            for item in items:
+                for column, value in zip(columns, item):
+                    column.append(value)
+            name = f"{metric}-{currency}"
+            for suffix, column in zip(("values", "users", "accounts"), columns):
+                temp_path = os.path.join(self.path, f"{name}.{suffix}.tmp")
+                with open(temp_path, "wb") as f:
+                    column.tofile(f)
+                os.replace(temp_path, os.path.join(self.path, f"{name}.{suffix}.bin"))
+            manifest["lists"][name] = len(items)
+        # The new columns already hold every logged change.
+        with open(os.path.join(self.path, "changes.tsv"), "wb"):
+            pass
+        return manifest
+
+
+class IndexReader:
+    """
+    Queries an index written by AccountIndex.save() through memory-mapped
+    columns: top() reads the last entries and above() bisects the values,
+    skipping accounts found in the changes log, whose logged values are
+    merged in. The whole log is read on open; AccountIndex.save() keeps it
+    below max(COMPACT_MIN, n / COMPACT_RATIO) lines by rewriting the
+    columns, so opening and querying cost O(log n + result size + n / 16)
+    at worst.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: Directory written by AccountIndex.save()
+        :raises FileNotFoundError: If no index was saved there
+        :raises ValueError: If the index was written with another byte order
+        """
+        with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest["byteorder"] != sys.byteorder:
+            raise ValueError("Index was written with a different byte order")
+        self.path = path
+        # (user_id, account_id) -> (currency, balance_minor, transaction count)
+        self.changes: Dict[Tuple[int, int], Tuple[str, int, int]] = {}
+        size = self.manifest.get("changes_size", 0)
+        if size:
+            with open(os.path.join(path, "changes.tsv"), "rb") as f:
+                lines = f.read(size).decode("utf-8").splitlines()
+            for line in lines:
+                user_id, account_id, currency, balance_minor, count = line.split("\t")
+                self.changes[(int(user_id), int(account_id))] = (
+                    currency, int(balance_minor), int(count)
+                )
+
+    def _columns(self, metric: str, currency: str):
+        """Maps the (values, users, accounts) columns of one list; None if it is empty."""
+        name = f"{metric}-{currency}"
+        if not self.manifest["lists"].get(name):
+            return None
+        columns = []
+        for suffix in ("values", "users", "accounts"):
+            with open(os.path.join(self.path, f"{name}.{suffix}.bin"), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            columns.append((mapped, memoryview(mapped).cast("q")))
+        return columns
+
+    def _query(
+        self, metric: str, currency: str, threshold: Optional[int], limit: Optional[int]
+    ) -> List[IndexEntry]:
+        """Merges the saved entries at or above threshold with the logged changes."""
+        position = METRICS.index(metric) + 1
+        changed = sorted(
+            (
+                (logged[position], user_id, account_id)
+                for (user_id, account_id), logged in self.changes.items()
+                if logged[0] == currency and (threshold is None or logged[position] >= threshold)
+            ),
+            reverse=True,
+        )
+        columns = self._columns(metric, currency)
+        if columns is None:
+            return _top(changed, limit)
+        (_v, values), (_u, users), (_a, accounts) = columns
+        try:
+            first = 0 if threshold is None else bisect_left(values, threshold)
+            if limit is not None and not self.changes:
+                first = max(first, len(values) - limit)
+            saved = (
+                (values[i], users[i], accounts[i])
+                for i in range(len(values) - 1, first - 1, -1)
+                if (users[i], accounts[i]) not in self.changes
+            )
+            return _top(heapq.merge(saved, changed, reverse=True), limit)
+        finally:
+            for mapped, view in columns:
+                view.release()
+                mapped.close()
+
+    def top(self, metric: str, currency: str, limit: int = 10) -> List[IndexEntry]:
+        """
+        Returns the accounts with the largest values.
+
+        :param metric: "balance" or "transactions"
+        :param currency: Currency code
+        :param limit: Number of accounts
+        :return: Entries, largest first
+        """
+        return self._query(metric, currency, None, limit)
+
+    def above(
+        self, metric: str, currency: str, threshold: int, limit: Optional[int] = None
+    ) -> List[IndexEntry]:
+        """
+        Returns the accounts whose value is at least threshold.
+
+        :param metric: "balance" (threshold in minor units) or "transactions"
+        :param currency: Currency code
+        :param threshold: Smallest value included
+        :param limit: Maximum number of accounts (None for all)
+        :return: Entries, largest first
+        """
+        return self._query(metric, currency, threshold, limit)
+
+
+# Bank-wide index, attached on load and saved with the users file.
+ACCOUNT_INDEX = AccountIndex()
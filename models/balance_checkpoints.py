@@ -0,0 +1,147 @@
+"""Periodic running-balance checkpoints for fast balance-at-time queries."""
+
+from array import array
+from bisect import bisect_right
+from typing import Optional
+
+from models.transaction_index import TransactionIndex
+
+
+class BalanceCheckpoints:
+    """
+    Running balance recorded after every `interval` transactions in time order.
+    balance_at(t) is a bisect over the account's TransactionIndex plus a replay
+    of at most `interval` - 1 transactions from the nearest checkpoint.
+
+    Checkpoints extend incrementally: each new transaction is processed once,
+    and an out-of-order insert only recomputes checkpoints after it.
+    """
+
+    DEFAULT_INTERVAL = 100
+
+    def __init__(self, index: TransactionIndex, interval: int = DEFAULT_INTERVAL):
+        """
+        :param index: Time-ordered index of the account's transactions
+        :param interval: Number of transactions between checkpoints
+        :raises ValueError: If interval is not positive
+        """
+        if interval <= 0:
+            raise ValueError("Checkpoint interval must be positive")
+        self.index = index
+        self.interval = interval
+        self.opening_minor = 0
+        self.balances = array("q")
+        self._covered = 0
+        self._running = 0
+
+    def rebuild(self, opening_minor: int) -> None:
+        """
+        Recomputes all checkpoints from history, starting at the account's
+        opening balance.
+
+        :param opening_minor: Account opening balance in minor units
+        """
+        index = self.index
+        index.sync()
+        self.opening_minor = opening_minor
+        self.balances = array("q")
+        self._covered = 0
+        self._running = self.opening_minor
+        index.first_changed_slot = None
+        self._extend()
+
+    def sync(self) -> None:
+        """Processes transactions added to the index since the last call."""
+        index = self.index
+        index.sync()
+        changed = index.first_changed_slot
+        if changed is not None and changed < self._covered:
+            kept = changed // self.interval
+            del self.balances[kept:]
+            self._covered = kept * self.interval
+            self._running = self.balances[-1] if kept else self.opening_minor
+        index.first_changed_slot = None
+        self._extend()
+
+    def _extend(self) -> None:
+        """Replays uncovered transactions and appends due checkpoints."""
+        index = self.index
+        transactions = index.transactions
+        positions = index.positions
+        interval = self.interval
+        running = self._running
+        for slot in range(self._covered, len(positions)):
+            running += transactions[positions[slot]].signed_amount_minor()
+            if (slot + 1) % interval == 0:
+                self.balances.append(running)
+        self._covered = len(positions)
+        self._running = running
+
+    def balance_at(self, at_us: int) -> int:
+        """
+        Returns the balance after every transaction with time <= at_us.
+
+        :param at_us: Time in epoch microseconds
+        :return: Balance in minor units
+        """
+        self.sync()
+        index = self.index
+        count = bisect_right(index.times, at_us)
+        checkpoint = count // self.interval
+        balance = self.balances[checkpoint - 1] if checkpoint else self.opening_minor
+        transactions = index.transactions
+        positions = index.positions
+        for slot in range(checkpoint * self.interval, count):
+            balance += transactions[positions[slot]].signed_amount_minor()
+        return balance
+
+    def to_dict(self) -> dict:
+        """
+        Converts the checkpoints into a dictionary for JSON serialization.
+
+        :return: Dictionary with interval, opening balance and checkpoint balances
+        """
+        self.sync()
+        return {
+            "interval": self.interval,
+            "opening": self.opening_minor,
+            "balances": self.balances.tolist(),
+        }
+
+    @staticmethod
+    def from_dict(
+        index: TransactionIndex, data: Optional[dict], opening_minor: int
+    ) -> "BalanceCheckpoints":
+        """
+        Restores saved checkpoints, rebuilding them from history if they are
+        missing, do not match the number of transactions or start from a
+        different opening balance than the account's.
+
+        :param index: Time-ordered index of the account's transactions
+        :param data: Saved checkpoint dictionary (or None)
+        :param opening_minor: Account opening balance in minor units
+        :return: BalanceCheckpoints instance
+        """
+        if not data:
+            checkpoints = BalanceCheckpoints(index)
+            checkpoints.rebuild(opening_minor)
+            return checkpoints
+        checkpoints = BalanceCheckpoints(index, data["interval"])
+        index.sync()
+        index.first_changed_slot = None
+        count = len(index.positions)
+        if (
+            len(data["balances"]) != count // checkpoints.interval
+            or data["opening"] != opening_minor
+        ):
+            checkpoints.rebuild(opening_minor)
+            return checkpoints
+        checkpoints.opening_minor = data["opening"]
+        checkpoints.balances = array("q", data["balances"])
+        covered = len(checkpoints.balances) * checkpoints.interval
+        checkpoints._covered = covered  # pylint: disable=protected-access
+        checkpoints._running = (  # pylint: disable=protected-access
+            checkpoints.balances[-1] if covered else checkpoints.opening_minor
+        )
+        checkpoints._extend()  # pylint: disable=protected-access
+        return checkpoints
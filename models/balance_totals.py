@@ -0,0 +1,145 @@
+"""Per-currency balance totals maintained incrementally as accounts change."""
+
+from typing import Dict, Iterable, Optional, Set
+
+
+class BalanceTotals:
+    """
+    Running per-currency totals in minor units.
+    on_balance_change is the BankAccount observer path (User forwards its
+    accounts' changes to it), so every balance change is applied as a delta
+    instead of re-summing all accounts. Totals can be attached to a parent
+    (a user's totals to BANK_TOTALS), which then receives every delta too,
+    so bank-wide totals are kept up to date the same way.
+    """
+
+    __slots__ = ("by_currency", "parent", "children")
+
+    def __init__(self, by_currency: Dict[str, int] = None) -> None:
+        """
+        :param by_currency: Initial totals (currency -> minor units)
+        """
+        self.by_currency: Dict[str, int] = dict(by_currency or {})
+        self.parent: Optional["BalanceTotals"] = None
+        self.children: Set["BalanceTotals"] = set()
+
+    def apply(self, currency: str, delta_minor: int) -> None:
+        """
+        Adds a signed delta to the total of one currency, here and in every
+        parent.
+
+        :param currency: Currency code
+        :param delta_minor: Change in minor units
+        """
+        totals = self
+        while totals is not None:
+            by_currency = totals.by_currency
+            by_currency[currency] = by_currency.get(currency, 0) + delta_minor
+            totals = totals.parent
+
+    def on_balance_change(self, account, delta_minor: int) -> None:
+        """
+        BankAccount observer callback.
+
+        :param account: The BankAccount whose balance changed
+        :param delta_minor: Change in minor units
+        """
+        self.apply(account.currency, delta_minor)
+
+    def attach(self, child: "BalanceTotals") -> None:
+        """
+        Adds child's totals to these and forwards its future changes here
+        (moving it from its previous parent, if any).
+
+        :param child: Totals to include
+        """
+        if child.parent is self:
+            return
+        if child.parent is not None:
+            child.parent.detach(child)
+        self.merge(child)
+        child.parent = self
+        self.children.add(child)
+
+    def detach(self, child: "BalanceTotals") -> None:
+        """
+        Removes child's totals from these and stops forwarding its changes.
+
+        :param child: Attached totals
+        """
+        self.children.discard(child)
+        child.parent = None
+        for currency, total in child.by_currency.items():
+            self.apply(currency, -total)
+
+    def reset(self, children: Iterable["BalanceTotals"] = ()) -> None:
+        """
+        Makes these totals the sum of exactly the given children.
+
+        :param children: Totals to attach
+        """
+        for child in self.children:
+            child.parent = None
+        self.children = set()
+        self.by_currency = {}
+        for child in children:
+            self.attach(child)
+
+    def merge(self, other: "BalanceTotals") -> None:
+        """
+        Adds another set of totals into this one.
+
+        :param other: Totals to add
+        """
+        for currency, total in other.by_currency.items():
+            self.apply(currency, total)
+
+    def total(self) -> int:
+        """
+        Returns the sum across all currencies in minor units.
+
+        :return: Total minor units
+        """
+        return sum(self.by_currency.values())
+
+    def to_dict(self) -> Dict[str, int]:
+        """
+        Converts the totals into a dictionary for JSON serialization.
+
+        :return: Dictionary of currency -> minor units
+        """
+        return dict(self.by_currency)
+
+    @staticmethod
+    def from_accounts(accounts: Iterable) -> "BalanceTotals":
+        """
+        Recomputes totals from scratch by iterating accounts.
+
+        :param accounts: BankAccount objects
+        :return: BalanceTotals instance
+        """
+        totals = BalanceTotals()
+        for account in accounts:
+            totals.apply(account.currency, account.balance_minor)
+        return totals
+
+    def diff(self, other: "BalanceTotals") -> Dict[str, int]:
+        """
+        Lists currencies where two sets of totals disagree.
+
+        :param other: Totals to compare with (usually recomputed ones)
+        :return: Dictionary of currency -> (self - other) for mismatches only
+        """
+        currencies = set(self.by_currency) | set(other.by_currency)
+        drift = {}
+        for currency in sorted(currencies):
+            delta = self.by_currency.get(currency, 0) - other.by_currency.get(
+                currency, 0
+            )
+            if delta:
+                drift[currency] = delta
+        return drift
+
+
+# Bank-wide totals: every loaded user's totals are attached to it.
+BANK_TOTALS = BalanceTotals()
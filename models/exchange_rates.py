@@ -0,0 +1,278 @@
+"""Precomputed currency exchange-rate matrix with hot reloading from a local file."""
+
+import csv
+import json
+import os
+import threading
+import time
+from fractions import Fraction
+from typing import Dict, Optional, Tuple
+
+from models.rate_history import RateHistory
+
+# Used when the rate file is missing: units of each currency per 1 USD.
+DEFAULT_BASE = "USD"
+DEFAULT_RATES = {"USD": "1", "EUR": "0.92", "UAN": "39.5"}
+
+
+class RateTable:
+    """
+    Immutable dense currency x currency matrix of exchange rates.
+    Every pair is precomputed once, so a lookup is two dict hits and a list
+    index with no allocation. Pairs not given explicitly are triangulated
+    through the base currency.
+    """
+
+    __slots__ = ("base", "currencies", "_index", "_size", "_fractions", "_floats")
+
+    def __init__(
+        self,
+        base: str,
+        base_rates: Dict[str, Fraction],
+        pairs: Optional[Dict[Tuple[str, str], Fraction]] = None,
+    ) -> None:
+        """
+        Builds the matrix from base rates and optional explicit pair rates.
+
+        :param base: Base currency code (its own rate must be 1)
+        :param base_rates: Units of each currency per one unit of base
+        :param pairs: Explicit (from, to) rates overriding triangulation
+        :raises ValueError: If a rate is not positive
+        """
+        base_rates = dict(base_rates)
+        base_rates.setdefault(base, Fraction(1))
+        currencies = set(base_rates)
+        for from_currency, to_currency in pairs or {}:
+            currencies.update((from_currency, to_currency))
+        for code, rate in base_rates.items():
+            if rate <= 0:
+                raise ValueError(f"Exchange rate for {code} must be positive")
+
+        self.base = base
+        self.currencies = tuple(sorted(currencies))
+        self._index = {code: i for i, code in enumerate(self.currencies)}
+        self._size = size = len(self.currencies)
+        fractions: list = [None] * (size * size)
+        for i, from_currency in enumerate(self.currencies):
+            for j, to_currency in enumerate(self.currencies):
+                if i == j:
+                    fractions[i * size + j] = Fraction(1)
+                elif from_currency in base_rates and to_currency in base_rates:
+                    fractions[i * size + j] = (
+                        base_rates[to_currency] / base_rates[from_currency]
+                    )
+        for (from_currency, to_currency), rate in (pairs or {}).items():
+            if rate <= 0:
+                raise ValueError(
+                    f"Exchange rate {from_currency}/{to_currency} must be positive"
+                )
+            i = self._index[from_currency]
+            j = self._index[to_currency]
+            fractions[i * size + j] = rate
+            if (to_currency, from_currency) not in pairs:
+                fractions[j * size + i] = 1 / rate
+        self._fractions = tuple(fractions)
+        self._floats = tuple(None if r is None else float(r) for r in fractions)
+
+    def index_of(self, currency: str) -> Optional[int]:
+        """
+        Returns the matrix index of a currency.
+
+        :param currency: Currency code
+        :return: Row/column index, or None if the currency is unknown
+        """
+        return self._index.get(currency)
+
+    def fraction(self, from_currency: str, to_currency: str) -> Optional[Fraction]:
+        """
+        Looks up the exact rate between two currencies.
+
+        :param from_currency: Currency to convert from
+        :param to_currency: Currency to convert to
+        :return: Rate as a Fraction, or None if unavailable
+        """
+        i = self._index.get(from_currency)
+        j = self._index.get(to_currency)
+        if i is None or j is None:
+            return None
+        return self._fractions[i * self._size + j]
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """
+        Looks up the rate between two currencies as a float.
+
+        :param from_currency: Currency to convert from
+        :param to_currency: Currency to convert to
+        :return: Rate as a float, or None if unavailable
+        """
+        i = self._index.get(from_currency)
+        j = self._index.get(to_currency)
+        if i is None or j is None:
+            return None
+        return self._floats[i * self._size + j]
+
+    def row(self, to_currency: str) -> Optional[Tuple[Optional[float], ...]]:
+        """
+        Returns the float rates from every currency into one target currency,
+        ordered like self.currencies (useful for vectorised conversions).
+
+        :param to_currency: Target currency code
+        :return: Tuple of rates, or None if the target is unknown
+        """
+        j = self._index.get(to_currency)
+        if j is None:
+            return None
+        return self._floats[j :: self._size]
+
+    @staticmethod
+    def from_dict(data: dict) -> "RateTable":
+        """
+        Builds a table from the rate file format:
+        {"base": "USD", "rates": {"EUR": "0.92"}, "pairs": {"EUR/UAN": "43"}}.
+        Rates may be given as strings or numbers; strings are parsed exactly.
+
+        :param data: Parsed rate file contents
+        :return: RateTable instance
+        :raises KeyError: If 'base' or 'rates' is missing
+        """
+        base_rates = {
+            code: Fraction(str(value)) for code, value in data["rates"].items()
+        }
+        pairs = {}
+        for key, value in data.get("pairs", {}).items():
+            from_currency, to_currency = key.split("/")
+            pairs[(from_currency, to_currency)] = Fraction(str(value))
+        return RateTable(data["base"], base_rates, pairs)
+
+
+class RateEngine:
+    """
+    Serves exchange rates from a RateTable loaded from a JSON file.
+    The file's mtime is checked at most once per check_interval seconds;
+    when it changes, a new table is built and swapped in with a single
+    reference assignment, so callers holding the old table keep a
+    consistent view for the duration of their operation.
+
+    Every table swapped in is also recorded in history, effective from the
+    file's mtime (the built-in defaults from the epoch), so rates at past
+    times can be looked up. With a history_path the recorded rates are
+    appended to a CSV in RateHistory.from_csv format and read back on
+    first use, so the history outlives the process.
+    """
+
+    def __init__(
+        self, path: str, check_interval: float = 1.0, history_path: Optional[str] = None
+    ) -> None:
+        """
+        :param path: Path to the JSON rate file
+        :param check_interval: Minimum seconds between mtime checks
+        :param history_path: CSV the rate history is kept in (None for in-memory)
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.history_path = history_path
+        self._table: Optional[RateTable] = None
+        self._history: Optional[RateHistory] = None
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def configure_history(self, path: Optional[str]) -> None:
+        """
+        Sets the CSV the rate history is kept in; it is read on next use.
+
+        :param path: File path (None for in-memory)
+        """
+        with self._lock:
+            self.history_path = path
+            self._history = None
+
+    @property
+    def history(self) -> RateHistory:
+        """
+        Returns the rates of every table loaded so far, by effective time.
+
+        :return: RateHistory including the current table
+        """
+        self.table  # pylint: disable=pointless-statement
+        with self._lock:
+            return self._load_history()
+
+    def _load_history(self) -> RateHistory:
+        """Returns the history, reading history_path on first use (lock held)."""
+        if self._history is None:
+            if self.history_path and os.path.exists(self.history_path):
+                self._history = RateHistory.from_csv(self.history_path, DEFAULT_BASE)
+            else:
+                self._history = RateHistory(DEFAULT_BASE)
+            if self._table is not None:
+                self._record(self._table, self._mtime)
+        return self._history
+
+    def _record(self, table: RateTable, mtime: Optional[float]) -> None:
+        """Adds a newly swapped-in table to the history (lock held)."""
+        history = self._load_history()
+        effective_us = 0 if mtime is None else int(mtime * 1_000_000)
+        added = history.add_table(table, effective_us)
+        if not added or not self.history_path:
+            return
+        directory = os.path.dirname(self.history_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        new_file = not os.path.exists(self.history_path)
+        with open(self.history_path, "a", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["from_currency", "to_currency", "effective", "rate"])
+            writer.writerows(
+                (from_currency, to_currency, effective_us, str(rate))
+                for from_currency, to_currency, rate in added
+            )
+
+    @property
+    def table(self) -> RateTable:
+        """
+        Returns the current rate table, reloading it if the file changed.
+
+        :return: Current RateTable
+        """
+        if self._table is None or time.monotonic() >= self._next_check:
+            self.refresh()
+        return self._table
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reloads the rate file if its mtime changed (or if forced).
+
+        :param force: Reload even if the mtime is unchanged
+        :return: True if a new table was swapped in
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if not force and self._table is not None and mtime == self._mtime:
+                return False
+            try:
+                if mtime is None:
+                    table = RateTable.from_dict(
+                        {"base": DEFAULT_BASE, "rates": DEFAULT_RATES}
+                    )
+                else:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        table = RateTable.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError, ZeroDivisionError):
+                # A half-written or broken file must not take down transfers:
+                # keep serving the previous table and retry on the next check.
+                if self._table is None:
+                    raise
+                return False
+            self._table = table
+            self._mtime = mtime
+            self._record(table, mtime)
+            return True
+
+
+RATE_ENGINE = RateEngine("data/rates.json")
@@ -0,0 +1,171 @@
+"""Monotonic ID allocator that leases blocks of IDs from a shared state file."""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class IdAllocator:
+    """
+    Hands out increasing integer IDs. Each allocator leases a block of
+    block_size IDs at a time from a JSON state file ({"next": N}) under a
+    file lock, then serves IDs from the block in memory, so writers touch
+    shared state once per block instead of once per ID. release() hands the
+    unused rest of a block back when no other process leased after it;
+    otherwise IDs left in a block when a process exits are skipped, never
+    reused.
+
+    Without a path the allocator only lives in memory (used by library code
+    and tests); the CLI configures a persisted path on start-up.
+    """
+
+    def __init__(self, path: Optional[str] = None, block_size: int = 1000) -> None:
+        """
+        :param path: JSON state file shared by all processes (None for in-memory)
+        :param block_size: Number of IDs leased at once
+        :raises ValueError: If block_size is not positive
+        """
+        if block_size <= 0:
+            raise ValueError("Block size must be positive")
+        self.path = path
+        self.block_size = block_size
+        self._floor = 1
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def configure(self, path: Optional[str], block_size: Optional[int] = None) -> None:
+        """
+        Switches the state file (and optionally the block size), dropping the
+        current block.
+
+        :param path: JSON state file (None for in-memory)
+        :param block_size: New block size, if given
+        """
+        with self._lock:
+            self.path = path
+            if block_size is not None:
+                self.block_size = block_size
+            self._next = self._end = 0
+
+    def next_id(self) -> int:
+        """
+        Returns the next ID, leasing a new block when the current one is used up.
+
+        :return: A unique integer ID
+        """
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self._lease(self.block_size)
+                self._end = self._next + self.block_size
+            value = self._next
+            self._next += 1
+            return value
+
+    def next_ids(self, count: int) -> range:
+        """
+        Returns a contiguous range of count IDs, served from the current
+        block when it has room and leased separately otherwise.
+
+        :param count: Number of IDs needed
+        :return: range of unique IDs
+        """
+        with self._lock:
+            if self._end - self._next >= count:
+                start = self._next
+                self._next += count
+            else:
+                start = self._lease(count)
+            return range(start, start + count)
+
+    def release(self) -> None:
+        """
+        Gives the unused rest of the current block back to the shared state,
+        if no other allocator leased IDs since, so the next process continues
+        right after the last ID this one handed out. Meant to run at exit.
+        """
+        with self._lock:
+            if self._next >= self._end:
+                return
+            with self._locked_state() as state:
+                released = state.get("next") == self._end
+                if released:
+                    state["next"] = self._next
+            if released:
+                self._floor = self._next
+            self._next = self._end = 0
+
+    def ensure_above(self, value: int) -> None:
+        """
+        Guarantees that future IDs are greater than value (e.g. the largest ID
+        found in loaded data).
+
+        :param value: Largest ID already in use
+        """
+        with self._lock:
+            if value >= self._floor:
+                self._floor = value + 1
+            if self._next <= value:
+                self._next = self._end = 0
+
+    def peek(self) -> int:
+        """
+        Returns the next unleased ID recorded in the state file (or in memory).
+
+        :return: Next ID a new lease would start from
+        """
+        with self._lock, self._locked_state() as state:
+            return max(state.get("next", 1), self._floor)
+
+    def _lease(self, count: int) -> int:
+        """Reserves count IDs in the shared state and returns the first one."""
+        with self._locked_state() as state:
+            start = max(state.get("next", 1), self._floor)
+            state["next"] = start + count
+        self._floor = start + count
+        return start
+
+    @contextmanager
+    def _locked_state(self):
+        """Yields the state dict under an exclusive lock and saves changes."""
+        if self.path is None:
+            state = {"next": self._floor}
+            yield state
+            self._floor = state["next"]
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".lock", "a", encoding="utf-8") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = {}
+                if os.path.exists(self.path):
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        state = json.load(f)
+                before = dict(state)
+                yield state
+                if state != before:
+                    temp_path = self.path + ".tmp"
+                    with open(temp_path, "w", encoding="utf-8") as f:
+                        json.dump(state, f)
+                    os.replace(temp_path, self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Bank-wide transaction IDs (and transfer correlation IDs).
+TRANSACTION_IDS = IdAllocator()
+
+# Bank-wide user IDs. Registration leases them instead of scanning the
+# users file for the largest ID.
+USER_IDS = IdAllocator(block_size=100)
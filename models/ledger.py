@@ -0,0 +1,489 @@
+"""Double-entry ledger: an append-only journal of balanced entries from which
+account balances are materialized."""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# System accounts on the other side of customer postings, one per currency.
+EXTERNAL = "external"  # money entering or leaving the bank (deposits, withdrawals)
+FX = "fx"  # currency exchange clearing for cross-currency transfers
+EQUITY = "equity"  # opening balances and manual adjustments
+INTEREST = "interest"  # interest paid to customers
+FEES = "fees"  # fees charged to customers
+
+
+def system_account(kind: str, currency: str) -> str:
+    """
+    Returns the ledger key of a system account.
+
+    :param kind: EXTERNAL, FX or EQUITY
+    :param currency: Currency code
+    :return: Key such as "external:USD"
+    """
+    return f"{kind}:{currency}"
+
+
+class Posting(NamedTuple):
+    """One leg of a journal entry; a positive amount increases the account balance."""
+
+    account: str
+    currency: str
+    amount_minor: int
+
+
+class JournalEntry(NamedTuple):
+    """
+    One business operation. Its postings must sum to zero in every currency.
+    """
+
+    entry_id: int
+    time_stamp_us: int
+    kind: str
+    postings: Tuple[Posting, ...]
+
+    def delta_for(self, account: str) -> int:
+        """
+        Returns the net change this entry makes to one account.
+
+        :param account: Ledger key of the account
+        :return: Signed change in minor units
+        """
+        return sum(p.amount_minor for p in self.postings if p.account == account)
+
+    def is_balanced(self) -> bool:
+        """
+        Checks that the postings sum to zero in every currency.
+
+        :return: True if the entry is balanced
+        """
+        sums: Dict[str, int] = {}
+        for posting in self.postings:
+            sums[posting.currency] = sums.get(posting.currency, 0) + posting.amount_minor
+        return not any(sums.values())
+
+    def to_line(self) -> str:
+        """
+        Encodes the entry as one journal line: tab-separated entry ID, time
+        stamp and kind, followed by account, currency and amount per posting.
+        Splitting a line is several times cheaper than parsing JSON, which
+        keeps replay fast.
+
+        :return: Line including the trailing newline
+        :raises ValueError: If a field contains a tab or newline
+        """
+        fields = [str(self.entry_id), str(self.time_stamp_us), self.kind]
+        for account, currency, amount_minor in self.postings:
+            fields += (account, currency, str(amount_minor))
+        line = "\t".join(fields)
+        if "\n" in line or line.count("\t") != len(fields) - 1:
+            raise ValueError("Journal fields cannot contain tabs or newlines")
+        return line + "\n"
+
+    @staticmethod
+    def from_line(line: str) -> "JournalEntry":
+        """
+        Decodes a journal line produced by to_line.
+
+        :param line: Journal line
+        :return: JournalEntry
+        """
+        fields = line.rstrip("\n").split("\t")
+        return JournalEntry(
+            int(fields[0]),
+            int(fields[1]),
+            fields[2],
+            tuple(
+                Posting(fields[i], fields[i + 1], int(fields[i + 2]))
+                for i in range(3, len(fields), 3)
+            ),
+        )
+
+
+def apply_entries(
+    balances: Dict[str, int], entries: Iterable[JournalEntry]
+) -> Dict[str, int]:
+    """
+    Applies journal entries to a balance map in place.
+
+    :param balances: Account key -> balance in minor units
+    :param entries: Entries to apply, in journal order
+    :return: The updated balance map
+    """
+    for entry in entries:
+        for account, _currency, amount_minor in entry.postings:
+            balances[account] = balances.get(account, 0) + amount_minor
+    return balances
+
+
+class Ledger:
+    """
+    Event-sourced double-entry ledger. Every balance change is a JournalEntry
+    whose postings sum to zero per currency; balances are a materialized view
+    of the journal, updated incrementally on each post so reads are O(1).
+
+    With a path the journal is an append-only file of to_line records. Every
+    snapshot_interval flushed entries a snapshot of the balances is written to
+    the snapshot directory, named by the entry count it covers and the latest
+    time stamp among those entries, and recording the journal byte offset it
+    ends at; the newest snapshots_kept are retained. Recovery loads a
+    snapshot, seeks to its offset and replays only the journal suffix.
+    Appends and recovery hold a lock file next to the journal, and a flush
+    first applies entries other processes appended since this one read the
+    journal, so offsets and entry counts in snapshots stay exact.
+
+    Without a path the ledger only lives in memory (used by library code and
+    tests; the CLI configures a path on start-up). Its journal then keeps the
+    latest memory_entries entries: older ones are folded into a base balance
+    map, the in-memory counterpart of a snapshot.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        snapshot_interval: int = 10_000,
+        snapshots_kept: int = 5,
+        memory_entries: Optional[int] = 100_000,
+    ) -> None:
+        """
+        :param path: Journal file (None for in-memory)
+        :param snapshot_interval: Flushed entries between snapshots
+        :param snapshots_kept: Number of snapshots retained for point-in-time recovery
+        :param memory_entries: Entries an in-memory ledger keeps (None for all)
+        """
+        self.snapshot_interval = snapshot_interval
+        self.snapshots_kept = snapshots_kept
+        self.memory_entries = memory_entries
+        self.balances: Dict[str, int] = {}
+        # Entries posted but not yet flushed to the journal file (in memory:
+        # the retained journal).
+        self.entries: List[JournalEntry] = []
+        # In-memory only: balances of the entries folded out of `entries`,
+        # and the latest time stamp among them.
+        self._folded: Dict[str, int] = {}
+        self._folded_ts: Optional[int] = None
+        self.entry_count = 0
+        self._offset = 0
+        self._last_ts = 0
+        self._since_snapshot = 0
+        self._lock = threading.Lock()
+        self.path: Optional[str] = None
+        self._loaded = True
+        self.configure(path)
+
+    def configure(self, path: Optional[str]) -> None:
+        """
+        Sets the journal location. The journal is read on the next load().
+
+        :param path: Journal file (None for in-memory)
+        """
+        with self._lock:
+            self.path = path
+            self._loaded = path is None
+
+    @property
+    def snapshot_dir(self) -> Optional[str]:
+        """
+        Returns the directory holding the balance snapshots.
+
+        :return: Directory path, or None for an in-memory ledger
+        """
+        return None if self.path is None else self.path + ".snapshots"
+
+    def balance(self, account: str) -> int:
+        """
+        Returns the materialized balance of an account.
+
+        :param account: Ledger key of the account
+        :return: Balance in minor units (0 for unknown accounts)
+        """
+        return self.balances.get(account, 0)
+
+    def post(self, entry: JournalEntry) -> None:
+        """
+        Appends an entry to the journal and applies it to the balances.
+
+        :param entry: Balanced journal entry
+        :raises ValueError: If the postings do not sum to zero per currency
+                            or a field cannot be written to the journal
+        """
+        if not entry.is_balanced():
+            raise ValueError("Unbalanced journal entry")
+        entry.to_line()
+        with self._lock:
+            self.entries.append(entry)
+            self.entry_count += 1
+            apply_entries(self.balances, (entry,))
+            limit = self.memory_entries
+            if self.path is None and limit is not None and len(self.entries) > limit:
+                self._fold(len(self.entries) - limit // 2)
+
+    def _fold(self, count: int) -> None:
+        """
+        Folds the oldest entries of an in-memory journal into the base
+        balances. Folding half the limit at a time keeps posting O(1) amortized.
+
+        :param count: Number of entries to fold
+        """
+        folded = self.entries[:count]
+        apply_entries(self._folded, folded)
+        latest = max(e.time_stamp_us for e in folded)
+        self._folded_ts = latest if self._folded_ts is None else max(self._folded_ts, latest)
+        del self.entries[:count]
+
+    @contextmanager
+    def _journal_lock(self):
+        """Holds an exclusive lock on the journal's lock file."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".lock", "a", encoding="utf-8") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def open_account(
+        self, account: str, currency: str, balance_minor: int, entry_id: int, time_stamp_us: int
+    ) -> bool:
+        """
+        Records an account's opening balance against equity, unless the
+        account already exists in the ledger.
+
+        :param account: Ledger key of the account
+        :param currency: Account currency
+        :param balance_minor: Opening balance in minor units
+        :param entry_id: ID for the opening entry
+        :param time_stamp_us: Time of the opening entry
+        :return: True if the account was opened, False if it already existed
+        """
+        if account in self.balances:
+            return False
+        self.post(
+            JournalEntry(
+                entry_id,
+                time_stamp_us,
+                "open",
+                (
+                    Posting(account, currency, balance_minor),
+                    Posting(system_account(EQUITY, currency), currency, -balance_minor),
+                ),
+            )
+        )
+        return True
+
+    def _snapshots(self) -> List[Tuple[int, int, str]]:
+        """
+        Lists the snapshot files, oldest first.
+
+        :return: List of (entry_count, time_stamp_us, file path)
+        """
+        directory = self.snapshot_dir
+        if directory is None or not os.path.isdir(directory):
+            return []
+        snapshots = []
+        for name in os.listdir(directory):
+            stem, ext = os.path.splitext(name)
+            count, _, time_stamp_us = stem.partition("-")
+            if ext == ".json" and count.isdigit() and time_stamp_us.isdigit():
+                snapshots.append(
+                    (int(count), int(time_stamp_us), os.path.join(directory, name))
+                )
+        return sorted(snapshots)
+
+    def _replay(self, until_us: Optional[int] = None) -> Tuple[Dict[str, int], int, int, int]:
+        """
+        Rebuilds the balances from the newest usable snapshot and the journal
+        after it. With until_us, uses the newest snapshot whose entries are
+        all stamped at or before that time and skips later-stamped entries.
+        Time stamps are UTC, but journal order is flush order, so an entry
+        can follow one stamped after it (processes flushing in a different
+        order than they posted); replay therefore filters rather than stops.
+        A final line without a newline (a torn write) is not replayed.
+
+        :param until_us: Point in time (epoch microseconds), or None for the end
+        :return: (balances, entry count, journal byte offset, latest time stamp)
+        """
+        balances: Dict[str, int] = {}
+        count = offset = last_ts = 0
+        usable = [
+            s for s in self._snapshots() if until_us is None or s[1] <= until_us
+        ]
+        if usable:
+            with open(usable[-1][2], "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            balances = snapshot["balances"]
+            count = snapshot["entry_count"]
+            offset = snapshot["offset"]
+            last_ts = snapshot["time_stamp_us"]
+        if not os.path.exists(self.path):
+            return balances, count, offset, last_ts
+        get = balances.get
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                fields = raw.decode("utf-8").split("\t")
+                time_stamp_us = int(fields[1])
+                count += 1
+                offset += len(raw)
+                if time_stamp_us > last_ts:
+                    last_ts = time_stamp_us
+                if until_us is not None and time_stamp_us > until_us:
+                    continue
+                for i in range(3, len(fields), 3):
+                    account = fields[i]
+                    balances[account] = get(account, 0) + int(fields[i + 2])
+        return balances, count, offset, last_ts
+
+    def load(self) -> None:
+        """
+        Restores the balances from the newest snapshot and the journal lines
+        written after it, then re-applies any entries posted before loading.
+        A torn final journal line is truncated. Does nothing if already loaded
+        or in-memory.
+        """
+        with self._lock:
+            if self._loaded:
+                return
+            with self._journal_lock():
+                balances, count, offset, last_ts = self._replay()
+                if os.path.exists(self.path) and os.path.getsize(self.path) > offset:
+                    with open(self.path, "r+b") as f:
+                        f.truncate(offset)
+            snapshots = self._snapshots()
+            covered = snapshots[-1][0] if snapshots else 0
+            self.balances = apply_entries(balances, self.entries)
+            self.entry_count = count + len(self.entries)
+            self._offset = offset
+            self._last_ts = last_ts
+            self._since_snapshot = count - covered
+            self._loaded = True
+
+    def balances_at(self, until_us: int) -> Dict[str, int]:
+        """
+        Point-in-time recovery: rebuilds the balances as of the given time
+        without changing this ledger, from every entry stamped at or before
+        until_us wherever it sits in the journal.
+
+        :param until_us: Point in time (epoch microseconds)
+        :return: Dictionary of account -> balance in minor units
+        """
+        if self.path is None:
+            if self._folded_ts is not None and until_us < self._folded_ts:
+                raise ValueError("Entries before that time are no longer kept in memory")
+            return apply_entries(
+                dict(self._folded), (e for e in self.entries if e.time_stamp_us <= until_us)
+            )
+        with self._lock:
+            balances, _count, _offset, _last_ts = self._replay(until_us)
+            return apply_entries(
+                balances, (e for e in self.entries if e.time_stamp_us <= until_us)
+            )
+
+    def flush(self) -> None:
+        """
+        Appends entries posted since the last flush to the journal file and
+        writes a snapshot once snapshot_interval entries are not covered by one.
+        Entries another process appended since this one last read the journal
+        are applied first. Does nothing for an in-memory ledger.
+        """
+        with self._lock:
+            if self.path is None or not self.entries:
+                return
+            data = "".join(e.to_line() for e in self.entries).encode("utf-8")
+            with self._journal_lock():
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self._offset:
+                    self._catch_up()
+                with open(self.path, "ab") as f:
+                    f.write(data)
+            self._offset += len(data)
+            self._since_snapshot += len(self.entries)
+            self._last_ts = max(self._last_ts, max(e.time_stamp_us for e in self.entries))
+            self.entries = []
+            if self._since_snapshot >= self.snapshot_interval:
+                self._write_snapshot()
+
+    def _catch_up(self) -> None:
+        """
+        Applies the journal lines after this ledger's offset, which other
+        processes appended. Called with the journal lock held; a torn final
+        line (from a writer that died) is truncated.
+        """
+        appended = []
+        end = self._offset
+        with open(self.path, "r+b") as f:
+            f.seek(end)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                appended.append(JournalEntry.from_line(raw.decode("utf-8")))
+                end += len(raw)
+            f.truncate(end)
+        apply_entries(self.balances, appended)
+        self._last_ts = max([self._last_ts] + [e.time_stamp_us for e in appended])
+        self.entry_count += len(appended)
+        self._since_snapshot += len(appended)
+        self._offset = end
+
+    def _write_snapshot(self) -> None:
+        """Writes the current balances and prunes snapshots beyond snapshots_kept."""
+        directory = self.snapshot_dir
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.entry_count:012d}-{self._last_ts}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "entry_count": self.entry_count,
+                    "offset": self._offset,
+                    "time_stamp_us": self._last_ts,
+                    "balances": self.balances,
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+        self._since_snapshot = 0
+        for _count, _ts, old_path in self._snapshots()[: -self.snapshots_kept]:
+            os.remove(old_path)
+
+    def iter_journal(self) -> Iterable[JournalEntry]:
+        """
+        Yields every entry from the start of the journal: persisted lines
+        first, then entries not yet flushed. An in-memory ledger yields only
+        the entries it has not folded.
+
+        :return: Iterator over JournalEntry objects
+        """
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if line.endswith(b"\n"):
+                        yield JournalEntry.from_line(line.decode("utf-8"))
+        yield from self.entries
+
+    def verify(self) -> Dict[str, int]:
+        """
+        Replays the whole journal from zero and compares the result with the
+        materialized balances.
+
+        :return: Dictionary of account -> drift in minor units (empty if consistent)
+        """
+        replayed = apply_entries(dict(self._folded), self.iter_journal())
+        accounts = set(replayed) | set(self.balances)
+        drift = {a: self.balance(a) - replayed.get(a, 0) for a in accounts}
+        return {a: d for a, d in sorted(drift.items()) if d}
+
+
+LEDGER = Ledger()
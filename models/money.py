@@ -0,0 +1,70 @@
+"""Integer minor-unit money helpers (cents, kopecks) used by accounts and transactions."""
+
+from array import array
+from fractions import Fraction
+from itertools import repeat
+from typing import Iterable, Union
+
+# All supported currencies (USD, EUR, UAN) have two decimal places.
+MINOR_PER_MAJOR = 100
+
+
+def to_minor(amount: Union[int, float]) -> int:
+    """
+    Converts an amount in major units into integer minor units.
+    Values with more than two decimals are rounded half to even.
+
+    :param amount: Amount in major units (e.g. 12.34)
+    :return: Amount in minor units (e.g. 1234)
+    """
+    if isinstance(amount, int):
+        return amount * MINOR_PER_MAJOR
+    return round(amount * MINOR_PER_MAJOR)
+
+
+def from_minor(amount_minor: int) -> float:
+    """
+    Converts integer minor units back into a float in major units.
+
+    :param amount_minor: Amount in minor units
+    :return: Amount in major units
+    """
+    return amount_minor / MINOR_PER_MAJOR
+
+
+def convert_minor(amount_minor: int, rate: Fraction) -> int:
+    """
+    Converts a minor-unit amount with an exact rational exchange rate.
+    The result is rounded half to even (banker's rounding) using integer
+    arithmetic only, so the same inputs always give the same cents.
+
+    :param amount_minor: Amount in minor units of the source currency
+    :param rate: Exchange rate as a Fraction (target units per source unit)
+    :return: Amount in minor units of the target currency
+    """
+    quotient, remainder = divmod(amount_minor * rate.numerator, rate.denominator)
+    twice = remainder * 2
+    if twice > rate.denominator or (twice == rate.denominator and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+def convert_minor_many(amounts_minor: Iterable[int], rate: Fraction) -> array:
+    """
+    Converts many minor-unit amounts with one rate, rounding exactly like
+    convert_minor, in a single pass over the input (one divmod per amount).
+
+    :param amounts_minor: Amounts in minor units (e.g. an array('q') column)
+    :param rate: Rate as a Fraction
+    :return: array('q') of converted amounts, in input order
+    """
+    numerator, denominator = rate.numerator, rate.denominator
+    return array(
+        "q",
+        [
+            quotient + (2 * remainder > denominator or (2 * remainder == denominator and quotient & 1))
+            for quotient, remainder in map(
+                divmod, [a * numerator for a in amounts_minor], repeat(denominator)
+            )
+        ],
+    )
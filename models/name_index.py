@@ -0,0 +1,342 @@
+"""Prefix and typo-tolerant search over user names."""
+
+import os
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+def normalize_name(text: str) -> str:
+    """
+    Normalizes a name for matching: NFKC (so composed and decomposed
+    letters compare equal) and case folding, which covers Cyrillic as well
+    as Latin names.
+
+    :param text: Name as entered
+    :return: Normalized name
+    """
+    return unicodedata.normalize("NFKC", text).casefold().strip()
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Damerau-Levenshtein distance (optimal string alignment: insertions,
+    deletions, substitutions and swaps of adjacent letters), stopping once
+    it exceeds limit.
+
+    :param a: First string
+    :param b: Second string
+    :param limit: Largest distance of interest
+    :return: The distance, or limit + 1 if it is larger than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous: List[int] = []
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            value = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                value = min(value, previous[j - 2] + 1)
+            current.append(value)
+        if min(current) > limit:
+            return limit + 1
+        previous, row = row, current
+    return row[-1] if row[-1] <= limit else limit + 1
+
+
+class NameMatch(NamedTuple):
+    """One user in a search result; distance is the number of typos corrected."""
+
+    user_id: int
+    username: str
+    surname: str
+    distance: int
+
+
+class NameIndex:
+    """
+    Index of usernames and surnames. Distinct normalized names are kept in
+    one sorted list, each pointing to the IDs of the users carrying it:
+
+    - prefix() bisects the range of names starting with each query word,
+      O(log n + result size);
+    - fuzzy() walks the sorted list as if it were a trie (the children of a
+      prefix are found by bisecting), carrying one edit-distance row per
+      prefix and pruning every branch that is already too far from the word,
+      so only names near the query are visited.
+
+    With a path, the names are also kept in an append-only log
+    (user_id, username and surname, tab-separated) which register appends
+    to, so the CLI can search without loading users.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        :param path: Names log (None for in-memory)
+        """
+        self.path = path
+        self.names: Dict[int, Tuple[str, str]] = {}
+        self._terms: List[str] = []
+        self._postings: Dict[str, Set[int]] = {}
+
+    def configure(self, path: Optional[str]) -> None:
+        """
+        Sets the names log.
+
+        :param path: File path (None for in-memory)
+        """
+        self.path = path
+
+    def __len__(self) -> int:
+        """Number of indexed users."""
+        return len(self.names)
+
+    def _build(self, names: Dict[int, Tuple[str, str]]) -> None:
+        """Replaces the index with the given names, sorting once."""
+        postings: Dict[str, Set[int]] = {}
+        for user_id, pair in names.items():
+            for name in pair:
+                term = normalize_name(name)
+                if term:
+                    ids = postings.get(term)
+                    if ids is None:
+                        postings[term] = {user_id}
+                    else:
+                        ids.add(user_id)
+        self.names = names
+        self._postings = postings
+        self._terms = sorted(postings)
+
+    def reset(self, users: Iterable) -> None:
+        """
+        Rebuilds the index from loaded users.
+
+        :param users: Objects with user_id, username and surname
+        """
+        self._build({user.user_id: (user.username, user.surname) for user in users})
+
+    def load(self) -> bool:
+        """
+        Rebuilds the index from the names log. A torn last line (from a
+        crash mid-append) is cut off.
+
+        :return: False if there is no log to load
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        with open(self.path, "rb") as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+        names: Dict[int, Tuple[str, str]] = {}
+        for line in data[:end].decode("utf-8").splitlines():
+            fields = line.split("\t")
+            if len(fields) == 3:
+                names[int(fields[0])] = (fields[1], fields[2])
+        self._build(names)
+        return True
+
+    def save(self) -> None:
+        """Rewrites the names log from the index."""
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(_line(user_id, *pair) for user_id, pair in self.names.items())
+        os.replace(temp_path, self.path)
+
+    def add(self, users: Iterable) -> None:
+        """
+        Indexes new (or renamed) users and appends them to the names log if
+        one exists; without a log, the next search builds it from the users
+        file, which then already holds them.
+
+        :param users: Objects with user_id, username and surname
+        """
+        lines = []
+        for user in users:
+            self._index(user.user_id, user.username, user.surname)
+            lines.append(_line(user.user_id, user.username, user.surname))
+        if lines and self.path is not None and os.path.exists(self.path):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def _index(self, user_id: int, username: str, surname: str) -> None:
+        """Adds one user, replacing its previous names."""
+        old = self.names.get(user_id)
+        if old is not None:
+            for term in {normalize_name(name) for name in old}:
+                ids = self._postings.get(term)
+                if ids is not None:
+                    ids.discard(user_id)
+                    if not ids:
+                        del self._postings[term]
+                        del self._terms[bisect_left(self._terms, term)]
+        self.names[user_id] = (username, surname)
+        for term in {normalize_name(username), normalize_name(surname)}:
+            if not term:
+                continue
+            ids = self._postings.get(term)
+            if ids is None:
+                self._postings[term] = {user_id}
+                insort(self._terms, term)
+            else:
+                ids.add(user_id)
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Positions of the names starting with prefix in the sorted list."""
+        terms = self._terms
+        lo = bisect_left(terms, prefix)
+        hi = lo
+        # Names sharing the prefix are contiguous; gallop to the end of the run.
+        step = 1
+        while hi + step <= len(terms) and terms[hi + step - 1].startswith(prefix):
+            hi += step
+            step *= 2
+        while step > 1:
+            step //= 2
+            if hi + step <= len(terms) and terms[hi + step - 1].startswith(prefix):
+                hi += step
+        return lo, hi
+
+    def _user_terms(self, user_id: int) -> Tuple[str, str]:
+        """Normalized names of one user."""
+        username, surname = self.names[user_id]
+        return normalize_name(username), normalize_name(surname)
+
+    def _match(self, user_id: int, distance: int) -> NameMatch:
+        """Builds a result entry."""
+        username, surname = self.names[user_id]
+        return NameMatch(user_id, username, surname, distance)
+
+    def prefix(self, query: str, limit: Optional[int] = 20) -> List[NameMatch]:
+        """
+        Finds users whose username or surname starts with each word of the
+        query ("ан ко" finds "Анна Коваль"). Shorter (exact) names come
+        first, then by name and user ID.
+
+        :param query: One or more name prefixes
+        :param limit: Maximum number of users (None for all)
+        :return: Matching users
+        """
+        words = [normalize_name(word) for word in query.split()]
+        if not words:
+            return []
+        # Walk the most selective word; check the others per candidate.
+        ranges = sorted(
+            ((self._prefix_range(word), word) for word in words),
+            key=lambda item: item[0][1] - item[0][0],
+        )
+        (lo, hi), _first = ranges[0]
+        others = [word for _range, word in ranges[1:]]
+        result: List[NameMatch] = []
+        seen: Set[int] = set()
+        for position in range(lo, hi):
+            for user_id in sorted(self._postings[self._terms[position]]):
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                if others:
+                    terms = self._user_terms(user_id)
+                    if not all(any(t.startswith(word) for t in terms) for word in others):
+                        continue
+                result.append(self._match(user_id, 0))
+                if limit is not None and len(result) >= limit:
+                    return result
+        return result
+
+    def similar_terms(self, word: str, max_distance: int = 1) -> Dict[str, int]:
+        """
+        Finds the indexed names within max_distance edits of a word.
+
+        :param word: Normalized word
+        :param max_distance: Largest number of typos
+        :return: name -> distance
+        """
+        terms = self._terms
+        found: Dict[str, int] = {}
+        width = len(word) + 1
+        # (prefix, its distance row, its parent's row, range of names with the prefix)
+        stack = [("", list(range(width)), None, 0, len(terms))]
+        while stack:
+            prefix, row, parent, lo, hi = stack.pop()
+            depth = len(prefix)
+            if hi - lo == 1:
+                # A single name below this prefix: finish it directly.
+                distance = edit_distance(word, terms[lo], max_distance)
+                if distance <= max_distance:
+                    found[terms[lo]] = distance
+                continue
+            i = lo
+            if i < hi and terms[i] == prefix:
+                if row[-1] <= max_distance:
+                    found[prefix] = row[-1]
+                i += 1
+            while i < hi:
+                char = terms[i][depth]
+                j = bisect_left(terms, prefix + chr(ord(char) + 1), i, hi)
+                current = [row[0] + 1]
+                for k in range(1, width):
+                    value = min(row[k] + 1, current[k - 1] + 1, row[k - 1] + (word[k - 1] != char))
+                    if (
+                        parent is not None
+                        and k > 1
+                        and word[k - 1] == prefix[-1]
+                        and word[k - 2] == char
+                    ):
+                        value = min(value, parent[k - 2] + 1)
+                    current.append(value)
+                if min(current) <= max_distance:
+                    stack.append((prefix + char, current, row, i, j))
+                i = j
+        return found
+
+    def fuzzy(self, query: str, max_distance: int = 1, limit: Optional[int] = 20) -> List[NameMatch]:
+        """
+        Finds users whose username or surname is within max_distance typos
+        of each word of the query. Closest matches come first, then by user ID.
+
+        :param query: One or more names
+        :param max_distance: Largest number of typos per word
+        :param limit: Maximum number of users (None for all)
+        :return: Matching users
+        """
+        words = [normalize_name(word) for word in query.split()]
+        if not words:
+            return []
+        matches = [self.similar_terms(word, max_distance) for word in words]
+        candidates: Optional[Set[int]] = None
+        for terms in sorted(matches, key=lambda m: sum(len(self._postings[t]) for t in m)):
+            ids = set()
+            for term in terms:
+                ids |= self._postings[term]
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        scored = []
+        for user_id in candidates or ():
+            user_terms = self._user_terms(user_id)
+            distance = 0
+            for terms in matches:
+                distance += min(terms.get(t, max_distance + 1) for t in user_terms)
+            scored.append((distance, user_id))
+        scored.sort()
+        if limit is not None:
+            scored = scored[:limit]
+        return [self._match(user_id, distance) for distance, user_id in scored]
+
+
+def _line(user_id: int, username: str, surname: str) -> str:
+    """One names log line; tabs and line breaks in names become spaces."""
+    return "\t".join((str(user_id), " ".join(username.split()), " ".join(surname.split()))) + "\n"
+
+
+# Bank-wide name index; register appends to its log.
+NAME_INDEX = NameIndex()
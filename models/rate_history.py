@@ -0,0 +1,262 @@
+"""Time-indexed store of historical exchange rates with binary-search lookup."""
+
+import csv
+from array import array
+from bisect import bisect_right, insort
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+from models.money import convert_minor
+from models.transaction import Transaction, parse_time_stamp
+
+Pair = Tuple[str, str]
+
+
+class RateSeries:
+    """
+    Rates for one currency pair ordered by effective time.
+    Times are epoch microseconds in a compact array('q'); rates are Fractions.
+    """
+
+    __slots__ = ("times", "rates")
+
+    def __init__(self) -> None:
+        self.times = array("q")
+        self.rates: List[Fraction] = []
+
+    def add(self, effective_us: int, rate: Fraction) -> None:
+        """
+        Adds a rate effective from the given time, replacing an existing
+        rate with the same time. Appending in time order is O(1).
+
+        :param effective_us: Effective time in epoch microseconds
+        :param rate: Exchange rate
+        """
+        times = self.times
+        if not times or effective_us > times[-1]:
+            times.append(effective_us)
+            self.rates.append(rate)
+            return
+        position = bisect_right(times, effective_us)
+        if position and times[position - 1] == effective_us:
+            self.rates[position - 1] = rate
+            return
+        insort(times, effective_us)
+        self.rates.insert(position, rate)
+
+    def interval_at(self, at_us: int) -> Optional[Tuple[int, int, Fraction]]:
+        """
+        Finds the rate in force at a time and the interval it covers.
+
+        :param at_us: Time in epoch microseconds
+        :return: (start_us, end_us, rate) with end exclusive, or None if
+                 the time precedes the first rate
+        """
+        position = bisect_right(self.times, at_us) - 1
+        if position < 0:
+            return None
+        end = (
+            self.times[position + 1]
+            if position + 1 < len(self.times)
+            else 2**63 - 1
+        )
+        return self.times[position], end, self.rates[position]
+
+
+class RateHistory:
+    """
+    Historical exchange rates per currency pair with "rate at time T" lookups.
+    Pairs that were not recorded directly are answered from the inverse pair
+    or by triangulating through the base currency. The interval found by the
+    last lookup for each pair is cached, so repeated lookups for nearby
+    times are answered without a search.
+    """
+
+    def __init__(self, base: str = "USD") -> None:
+        """
+        :param base: Currency used for triangulation of unrecorded pairs
+        """
+        self.base = base
+        self._series: Dict[Pair, RateSeries] = {}
+        self._cache: Dict[Pair, Tuple[int, int, Optional[Fraction]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def add_rate(
+        self, from_currency: str, to_currency: str, effective_us: int, rate: Fraction
+    ) -> None:
+        """
+        Records a rate effective from the given time.
+
+        :param from_currency: Currency to convert from
+        :param to_currency: Currency to convert to
+        :param effective_us: Effective time in epoch microseconds
+        :param rate: Exchange rate (to units per from unit)
+        :raises ValueError: If the rate is not positive
+        """
+        if rate <= 0:
+            raise ValueError("Exchange rate must be positive")
+        pair = (from_currency, to_currency)
+        series = self._series.get(pair)
+        if series is None:
+            series = self._series[pair] = RateSeries()
+        series.add(effective_us, Fraction(rate))
+        self._cache.clear()
+
+    def rate_at(
+        self, from_currency: str, to_currency: str, at_us: int
+    ) -> Optional[Fraction]:
+        """
+        Returns the rate in force at the given time.
+
+        :param from_currency: Currency to convert from
+        :param to_currency: Currency to convert to
+        :param at_us: Time in epoch microseconds
+        :return: Exchange rate as a Fraction, or None if unknown at that time
+        """
+        if from_currency == to_currency:
+            return Fraction(1)
+        pair = (from_currency, to_currency)
+        cached = self._cache.get(pair)
+        if cached is not None and cached[0] <= at_us < cached[1]:
+            self.hits += 1
+            return cached[2]
+        self.misses += 1
+        start, end, rate = self._lookup(from_currency, to_currency, at_us)
+        self._cache[pair] = (start, end, rate)
+        return rate
+
+    def _lookup(
+        self, from_currency: str, to_currency: str, at_us: int
+    ) -> Tuple[int, int, Optional[Fraction]]:
+        """
+        Resolves a rate and the interval in which the answer stays valid.
+
+        :return: (start_us, end_us, rate or None)
+        """
+        # A derived answer is only valid until the series that would take
+        # precedence (the direct pair, then its inverse) gets its first rate.
+        end_limit = 2**63 - 1
+        series = self._series.get((from_currency, to_currency))
+        if series is not None:
+            found = series.interval_at(at_us)
+            if found is not None:
+                return found
+            end_limit = series.times[0]
+        series = self._series.get((to_currency, from_currency))
+        if series is not None:
+            found = series.interval_at(at_us)
+            if found is not None:
+                return found[0], min(found[1], end_limit), 1 / found[2]
+            end_limit = min(end_limit, series.times[0])
+        if self.base not in (from_currency, to_currency):
+            from_leg = self._lookup(self.base, from_currency, at_us)
+            to_leg = self._lookup(self.base, to_currency, at_us)
+            if from_leg[2] is not None and to_leg[2] is not None:
+                return (
+                    max(from_leg[0], to_leg[0]),
+                    min(from_leg[1], to_leg[1], end_limit),
+                    to_leg[2] / from_leg[2],
+                )
+        # Unknown: cache only this exact instant.
+        return at_us, at_us + 1, None
+
+    def add_table(self, table, effective_us: int) -> List[Tuple[str, str, Fraction]]:
+        """
+        Records the rates of a RateTable as effective from a time. Only the
+        rates the history would not already answer the same way at that
+        time are added: base rates first, then the pairs triangulation or
+        the inverse pair would get wrong.
+
+        :param table: RateTable (base, currencies and fraction())
+        :param effective_us: Effective time in epoch microseconds
+        :return: The (from_currency, to_currency, rate) entries added
+        """
+        added = []
+        pairs = [(table.base, code) for code in table.currencies if code != table.base]
+        pairs += [
+            (a, b) for a in table.currencies for b in table.currencies
+            if a != b and a != table.base
+        ]
+        # Adding a pair can change derived answers of pairs checked before
+        # it, so check until nothing changes (at most twice in practice).
+        changed = True
+        while changed:
+            changed = False
+            for from_currency, to_currency in pairs:
+                rate = table.fraction(from_currency, to_currency)
+                if rate is not None and self.rate_at(from_currency, to_currency, effective_us) != rate:
+                    self.add_rate(from_currency, to_currency, effective_us, rate)
+                    added.append((from_currency, to_currency, rate))
+                    changed = True
+        return added
+
+    def convert_at(
+        self, amount_minor: int, from_currency: str, to_currency: str, at_us: int
+    ) -> Optional[int]:
+        """
+        Converts a minor-unit amount at the rate in force at a given time.
+
+        :param amount_minor: Amount in minor units of from_currency
+        :param from_currency: Currency to convert from
+        :param to_currency: Currency to convert to
+        :param at_us: Time in epoch microseconds
+        :return: Amount in minor units of to_currency, or None if no rate
+        """
+        rate = self.rate_at(from_currency, to_currency, at_us)
+        if rate is None:
+            return None
+        return convert_minor(amount_minor, rate)
+
+    def revalue(
+        self, transaction: Transaction, to_currency: str, at_us: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Revalues a transaction in another currency, by default at the rate
+        in force when the transaction happened.
+
+        :param transaction: Transaction to revalue
+        :param to_currency: Target currency
+        :param at_us: Valuation time in epoch microseconds ("as of" date)
+        :return: Amount in minor units of to_currency, or None if no rate
+        """
+        return self.convert_at(
+            transaction.amount_minor,
+            transaction.currency,
+            to_currency,
+            transaction.time_stamp_us if at_us is None else at_us,
+        )
+
+    def cache_hit_ratio(self) -> float:
+        """
+        Returns the share of lookups answered from the interval cache.
+
+        :return: Hit ratio between 0.0 and 1.0
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @staticmethod
+    def from_csv(path: str, base: str = "USD") -> "RateHistory":
+        """
+        Loads rates from a CSV file with the header
+        from_currency,to_currency,effective,rate where effective is an ISO
+        date/time or epoch microseconds.
+
+        :param path: Path to the CSV file
+        :param base: Currency used for triangulation
+        :return: RateHistory instance
+        """
+        history = RateHistory(base)
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                effective = row["effective"]
+                history.add_rate(
+                    row["from_currency"],
+                    row["to_currency"],
+                    parse_time_stamp(
+                        int(effective) if effective.isdigit() else effective
+                    ),
+                    Fraction(row["rate"]),
+                )
+        return history
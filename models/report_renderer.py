@@ -0,0 +1,203 @@
+"""Streaming user report renderer with text, JSON and CSV output."""
+
+import csv
+import json
+import sys
+from itertools import islice
+from typing import Iterator, List, Optional, TextIO
+
+from models.transaction import Transaction, from_epoch_us
+
+FORMATS = ("text", "json", "csv")
+
+
+class BufferedLineWriter:
+    """
+    Collects small writes and forwards them to the underlying stream in
+    large chunks, so a report costs one write call per `buffer_size`
+    pieces instead of one per line.
+    """
+
+    def __init__(self, stream: TextIO, buffer_size: int = 1024) -> None:
+        """
+        :param stream: Text stream to write to
+        :param buffer_size: Number of pieces collected before a write
+        """
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._parts: List[str] = []
+
+    def write(self, text: str) -> None:
+        """
+        Buffers a piece of text.
+
+        :param text: Text to write
+        """
+        self._parts.append(text)
+        if len(self._parts) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all buffered text to the stream."""
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts.clear()
+
+
+def _iso(t: Transaction) -> str:
+    """ISO time of a transaction without caching a datetime on it."""
+    return from_epoch_us(t.time_stamp_us).isoformat()
+
+
+def _detail(t: Transaction) -> str:
+    """Same text as Transaction.get_transaction_detail, without caching a datetime."""
+    return (
+        f"Amount: {t.amount} Currency {t.currency}, "
+        f"Transaction type: {t.transaction_type}, "
+        f"Time= {from_epoch_us(t.time_stamp_us)}"
+    )
+
+
+class ReportRenderer:
+    """
+    Renders a user's summary report to a stream without materialising it.
+    Transactions are pulled lazily from each account's time-ordered index,
+    so memory use does not grow with the number of transactions.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        output_format: str = "text",
+        since_us: Optional[int] = None,
+        until_us: Optional[int] = None,
+        limit: Optional[int] = None,
+        page: int = 1,
+        buffer_size: int = 1024,
+    ) -> None:
+        """
+        :param output_format: One of "text", "json", "csv"
+        :param since_us: Only transactions at or after this time (epoch microseconds)
+        :param until_us: Only transactions before this time (epoch microseconds)
+        :param limit: Maximum transactions per account per page (None for all)
+        :param page: 1-based page number; page N skips (N - 1) * limit transactions
+        :param buffer_size: Pieces buffered before each write to the stream
+        :raises ValueError: If the format or page is invalid
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown report format: {output_format}")
+        if page < 1 or (page > 1 and limit is None):
+            raise ValueError("Page must be >= 1 and requires a limit")
+        self.output_format = output_format
+        self.since_us = since_us
+        self.until_us = until_us
+        self.limit = limit
+        self.page = page
+        self.buffer_size = buffer_size
+
+    def _transactions(self, account) -> Iterator[Transaction]:
+        """Lazily yields the selected page of an account's transactions."""
+        selected = (
+            tx
+            for _, tx in account.transaction_index.iter_range(
+                self.since_us, self.until_us
+            )
+        )
+        if self.limit is None:
+            return selected
+        start = (self.page - 1) * self.limit
+        return islice(selected, start, start + self.limit)
+
+    def render(self, user, stream: Optional[TextIO] = None) -> None:
+        """
+        Writes the report for one user.
+
+        :param user: User to report on
+        :param stream: Text stream (defaults to the current sys.stdout)
+        """
+        out = BufferedLineWriter(stream or sys.stdout, self.buffer_size)
+        if self.output_format == "text":
+            self._render_text(user, out)
+        elif self.output_format == "json":
+            self._render_json(user, out)
+        else:
+            self._render_csv(user, out)
+        out.flush()
+
+    def _render_text(self, user, out: BufferedLineWriter) -> None:
+        """Writes the human-readable report (same layout as print_summary)."""
+        write = out.write
+        write("=== User report ===\n")
+        write(f"Name: {user.username} {user.surname}\n")
+        write(f"User ID: {user.get_user_id()}\n")
+        write(f"General balance: {user.get_total_balance()}\n")
+        write("Balance by currencies:\n")
+        for currency, balance in user.get_balances_by_currency().items():
+            write(f"  {currency}: {balance}\n")
+        write("\n--- Accounts ---\n")
+        for account in user.accounts:
+            write(
+                f"account ID: {account.get_account_id()}, balance: {account.get_balance()} "
+                f"{account.currency}\n"
+            )
+            write("Transactions:\n")
+            empty = True
+            for t in self._transactions(account):
+                empty = False
+                write(f"    {_detail(t)}\n")
+            if empty:
+                write("(No transactions)\n")
+            write("-" * 30 + "\n")
+
+    def _render_json(self, user, out: BufferedLineWriter) -> None:
+        """Writes the report as one JSON document, streamed piece by piece."""
+        write = out.write
+        write("{")
+        write(f'"user_id": {json.dumps(user.user_id)}, ')
+        write(f'"username": {json.dumps(user.username, ensure_ascii=False)}, ')
+        write(f'"surname": {json.dumps(user.surname, ensure_ascii=False)}, ')
+        write(f'"balances": {json.dumps(user.get_balances_by_currency())}, ')
+        write('"accounts": [')
+        for i, account in enumerate(user.accounts):
+            if i:
+                write(", ")
+            write(
+                f'{{"account_id": {json.dumps(account.account_id)}, '
+                f'"balance": {json.dumps(account.get_balance())}, '
+                f'"currency": {json.dumps(account.currency)}, "transactions": ['
+            )
+            for j, t in enumerate(self._transactions(account)):
+                if j:
+                    write(", ")
+                data = t.to_dict(epoch=True)
+                data["time_stamp"] = _iso(t)
+                write(json.dumps(data))
+            write("]}")
+        write("]}\n")
+
+    def _render_csv(self, user, out: BufferedLineWriter) -> None:
+        """Writes one CSV row per transaction."""
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(
+            [
+                "user_id",
+                "account_id",
+                "transaction_id",
+                "transaction_type",
+                "amount",
+                "currency",
+                "time_stamp",
+            ]
+        )
+        for account in user.accounts:
+            for t in self._transactions(account):
+                writer.writerow(
+                    [
+                        user.user_id,
+                        account.account_id,
+                        t.transaction_id,
+                        t.transaction_type,
+                        t.amount,
+                        t.currency,
+                        _iso(t),
+                    ]
+                )
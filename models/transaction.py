@@ -1,19 +1,110 @@
 """Module for defining the Transaction class used in banking operations."""
 
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
+from fractions import Fraction
+from typing import Optional
+from models.money import from_minor, to_minor
+
+# Transaction type prefixes that add to / subtract from the account balance.
+CREDIT_TYPES = ("deposit", "transfer_from", "interest")
+DEBIT_TYPES = ("withdraw", "transfer_to", "fee")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def signed_minor(transaction_type: str, amount_minor: int) -> int:
+    """
+    Returns the effect of a transaction on its account's balance.
+    :param transaction_type: Stored transaction type (prefix decides the sign)
+    :param amount_minor: Unsigned amount in minor units
+    :return: Positive for credits, negative for debits, 0 for unknown types
+    """
+    if transaction_type.startswith(CREDIT_TYPES):
+        return amount_minor
+    if transaction_type.startswith(DEBIT_TYPES):
+        return -amount_minor
+    return 0
+
+
+def to_epoch_us(value: datetime) -> int:
+    """
+    Converts a datetime into integer microseconds since 1970-01-01 UTC.
+    Naive datetimes are local time (as from datetime.now() or user input),
+    aware ones carry their own offset; either way the same instant gives
+    the same value, so stored time stamps stay ordered across DST changes.
+    :param value: Datetime to convert
+    :return: Microseconds since the epoch
+    """
+    return (value.astimezone(timezone.utc) - _EPOCH) // _ONE_MICROSECOND
+
+
+def from_epoch_us(value: int) -> datetime:
+    """
+    Converts integer epoch microseconds back into a naive local datetime
+    for display and calendar arithmetic.
+    :param value: Microseconds since the epoch
+    :return: Naive datetime in local time
+    """
+    seconds, micros = divmod(value, 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=micros)
+
+
+def now_epoch_us() -> int:
+    """
+    Returns the current time in epoch microseconds (UTC), without building
+    a datetime.
+    :return: Microseconds since the epoch
+    """
+    return time.time_ns() // 1000
+
+
+def parse_time_stamp(value) -> int:
+    """
+    Reads a stored time stamp: integer epoch microseconds (fast path)
+    or a legacy ISO-8601 string.
+    :param value: Stored time stamp value
+    :return: Microseconds since the epoch
+    :raises TypeError: If the value is neither an integer nor a string
+    :raises ValueError: If the string is not a valid ISO-8601 date
+    """
+    if type(value) is int:  # pylint: disable=unidiomatic-typecheck
+        return value
+    if isinstance(value, str):
+        return to_epoch_us(datetime.fromisoformat(value))
+    raise TypeError("Time_stamp must be an epoch integer or ISO string")
 
 
 class Transaction:
     """
     Represents a single banking transaction including deposit, withdrawal, or transfer.
     Contains transaction ID, amount, type, timestamp, and currency.
+    The timestamp is stored as integer epoch microseconds (time_stamp_us);
+    time_stamp is a lazily computed datetime view of it. The amount is stored
+    in integer minor units (amount_minor); amount is its float view.
+    Transfer legs also record the exchange rate that was applied and share
+    a correlation_id linking the two legs.
     """
 
+    __slots__ = (
+        "transaction_id",
+        "amount_minor",
+        "transaction_type",
+        "time_stamp_us",
+        "currency",
+        "exchange_rate",
+        "correlation_id",
+        "_time_stamp",
+    )
+
     transaction_id: int
-    amount: float
+    amount_minor: int
     transaction_type: str
-    time_stamp: datetime
+    time_stamp_us: int
     currency: str
+    exchange_rate: Optional[Fraction]
+    correlation_id: Optional[int]
 
     def __init__(  # pylint: disable=too-many-arguments, too-many-positional-arguments
         self,
@@ -48,10 +139,84 @@ class Transaction:
             raise TypeError("Currency must be an string")
 
         self.transaction_id = transaction_id
-        self.amount = amount
+        self.amount_minor = to_minor(amount)
         self.transaction_type = transaction_type
-        self.time_stamp = time_stamp
+        self.time_stamp_us = to_epoch_us(time_stamp)
+        self._time_stamp = time_stamp
         self.currency = currency
+        self.exchange_rate = None
+        self.correlation_id = None
+
+    @classmethod
+    def from_epoch(  # pylint: disable=too-many-arguments, too-many-positional-arguments
+        cls,
+        transaction_id: int,
+        amount_minor: int,
+        transaction_type: str,
+        time_stamp_us: int,
+        currency: str,
+        exchange_rate: Optional[Fraction] = None,
+        correlation_id: Optional[int] = None,
+    ) -> "Transaction":
+        """
+        Builds a Transaction directly from an epoch-microsecond timestamp
+        and a minor-unit amount.
+        Skips validation and datetime construction; meant for trusted
+        internal callers (account operations, loading saved data).
+        :param transaction_id: Unique ID of the transaction
+        :param amount_minor: The amount in minor units (cents)
+        :param transaction_type: Type of transaction
+        :param time_stamp_us: Time of the transaction in epoch microseconds
+        :param currency: The currency used
+        :param exchange_rate: Rate applied to a transfer leg, if any
+        :param correlation_id: ID shared by both legs of a transfer, if any
+        :return: Transaction object
+        """
+        tx = cls.__new__(cls)
+        tx.transaction_id = transaction_id
+        tx.amount_minor = amount_minor
+        tx.transaction_type = transaction_type
+        tx.time_stamp_us = time_stamp_us
+        tx._time_stamp = None
+        tx.currency = currency
+        tx.exchange_rate = exchange_rate
+        tx.correlation_id = correlation_id
+        return tx
+
+    @property
+    def amount(self) -> float:
+        """
+        Returns the transaction amount in major units.
+        :return: Amount as float
+        """
+        return from_minor(self.amount_minor)
+
+    @property
+    def time_stamp(self) -> datetime:
+        """
+        Returns the transaction time as a datetime, computed on first access.
+        :return: Naive local datetime of the transaction
+        """
+        if self._time_stamp is None:
+            self._time_stamp = from_epoch_us(self.time_stamp_us)
+        return self._time_stamp
+
+    def signed_amount_minor(self) -> int:
+        """
+        Returns the effect of the transaction on its account's balance:
+        positive for credits, negative for debits, 0 for unknown types.
+        :return: Signed amount in minor units
+        """
+        return signed_minor(self.transaction_type, self.amount_minor)
+
+    def occurred_between(self, start_us: int, end_us: int) -> bool:
+        """
+        Checks whether the transaction falls in [start_us, end_us).
+        :param start_us: Inclusive lower bound in epoch microseconds
+        :param end_us: Exclusive upper bound in epoch microseconds
+        :return: True if the transaction time is within the range
+        """
+        return start_us <= self.time_stamp_us < end_us
 
     def get_transaction_id(self) -> int:
         """
@@ -88,30 +253,56 @@ class Transaction:
             f"Amount={self.amount}, Time={self.time_stamp})"
         )
 
-    def to_dict(self):
+    def to_dict(self, epoch: bool = False):
         """
         Converts the transaction into a dictionary for JSON serialization.
+        :param epoch: Store the time stamp as epoch microseconds instead of ISO text
         :return: Dictionary with transaction fields
         """
-        return {
+        data = {
             "transaction_id": self.transaction_id,
             "amount": self.amount,
             "transaction_type": self.transaction_type,
             "currency": self.currency,
-            "time_stamp": self.time_stamp.isoformat(),
+            "time_stamp": (
+                self.time_stamp_us if epoch else self.time_stamp.isoformat()
+            ),
         }
+        if self.exchange_rate is not None:
+            # Stored as an exact fraction string, e.g. "79/2".
+            data["exchange_rate"] = str(self.exchange_rate)
+        if self.correlation_id is not None:
+            data["correlation_id"] = self.correlation_id
+        return data
 
     @staticmethod
     def from_dict(data):
         """
         Creates a Transaction object from a dictionary (typically from JSON).
+        Accepts both epoch-microsecond and legacy ISO-8601 time stamps.
         :param data: Dictionary containing transaction fields
         :return: Transaction object
         """
-        return Transaction(
-            transaction_id=data["transaction_id"],
-            amount=data["amount"],
-            transaction_type=data["transaction_type"],
-            currency=data["currency"],
-            time_stamp=datetime.fromisoformat(data["time_stamp"]),
+        time_stamp_us = parse_time_stamp(data["time_stamp"])
+        transaction_id = data["transaction_id"]
+        amount = data["amount"]
+        transaction_type = data["transaction_type"]
+        currency = data["currency"]
+        if not isinstance(transaction_id, int):
+            raise TypeError("Transaction id must be an integer")
+        if not isinstance(amount, (int, float)):
+            raise TypeError("Amount must be a num")
+        if not isinstance(transaction_type, str) or not transaction_type.strip():
+            raise ValueError("Transaction type must be a non-empty string")
+        if not isinstance(currency, str):
+            raise TypeError("Currency must be an string")
+        exchange_rate = data.get("exchange_rate")
+        return Transaction.from_epoch(
+            transaction_id,
+            to_minor(amount),
+            transaction_type,
+            time_stamp_us,
+            currency,
+            None if exchange_rate is None else Fraction(exchange_rate),
+            data.get("correlation_id"),
         )
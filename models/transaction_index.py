@@ -0,0 +1,147 @@
+"""Time-ordered index over an account's transactions with paginated range queries."""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, NamedTuple, Optional
+
+from models.money import to_minor
+from models.transaction import Transaction
+
+
+class TransactionPage(NamedTuple):
+    """One page of query results and the cursor to request the next page."""
+
+    items: List[Transaction]
+    next_cursor: Optional[str]
+
+
+class TransactionIndex:
+    """
+    Keeps (time stamp, position) keys of an append-only transaction list in
+    sorted order. New transactions are indexed lazily on the next query,
+    which is O(1) per transaction when they arrive in time order.
+    Range lookups are a bisect, so a query costs O(log n + k).
+    """
+
+    def __init__(self, transactions: List[Transaction]) -> None:
+        """
+        :param transactions: The account's transaction list (indexed by reference)
+        """
+        self.transactions = transactions
+        self.times = array("q")
+        self.positions = array("q")
+        self._indexed = 0
+        # Lowest slot shifted by an out-of-order insert (or a rebuild) since
+        # consumers last reset it; lets derived data such as balance
+        # checkpoints know what to recompute.
+        self.first_changed_slot: Optional[int] = None
+
+    def sync(self) -> None:
+        """Indexes transactions appended since the last call."""
+        transactions = self.transactions
+        times = self.times
+        positions = self.positions
+        for position in range(self._indexed, len(transactions)):
+            time_us = transactions[position].time_stamp_us
+            if not times or time_us >= times[-1]:
+                times.append(time_us)
+                positions.append(position)
+            else:
+                slot = bisect_right(times, time_us)
+                times.insert(slot, time_us)
+                positions.insert(slot, position)
+                if self.first_changed_slot is None or slot < self.first_changed_slot:
+                    self.first_changed_slot = slot
+        self._indexed = len(transactions)
+
+    def rebuild(self) -> None:
+        """Rebuilds the index from scratch (needed if history was rewritten)."""
+        self.times = array("q")
+        self.positions = array("q")
+        self._indexed = 0
+        self.first_changed_slot = 0
+        self.sync()
+
+    def _start_slot(self, start_us: Optional[int], cursor: Optional[str]) -> int:
+        """
+        Finds the first index slot at or after start_us and after the cursor.
+        """
+        slot = 0 if start_us is None else bisect_left(self.times, start_us)
+        if cursor is not None:
+            time_text, position_text = cursor.split(":")
+            cursor_time, cursor_position = int(time_text), int(position_text)
+            after = bisect_left(self.times, cursor_time)
+            while (
+                after < len(self.times)
+                and self.times[after] == cursor_time
+                and self.positions[after] != cursor_position
+            ):
+                after += 1
+            slot = max(slot, after + 1)
+        return slot
+
+    def iter_range(
+        self,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Iterator[tuple]:
+        """
+        Lazily yields (slot, transaction) in time order for [start_us, end_us).
+
+        :param start_us: Inclusive lower bound in epoch microseconds
+        :param end_us: Exclusive upper bound in epoch microseconds
+        :param cursor: Resume after the transaction this cursor points at
+        """
+        self.sync()
+        times = self.times
+        positions = self.positions
+        transactions = self.transactions
+        stop = len(times) if end_us is None else bisect_left(times, end_us)
+        for slot in range(self._start_slot(start_us, cursor), stop):
+            yield slot, transactions[positions[slot]]
+
+    def query(  # pylint: disable=too-many-arguments
+        self,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None,
+        transaction_type: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> TransactionPage:
+        """
+        Returns one page of transactions in time order matching all filters.
+
+        :param start_us: Inclusive lower time bound in epoch microseconds
+        :param end_us: Exclusive upper time bound in epoch microseconds
+        :param transaction_type: Type prefix, e.g. "deposit" or "transfer"
+        :param min_amount: Inclusive lower amount bound (major units)
+        :param max_amount: Inclusive upper amount bound (major units)
+        :param limit: Maximum number of items on the page (None for all)
+        :param cursor: next_cursor from the previous page
+        :return: TransactionPage with items and the cursor for the next page
+        """
+        min_minor = None if min_amount is None else to_minor(min_amount)
+        max_minor = None if max_amount is None else to_minor(max_amount)
+        items: List[Transaction] = []
+        last_slot = -1
+        for slot, tx in self.iter_range(start_us, end_us, cursor):
+            if transaction_type is not None and not tx.transaction_type.startswith(
+                transaction_type
+            ):
+                continue
+            if min_minor is not None and tx.amount_minor < min_minor:
+                continue
+            if max_minor is not None and tx.amount_minor > max_minor:
+                continue
+            if limit is not None and len(items) == limit:
+                return TransactionPage(items, self._cursor_at(last_slot))
+            items.append(tx)
+            last_slot = slot
+        return TransactionPage(items, None)
+
+    def _cursor_at(self, slot: int) -> str:
+        """Encodes the position of an index slot as an opaque cursor string."""
+        return f"{self.times[slot]}:{self.positions[slot]}"
@@ -3,6 +3,9 @@
 
 from typing import List
 from models.account import BankAccount
+from models.balance_totals import BalanceTotals
+from models.money import from_minor
+from models.report_renderer import ReportRenderer
 from models.transaction import Transaction
 
 
@@ -10,6 +13,8 @@ class User:
     """
     Represents a user of the banking system with multiple accounts.
     Provides access to user's personal data, bank accounts, and summary reports.
+    Per-currency totals are kept up to date incrementally in `totals`, and
+    `version` is incremented on every change to the user's accounts.
     """
 
     user_id: int
@@ -28,6 +33,8 @@ class User:
         self.surname = surname
         self.accounts: List[BankAccount] = []
         self.user_id = user_id
+        self.totals = BalanceTotals()
+        self.version = 0
 
     def get_user_id(self):
         """
@@ -45,17 +52,41 @@ class User:
 
     def add_account(self, account) -> None:
         """
-        Adds a new bank account to the user's list of accounts.
+        Adds a new bank account to the user's list of accounts
+        and starts tracking its balance in the user's totals.
+        The account's ledger key is scoped to this user, since account IDs
+        are only unique per user.
         :param account: A Bankaccount object
         """
+        account.ledger_key = f"user:{self.user_id}/account:{account.account_id}"
         self.accounts.append(account)
+        self.totals.apply(account.currency, account.balance_minor)
+        self.version += 1
+        account.observers.append(self._on_account_change)
+
+    def _on_account_change(self, account, delta_minor: int) -> None:
+        """
+        BankAccount observer: passes the change to the totals and bumps the
+        modification version.
+        :param account: The account whose balance changed
+        :param delta_minor: Change in minor units
+        """
+        self.totals.on_balance_change(account, delta_minor)
+        self.version += 1
 
     def get_total_balance(self) -> float:
         """
         Calculates the total balance across all the user's accounts.
         :return: Sum of all account balances
         """
-        return sum(account.get_balance() for account in self.accounts)
+        return from_minor(self.get_total_balance_minor())
+
+    def get_total_balance_minor(self) -> int:
+        """
+        Calculates the exact total balance across all accounts in minor units.
+        :return: Sum of all account balances in minor units
+        """
+        return self.totals.total()
 
     def get_account(self) -> List[BankAccount]:
         """
@@ -84,14 +115,28 @@ class User:
         Groups and returns the balances of the user's accounts by currency.
         :return: Dictionary with currency as key and total balance as value
         """
-        balances: dict[str, float] = {}
-        for account in self.accounts:
-            currency = account.currency
-            if currency in balances:
-                balances[currency] += account.get_balance()
-            else:
-                balances[currency] = account.get_balance()
-        return balances
+        return {
+            currency: from_minor(total)
+            for currency, total in self.get_balances_by_currency_minor().items()
+        }
+
+    def get_balances_by_currency_minor(self) -> dict[str, int]:
+        """
+        Groups the balances of the user's accounts by currency in minor units.
+        :return: Dictionary with currency as key and total minor units as value
+        """
+        return self.totals.to_dict()
+
+    def verify_totals(self) -> dict[str, int]:
+        """
+        Recomputes the per-currency totals from the accounts and compares them
+        with the incrementally maintained ones.
+        :return: Dictionary of currency -> drift in minor units (empty if consistent)
+        """
+        recomputed = BalanceTotals.from_accounts(
+            a for a in self.accounts if isinstance(a, BankAccount)
+        )
+        return self.totals.diff(recomputed)
 
     def print_summary(self):
         """
@@ -100,28 +145,9 @@ class User:
         - Total balance
         - Balances by currency
         - Detailed information about each account and its transactions
+        The report is streamed through a buffered writer (see ReportRenderer).
         """
-        print("=== User report ===")
-        print(f"Name: {self.username} {self.surname}")
-        print(f"User ID: {self.get_user_id()}")
-        print(f"General balance: {self.get_total_balance()}")
-        print("Balance by currencies:")
-
-        for currency, balance in self.get_balances_by_currency().items():
-            print(f"  {currency}: {balance}")
-        print("\n--- Accounts ---")
-        for account in self.accounts:
-            print(
-                f"account ID: {account.get_account_id()}, balance: {account.get_balance()} "
-                f"{account.currency}"
-            )
-            print("Transactions:")
-            if not account.get_transactions():
-                print("(No transactions)")
-            else:
-                for t in account.get_transactions():
-                    print("   ", t.get_transaction_detail())
-            print("-" * 30)
+        ReportRenderer().render(self)
 
     @staticmethod
     def from_dict(data):
@@ -157,12 +183,16 @@ class User:
             for tr_data in acc_data.get("transactions", []):
                 transaction = Transaction.from_dict(tr_data)
                 account.transactions.append(transaction)
+            account.restore_opening(acc_data.get("opening"))
+            account.restore_checkpoints(acc_data.get("checkpoints"))
             user.add_account(account)
+        user.version = data.get("version", 0)
         return user
 
-    def to_dict(self):
+    def to_dict(self, epoch: bool = False):
         """
         Converts the User object into a dictionary suitable for JSON serialization.
+        :param epoch: Store transaction time stamps as epoch microseconds
         :return: Dictionary containing user data and list of account dictionaries
         """
         # Code borrowed from: https://github.com/pjastr/PFsample/blob/master/src/user.py
@@ -183,5 +213,6 @@ class User:
             "user_id": self.user_id,
             "username": self.username,
             "surname": self.surname,
-            "accounts": [a.to_dict() for a in self.accounts],
+            "version": self.version,
+            "accounts": [a.to_dict(epoch) for a in self.accounts],
         }
@@ -0,0 +1,340 @@
+"""Copy-on-write versioned state: readers take a consistent snapshot of all
+users and iterate it while writers keep publishing new versions."""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+
+from models.money import from_minor
+from models.transaction import Transaction
+from models.transaction_index import TransactionIndex
+
+
+class AccountState(NamedTuple):
+    """
+    Immutable view of an account at one version. Transaction history is
+    append-only, so the view keeps a reference to the live list and the
+    number of transactions it covers instead of copying it.
+    """
+
+    account_id: int
+    currency: str
+    balance_minor: int
+    history: List[Transaction]
+    transaction_count: int
+
+    @property
+    def transactions(self) -> List[Transaction]:
+        """Transactions recorded up to this version."""
+        return self.history[: self.transaction_count]
+
+    @property
+    def transaction_index(self) -> TransactionIndex:
+        """Time-ordered index over this version's transactions (built on demand)."""
+        return TransactionIndex(self.transactions)
+
+    def get_account_id(self) -> int:
+        """Returns the account ID."""
+        return self.account_id
+
+    def get_balance(self) -> float:
+        """Returns the balance in major units."""
+        return from_minor(self.balance_minor)
+
+
+class UserState(NamedTuple):
+    """
+    Immutable view of a user and its accounts at one version. Offers the
+    read methods of User used by ReportRenderer, so a snapshot can be
+    rendered like a live user.
+    """
+
+    user_id: int
+    username: str
+    surname: str
+    accounts: Tuple[AccountState, ...]
+
+    @staticmethod
+    def from_user(user) -> "UserState":
+        """
+        Captures the current state of a user, O(number of accounts).
+
+        :param user: Live User object
+        :return: UserState
+        """
+        return UserState(
+            user.user_id,
+            user.username,
+            user.surname,
+            tuple(
+                AccountState(
+                    a.account_id,
+                    a.currency,
+                    a.balance_minor,
+                    a.transactions,
+                    len(a.transactions),
+                )
+                for a in user.accounts
+            ),
+        )
+
+    def get_user_id(self) -> int:
+        """Returns the user ID."""
+        return self.user_id
+
+    def get_balances_by_currency_minor(self) -> Dict[str, int]:
+        """Per-currency balances in minor units."""
+        totals: Dict[str, int] = {}
+        for account in self.accounts:
+            totals[account.currency] = totals.get(account.currency, 0) + account.balance_minor
+        return totals
+
+    def get_balances_by_currency(self) -> Dict[str, float]:
+        """Per-currency balances in major units."""
+        return {c: from_minor(v) for c, v in self.get_balances_by_currency_minor().items()}
+
+    def get_total_balance_minor(self) -> int:
+        """Sum of all account balances in minor units."""
+        return sum(a.balance_minor for a in self.accounts)
+
+    def get_total_balance(self) -> float:
+        """Sum of all account balances in major units."""
+        return from_minor(self.get_total_balance_minor())
+
+
+class VersionedStore:
+    """
+    Multi-version map. Every put() creates a new global version and appends
+    (version, value) to the key's chain; a snapshot records the current
+    version and reads, for each key, the newest value at or below it. Taking
+    a snapshot is O(1) and never copies data, and writers never wait for
+    readers.
+
+    Old values are kept only while an open snapshot may still read them:
+    a chain is pruned on every write to its key, and all chains holding
+    extra versions are pruned whenever a snapshot is released.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._chains: Dict[Hashable, List[Tuple[int, object]]] = {}
+        # Keys in insertion order; append-only, so snapshots iterate a prefix.
+        self._keys: List[Hashable] = []
+        self._readers: Dict[int, int] = {}
+        self._retained: set = set()
+        self._lock = threading.Lock()
+
+    def _prune(self, key: Hashable) -> None:
+        """
+        Drops values of a key that no open snapshot can read: each snapshot
+        needs the newest value at or below its version, and new snapshots
+        need the latest one.
+        """
+        chain = self._chains[key]
+        readers = sorted(self._readers, reverse=True)
+        kept = [chain[-1]]
+        for version, value in reversed(chain[:-1]):
+            while readers and readers[0] >= kept[-1][0]:
+                readers.pop(0)
+            if not readers:
+                break
+            if version <= readers[0]:
+                kept.append((version, value))
+        if len(kept) < len(chain):
+            # Replaced, never mutated in place: readers may hold the old list.
+            kept.reverse()
+            self._chains[key] = kept
+        if len(kept) > 1:
+            self._retained.add(key)
+        else:
+            self._retained.discard(key)
+
+    def put(self, key: Hashable, value: Optional[object]) -> int:
+        """
+        Publishes a new value for a key (None deletes it).
+
+        :param key: Key
+        :param value: Immutable value
+        :return: The new version
+        """
+        return self.put_many({key: value})
+
+    def put_many(self, values: Dict[Hashable, Optional[object]]) -> int:
+        """
+        Publishes new values for several keys as one version, so a snapshot
+        sees either all of them or none.
+
+        :param values: Key -> immutable value (None deletes it)
+        :return: The new version
+        """
+        with self._lock:
+            self.version += 1
+            for key, value in values.items():
+                chain = self._chains.get(key)
+                if chain is None:
+                    self._chains[key] = [(self.version, value)]
+                    self._keys.append(key)
+                else:
+                    chain.append((self.version, value))
+                    self._prune(key)
+            return self.version
+
+    @contextmanager
+    def snapshot(self) -> Iterator["Snapshot"]:
+        """
+        Opens a consistent snapshot of the current version; old versions it
+        needs are kept until the block exits.
+
+        :return: Context manager yielding a Snapshot
+        """
+        with self._lock:
+            version = self.version
+            self._readers[version] = self._readers.get(version, 0) + 1
+            key_count = len(self._keys)
+        try:
+            yield Snapshot(self, version, key_count)
+        finally:
+            with self._lock:
+                self._readers[version] -= 1
+                if not self._readers[version]:
+                    del self._readers[version]
+                    for key in list(self._retained):
+                        self._prune(key)
+
+    def retained_versions(self) -> int:
+        """
+        Counts values kept only for open snapshots.
+
+        :return: Number of old values in memory
+        """
+        with self._lock:
+            return sum(len(self._chains[key]) - 1 for key in self._retained)
+
+
+class Snapshot:
+    """Read-only view of a VersionedStore at one version."""
+
+    def __init__(self, store: VersionedStore, version: int, key_count: int) -> None:
+        """
+        :param store: Store the snapshot belongs to
+        :param version: Version the snapshot reads
+        :param key_count: Number of keys that existed at that version
+        """
+        self.version = version
+        self._store = store
+        self._key_count = key_count
+
+    def _read(self, chain: List[Tuple[int, object]]) -> Optional[object]:
+        """Newest value in a chain at or below the snapshot version."""
+        for version, value in reversed(chain):
+            if version <= self.version:
+                return value
+        return None
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """
+        Reads one key.
+
+        :param key: Key
+        :return: Value at the snapshot version, or None
+        """
+        chain = self._store._chains.get(key)  # pylint: disable=protected-access
+        return None if chain is None else self._read(chain)
+
+    def values(self) -> Iterator[object]:
+        """
+        Iterates all values at the snapshot version in key insertion order.
+
+        :return: Iterator over values
+        """
+        keys = self._store._keys  # pylint: disable=protected-access
+        chains = self._store._chains  # pylint: disable=protected-access
+        for position in range(self._key_count):
+            value = self._read(chains[keys[position]])
+            if value is not None:
+                yield value
+
+
+class BankState:
+    """
+    Live users plus their published, immutable states. Writers change the
+    live User objects inside write(), one writer at a time. BankState
+    observes every live account, so when the block exits the new UserState
+    of each user whose accounts changed (e.g. both sides of a transfer to
+    another user) is published in one version (O(accounts of those users)
+    per write). Readers use snapshot() and only ever see published states,
+    so a full-bank report neither blocks writers nor sees half-applied
+    changes.
+    """
+
+    def __init__(self, users=()) -> None:
+        """
+        :param users: Initial live users
+        """
+        self.users: Dict[int, object] = {}
+        self.store = VersionedStore()
+        self._write_lock = threading.Lock()
+        # ledger key -> owning user ID of every observed account
+        self._owners: Dict[str, int] = {}
+        # Users whose accounts changed since the last publish
+        self._touched: set = set()
+        for user in users:
+            self.add_user(user)
+
+    def add_user(self, user) -> None:
+        """
+        Adds (or replaces) a live user and publishes its state.
+
+        :param user: User object
+        """
+        with self._write_lock:
+            self.users[user.user_id] = user
+            self._observe(user)
+            self.store.put(user.user_id, UserState.from_user(user))
+
+    def _observe(self, user) -> None:
+        """Registers the observers on accounts of a user not observed yet."""
+        for account in user.accounts:
+            self._owners[account.ledger_key] = user.user_id
+            if self._on_change not in account.observers:
+                account.observers.append(self._on_change)
+                account.record_observers.append(self._on_change)
+
+    def _on_change(self, account, _change) -> None:
+        """BankAccount balance and record observer: marks the owner as touched."""
+        user_id = self._owners.get(account.ledger_key)
+        if user_id is not None:
+            self._touched.add(user_id)
+
+    @contextmanager
+    def write(self, user_id: int):
+        """
+        Gives exclusive access to a live user. On exit its new state, and
+        that of every other user whose accounts changed inside the block,
+        is published as one version, also if the block raises after a
+        partial change.
+
+        :param user_id: User to modify
+        :return: Context manager yielding the live User
+        :raises KeyError: If the user does not exist
+        """
+        with self._write_lock:
+            user = self.users[user_id]
+            self._touched = {user_id}
+            try:
+                yield user
+            finally:
+                touched = [self.users[uid] for uid in self._touched if uid in self.users]
+                for changed in touched:
+                    self._observe(changed)
+                self.store.put_many(
+                    {changed.user_id: UserState.from_user(changed) for changed in touched}
+                )
+
+    def snapshot(self):
+        """
+        Opens a consistent snapshot of all users.
+
+        :return: Context manager yielding a Snapshot whose values are UserStates
+        """
+        return self.store.snapshot()
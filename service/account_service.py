@@ -1,7 +1,14 @@
 """Provides high-level operations and CLI handlers for managing user bank accounts."""
 
+from datetime import datetime
+from typing import Callable, Optional
 from models.account import BankAccount
+from models.account_index import ACCOUNT_INDEX
+from models.ledger import LEDGER
+from models.money import from_minor, to_minor
+from models.transaction import to_epoch_us
 from service.file_manager import FileManager
+from service.idempotency import IdempotencyError, IdempotencyStore
 
 
 class AccountService:
@@ -9,8 +16,52 @@ class AccountService:
     Service class that provides high-level operations for managing bank accounts.
     Includes helper methods for creating, depositing, withdrawing, and transferring funds.
     Interacts with file-based user storage via FileManager.
+    Mutations accept an optional idempotency key; a repeated key returns the
+    original result without applying the operation again.
     """
 
+    IDEMPOTENCY = IdempotencyStore()
+
+    @staticmethod
+    def _run_once(
+        idempotency_key: Optional[str], fingerprint: str, operation: Callable[[], str]
+    ) -> str:
+        """
+        Runs an operation unless its idempotency key was already seen.
+
+        :param idempotency_key: Client-supplied key (None to always run)
+        :param fingerprint: Description of the request, used to detect key reuse
+        :param operation: Callable performing the mutation and returning its result
+        :return: The operation result, or the stored result of the first attempt
+        """
+        if idempotency_key is None:
+            return operation()
+        store = AccountService.IDEMPOTENCY
+        try:
+            previous = store.reserve(idempotency_key, fingerprint)
+        except IdempotencyError as e:
+            return f"Idempotency error: {e}"
+        if previous is not None:
+            return previous
+        try:
+            result = operation()
+        except BaseException:
+            store.release(idempotency_key)
+            raise
+        store.put(idempotency_key, fingerprint, result)
+        return result
+
+    @staticmethod
+    def _cli_key(args) -> Optional[str]:
+        """
+        Returns the --idempotency-key value passed on the command line, if any.
+
+        :param args: Parsed arguments object
+        :return: Key string or None
+        """
+        key = getattr(args, "idempotency_key", None)
+        return key if isinstance(key, str) and key else None
+
     @staticmethod
     def create_bank_account(
         account_id: int, initial_balance: float = 0.0, currency: str = "USD"
@@ -26,19 +77,32 @@ class AccountService:
         return BankAccount(account_id, initial_balance, currency)
 
     @staticmethod
-    def deposit_to_account(account: BankAccount, amount: float, currency: str) -> str:
+    def deposit_to_account(
+        account: BankAccount,
+        amount: float,
+        currency: str,
+        idempotency_key: Optional[str] = None,
+    ) -> str:
         """
         Deposits money into a specific bank account.
 
         :param account: Target Bankaccount instance
         :param amount: Amount to deposit
         :param currency: Currency in which deposit is made
+        :param idempotency_key: Optional key making retries safe
         """
-        return account.deposit(amount, currency)
+        return AccountService._run_once(
+            idempotency_key,
+            f"deposit:{account.account_id}:{amount}:{currency}",
+            lambda: account.deposit(amount, currency),
+        )
 
     @staticmethod
     def withdraw_from_account(
-        account: BankAccount, amount: float, currency: str
+        account: BankAccount,
+        amount: float,
+        currency: str,
+        idempotency_key: Optional[str] = None,
     ) -> str:
         """
         Attempts to withdraw money from the specified bank account.
@@ -46,13 +110,22 @@ class AccountService:
         :param account: Target Bankaccount instance
         :param amount: Amount to withdraw
         :param currency: Currency of withdrawal
+        :param idempotency_key: Optional key making retries safe
         :return: Result message from the withdrawal method
         """
-        return account.withdraw(amount, currency)
+        return AccountService._run_once(
+            idempotency_key,
+            f"withdraw:{account.account_id}:{amount}:{currency}",
+            lambda: account.withdraw(amount, currency),
+        )
 
     @staticmethod
     def transfer_between_accounts(
-        from_account: BankAccount, to_account: BankAccount, amount: float, currency: str
+        from_account: BankAccount,
+        to_account: BankAccount,
+        amount: float,
+        currency: str,
+        idempotency_key: Optional[str] = None,
     ) -> str:
         """
         Transfers money between two accounts, with currency validation and conversion if needed.
@@ -61,9 +134,54 @@ class AccountService:
         :param to_account: Target account
         :param amount: Amount to transfer
         :param currency: Currency used for transfer
+        :param idempotency_key: Optional key making retries safe
         :return: Result message from the transfer method
         """
-        return from_account.transfer(to_account, amount, currency)
+        return AccountService._run_once(
+            idempotency_key,
+            f"transfer:{from_account.account_id}:{to_account.account_id}:{amount}:{currency}",
+            lambda: from_account.transfer(to_account, amount, currency),
+        )
+
+    @staticmethod
+    def _run_cli_once(
+        key: Optional[str], fingerprint: str, apply: Callable[[], Optional[str]]
+    ) -> None:
+        """
+        Runs a CLI mutation under its idempotency key and prints the result.
+        The key is reserved before the users file is loaded, so a concurrent
+        retry of the same request cannot apply it a second time; a replay
+        prints the stored result without loading users. The result is
+        recorded after the users file is saved. If the process dies in
+        between, the key stays reserved and retries are refused until the
+        store's lease runs out.
+
+        :param key: Idempotency key (None to skip the check)
+        :param fingerprint: Description of the request
+        :param apply: Loads, mutates and saves users and returns the result
+                      message, or prints why nothing was done and returns None
+        """
+        store = AccountService.IDEMPOTENCY
+        if key is not None:
+            try:
+                previous = store.reserve(key, fingerprint)
+            except IdempotencyError as e:
+                print(f"Idempotency error: {e}")
+                return
+            if previous is not None:
+                print(previous)
+                return
+        result = None
+        try:
+            result = apply()
+        finally:
+            if key is not None:
+                if result is None:
+                    store.release(key)
+                else:
+                    store.put(key, fingerprint, result)
+        if result is not None:
+            print(result)
 
     @staticmethod
     def withdraw(args):
@@ -71,20 +189,29 @@ class AccountService:
         CLI wrapper for withdrawing money from a user's account based on provided arguments.
 
         :param args: Parsed arguments object with user_id, account_id, amount
+                     and optional idempotency_key
         """
-        users = FileManager.load_all_users()
-        user = next((u for u in users if u.user_id == args.user_id), None)
-        if not user:
-            print("User not found")
-            return
 
-        account = user.get_account_by_id(args.account_id)
-        if account:
+        def apply() -> Optional[str]:
+            users = FileManager.load_all_users()
+            user = next((u for u in users if u.user_id == args.user_id), None)
+            if not user:
+                print("User not found")
+                return None
+
+            account = user.get_account_by_id(args.account_id)
+            if not account:
+                print("Account not found")
+                return None
             result = account.withdraw(args.amount, account.currency)
             FileManager.save_all_users(users)
-            print(f"{result}")
-        else:
-            print("Account not found")
+            return f"{result}"
+
+        AccountService._run_cli_once(
+            AccountService._cli_key(args),
+            f"withdraw:{args.user_id}:{args.account_id}:{args.amount}",
+            apply,
+        )
 
     @staticmethod
     def create_account(args):
@@ -102,7 +229,7 @@ class AccountService:
         account = BankAccount(
             account_id=args.account_id, balance=0.0, currency=args.currency
         )
-        user.accounts.append(account)
+        user.add_account(account)
         FileManager.save_all_users(users)
         print(f"Creating account ID {args.account_id} by user {user.username}")
 
@@ -112,20 +239,29 @@ class AccountService:
         CLI wrapper for depositing funds into a user's account.
 
         :param args: Parsed arguments object with user_id, account_id, amount
+                     and optional idempotency_key
         """
-        users = FileManager.load_all_users()
-        user = next((u for u in users if u.user_id == args.user_id), None)
-        if not user:
-            print("User not found")
-            return
 
-        account = user.get_account_by_id(args.account_id)
-        if account:
+        def apply() -> Optional[str]:
+            users = FileManager.load_all_users()
+            user = next((u for u in users if u.user_id == args.user_id), None)
+            if not user:
+                print("User not found")
+                return None
+
+            account = user.get_account_by_id(args.account_id)
+            if not account:
+                print("Account not found")
+                return None
             account.deposit(args.amount, account.currency)
             FileManager.save_all_users(users)
-            print(f"Account replenished {args.account_id} на {args.amount}")
-        else:
-            print("Account not found")
+            return f"Account replenished {args.account_id} на {args.amount}"
+
+        AccountService._run_cli_once(
+            AccountService._cli_key(args),
+            f"deposit:{args.user_id}:{args.account_id}:{args.amount}",
+            apply,
+        )
 
     @staticmethod
     def transfer(args):
@@ -133,6 +269,38 @@ class AccountService:
         CLI wrapper for transferring funds between two of a user's accounts.
 
         :param args: Parsed arguments object with user_id, from_id, to_id, amount
+                     and optional idempotency_key
+        """
+
+        def apply() -> Optional[str]:
+            users = FileManager.load_all_users()
+            user = next((u for u in users if u.user_id == args.user_id), None)
+            if not user:
+                print("User not found")
+                return None
+
+            from_acc = user.get_account_by_id(args.from_id)
+            to_acc = user.get_account_by_id(args.to_id)
+            if not (from_acc and to_acc):
+                print("One of the accounts was not found.")
+                return None
+            result = from_acc.transfer(to_acc, args.amount, from_acc.currency)
+            FileManager.save_all_users(users)
+            return result
+
+        AccountService._run_cli_once(
+            AccountService._cli_key(args),
+            f"transfer:{args.user_id}:{args.from_id}:{args.to_id}:{args.amount}",
+            apply,
+        )
+
+    @staticmethod
+    def history(args):
+        """
+        CLI wrapper that prints one page of an account's transaction history.
+
+        :param args: Parsed arguments object with user_id, account_id and optional
+                     since, until (ISO dates), type, limit, cursor
         """
         users = FileManager.load_all_users()
         user = next((u for u in users if u.user_id == args.user_id), None)
@@ -140,11 +308,97 @@ class AccountService:
             print("User not found")
             return
 
-        from_acc = user.get_account_by_id(args.from_id)
-        to_acc = user.get_account_by_id(args.to_id)
-        if from_acc and to_acc:
-            result = from_acc.transfer(to_acc, args.amount, from_acc.currency)
-            FileManager.save_all_users(users)
-            print(result)
+        account = user.get_account_by_id(args.account_id)
+        if not account:
+            print("Account not found")
+            return
+
+        page = account.query_transactions(
+            start=datetime.fromisoformat(args.since) if args.since else None,
+            end=datetime.fromisoformat(args.until) if args.until else None,
+            transaction_type=args.type,
+            limit=args.limit,
+            cursor=args.cursor,
+        )
+        for t in page.items:
+            print(t.get_transaction_detail())
+        if page.next_cursor:
+            print(f"Next page: --cursor {page.next_cursor}")
+
+    @staticmethod
+    def verify_totals(_args):
+        """
+        CLI wrapper that recomputes balance totals from scratch and reports drift
+        against the saved totals.
+
+        :param _args: Parsed arguments object (unused)
+        """
+        drift = FileManager.verify_totals()
+        if not drift:
+            print("Totals are consistent")
+            return
+        for scope, currencies in drift.items():
+            for currency, delta in currencies.items():
+                print(f"Drift in {scope} {currency}: {delta} minor units")
+
+    @staticmethod
+    def verify_ledger(_args):
+        """
+        CLI wrapper that replays the whole journal and reports accounts whose
+        materialized balance differs from the replayed one.
+
+        :param _args: Parsed arguments object (unused)
+        """
+        FileManager.load_all_users()
+        drift = LEDGER.verify()
+        if not drift:
+            print(f"Ledger is consistent ({LEDGER.entry_count} entries)")
+            return
+        for account, delta in drift.items():
+            print(f"Drift in {account}: {delta} minor units")
+
+    @staticmethod
+    def ledger_balances(args):
+        """
+        CLI wrapper that prints every ledger account's balance, either current
+        or recovered as of a point in time (snapshot plus journal replay).
+
+        :param args: Parsed arguments object with optional at (ISO date)
+        """
+        if args.at:
+            balances = LEDGER.balances_at(to_epoch_us(datetime.fromisoformat(args.at)))
+        else:
+            FileManager.load_all_users()
+            balances = LEDGER.balances
+        for account, balance_minor in sorted(balances.items()):
+            print(f"{account}: {from_minor(balance_minor)}")
+
+    @staticmethod
+    def top_accounts(args):
+        """
+        CLI wrapper that prints the accounts with the largest balances or the
+        most transactions in one currency, optionally only those at or above
+        a minimum. Reads the saved index when it was written for the
+        current users file; otherwise (missing, or the users file was
+        edited, restored or saved without it) users are loaded and the
+        index is rebuilt and saved.
+
+        :param args: Parsed arguments object with currency, by ("balance" or
+                     "transactions"), limit and optional minimum
+        """
+        index = ACCOUNT_INDEX.reader(FileManager.users_file_stamp())
+        if index is None:
+            FileManager.load_all_users()
+            FileManager.save_account_index()
+            index = ACCOUNT_INDEX
+        if args.minimum is None:
+            entries = index.top(args.by, args.currency, args.limit)
         else:
-            print("One of the accounts was not found.")
+            threshold = to_minor(args.minimum) if args.by == "balance" else int(args.minimum)
+            entries = index.above(args.by, args.currency, threshold, args.limit)
+        if not entries:
+            print("No accounts found")
+            return
+        for rank, entry in enumerate(entries, start=1):
+            value = from_minor(entry.value) if args.by == "balance" else entry.value
+            print(f"{rank}. user {entry.user_id}, account {entry.account_id}: {value}")
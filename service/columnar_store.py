@@ -0,0 +1,304 @@
+"""Flat transaction tables for analytics: one binary array file per column
+plus a JSON schema, a CSV fallback, and a memory-mapped reader."""
+
+import csv
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA_FILE = "schema.json"
+
+# (column name, array typecode). Strings are dictionary-encoded: the column
+# holds codes and the schema holds the values.
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("user_id", "q"),
+    ("account_id", "q"),
+    ("transaction_id", "q"),
+    ("type", "H"),
+    ("counterparty", "q"),
+    ("correlation_id", "q"),
+    ("amount_minor", "q"),
+    ("currency", "H"),
+    ("time_stamp_us", "q"),
+)
+DICTIONARY_COLUMNS = ("type", "currency")
+# Counterparty value for transactions without one (deposits, withdrawals).
+NO_COUNTERPARTY = -1
+# Correlation ID value for transactions without one (everything but
+# transfer legs, and legs written before transfers carried one).
+NO_CORRELATION = -1
+
+# One flat row: user_id, account_id, transaction_id, type, counterparty
+# account ID, correlation_id, amount_minor, currency, time_stamp_us.
+# The counterparty column holds the peer's account ID only; the peer's
+# user is found through the leg sharing the correlation ID
+# (ColumnarReader.counterparties).
+Row = Tuple[int, int, int, str, int, int, int, str, int]
+
+
+_POSITIONS = {name: position for position, (name, _typecode) in enumerate(COLUMNS)}
+
+
+def split_transaction_type(transaction_type: str) -> Tuple[str, int]:
+    """
+    Splits a stored type such as "transfer_to_5" into its base type and
+    counterparty account ID.
+
+    :param transaction_type: Stored transaction type
+    :return: (base type, counterparty account ID or NO_COUNTERPARTY)
+    """
+    base, _, suffix = transaction_type.rpartition("_")
+    if base and suffix.isdigit():
+        return base, int(suffix)
+    return transaction_type, NO_COUNTERPARTY
+
+
+def rows_from_records(records: Iterable[tuple]) -> Iterable[Row]:
+    """
+    Flattens user records (see service.parallel_loader.parse_user_chunk)
+    into transaction rows.
+
+    :param records: User records
+    :return: Iterator over rows
+    """
+    for user_id, _username, _surname, _version, accounts in records:
+        for account_id, _balance, _currency, _opening, _checkpoints, transactions in accounts:
+            for (
+                transaction_id,
+                amount_minor,
+                transaction_type,
+                time_stamp_us,
+                currency,
+                _exchange_rate,
+                correlation_id,
+            ) in transactions:
+                base, counterparty = split_transaction_type(transaction_type)
+                yield (
+                    user_id,
+                    account_id,
+                    transaction_id,
+                    base,
+                    counterparty,
+                    NO_CORRELATION if correlation_id is None else correlation_id,
+                    amount_minor,
+                    currency,
+                    time_stamp_us,
+                )
+
+
+class ColumnarWriter:
+    """
+    Appends rows to one binary file per column (native byte order), batch by
+    batch, so memory is bounded by the batch size. close() writes the schema
+    with the row count and the string dictionaries.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        :param directory: Output directory (created if missing)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.rows = 0
+        self.dictionaries: Dict[str, Dict[str, int]] = {
+            name: {} for name in DICTIONARY_COLUMNS
+        }
+        self._files = {
+            # pylint: disable=consider-using-with
+            name: open(os.path.join(directory, f"{name}.bin"), "wb")
+            for name, _typecode in COLUMNS
+        }
+
+    def write_rows(self, rows: Iterable[Row]) -> None:
+        """
+        Appends one batch of rows.
+
+        :param rows: Rows in COLUMNS order
+        """
+        columns = [array(typecode) for _name, typecode in COLUMNS]
+        types = self.dictionaries["type"]
+        currencies = self.dictionaries["currency"]
+        type_position = _POSITIONS["type"]
+        currency_position = _POSITIONS["currency"]
+        count = 0
+        for row in rows:
+            count += 1
+            for position, value in enumerate(row):
+                if position == type_position:
+                    value = types.setdefault(value, len(types))
+                elif position == currency_position:
+                    value = currencies.setdefault(value, len(currencies))
+                columns[position].append(value)
+        for (name, _typecode), column in zip(COLUMNS, columns):
+            column.tofile(self._files[name])
+        self.rows += count
+
+    def close(self) -> None:
+        """Closes the column files and writes the schema."""
+        for f in self._files.values():
+            f.close()
+        schema = {
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "columns": [
+                {"name": name, "file": f"{name}.bin", "typecode": typecode}
+                for name, typecode in COLUMNS
+            ],
+            "dictionaries": {
+                name: list(values) for name, values in self.dictionaries.items()
+            },
+        }
+        with open(os.path.join(self.directory, SCHEMA_FILE), "w", encoding="utf-8") as f:
+            json.dump(schema, f, indent=4)
+
+    def __enter__(self) -> "ColumnarWriter":
+        """Supports use as a context manager."""
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        """Closes on leaving the context."""
+        self.close()
+
+
+class CsvWriter:
+    """Fallback writer producing a single CSV file with the same columns."""
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: Output CSV file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.rows = 0
+        self._file = open(path, "w", encoding="utf-8", newline="")  # pylint: disable=consider-using-with
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _typecode in COLUMNS])
+
+    def write_rows(self, rows: Iterable[Row]) -> None:
+        """
+        Appends one batch of rows.
+
+        :param rows: Rows in COLUMNS order
+        """
+        batch = list(rows)
+        self._writer.writerows(batch)
+        self.rows += len(batch)
+
+    def close(self) -> None:
+        """Closes the CSV file."""
+        self._file.close()
+
+    def __enter__(self) -> "CsvWriter":
+        """Supports use as a context manager."""
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        """Closes on leaving the context."""
+        self.close()
+
+
+class ColumnarReader:
+    """
+    Memory-maps the column files written by ColumnarWriter. column() returns
+    a zero-copy memoryview of the integers, so scans such as
+    sum(reader.column("amount_minor")) never load the table into Python objects.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        :param directory: Directory written by ColumnarWriter
+        :raises ValueError: If the files were written with another byte order
+        """
+        with open(os.path.join(directory, SCHEMA_FILE), "r", encoding="utf-8") as f:
+            self.schema = json.load(f)
+        if self.schema["byteorder"] != sys.byteorder:
+            raise ValueError("Columns were written with a different byte order")
+        self.directory = directory
+        self.rows: int = self.schema["rows"]
+        self.dictionaries: Dict[str, List[str]] = self.schema["dictionaries"]
+        self._typecodes = {c["name"]: c["typecode"] for c in self.schema["columns"]}
+        self._files = {c["name"]: c["file"] for c in self.schema["columns"]}
+        self._maps: Dict[str, Optional[mmap.mmap]] = {}
+
+    def column(self, name: str) -> memoryview:
+        """
+        Returns a column as a memoryview over the mapped file.
+        Dictionary columns return their codes (see decode()).
+
+        :param name: Column name
+        :return: memoryview of integers, one per row
+        :raises KeyError: If the column does not exist
+        """
+        typecode = self._typecodes[name]
+        if name not in self._maps:
+            path = os.path.join(self.directory, self._files[name])
+            with open(path, "rb") as f:
+                self._maps[name] = (
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    if os.fstat(f.fileno()).st_size
+                    else None
+                )
+        mapped = self._maps[name]
+        if mapped is None:
+            return memoryview(array(typecode))
+        return memoryview(mapped).cast(typecode)
+
+    def decode(self, name: str) -> List[str]:
+        """
+        Returns a dictionary-encoded column as strings.
+
+        :param name: "type" or "currency"
+        :return: List of values, one per row
+        """
+        values = self.dictionaries[name]
+        return [values[code] for code in self.column(name)]
+
+    def counterparties(self) -> List[Optional[Tuple[int, int]]]:
+        """
+        Resolves each transfer leg's counterparty as (user_id, account_id) by
+        pairing the two legs that share a correlation ID. Legs without one
+        (written before transfers carried it) moved money between two
+        accounts of the same user, so their own user ID is used.
+
+        :return: One (user_id, account_id) or None (not a transfer) per row
+        """
+        user_ids = self.column("user_id")
+        account_ids = self.column("account_id")
+        counterparty = self.column("counterparty")
+        correlation_ids = self.column("correlation_id")
+        result: List[Optional[Tuple[int, int]]] = [None] * self.rows
+        unpaired: Dict[int, int] = {}
+        for row in range(self.rows):
+            correlation_id = correlation_ids[row]
+            if correlation_id == NO_CORRELATION:
+                if counterparty[row] != NO_COUNTERPARTY:
+                    result[row] = (user_ids[row], counterparty[row])
+                continue
+            other = unpaired.pop(correlation_id, None)
+            if other is None:
+                unpaired[correlation_id] = row
+                continue
+            result[row] = (user_ids[other], account_ids[other])
+            result[other] = (user_ids[row], account_ids[row])
+        for view in (user_ids, account_ids, counterparty, correlation_ids):
+            view.release()
+        return result
+
+    def close(self) -> None:
+        """Unmaps all column files. Memoryviews returned by column() must be released first."""
+        for mapped in self._maps.values():
+            if mapped is not None:
+                mapped.close()
+        self._maps.clear()
+
+    def __enter__(self) -> "ColumnarReader":
+        """Supports use as a context manager."""
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        """Closes on leaving the context."""
+        self.close()
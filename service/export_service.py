@@ -0,0 +1,70 @@
+"""Exports every stored transaction as a flat table for analytics."""
+
+import os
+from typing import Optional
+
+from service.columnar_store import ColumnarWriter, CsvWriter, rows_from_records
+from service.file_manager import FileManager
+from service.parallel_loader import parse_user_chunk, split_user_chunks
+
+
+class ExportService:
+    """
+    Service class that walks the users file once, chunk by chunk, and writes
+    all transactions as columnar binary files (read them with
+    ColumnarReader) or as CSV. Only one chunk is held in memory at a time.
+    """
+
+    CHUNK_BYTES = 16 * 1024 * 1024
+    FORMATS = ("columnar", "csv")
+
+    @staticmethod
+    def export_transactions(
+        destination: str,
+        output_format: str = "columnar",
+        users_path: Optional[str] = None,
+        chunk_bytes: Optional[int] = None,
+    ) -> int:
+        """
+        Streams all transactions from a users file into a flat table.
+
+        :param destination: Output directory (columnar) or file (csv)
+        :param output_format: "columnar" or "csv"
+        :param users_path: Users file (defaults to FileManager.USERS_FILE)
+        :param chunk_bytes: Approximate size of the users-file chunks parsed at once
+        :return: Number of transactions exported
+        :raises ValueError: If the format is unknown
+        """
+        if output_format not in ExportService.FORMATS:
+            raise ValueError(f"Unknown export format: {output_format}")
+        users_path = users_path or FileManager.USERS_FILE
+        chunk_bytes = chunk_bytes or ExportService.CHUNK_BYTES
+        chunks = []
+        if os.path.exists(users_path):
+            parts = max(1, os.path.getsize(users_path) // chunk_bytes)
+            chunks = split_user_chunks(users_path, parts)
+
+        writer = (
+            ColumnarWriter(destination)
+            if output_format == "columnar"
+            else CsvWriter(destination)
+        )
+        with writer:
+            for start, end in chunks:
+                records = parse_user_chunk((users_path, start, end))
+                writer.write_rows(rows_from_records(records))
+        return writer.rows
+
+    @staticmethod
+    def export(args):
+        """
+        CLI wrapper that exports all transactions.
+
+        :param args: Parsed arguments with out (path) and format
+        """
+        try:
+            count = ExportService.export_transactions(args.out, args.format)
+        except ValueError as e:
+            print(f"Export error: {e}")
+            return
+        print(f"Exported {count} transactions to {args.out}")
@@ -2,7 +2,19 @@
 
 import os
 import json
+from contextlib import contextmanager
+from models.account_index import ACCOUNT_INDEX
+from models.balance_totals import BANK_TOTALS, BalanceTotals
+from models.id_allocator import TRANSACTION_IDS, USER_IDS
+from models.ledger import LEDGER
+from models.transaction import now_epoch_us
 from models.user import User
+from service.parallel_loader import load_users_parallel
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
 
 
 class FileManager:
@@ -13,19 +25,243 @@ class FileManager:
     """
 
     USERS_FILE = "data/users.json"
+    # Write transaction time stamps as epoch microseconds; ISO strings
+    # from older files are still accepted on load.
+    EPOCH_TIMESTAMPS = True
+    # Per-user and bank-wide per-currency totals, readable without the accounts.
+    TOTALS_FILE = "data/totals.json"
+    # (path, size, mtime_ns, largest user ID) of the users file as last
+    # loaded or saved by this process; see _appended_since_load.
+    _file_state = None
 
     @staticmethod
     def save_all_users(users: list[User]) -> None:
         """
         Saves the list of User objects to a JSON file.
         If the directory does not exist, it creates it.
+        The file is written to a temporary file and renamed over the old one
+        while holding the users file lock, so readers never see a partial
+        file and users appended by another process since the load are kept.
 
         :param users: A list of User objects to be saved.
         """
         os.makedirs("data", exist_ok=True)
-        data = [user.to_dict() for user in users]
-        with open(FileManager.USERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        # The journal is the source of truth; the users file caches its balances.
+        LEDGER.flush()
+        data = [user.to_dict(FileManager.EPOCH_TIMESTAMPS) for user in users]
+        temp_path = FileManager.USERS_FILE + ".tmp"
+        with FileManager._users_file_lock():
+            data.extend(FileManager._appended_since_load(users))
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            os.replace(temp_path, FileManager.USERS_FILE)
+            FileManager._remember_file_state(max((u.user_id for u in users), default=0))
+            # Accounts created since load join the index before it is written.
+            ACCOUNT_INDEX.track_users(users)
+            ACCOUNT_INDEX.save(FileManager.users_file_stamp())
+        FileManager.save_totals(users)
+
+    @staticmethod
+    def append_user(user: User) -> None:
+        """
+        Adds one user to the users file without rewriting it: the new record
+        is written over the closing bracket, giving the same bytes
+        save_all_users would write. Concurrent appends are serialized with a
+        lock file, so the cost is independent of the number of users.
+
+        :param user: The new User object
+        :raises ValueError: If the users file does not end with a JSON array
+        """
+        directory = os.path.dirname(FileManager.USERS_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        text = json.dumps(
+            [user.to_dict(FileManager.EPOCH_TIMESTAMPS)], indent=4, ensure_ascii=False
+        )
+        with FileManager._users_file_lock():
+            if not os.path.exists(FileManager.USERS_FILE) or not os.path.getsize(
+                FileManager.USERS_FILE
+            ):
+                with open(FileManager.USERS_FILE, "w", encoding="utf-8") as f:
+                    f.write(text)
+                return
+            before = FileManager.users_file_stamp()
+            with open(FileManager.USERS_FILE, "r+b") as f:
+                size = f.seek(0, os.SEEK_END)
+                base = max(0, size - 4096)
+                f.seek(base)
+                tail = f.read().rstrip()
+                if not tail.endswith(b"]"):
+                    raise ValueError("Users file does not end with a JSON array")
+                last = tail[:-1].rstrip()
+                record = text[1:].encode("utf-8")
+                f.seek(base + len(last))
+                f.write(record if last.endswith(b"[") else b"," + record)
+                f.truncate()
+            if not user.accounts:
+                # The saved account index still holds every account.
+                ACCOUNT_INDEX.restamp(before, FileManager.users_file_stamp())
+
+    @staticmethod
+    def users_file_stamp():
+        """
+        Identifies the current contents of the users file for the saved
+        account index.
+
+        :return: (size, mtime_ns), or None if there is no users file
+        """
+        try:
+            stat = os.stat(FileManager.USERS_FILE)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def save_account_index() -> None:
+        """
+        Writes the account index of the loaded users, unless the users file
+        changed since they were loaded (its next save writes the index then).
+        """
+        if ACCOUNT_INDEX.path is None:
+            return
+        with FileManager._users_file_lock():
+            state = FileManager._file_state
+            stamp = FileManager.users_file_stamp()
+            if state is not None and state[0] == FileManager.USERS_FILE and state[1:3] == stamp:
+                ACCOUNT_INDEX.save(stamp)
+
+    @staticmethod
+    def _remember_file_state(max_user_id: int) -> None:
+        """
+        Records the users file's size and modification time after a load or
+        save. A save keeps the largest user ID seen at load, so users another
+        process appended are still carried over by later saves.
+
+        :param max_user_id: Largest user ID in the loaded or saved list
+        """
+        state = FileManager._file_state
+        if state is not None and state[0] == FileManager.USERS_FILE:
+            max_user_id = state[3]
+        try:
+            stat = os.stat(FileManager.USERS_FILE)
+        except FileNotFoundError:
+            FileManager._file_state = None
+            return
+        FileManager._file_state = (
+            FileManager.USERS_FILE, stat.st_size, stat.st_mtime_ns, max_user_id
+        )
+
+    @staticmethod
+    def _appended_since_load(users: list[User]) -> list[dict]:
+        """
+        Returns the records append_user added to the users file after this
+        process loaded it, so a save does not drop them. User IDs only grow,
+        so these are the stored users above the largest loaded ID that the
+        list being saved does not hold. Called with the users file lock held.
+
+        :param users: Users about to be saved
+        :return: User dictionaries to write after them
+        """
+        state = FileManager._file_state
+        if state is None or state[0] != FileManager.USERS_FILE:
+            return []
+        try:
+            stat = os.stat(FileManager.USERS_FILE)
+        except FileNotFoundError:
+            return []
+        if (stat.st_size, stat.st_mtime_ns) == state[1:3]:
+            return []
+        with open(FileManager.USERS_FILE, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        known = {user.user_id for user in users}
+        return [
+            data for data in stored if data["user_id"] > state[3] and data["user_id"] not in known
+        ]
+
+    @staticmethod
+    @contextmanager
+    def _users_file_lock():
+        """Holds an exclusive lock on the users file's lock file."""
+        with open(FileManager.USERS_FILE + ".lock", "a", encoding="utf-8") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def save_totals(users: list[User]) -> None:
+        """
+        Saves the incrementally maintained per-user totals and their bank-wide
+        sum (in minor units) so dashboards can read them without loading accounts.
+
+        :param users: A list of User objects whose totals are saved.
+        """
+        os.makedirs("data", exist_ok=True)
+        # Loaded users are attached to BANK_TOTALS, which follows their
+        # changes; only users created since load are added here. A list
+        # that is not the loaded one (library use) is summed afresh.
+        for user in users:
+            if user.totals.parent is not BANK_TOTALS:
+                BANK_TOTALS.attach(user.totals)
+        if len(BANK_TOTALS.children) != len(users):
+            BANK_TOTALS.reset(user.totals for user in users)
+        data = {
+            "bank": BANK_TOTALS.to_dict(),
+            "users": {str(user.user_id): user.totals.to_dict() for user in users},
+            "versions": {str(user.user_id): user.version for user in users},
+        }
+        with open(FileManager.TOTALS_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+
+    @staticmethod
+    def load_totals() -> dict:
+        """
+        Loads the saved totals without touching the users file.
+
+        :return: Dictionary {"bank": {currency: minor}, "users": {user_id: {currency: minor}}}
+        """
+        if not os.path.exists(FileManager.TOTALS_FILE):
+            return {"bank": {}, "users": {}}
+        with open(FileManager.TOTALS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def load_user_versions() -> dict[str, int]:
+        """
+        Loads each user's modification version from the totals file, so callers
+        can tell whether cached data is still current without loading users.
+
+        :return: Dictionary of user ID (as string) -> version
+        """
+        return FileManager.load_totals().get("versions", {})
+
+    @staticmethod
+    def verify_totals() -> dict:
+        """
+        Recomputes totals from every stored account and compares them with the
+        saved totals file.
+
+        :return: Dictionary of scope ("bank" or user ID) -> {currency: drift in minor
+                 units}; empty if everything matches
+        """
+        saved = FileManager.load_totals()
+        users = FileManager.load_all_users()
+        drift = {}
+        bank = BalanceTotals()
+        for user in users:
+            recomputed = BalanceTotals.from_accounts(user.accounts)
+            bank.merge(recomputed)
+            stored = BalanceTotals(saved["users"].get(str(user.user_id), {}))
+            user_drift = stored.diff(recomputed)
+            if user_drift:
+                drift[str(user.user_id)] = user_drift
+        bank_drift = BalanceTotals(saved["bank"]).diff(bank)
+        if bank_drift:
+            drift["bank"] = bank_drift
+        return drift
 
     @staticmethod
     def load_all_users() -> list[User]:
@@ -37,6 +273,95 @@ class FileManager:
         """
         if not os.path.exists(FileManager.USERS_FILE):
             return []
-        with open(FileManager.USERS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return [User.from_dict(user_data) for user_data in data]
+        with FileManager._users_file_lock():
+            with open(FileManager.USERS_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            users = [User.from_dict(user_data) for user_data in data]
+            FileManager._remember_file_state(max((u.user_id for u in users), default=0))
+        FileManager._finish_load(users)
+        return users
+
+    @staticmethod
+    def load_all_users_parallel(workers: int = None) -> list[User]:
+        """
+        Loads all users like load_all_users, but splits the file at user
+        boundaries and parses the pieces in a pool of worker processes.
+        Meant for very large (legacy) users files.
+
+        :param workers: Number of worker processes (defaults to the CPU count)
+        :return: A list of User objects.
+        """
+        if not os.path.exists(FileManager.USERS_FILE):
+            return []
+        with FileManager._users_file_lock():
+            users = load_users_parallel(FileManager.USERS_FILE, workers)
+            FileManager._remember_file_state(max((u.user_id for u in users), default=0))
+        FileManager._finish_load(users)
+        return users
+
+    @staticmethod
+    def _finish_load(users: list[User]) -> None:
+        """
+        Steps shared by all loaders once the users are built.
+
+        :param users: Loaded users
+        """
+        # Never hand out an ID that already exists in the stored data.
+        USER_IDS.ensure_above(max((user.user_id for user in users), default=0))
+        TRANSACTION_IDS.ensure_above(
+            max(
+                (
+                    t.transaction_id
+                    for user in users
+                    for account in user.accounts
+                    for t in account.transactions
+                ),
+                default=0,
+            )
+        )
+        # Attached before the ledger corrections so they are saved as changes;
+        # the saved index is only rebuilt if it was not written for this file.
+        state = FileManager._file_state
+        ACCOUNT_INDEX.attach(
+            users, state[1:3] if state is not None and state[0] == FileManager.USERS_FILE else None
+        )
+        FileManager.materialize_from_ledger(users)
+        BANK_TOTALS.reset(user.totals for user in users)
+
+    @staticmethod
+    def materialize_from_ledger(users: list[User]) -> None:
+        """
+        Brings loaded account balances in line with the ledger, which is the
+        source of truth. Accounts the ledger has not seen yet (files written
+        before the ledger existed) are opened with their stored balance.
+        A load of data that matches the ledger changes nothing: no IDs are
+        allocated and no versions bumped. Does nothing while the ledger is
+        in-memory only.
+
+        :param users: Users whose accounts are checked
+        """
+        if LEDGER.path is None:
+            return
+        LEDGER.load()
+        unseen = []
+        for user in users:
+            for account in user.accounts:
+                if account.ledger_key not in LEDGER.balances:
+                    unseen.append(account)
+                    continue
+                delta_minor = LEDGER.balance(account.ledger_key) - account.balance_minor
+                if delta_minor:
+                    # A real correction: the users file lags the journal.
+                    # pylint: disable=protected-access
+                    account._apply_change(delta_minor)
+        if unseen:
+            entry_ids = iter(TRANSACTION_IDS.next_ids(len(unseen)))
+            time_stamp_us = now_epoch_us()
+            for account in unseen:
+                LEDGER.open_account(
+                    account.ledger_key,
+                    account.currency,
+                    account.balance_minor,
+                    next(entry_ids),
+                    time_stamp_us,
+                )
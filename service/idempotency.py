@@ -0,0 +1,247 @@
+"""Idempotency-key store: bounded in-memory LRU/TTL cache over an SQLite table."""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class IdempotencyError(ValueError):
+    """Raised when an idempotency key is reused for a different request."""
+
+
+class IdempotencyStore:
+    """
+    Remembers the result of each mutation by its idempotency key so a retried
+    request returns the original result instead of being applied again.
+
+    Recent keys live in an OrderedDict capped at max_entries (O(1) lookup,
+    least recently used evicted first). With a path, every key is also
+    kept in an SQLite table (key is the primary key), which answers lookups
+    for keys that were evicted from memory or recorded by another process.
+
+    reserve() claims a key before the mutation runs: the insert of a pending
+    row (no result yet) and the check for an existing one happen in one
+    transaction, so of two processes retrying the same request only one
+    applies it. A reservation left behind by a crash blocks the key for
+    `lease` seconds. Entries expire after ttl seconds in both layers;
+    expired rows are removed whenever the table is opened.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 100_000,
+        ttl: float = 86_400,
+        lease: float = 300,
+    ) -> None:
+        """
+        :param path: SQLite file for the persisted table (None for memory only)
+        :param max_entries: Maximum keys kept in memory
+        :param ttl: Seconds a key is remembered
+        :param lease: Seconds a reservation without a result blocks its key
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lease = lease
+        self._memory: "OrderedDict[str, Tuple[float, str, Optional[str]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def configure(self, path: Optional[str]) -> None:
+        """
+        Sets the persisted table location.
+
+        :param path: SQLite file path (None for memory only)
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self.path = path
+
+    def get(self, key: str, fingerprint: str) -> Optional[str]:
+        """
+        Looks up a stored result.
+
+        :param key: Idempotency key supplied by the client
+        :param fingerprint: Description of the request (operation and parameters)
+        :return: The original result, or None if the key is new, reserved or expired
+        :raises IdempotencyError: If the key was used for a different request
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            elif self.path is not None:
+                entry = self._read_disk(key)
+                if entry is not None and entry[2] is not None:
+                    self._remember(key, entry)
+            if entry is None:
+                return None
+            expires_at, stored_fingerprint, result = entry
+            if expires_at <= now:
+                self._memory.pop(key, None)
+                return None
+            if stored_fingerprint != fingerprint:
+                raise IdempotencyError(
+                    "Idempotency key was already used for a different request"
+                )
+            return result
+
+    def reserve(
+        self, key: str, fingerprint: str, lease: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Claims a key for a request about to be applied. The caller must
+        follow up with put() once the request is applied, or release() if
+        nothing was changed.
+
+        :param key: Idempotency key supplied by the client
+        :param fingerprint: Description of the request
+        :param lease: Seconds the reservation blocks the key (defaults to self.lease)
+        :return: None if the key was claimed, or the original result if the
+                 request was already applied
+        :raises IdempotencyError: If the key was used for a different request
+                                  or the request is still being applied
+        """
+        now = time.time()
+        pending = (now + (self.lease if lease is None else lease), fingerprint, None)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                return _result(entry, fingerprint)
+            if self.path is None:
+                self._remember(key, pending)
+                return None
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "DELETE FROM idempotency WHERE key = ? AND expires_at <= ?", (key, now)
+                )
+                claimed = db.execute(
+                    "INSERT OR IGNORE INTO idempotency (key, expires_at, fingerprint, result) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, *pending),
+                ).rowcount
+                row = None if claimed else db.execute(
+                    "SELECT expires_at, fingerprint, result FROM idempotency WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            if claimed:
+                return None
+            entry = tuple(row)
+            if entry[2] is not None:
+                self._remember(key, entry)
+            return _result(entry, fingerprint)
+
+    def put(self, key: str, fingerprint: str, result: str) -> None:
+        """
+        Records the result of a request.
+
+        :param key: Idempotency key supplied by the client
+        :param fingerprint: Description of the request
+        :param result: Result returned to the client
+        """
+        entry = (time.time() + self.ttl, fingerprint, result)
+        with self._lock:
+            self._remember(key, entry)
+            if self.path is not None:
+                self._connect().execute(
+                    "INSERT OR REPLACE INTO idempotency (key, expires_at, fingerprint, result) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, *entry),
+                )
+
+    def release(self, key: str) -> None:
+        """
+        Drops a reservation whose request changed nothing, so a retry runs it.
+
+        :param key: Idempotency key passed to reserve()
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[2] is None:
+                del self._memory[key]
+            if self.path is not None:
+                self._connect().execute(
+                    "DELETE FROM idempotency WHERE key = ? AND result IS NULL", (key,)
+                )
+
+    def purge_expired(self) -> int:
+        """
+        Removes expired keys from memory and from the persisted table.
+
+        :return: Number of persisted keys removed
+        """
+        now = time.time()
+        with self._lock:
+            for key in [k for k, e in self._memory.items() if e[0] <= now]:
+                del self._memory[key]
+            if self.path is None:
+                return 0
+            return self._connect().execute(
+                "DELETE FROM idempotency WHERE expires_at <= ?", (now,)
+            ).rowcount
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens the persisted table on first use and drops its expired keys."""
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit: single statements are atomic, reserve() opens its own transaction.
+            db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+                "result TEXT, expires_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idempotency_expiry ON idempotency (expires_at)"
+            )
+            db.execute("DELETE FROM idempotency WHERE expires_at <= ?", (time.time(),))
+            self._db = db
+        return self._db
+
+    def _remember(self, key: str, entry: Tuple[float, str, Optional[str]]) -> None:
+        """Stores an entry in memory, evicting the least recently used one."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str, Optional[str]]]:
+        """Reads an entry from the persisted table."""
+        row = self._connect().execute(
+            "SELECT expires_at, fingerprint, result FROM idempotency WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else tuple(row)
+
+
+def _result(entry: Tuple[float, str, Optional[str]], fingerprint: str) -> str:
+    """
+    Checks an unexpired entry found by reserve().
+
+    :param entry: (expires_at, fingerprint, result)
+    :param fingerprint: Description of the new request
+    :return: The stored result
+    :raises IdempotencyError: If the key belongs to another request or has no result yet
+    """
+    if entry[1] != fingerprint:
+        raise IdempotencyError("Idempotency key was already used for a different request")
+    if entry[2] is None:
+        raise IdempotencyError("A request with this idempotency key is still being applied")
+    return entry[2]
@@ -0,0 +1,223 @@
+"""End-of-day interest accrual and monthly fee batches over all accounts."""
+
+import json
+import os
+from array import array
+from datetime import datetime, timezone
+from fractions import Fraction
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models.account import BankAccount
+from models.id_allocator import TRANSACTION_IDS
+from models.ledger import FEES, INTEREST, JournalEntry, Ledger, Posting, system_account
+from models.money import convert_minor_many, from_minor, to_minor
+from models.transaction import Transaction, now_epoch_us
+from models.user import User
+from service.account_service import AccountService
+from service.file_manager import FileManager
+from service.idempotency import IdempotencyError
+
+# Batch kind -> (sign of the customer posting, system account kind)
+BATCH_KINDS = {"interest": (1, INTEREST), "fee": (-1, FEES)}
+
+
+class InterestService:
+    """
+    Service class for interest and fee batches. Balances are gathered into
+    one array('q') column per currency, amounts for the whole column are
+    computed in a single pass with that currency's rate, and the result is
+    applied in bulk: one balanced journal entry per currency, one
+    contiguous block of transaction IDs, and one save of the users file.
+    """
+
+    RATES_FILE = "data/accrual_rates.json"
+    # Annual interest rate and monthly fee (major units) per currency,
+    # used when RATES_FILE does not exist.
+    DEFAULT_RATES = {
+        "USD": {"annual_interest": "0.02", "monthly_fee": "1.00"},
+        "EUR": {"annual_interest": "0.015", "monthly_fee": "1.00"},
+        "UAN": {"annual_interest": "0.1", "monthly_fee": "40.00"},
+    }
+    DAYS_PER_YEAR = 365
+
+    @staticmethod
+    def load_rates() -> Dict[str, Tuple[Fraction, int]]:
+        """
+        Reads the per-currency rate table.
+
+        :return: Dictionary of currency -> (annual interest rate, monthly fee in minor units)
+        """
+        raw = InterestService.DEFAULT_RATES
+        if os.path.exists(InterestService.RATES_FILE):
+            with open(InterestService.RATES_FILE, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        return {
+            currency: (
+                Fraction(entry["annual_interest"]),
+                to_minor(float(entry["monthly_fee"])),
+            )
+            for currency, entry in raw.items()
+        }
+
+    @staticmethod
+    def group_accounts(users: Iterable[User]) -> Dict[str, Tuple[List[BankAccount], array]]:
+        """
+        Gathers all accounts into per-currency columns.
+
+        :param users: Users whose accounts are included
+        :return: Dictionary of currency -> (accounts, array('q') of their balances)
+        """
+        groups: Dict[str, Tuple[List[BankAccount], array]] = {}
+        for user in users:
+            for account in user.accounts:
+                group = groups.get(account.currency)
+                if group is None:
+                    group = groups[account.currency] = ([], array("q"))
+                group[0].append(account)
+                group[1].append(account.balance_minor)
+        return groups
+
+    @staticmethod
+    def interest_amounts(balances: array, annual_rate: Fraction, days: int = 1) -> array:
+        """
+        Computes simple interest for a column of balances.
+
+        :param balances: Balances in minor units
+        :param annual_rate: Annual interest rate
+        :param days: Days of interest to accrue
+        :return: array('q') of interest amounts (0 for non-positive balances)
+        """
+        daily = annual_rate * days / InterestService.DAYS_PER_YEAR
+        return array("q", [a if a > 0 else 0 for a in convert_minor_many(balances, daily)])
+
+    @staticmethod
+    def fee_amounts(balances: array, fee_minor: int) -> array:
+        """
+        Computes the fee for a column of balances; a fee never takes a
+        balance below zero.
+
+        :param balances: Balances in minor units
+        :param fee_minor: Fee in minor units
+        :return: array('q') of fee amounts
+        """
+        return array(
+            "q", [fee_minor if b >= fee_minor else (b if b > 0 else 0) for b in balances]
+        )
+
+    @staticmethod
+    def apply_amounts(  # pylint: disable=too-many-arguments
+        accounts: List[BankAccount],
+        amounts: array,
+        kind: str,
+        currency: str,
+        time_stamp_us: int,
+        ledger: Optional[Ledger] = None,
+    ) -> Tuple[int, int]:
+        """
+        Applies one computed column: posts a single journal entry against the
+        interest or fees system account, then updates balances and appends a
+        transaction to each affected account.
+
+        :param accounts: Accounts in column order
+        :param amounts: Amount per account in minor units (0 to skip)
+        :param kind: "interest" or "fee"
+        :param currency: Currency of the column
+        :param time_stamp_us: Time stamp of the batch
+        :param ledger: Ledger to post to (defaults to the accounts' ledger)
+        :return: (number of accounts changed, total amount in minor units)
+        """
+        sign, system_kind = BATCH_KINDS[kind]
+        selected = [(a, amount) for a, amount in zip(accounts, amounts) if amount]
+        if not selected:
+            return 0, 0
+        total = sum(amount for _account, amount in selected)
+        ids = TRANSACTION_IDS.next_ids(len(selected) + 1)
+        postings = [Posting(a.ledger_key, currency, sign * amount) for a, amount in selected]
+        postings.append(Posting(system_account(system_kind, currency), currency, -sign * total))
+        if ledger is None:
+            ledger = selected[0][0].ledger
+        ledger.post(JournalEntry(ids[0], time_stamp_us, kind, tuple(postings)))
+        for (account, amount), transaction_id in zip(selected, ids[1:]):
+            # pylint: disable=protected-access
+            account._apply_change(sign * amount)
+            account._record(
+                Transaction.from_epoch(transaction_id, amount, kind, time_stamp_us, currency)
+            )
+        return len(selected), total
+
+    @staticmethod
+    def run_batch(
+        users: Iterable[User],
+        kind: str,
+        days: int = 1,
+        rates: Optional[Dict[str, Tuple[Fraction, int]]] = None,
+        ledger: Optional[Ledger] = None,
+    ) -> Dict[str, Tuple[int, int]]:
+        """
+        Runs an interest or fee batch over all accounts of the given users.
+        Currencies without a rate are left untouched.
+
+        :param users: Users whose accounts are processed
+        :param kind: "interest" or "fee"
+        :param days: Days of interest to accrue (interest only)
+        :param rates: Rate table (defaults to load_rates())
+        :param ledger: Ledger to post to (defaults to the accounts' ledger)
+        :return: Dictionary of currency -> (accounts changed, total in minor units)
+        :raises ValueError: If kind is unknown
+        """
+        if kind not in BATCH_KINDS:
+            raise ValueError(f"Unknown batch kind: {kind}")
+        rates = rates if rates is not None else InterestService.load_rates()
+        time_stamp_us = now_epoch_us()
+        summary = {}
+        for currency, (accounts, balances) in InterestService.group_accounts(users).items():
+            if currency not in rates:
+                continue
+            annual_rate, fee_minor = rates[currency]
+            amounts = (
+                InterestService.interest_amounts(balances, annual_rate, days)
+                if kind == "interest"
+                else InterestService.fee_amounts(balances, fee_minor)
+            )
+            summary[currency] = InterestService.apply_amounts(
+                accounts, amounts, kind, currency, time_stamp_us, ledger
+            )
+        return summary
+
+    @staticmethod
+    def accrue(args):
+        """
+        CLI wrapper that runs a batch over the whole bank and saves once.
+        Each kind of batch runs at most once per UTC day: the run holds the
+        idempotency key "accrue:<kind>:<date>", so a repeated run (a retry
+        after a crash, or a second cron trigger) prints the first run's
+        summary instead of paying or charging again.
+
+        :param args: Parsed arguments with kind and days
+        """
+        key = f"accrue:{args.kind}:{datetime.now(timezone.utc).date().isoformat()}"
+        fingerprint = f"{key}:{args.days}"
+        store = AccountService.IDEMPOTENCY
+        try:
+            previous = store.reserve(key, fingerprint)
+        except IdempotencyError as e:
+            print(f"Idempotency error: {e}")
+            return
+        if previous is not None:
+            print(f"{args.kind} batch already ran today")
+            print(previous)
+            return
+        try:
+            users = FileManager.load_all_users()
+            summary = InterestService.run_batch(users, args.kind, args.days)
+            FileManager.save_all_users(users)
+        except BaseException:
+            store.release(key)
+            raise
+        lines = [
+            f"{args.kind} {currency}: {count} accounts, {from_minor(total)}"
+            for currency, (count, total) in sorted(summary.items())
+        ]
+        store.put(key, fingerprint, "\n".join(lines))
+        for line in lines:
+            print(line)
@@ -0,0 +1,267 @@
+"""Multilateral netting for batches of transfers: funds are checked against
+each account's net position and every account's balance is written once,
+while each original transfer is still recorded in history."""
+
+import csv
+from fractions import Fraction
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from models.account import BankAccount
+from models.id_allocator import TRANSACTION_IDS
+from models.ledger import FX, JournalEntry, Ledger, Posting, system_account
+from models.money import convert_minor, to_minor
+from models.transaction import Transaction, now_epoch_us
+from service.file_manager import FileManager
+
+# One requested transfer: source account, target account, amount in the
+# source account's currency.
+TransferRequest = Tuple[BankAccount, BankAccount, float]
+
+
+class NettingResult(NamedTuple):
+    """Outcome of a netted batch."""
+
+    applied: List[int]  # positions of the applied transfers in the batch
+    rejected: Dict[int, str]  # position -> reason
+    balance_writes: int  # balance updates made
+    gross_balance_writes: int  # balance updates applying one by one would make
+
+
+class _Leg(NamedTuple):
+    """A validated transfer."""
+
+    position: int
+    source: BankAccount
+    target: BankAccount
+    amount_minor: int
+    converted_minor: int
+    exchange_rate: Fraction
+
+
+class NettingService:
+    """
+    Service class for netted transfer batches.
+
+    A batch is checked as a whole: each account's net position (incoming
+    minus outgoing, in its own currency) must not take its balance below
+    zero. When an account falls short, its transfers are dropped from the
+    latest backwards until its position is covered, and the check repeats
+    (dropping a transfer also lowers its target's inflow). The surviving
+    transfers are posted as one journal entry with a single posting per
+    account and FX account, each account's balance is updated once, and
+    both legs of every transfer are recorded in history with their own
+    correlation ID.
+    """
+
+    @staticmethod
+    def _validate(
+        transfers: Sequence[TransferRequest], rejected: Dict[int, str]
+    ) -> List[_Leg]:
+        """
+        Applies the per-transfer checks of BankAccount.transfer.
+
+        :param transfers: Requested transfers
+        :param rejected: Receives position -> reason for invalid transfers
+        :return: Valid transfers in batch order
+        """
+        legs = []
+        # Rates are fixed for the batch, so each currency pair is looked up once.
+        rates: Dict[Tuple[str, str], Optional[Fraction]] = {}
+        for position, (source, target, amount) in enumerate(transfers):
+            # Checked in minor units: 0.004 rounds to a zero-value leg.
+            amount_minor = to_minor(amount)
+            if amount_minor <= 0:
+                rejected[position] = "The transfer amount must be greater than 0.."
+                continue
+            if target is not source and target.ledger_key == source.ledger_key:
+                rejected[position] = "Both accounts have the same ledger key."
+                continue
+            pair = (source.currency, target.currency)
+            if pair not in rates:
+                rates[pair] = source.get_exchange_rate_fraction(*pair)
+            exchange_rate = rates[pair]
+            if exchange_rate is None:
+                rejected[position] = "Unable to transfer: no exchange rate available."
+                continue
+            converted_minor = (
+                amount_minor if exchange_rate == 1 else convert_minor(amount_minor, exchange_rate)
+            )
+            if converted_minor <= 0:
+                rejected[position] = "The transfer amount is too small to convert."
+                continue
+            legs.append(
+                _Leg(position, source, target, amount_minor, converted_minor, exchange_rate)
+            )
+        return legs
+
+    @staticmethod
+    def _net_positions(legs: List[_Leg]) -> Dict[BankAccount, int]:
+        """
+        Sums the batch per account.
+
+        :param legs: Transfers to net
+        :return: account -> net change in minor units
+        """
+        positions: Dict[BankAccount, int] = {}
+        get = positions.get
+        for _position, source, target, amount_minor, converted_minor, _rate in legs:
+            positions[source] = get(source, 0) - amount_minor
+            positions[target] = get(target, 0) + converted_minor
+        return positions
+
+    @staticmethod
+    def _drop_uncovered(legs: List[_Leg], rejected: Dict[int, str]) -> List[_Leg]:
+        """
+        Drops transfers until every account's net position is covered by
+        its balance.
+
+        :param legs: Valid transfers in batch order
+        :param rejected: Receives position -> reason for dropped transfers
+        :return: Transfers that can be applied together
+        """
+        while True:
+            positions = NettingService._net_positions(legs)
+            short = {
+                account: account.balance_minor + net
+                for account, net in positions.items()
+                if net < 0 and account.balance_minor + net < 0
+            }
+            if not short:
+                return legs
+            kept = []
+            for leg in reversed(legs):
+                source = leg.source
+                if short.get(source, 0) < 0:
+                    short[source] += leg.amount_minor
+                    if leg.target is source:
+                        short[source] -= leg.converted_minor
+                    rejected[leg.position] = "Insufficient funds for transfer."
+                else:
+                    kept.append(leg)
+            kept.reverse()
+            legs = kept
+
+    @staticmethod
+    def settle(
+        transfers: Sequence[TransferRequest], ledger: Optional[Ledger] = None
+    ) -> NettingResult:
+        """
+        Applies a batch of transfers with netting.
+
+        :param transfers: Requested transfers
+        :param ledger: Ledger to post to (defaults to the first account's ledger)
+        :return: NettingResult
+        """
+        rejected: Dict[int, str] = {}
+        legs = NettingService._validate(transfers, rejected)
+        legs = NettingService._drop_uncovered(legs, rejected)
+        if not legs:
+            return NettingResult([], rejected, 0, 0)
+
+        positions = NettingService._net_positions(legs)
+        postings: Dict[Tuple[str, str], int] = {}
+        for account, net in positions.items():
+            key = (account.ledger_key, account.currency)
+            postings[key] = postings.get(key, 0) + net
+        for leg in legs:
+            if leg.source.currency != leg.target.currency:
+                for key, amount_minor in (
+                    ((system_account(FX, leg.source.currency), leg.source.currency), leg.amount_minor),
+                    ((system_account(FX, leg.target.currency), leg.target.currency), -leg.converted_minor),
+                ):
+                    postings[key] = postings.get(key, 0) + amount_minor
+
+        ids = iter(TRANSACTION_IDS.next_ids(1 + 3 * len(legs)))
+        time_stamp_us = now_epoch_us()
+        if ledger is None:
+            ledger = legs[0].source.ledger
+        ledger.post(
+            JournalEntry(
+                next(ids),
+                time_stamp_us,
+                "netting",
+                tuple(Posting(a, c, amount) for (a, c), amount in postings.items() if amount),
+            )
+        )
+
+        balance_writes = 0
+        for account, net in positions.items():
+            if net:
+                account._apply_change(net)  # pylint: disable=protected-access
+                balance_writes += 1
+
+        for leg in legs:
+            correlation_id = next(ids)
+            # pylint: disable=protected-access
+            leg.source._record(
+                Transaction.from_epoch(
+                    transaction_id=next(ids),
+                    amount_minor=leg.amount_minor,
+                    currency=leg.source.currency,
+                    transaction_type=f"transfer_to_{leg.target.get_account_id()}",
+                    time_stamp_us=time_stamp_us,
+                    exchange_rate=leg.exchange_rate,
+                    correlation_id=correlation_id,
+                )
+            )
+            leg.target._record(
+                Transaction.from_epoch(
+                    transaction_id=next(ids),
+                    amount_minor=leg.converted_minor,
+                    currency=leg.target.currency,
+                    transaction_type=f"transfer_from_{leg.source.get_account_id()}",
+                    time_stamp_us=time_stamp_us,
+                    exchange_rate=leg.exchange_rate,
+                    correlation_id=correlation_id,
+                )
+            )
+        return NettingResult(
+            [leg.position for leg in legs], rejected, balance_writes, 2 * len(legs)
+        )
+
+    @staticmethod
+    def settle_batch(args):
+        """
+        CLI wrapper that applies a CSV batch of transfers (columns
+        user_id, from_id, to_user_id, to_id, amount) with netting and saves once.
+
+        :param args: Parsed arguments with file
+        """
+        with open(args.file, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        users = FileManager.load_all_users()
+        accounts = {
+            (user.user_id, account.account_id): account
+            for user in users
+            for account in user.accounts
+        }
+        transfers: List[TransferRequest] = []
+        lines: List[int] = []
+        missing: Dict[int, str] = {}
+        for line, row in enumerate(rows, start=2):
+            try:
+                source = accounts.get((int(row["user_id"]), int(row["from_id"])))
+                target = accounts.get((int(row["to_user_id"]), int(row["to_id"])))
+                amount = float(row["amount"])
+            except (KeyError, TypeError, ValueError):
+                missing[line] = "Invalid row"
+                continue
+            if source is None or target is None:
+                missing[line] = "One of the accounts was not found."
+                continue
+            transfers.append((source, target, amount))
+            lines.append(line)
+
+        result = NettingService.settle(transfers)
+        if result.applied:
+            FileManager.save_all_users(users)
+        failures = dict(missing)
+        failures.update({lines[position]: reason for position, reason in result.rejected.items()})
+        for line, reason in sorted(failures.items()):
+            print(f"Line {line}: {reason}")
+        saved = result.gross_balance_writes - result.balance_writes
+        print(
+            f"{len(result.applied)} transfers applied, {len(failures)} rejected; "
+            f"{result.balance_writes} balance writes instead of {result.gross_balance_writes}"
+            f" ({saved} saved)"
+        )
@@ -0,0 +1,144 @@
+"""Parallel loading of large users.json files: the file is split at top-level
+user boundaries and the chunks are parsed in a process pool."""
+
+import json
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from models.account import BankAccount
+from models.transaction import Transaction
+from models.user import User
+
+# Boundary between two top-level users in the indent=4 layout FileManager
+# writes. JSON strings cannot contain a raw newline, and deeper objects are
+# indented further, so this only matches between users.
+USER_SEPARATOR = b"\n    },\n    {"
+# Offset from the start of the separator to just after "},".
+_SPLIT_OFFSET = len(b"\n    },")
+
+# Compact per-user record passed back from workers: plain tuples pickle much
+# faster than User objects and carry no observers or ledger references.
+UserRecord = Tuple[int, str, str, int, list]
+
+
+def split_user_chunks(path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Splits a users file into byte ranges that each hold whole users.
+    Files not in the indent=4 layout come back as a single range.
+
+    :param path: Path to the users JSON file
+    :param parts: Desired number of ranges
+    :return: List of (start, end) byte offsets covering the file
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return [(0, 0)]
+    bounds = [0]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for k in range(1, parts):
+            position = data.find(USER_SEPARATOR, max(bounds[-1], size * k // parts))
+            if position < 0:
+                break
+            if position + _SPLIT_OFFSET > bounds[-1]:
+                bounds.append(position + _SPLIT_OFFSET)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def parse_user_chunk(chunk: Tuple[str, int, int]) -> List[UserRecord]:
+    """
+    Parses one byte range of a users file into compact records.
+    Runs in a worker process; transactions are validated here with
+    Transaction.from_dict so the parent only assembles objects.
+
+    :param chunk: (path, start, end) as produced by split_user_chunks
+    :return: List of user records in file order
+    """
+    path, start, end = chunk
+    with open(path, "rb") as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    body = raw.strip(b"[], \n\r\t")
+    if not body:
+        return []
+    records = []
+    for data in json.loads(b"[" + body + b"]"):
+        accounts = []
+        for acc_data in data.get("accounts", []):
+            transactions = []
+            for tr_data in acc_data.get("transactions", []):
+                t = Transaction.from_dict(tr_data)
+                transactions.append(
+                    (
+                        t.transaction_id,
+                        t.amount_minor,
+                        t.transaction_type,
+                        t.time_stamp_us,
+                        t.currency,
+                        t.exchange_rate,
+                        t.correlation_id,
+                    )
+                )
+            accounts.append(
+                (
+                    acc_data["account_id"],
+                    acc_data["balance"],
+                    acc_data["currency"],
+                    acc_data.get("opening"),
+                    acc_data.get("checkpoints"),
+                    transactions,
+                )
+            )
+        records.append(
+            (
+                data["user_id"],
+                data["username"],
+                data["surname"],
+                data.get("version", 0),
+                accounts,
+            )
+        )
+    return records
+
+
+def user_from_record(record: UserRecord) -> User:
+    """
+    Builds a User from a worker record, the same way User.from_dict does.
+
+    :param record: Record produced by parse_user_chunk
+    :return: Initialized User object
+    """
+    user_id, username, surname, version, accounts = record
+    user = User(username=username, surname=surname, user_id=user_id)
+    for account_id, balance, currency, opening, checkpoints, transactions in accounts:
+        account = BankAccount(account_id=account_id, balance=balance, currency=currency)
+        account.transactions = [Transaction.from_epoch(*t) for t in transactions]
+        account.restore_opening(opening)
+        account.restore_checkpoints(checkpoints)
+        user.add_account(account)
+    user.version = version
+    return user
+
+
+def load_users_parallel(path: str, workers: Optional[int] = None) -> List[User]:
+    """
+    Loads all users from a users file, parsing chunks in a process pool.
+    Several chunks per worker keep the pool busy when users differ in size.
+
+    :param path: Path to the users JSON file
+    :param workers: Number of worker processes (defaults to the CPU count);
+                    1 parses in the calling process
+    :return: List of User objects in file order
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [(path, start, end) for start, end in split_user_chunks(path, workers * 4)]
+    if workers == 1 or len(chunks) == 1:
+        parsed = map(parse_user_chunk, chunks)
+        return [user_from_record(r) for records in parsed for r in records]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [
+            user_from_record(r)
+            for records in pool.map(parse_user_chunk, chunks)
+            for r in records
+        ]
@@ -0,0 +1,583 @@
+"""Standing orders: recurring transfers kept in a min-heap of due times and
+executed in batches through AccountService."""
+
+import calendar
+import heapq
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from models.transaction import from_epoch_us, now_epoch_us, to_epoch_us
+from models.user import User
+from service.account_service import AccountService
+from service.file_manager import FileManager
+from service.idempotency import IdempotencyError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+DAY_US = 86_400_000_000
+# Period name -> fixed length in microseconds (None: calendar months).
+PERIODS = {"daily": DAY_US, "weekly": 7 * DAY_US, "monthly": None}
+
+
+class StandingOrder(NamedTuple):
+    """One recurring transfer. runs counts the occurrences already handled."""
+
+    order_id: int
+    user_id: int
+    from_id: int
+    to_user_id: int
+    to_id: int
+    amount: float
+    period: str
+    start_us: int
+    runs: int = 0
+
+    def due_at(self, run: int) -> int:
+        """
+        Returns the due time of an occurrence. Monthly orders keep the day of
+        month of the first occurrence, clamped to shorter months.
+
+        :param run: Occurrence number (0 is the first)
+        :return: Due time in epoch microseconds
+        """
+        length = PERIODS[self.period]
+        if length is not None:
+            return self.start_us + run * length
+        start = from_epoch_us(self.start_us)
+        year, month = divmod(start.month - 1 + run, 12)
+        year += start.year
+        day = min(start.day, calendar.monthrange(year, month + 1)[1])
+        return to_epoch_us(start.replace(year=year, month=month + 1, day=day))
+
+    @property
+    def next_due_us(self) -> int:
+        """Due time of the next unhandled occurrence."""
+        return self.due_at(self.runs)
+
+    def runs_until(self, now_us: int) -> int:
+        """
+        Counts the occurrences due at or before a time.
+
+        :param now_us: Time in epoch microseconds
+        :return: Number of occurrences with due time <= now_us
+        """
+        if now_us < self.start_us:
+            return 0
+        length = PERIODS[self.period]
+        if length is not None:
+            return (now_us - self.start_us) // length + 1
+        start, now = from_epoch_us(self.start_us), from_epoch_us(now_us)
+        run = (now.year - start.year) * 12 + now.month - start.month
+        return run + 1 if self.due_at(run) <= now_us else run
+
+    def to_line(self) -> str:
+        """
+        Encodes the order as one tab-separated log line (fields in
+        declaration order), which reloads several times faster than JSON.
+
+        :return: Line including the trailing newline
+        """
+        return "\t".join(map(str, self)) + "\n"
+
+    @staticmethod
+    def from_line(fields: List[str]) -> "StandingOrder":
+        """
+        Decodes the fields of a log line produced by to_line.
+
+        :param fields: Line split on tabs
+        :return: StandingOrder
+        """
+        order_id, user_id, from_id, to_user_id, to_id, amount, period, start_us, runs = fields
+        return StandingOrder(
+            int(order_id),
+            int(user_id),
+            int(from_id),
+            int(to_user_id),
+            int(to_id),
+            float(amount),
+            period,
+            int(start_us),
+            int(runs),
+        )
+
+
+class Execution(NamedTuple):
+    """Outcome of one executed occurrence."""
+
+    order_id: int
+    run: int
+    due_us: int
+    succeeded: bool
+    result: str
+
+
+class PaymentScheduler:
+    """
+    Holds standing orders and a min-heap of (next due time, order ID).
+    Adding an order and taking the earliest due one are O(log n); cancelled
+    or rescheduled orders leave stale heap entries that are skipped when
+    popped, so cancelling is O(1).
+
+    With a path, orders are kept in an append-only log (see
+    StandingOrder.to_line) where the last line for an order wins and a line
+    holding only an order ID cancels it. Adding or cancelling appends one
+    line, flush() appends the orders a run advanced, and the log is
+    rewritten once it has grown to twice the number of live orders.
+
+    Every change to the log is made under a lock file, after first reading
+    the lines other processes appended since this one last read it (or the
+    whole log, if another process rewrote it). So new order IDs never
+    collide, flush() does not bring back an order cancelled in the meantime,
+    and a rewrite keeps orders added by other processes.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        :param path: Log file (None for in-memory)
+        """
+        self.path = path
+        self.orders: Dict[int, StandingOrder] = {}
+        self._heap: List[Tuple[int, int]] = []
+        self._next_id = 1
+        self._dirty: Dict[int, StandingOrder] = {}
+        self._lines = 0
+        # (inode, bytes read) of the log as last read
+        self._position: Tuple[int, int] = (0, 0)
+
+    def configure(self, path: Optional[str]) -> None:
+        """
+        Switches the log file and drops the in-memory orders.
+
+        :param path: Log file (None for in-memory)
+        """
+        self.path = path
+        self.orders = {}
+        self._heap = []
+        self._next_id = 1
+        self._dirty = {}
+        self._lines = 0
+        self._position = (0, 0)
+
+    def load(self) -> None:
+        """
+        Reads the log and rebuilds the heap in O(n). A torn last line left by
+        a crash is cut off. An in-memory scheduler keeps its orders.
+        """
+        if self.path is None:
+            return
+        with self._log_lock():
+            self._dirty = {}
+            self._reload()
+
+    def _reload(self) -> None:
+        """Rebuilds the orders and the heap from the whole log, keeping advanced orders."""
+        dirty = self._dirty
+        self.configure(self.path)
+        self._dirty = dirty
+        self._read()
+        self._heap = [(order.next_due_us, order_id) for order_id, order in self.orders.items()]
+        heapq.heapify(self._heap)
+
+    @contextmanager
+    def _log_lock(self):
+        """Holds an exclusive lock on the log's lock file (nothing for in-memory)."""
+        if self.path is None:
+            yield
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".lock", "a", encoding="utf-8") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _catch_up(self) -> None:
+        """
+        Applies the lines other processes appended since the log was last
+        read, or reloads it if it was rewritten. Called with the lock held.
+        """
+        if self.path is None:
+            return
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        inode, offset = self._position
+        if stat.st_ino != inode or stat.st_size < offset:
+            self._reload()
+        else:
+            self._read(offset)
+        # Orders another process cancelled stay cancelled.
+        for order_id in [i for i in self._dirty if i not in self.orders]:
+            del self._dirty[order_id]
+
+    def _read(self, offset: int = 0) -> None:
+        """
+        Applies the log's records from a byte offset on, cutting off a torn
+        last line left by a crash. An order this process advanced further
+        than a line from another process keeps its own runs.
+
+        :param offset: Position up to which the log was already applied
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            data = f.read()
+        # Everything after the last newline is a torn line.
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(offset + end)
+        orders = self.orders
+        last_id = self._next_id - 1
+        records = data[:end].decode("utf-8").split("\n")
+        records.pop()
+        for record in records:
+            fields = record.split("\t")
+            if len(fields) == 1:
+                order_id = int(fields[0])
+                orders.pop(order_id, None)
+            else:
+                order = StandingOrder.from_line(fields)
+                order_id = order.order_id
+                mine = self._dirty.get(order_id)
+                if mine is not None and mine.runs >= order.runs:
+                    order = mine
+                else:
+                    self._dirty.pop(order_id, None)
+                orders[order_id] = order
+                if offset:
+                    heapq.heappush(self._heap, (order.next_due_us, order_id))
+            if order_id > last_id:
+                last_id = order_id
+        self._next_id = last_id + 1
+        self._lines += len(records)
+        self._position = (inode, offset + end)
+
+    def add(  # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self,
+        user_id: int,
+        from_id: int,
+        to_id: int,
+        amount: float,
+        period: str,
+        start_us: int,
+        to_user_id: Optional[int] = None,
+    ) -> StandingOrder:
+        """
+        Creates a standing order.
+
+        :param user_id: Owner of the source account
+        :param from_id: Source account ID
+        :param to_id: Target account ID
+        :param amount: Amount per occurrence, in the source account's currency
+        :param period: "daily", "weekly" or "monthly"
+        :param start_us: Due time of the first occurrence
+        :param to_user_id: Owner of the target account (defaults to user_id)
+        :return: The new order
+        :raises ValueError: If the amount or period is invalid
+        """
+        if amount <= 0:
+            raise ValueError("The amount must be greater than 0")
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        with self._log_lock():
+            self._catch_up()
+            return self._add(
+                StandingOrder(
+            self._next_id,
+                    user_id,
+                    from_id,
+                    user_id if to_user_id is None else to_user_id,
+                    to_id,
+                    amount,
+                    period,
+                    start_us,
+                )
+            )
+
+    def _add(self, order: StandingOrder) -> StandingOrder:
+        """Stores a new order and appends it to the log. Called with the lock held."""
+        self._next_id += 1
+        self.orders[order.order_id] = order
+        heapq.heappush(self._heap, (order.next_due_us, order.order_id))
+        self._append([order.to_line()])
+        return order
+
+    def cancel(self, order_id: int) -> bool:
+        """
+        Cancels a standing order.
+
+        :param order_id: Order to cancel
+        :return: False if no such order exists
+        """
+        with self._log_lock():
+            self._catch_up()
+            if self.orders.pop(order_id, None) is None:
+                return False
+            self._dirty.pop(order_id, None)
+            self._append([f"{order_id}\n"])
+            return True
+
+    def pop_due(self, now_us: int) -> Optional[StandingOrder]:
+        """
+        Takes the order with the earliest due time, if it is due.
+        The caller hands it back with advance() once handled.
+
+        :param now_us: Current time in epoch microseconds
+        :return: The due order, or None if nothing is due
+        """
+        heap = self._heap
+        while heap and heap[0][0] <= now_us:
+            due_us, order_id = heapq.heappop(heap)
+            order = self.orders.get(order_id)
+            if order is not None and order.next_due_us == due_us:
+                return order
+        return None
+
+    def advance(self, order: StandingOrder, runs: int) -> StandingOrder:
+        """
+        Records that an order's occurrences up to runs were handled and
+        schedules the next one.
+
+        :param order: Order returned by pop_due
+        :param runs: New number of handled occurrences
+        :return: The updated order
+        """
+        order = order._replace(runs=runs)
+        self.orders[order.order_id] = order
+        self._dirty[order.order_id] = order
+        heapq.heappush(self._heap, (order.next_due_us, order.order_id))
+        return order
+
+    def flush(self) -> None:
+        """
+        Persists the orders advanced since the last flush, except those
+        another process cancelled in the meantime.
+        """
+        if not self._dirty:
+            return
+        with self._log_lock():
+            self._catch_up()
+            lines = [order.to_line() for order in self._dirty.values()]
+            self._dirty = {}
+            if self.path is not None and self._lines + len(lines) > 2 * len(self.orders) + 1000:
+                self._rewrite()
+            else:
+                self._append(lines)
+
+    def _append(self, lines: List[str]) -> None:
+        """Appends lines to the log. Called with the lock held, after _catch_up()."""
+        if self.path is None:
+            return
+        with open(self.path, "ab") as f:
+            f.write("".join(lines).encode("utf-8"))
+            self._position = (os.fstat(f.fileno()).st_ino, f.tell())
+        self._lines += len(lines)
+
+    def _rewrite(self) -> None:
+        """Replaces the log with one line per live order. Called like _append()."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write("".join(order.to_line() for order in self.orders.values()).encode("utf-8"))
+            self._position = (os.fstat(f.fileno()).st_ino, f.tell())
+        os.replace(temp_path, self.path)
+        self._lines = len(self.orders)
+
+
+class SchedulerService:
+    """
+    Service class for standing orders. Due occurrences are executed in due
+    time order with AccountService.transfer_between_accounts, against users
+    loaded once and saved once per run. After downtime every missed
+    occurrence is executed in the same pass (or only the latest one with
+    catch_up=False). A failed transfer (e.g. insufficient funds) is reported
+    and not retried.
+
+    Each occurrence carries the idempotency key "schedule:<order>:<run>".
+    It is reserved before the transfer runs, and its outcome is recorded
+    (failures included) after the users are saved and before the orders
+    are flushed. A key reserved by an interrupted run stays blocked for the
+    store's TTL, so its occurrence is reported as failed rather than paid a
+    second time: payments are made at most once.
+    """
+
+    SCHEDULER = PaymentScheduler()
+    # Stored results of occurrences that were not paid start with this.
+    FAILED_PREFIX = "Not paid: "
+
+    @staticmethod
+    def _occurrence_key(order_id: int, run: int) -> Tuple[str, str]:
+        """Returns the idempotency key and fingerprint of one occurrence."""
+        key = f"schedule:{order_id}:{run}"
+        return key, key
+
+    @staticmethod
+    def run_due(
+        users: List[User],
+        now_us: int,
+        catch_up: bool = True,
+        max_payments: Optional[int] = None,
+    ) -> List[Execution]:
+        """
+        Executes the occurrences due at or before now_us, reserving each
+        occurrence's idempotency key first. The caller saves the users and
+        then calls record() with the executions.
+
+        :param users: Loaded users (modified in place)
+        :param now_us: Current time in epoch microseconds
+        :param catch_up: Execute every missed occurrence; if False, only the
+                         latest missed one of each order
+        :param max_payments: Stop after this many executions (None: no limit)
+        :return: Executions in due time order
+        """
+        scheduler = SchedulerService.SCHEDULER
+        store = AccountService.IDEMPOTENCY
+        by_id = {user.user_id: user for user in users}
+        executions = []
+        while max_payments is None or len(executions) < max_payments:
+            order = scheduler.pop_due(now_us)
+            if order is None:
+                break
+            run = order.runs
+            if not catch_up:
+                run = max(run, order.runs_until(now_us) - 1)
+            key, fingerprint = SchedulerService._occurrence_key(order.order_id, run)
+            try:
+                previous = store.reserve(key, fingerprint, store.ttl)
+            except IdempotencyError as e:
+                succeeded, result = False, f"Idempotency error: {e}"
+            else:
+                if previous is None:
+                    succeeded, result = SchedulerService._execute(order, by_id)
+                elif previous.startswith(SchedulerService.FAILED_PREFIX):
+                    succeeded, result = False, previous[len(SchedulerService.FAILED_PREFIX):]
+                else:
+                    succeeded, result = True, previous
+            executions.append(
+                Execution(order.order_id, run, order.due_at(run), succeeded, result)
+            )
+            scheduler.advance(order, run + 1)
+        return executions
+
+    @staticmethod
+    def record(executions: List[Execution]) -> None:
+        """
+        Records the outcome of every execution under its idempotency key,
+        so neither a paid nor a failed occurrence is executed again.
+
+        :param executions: Executions returned by run_due
+        """
+        store = AccountService.IDEMPOTENCY
+        for e in executions:
+            key, fingerprint = SchedulerService._occurrence_key(e.order_id, e.run)
+            result = e.result if e.succeeded else SchedulerService.FAILED_PREFIX + e.result
+            store.put(key, fingerprint, result)
+
+    @staticmethod
+    def _execute(order: StandingOrder, by_id: Dict[int, User]) -> Tuple[bool, str]:
+        """
+        Executes one occurrence of an order.
+
+        :param order: Order to execute
+        :param by_id: Users by ID
+        :return: (whether the transfer was applied, result message)
+        """
+        source_user = by_id.get(order.user_id)
+        target_user = by_id.get(order.to_user_id)
+        if source_user is None or target_user is None:
+            return False, "User not found"
+        # Direct lookups: User.get_account_by_id prints every account it checks.
+        from_acc = next((a for a in source_user.accounts if a.account_id == order.from_id), None)
+        to_acc = next((a for a in target_user.accounts if a.account_id == order.to_id), None)
+        if from_acc is None or to_acc is None:
+            return False, "One of the accounts was not found."
+        result = AccountService.transfer_between_accounts(
+            from_acc, to_acc, order.amount, from_acc.currency
+        )
+        return not result.startswith("Transfer error"), result
+
+    @staticmethod
+    def schedule(args):
+        """
+        CLI wrapper that creates a standing order.
+
+        :param args: Parsed arguments with user_id, from_id, to_id, amount,
+                     period and optional to_user_id, start (ISO date)
+        """
+        users = FileManager.load_all_users()
+        by_id = {user.user_id: user for user in users}
+        to_user_id = args.user_id if args.to_user_id is None else args.to_user_id
+        source_user, target_user = by_id.get(args.user_id), by_id.get(to_user_id)
+        if not source_user or not target_user:
+            print("User not found")
+            return
+        if not source_user.get_account_by_id(args.from_id) or not target_user.get_account_by_id(
+            args.to_id
+        ):
+            print("One of the accounts was not found.")
+            return
+        start_us = (
+            to_epoch_us(datetime.fromisoformat(args.start)) if args.start else now_epoch_us()
+        )
+        scheduler = SchedulerService.SCHEDULER
+        scheduler.load()
+        try:
+            order = scheduler.add(
+                args.user_id, args.from_id, args.to_id, args.amount, args.period, start_us,
+                to_user_id,
+            )
+        except ValueError as e:
+            print(f"Schedule error: {e}")
+            return
+        print(f"Standing order {order.order_id} created, first due {from_epoch_us(start_us)}")
+
+    @staticmethod
+    def cancel(args):
+        """
+        CLI wrapper that cancels a standing order.
+
+        :param args: Parsed arguments with order_id
+        """
+        scheduler = SchedulerService.SCHEDULER
+        scheduler.load()
+        if scheduler.cancel(args.order_id):
+            print(f"Standing order {args.order_id} cancelled")
+        else:
+            print("Standing order not found")
+
+    @staticmethod
+    def run(args):
+        """
+        CLI wrapper that executes all due occurrences and saves once.
+
+        :param args: Parsed arguments with optional limit and no_catch_up
+        """
+        scheduler = SchedulerService.SCHEDULER
+        scheduler.load()
+        users = FileManager.load_all_users()
+        executions = SchedulerService.run_due(
+            users, now_epoch_us(), catch_up=not args.no_catch_up, max_payments=args.limit
+        )
+        if not executions:
+            print("No payments due")
+            return
+        FileManager.save_all_users(users)
+        SchedulerService.record(executions)
+        scheduler.flush()
+        failed = [e for e in executions if not e.succeeded]
+        for e in failed:
+            print(f"Order {e.order_id} due {from_epoch_us(e.due_us)}: {e.result}")
+        print(f"{len(executions) - len(failed)} payments executed, {len(failed)} failed")
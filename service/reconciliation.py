@@ -0,0 +1,379 @@
+"""Nightly balance reconciliation: recomputes every account's balance from
+its transactions and checks that transfer legs pair up, in a process pool,
+with resumable per-chunk progress and incremental reruns."""
+
+import csv
+import json
+import os
+import shutil
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from models.money import to_minor
+from models.transaction import parse_time_stamp, signed_minor
+from service.columnar_store import split_transaction_type
+from service.file_manager import FileManager
+from service.parallel_loader import split_user_chunks
+
+# Digests of users whose result can be reused, set in each worker process.
+_PREVIOUS_DIGESTS: Dict[str, str] = {}
+# Legacy transfers stamped each leg separately; legs this close belong together.
+LEGACY_LEG_WINDOW_US = 1_000_000
+
+
+class Discrepancy(NamedTuple):
+    """One problem found by the reconciliation."""
+
+    kind: str  # "balance" or "unmatched_leg"
+    user_id: int
+    account_id: int
+    detail: str
+    expected: int
+    actual: int
+
+
+def _init_worker(previous_digests: Dict[str, str]) -> None:
+    """Process-pool initializer: receives the digests from the last run once per worker."""
+    global _PREVIOUS_DIGESTS  # pylint: disable=global-statement
+    _PREVIOUS_DIGESTS = previous_digests
+
+
+def _user_digest(data: dict) -> str:
+    """
+    Summarizes what can change in a user between runs: version, and per
+    account its balance, transaction count and last transaction ID.
+
+    :param data: User dictionary from the users file
+    :return: Digest string
+    """
+    return json.dumps(
+        [
+            data.get("version", 0),
+            [
+                [
+                    a["account_id"],
+                    a["balance"],
+                    len(a.get("transactions", [])),
+                    a["transactions"][-1]["transaction_id"] if a.get("transactions") else None,
+                ]
+                for a in data.get("accounts", [])
+            ],
+        ],
+        separators=(",", ":"),
+    )
+
+
+def _check_user(data: dict) -> Tuple[list, list]:
+    """
+    Recomputes one user's account balances and collects its transfer legs.
+    The expected balance is the opening balance saved when the account was
+    created (0 if absent) plus the signed sum of its transactions.
+
+    :param data: User dictionary from the users file
+    :return: (balance issues as lists, legs as [key, side, user_id, account_id, amount_minor])
+    """
+    user_id = data["user_id"]
+    issues = []
+    legs = []
+    legacy = []
+    for account in data.get("accounts", []):
+        account_id = account["account_id"]
+        expected = to_minor(account.get("opening", 0))
+        for t in account.get("transactions", []):
+            transaction_type = t["transaction_type"]
+            amount_minor = to_minor(t["amount"])
+            expected += signed_minor(transaction_type, amount_minor)
+            base, counterparty = split_transaction_type(transaction_type)
+            if base not in ("transfer_to", "transfer_from"):
+                continue
+            correlation_id = t.get("correlation_id")
+            if correlation_id is not None:
+                key = f"c:{correlation_id}"
+            else:
+                source, target = (
+                    (account_id, counterparty)
+                    if base == "transfer_to"
+                    else (counterparty, account_id)
+                )
+                legacy.append(
+                    (
+                        source,
+                        target,
+                        parse_time_stamp(t["time_stamp"]),
+                        base,
+                        account_id,
+                        amount_minor,
+                        t.get("currency", account.get("currency")),
+                    )
+                )
+                continue
+            legs.append([key, base, user_id, account_id, amount_minor])
+        actual = to_minor(account["balance"])
+        if actual != expected:
+            issues.append(["balance", user_id, account_id, "stored balance", expected, actual])
+    return issues, legs + _pair_legacy_legs(user_id, legacy)
+
+
+def _pair_legacy_legs(user_id: int, legacy: List[tuple]) -> List[list]:
+    """
+    Keys legacy transfer legs (saved before correlation IDs) so that the
+    two legs of one transfer share a key. The old transfer stamped each leg
+    separately, so a transfer_to leg is paired with the nearest
+    transfer_from leg of the same account pair within LEGACY_LEG_WINDOW_US
+    whose amount matches (amounts are only compared when both legs are in
+    the same currency; an exchange changes them).
+
+    :param user_id: Owner of the legs
+    :param legacy: Legs as (source, target, time_us, side, account_id, amount_minor, currency)
+    :return: Legs as [key, side, user_id, account_id, amount_minor]
+    """
+    received: Dict[Tuple[int, int], List[tuple]] = {}
+    for leg in legacy:
+        if leg[3] == "transfer_from":
+            received.setdefault((leg[0], leg[1]), []).append(leg)
+    for group in received.values():
+        group.sort(key=lambda leg: leg[2])
+    paired: Dict[int, int] = {}  # id(transfer_from leg) -> time of its transfer_to leg
+    for sent in sorted((leg for leg in legacy if leg[3] == "transfer_to"), key=lambda leg: leg[2]):
+        group = received.get((sent[0], sent[1]), [])
+        times = [leg[2] for leg in group]
+        best = None
+        for i in range(bisect_left(times, sent[2] - LEGACY_LEG_WINDOW_US), len(group)):
+            leg = group[i]
+            if leg[2] > sent[2] + LEGACY_LEG_WINDOW_US:
+                break
+            if id(leg) in paired or (leg[6] == sent[6] and leg[5] != sent[5]):
+                continue
+            if best is None or abs(leg[2] - sent[2]) < abs(best[2] - sent[2]):
+                best = leg
+        if best is not None:
+            paired[id(best)] = sent[2]
+    legs = []
+    for leg in legacy:
+        source, target, time_us, side, account_id, amount_minor, _currency = leg
+        key_time = paired.get(id(leg), time_us)
+        legs.append([f"t:{user_id}:{key_time}:{source}:{target}", side, user_id, account_id, amount_minor])
+    return legs
+
+
+def reconcile_chunk(chunk: Tuple[str, int, int]) -> Dict[str, dict]:
+    """
+    Checks the users in one byte range of the users file. Users whose digest
+    equals the one from the last run are only marked as skipped.
+
+    :param chunk: (path, start, end) as produced by split_user_chunks
+    :return: Dictionary of user ID (as string) -> {"digest", "skipped"[, "issues", "legs"]}
+    """
+    path, start, end = chunk
+    with open(path, "rb") as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    body = raw.strip(b"[], \n\r\t")
+    results = {}
+    if not body:
+        return results
+    for data in json.loads(b"[" + body + b"]"):
+        uid = str(data["user_id"])
+        digest = _user_digest(data)
+        if _PREVIOUS_DIGESTS.get(uid) == digest:
+            results[uid] = {"digest": digest, "skipped": True}
+            continue
+        issues, legs = _check_user(data)
+        results[uid] = {"digest": digest, "skipped": False, "issues": issues, "legs": legs}
+    return results
+
+
+def pair_legs(legs: List[list]) -> Tuple[List[Discrepancy], set]:
+    """
+    Pairs transfer legs by key: every key needs exactly one transfer_to and
+    one transfer_from leg.
+
+    :param legs: Legs as [key, side, user_id, account_id, amount_minor]
+    :return: (unmatched-leg discrepancies, set of keys that paired within one user)
+    """
+    groups: Dict[str, List[list]] = {}
+    for leg in legs:
+        groups.setdefault(leg[0], []).append(leg)
+    issues = []
+    local = set()
+    for key, group in groups.items():
+        sides = sorted(leg[1] for leg in group)
+        if sides == ["transfer_from", "transfer_to"]:
+            if group[0][2] == group[1][2]:
+                local.add(key)
+            continue
+        for _key, side, user_id, account_id, amount_minor in group:
+            issues.append(
+                Discrepancy("unmatched_leg", user_id, account_id, f"{side} {key}", 0, amount_minor)
+            )
+    return issues, local
+
+
+class ReconciliationService:
+    """
+    Service class for the reconciliation job.
+
+    The users file is split into chunks (at user boundaries) that are checked
+    in a process pool. Each finished chunk's result is written to STATE_DIR,
+    so an interrupted run over an unchanged file resumes with the remaining
+    chunks. After a complete run, every user's digest, balance issues and
+    cross-user or unmatched transfer legs are kept in the state file; the
+    next run reuses them for users whose digest has not changed.
+    """
+
+    STATE_DIR = "data/reconciliation"
+    REPORT_FILE = "data/reconciliation_report.csv"
+    CHUNK_BYTES = 8 * 1024 * 1024
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[dict]:
+        """Reads a JSON file, or returns None if it does not exist."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path: str, data) -> None:
+        """Writes a JSON file atomically."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def run(
+        workers: Optional[int] = None,
+        full: bool = False,
+        users_path: Optional[str] = None,
+    ) -> List[Discrepancy]:
+        """
+        Runs (or resumes) the reconciliation and writes the discrepancy report.
+
+        :param workers: Worker processes (defaults to the CPU count; 1 runs in-process)
+        :param full: Recheck every user, ignoring the last run's digests
+        :param users_path: Users file (defaults to FileManager.USERS_FILE)
+        :return: List of discrepancies
+        """
+        users_path = users_path or FileManager.USERS_FILE
+        state_dir = ReconciliationService.STATE_DIR
+        chunk_dir = os.path.join(state_dir, "chunks")
+        os.makedirs(chunk_dir, exist_ok=True)
+        if not os.path.exists(users_path):
+            return []
+
+        stat = os.stat(users_path)
+        source = [stat.st_size, stat.st_mtime_ns, full]
+        run_path = os.path.join(state_dir, "run.json")
+        state_path = os.path.join(state_dir, "state.json")
+        previous = {} if full else (
+            ReconciliationService._read_json(state_path) or {}
+        ).get("users", {})
+        if (ReconciliationService._read_json(run_path) or {}).get("source") != source:
+            shutil.rmtree(chunk_dir)
+            os.makedirs(chunk_dir)
+            ReconciliationService._write_json(run_path, {"source": source})
+
+        parts = max(1, stat.st_size // ReconciliationService.CHUNK_BYTES)
+        chunks = split_user_chunks(users_path, parts)
+        results: Dict[str, dict] = {}
+        pending = []
+        for start, end in chunks:
+            done = ReconciliationService._read_json(os.path.join(chunk_dir, f"{start}.json"))
+            if done is None:
+                pending.append((users_path, start, end))
+            else:
+                results.update(done)
+
+        digests = {uid: user["digest"] for uid, user in previous.items()}
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(pending) <= 1:
+            _init_worker(digests)
+            finished = ((chunk, reconcile_chunk(chunk)) for chunk in pending)
+            ReconciliationService._collect(finished, chunk_dir, results)
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(digests,)) as pool:
+                futures = {pool.submit(reconcile_chunk, chunk): chunk for chunk in pending}
+                finished = ((futures[f], f.result()) for f in as_completed(futures))
+                ReconciliationService._collect(finished, chunk_dir, results)
+
+        discrepancies, users = ReconciliationService._merge(results, previous)
+        ReconciliationService._write_json(state_path, {"users": users})
+        os.remove(run_path)
+        shutil.rmtree(chunk_dir)
+        ReconciliationService.write_report(discrepancies, ReconciliationService.REPORT_FILE)
+        return discrepancies
+
+    @staticmethod
+    def _collect(finished, chunk_dir: str, results: Dict[str, dict]) -> None:
+        """Saves each finished chunk's result (the resume checkpoint) and gathers it."""
+        for (_path, start, _end), chunk_results in finished:
+            ReconciliationService._write_json(
+                os.path.join(chunk_dir, f"{start}.json"), chunk_results
+            )
+            results.update(chunk_results)
+
+    @staticmethod
+    def _merge(
+        results: Dict[str, dict], previous: Dict[str, dict]
+    ) -> Tuple[List[Discrepancy], Dict[str, dict]]:
+        """
+        Combines fresh and reused per-user results and pairs the transfer legs.
+
+        :param results: Chunk results by user ID
+        :param previous: Per-user state from the last complete run
+        :return: (all discrepancies, per-user state for the next run)
+        """
+        users = {}
+        legs = []
+        for uid, result in results.items():
+            if result["skipped"]:
+                result = previous[uid]
+            users[uid] = result
+            legs.extend(result["legs"])
+        leg_issues, local = pair_legs(legs)
+        discrepancies = [
+            Discrepancy(*issue) for user in users.values() for issue in user["issues"]
+        ]
+        state = {
+            uid: {
+                "digest": user["digest"],
+                "issues": user["issues"],
+                # Legs paired inside the user cannot change while its digest holds.
+                "legs": [leg for leg in user["legs"] if leg[0] not in local],
+            }
+            for uid, user in users.items()
+        }
+        return discrepancies + leg_issues, state
+
+    @staticmethod
+    def write_report(discrepancies: List[Discrepancy], path: str) -> None:
+        """
+        Writes the discrepancy report as CSV.
+
+        :param discrepancies: Discrepancies to report
+        :param path: Report file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(Discrepancy._fields)
+            writer.writerows(discrepancies)
+
+    @staticmethod
+    def reconcile(args):
+        """
+        CLI wrapper that runs the reconciliation and prints a summary.
+
+        :param args: Parsed arguments with workers and full
+        """
+        discrepancies = ReconciliationService.run(args.workers, args.full)
+        if not discrepancies:
+            print("All accounts reconcile")
+            return
+        print(
+            f"{len(discrepancies)} discrepancies, see {ReconciliationService.REPORT_FILE}"
+        )
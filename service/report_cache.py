@@ -0,0 +1,116 @@
+"""LRU cache of rendered user reports with a byte-size budget."""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+CacheKey = Tuple[int, int, Hashable]
+
+
+class ReportCache:
+    """
+    Caches rendered reports keyed by (user_id, version, options).
+    A user's version changes on every mutation, so stale reports are never
+    returned; storing a newer version drops the user's older entries.
+    Least recently used entries are evicted once the cached text exceeds
+    max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024) -> None:
+        """
+        :param max_bytes: Budget for the UTF-8 size of all cached reports
+        """
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[str, int]]" = OrderedDict()
+        self._by_user: Dict[int, Set[CacheKey]] = {}
+
+    def get(self, user_id: int, version: int, options: Hashable = None) -> Optional[str]:
+        """
+        Returns a cached report and marks it as recently used.
+
+        :param user_id: User ID
+        :param version: User's current modification version
+        :param options: Hashable description of the render options
+        :return: Cached report text, or None on a miss
+        """
+        key = (user_id, version, options)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, user_id: int, version: int, text: str, options: Hashable = None) -> None:
+        """
+        Stores a rendered report, dropping older versions for the same user
+        and evicting least recently used entries over the byte budget.
+        Reports larger than the whole budget are not cached.
+
+        :param user_id: User ID
+        :param version: Version the report was rendered from
+        :param text: Rendered report
+        :param options: Hashable description of the render options
+        """
+        for key in list(self._by_user.get(user_id, ())):
+            if key[1] != version:
+                self._remove(key)
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        key = (user_id, version, options)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (text, size)
+        self._by_user.setdefault(user_id, set()).add(key)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drops every cached report of a user.
+
+        :param user_id: User ID
+        """
+        for key in list(self._by_user.get(user_id, ())):
+            self._remove(key)
+
+    def _remove(self, key: CacheKey) -> None:
+        """Removes one entry and its bookkeeping."""
+        _, size = self._entries.pop(key)
+        self.size_bytes -= size
+        keys = self._by_user[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._by_user[key[0]]
+
+    def hit_ratio(self) -> float:
+        """
+        Returns the share of lookups served from the cache.
+
+        :return: Hit ratio between 0.0 and 1.0
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        """
+        Returns cache statistics.
+
+        :return: Dictionary with entries, size_bytes, hits, misses, evictions, hit_ratio
+        """
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hit_ratio(),
+        }
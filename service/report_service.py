@@ -0,0 +1,92 @@
+"""CLI handler for rendering user reports in text, JSON or CSV."""
+
+import io
+from datetime import datetime
+from typing import Optional
+
+from models.report_renderer import ReportRenderer
+from models.transaction import to_epoch_us
+from service.file_manager import FileManager
+from service.report_cache import ReportCache
+
+
+class ReportService:
+    """
+    Service class that renders a user's report with filters and pagination,
+    either to the terminal or to a file. Plain text summaries are cached
+    per user version in CACHE.
+    """
+
+    CACHE = ReportCache()
+
+    @staticmethod
+    def cached_summary(user_id: int) -> Optional[str]:
+        """
+        Returns the text summary of a user, serving it from CACHE when the
+        user's saved version is unchanged. The version is read from the
+        small totals file, so a cache hit does not load the users file.
+
+        :param user_id: User ID
+        :return: Rendered summary, or None if the user does not exist
+        """
+        cache = ReportService.CACHE
+        version = FileManager.load_user_versions().get(str(user_id))
+        if version is not None:
+            text = cache.get(user_id, version)
+            if text is not None:
+                return text
+
+        users = FileManager.load_all_users()
+        user = next((u for u in users if u.user_id == user_id), None)
+        if not user:
+            return None
+        stream = io.StringIO()
+        ReportRenderer().render(user, stream)
+        text = stream.getvalue()
+        if version == user.version:
+            cache.put(user_id, user.version, text)
+        return text
+
+    @staticmethod
+    def build_renderer(args) -> ReportRenderer:
+        """
+        Creates a ReportRenderer from parsed CLI arguments.
+
+        :param args: Parsed arguments with format, since, until, limit, page
+        :return: Configured ReportRenderer
+        :raises ValueError: If a date, the format or the page is invalid
+        """
+        return ReportRenderer(
+            output_format=args.format,
+            since_us=to_epoch_us(datetime.fromisoformat(args.since)) if args.since else None,
+            until_us=to_epoch_us(datetime.fromisoformat(args.until)) if args.until else None,
+            limit=args.limit,
+            page=args.page,
+        )
+
+    @staticmethod
+    def report(args):
+        """
+        CLI wrapper that renders one user's report.
+
+        :param args: Parsed arguments with user_id, format, since, until, limit,
+                     page and output (file path, or None for the terminal)
+        """
+        users = FileManager.load_all_users()
+        user = next((u for u in users if u.user_id == args.user_id), None)
+        if not user:
+            print("User not found")
+            return
+
+        try:
+            renderer = ReportService.build_renderer(args)
+        except ValueError as e:
+            print(f"Report error: {e}")
+            return
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as f:
+                renderer.render(user, f)
+            print(f"Report written to {args.output}")
+        else:
+            renderer.render(user)
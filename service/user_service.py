@@ -1,17 +1,43 @@
 """Provides services for user registration, login, and retrieval."""
 
+import csv
+import math
+import os
+from typing import List, NamedTuple, Optional, Tuple
+from models.account import BankAccount
+from models.id_allocator import TRANSACTION_IDS, USER_IDS
+from models.ledger import LEDGER
+from models.money import to_minor
+from models.name_index import NAME_INDEX
+from models.transaction import now_epoch_us
 from models.user import User
 from service.file_manager import FileManager
 
 
+class ImportResult(NamedTuple):
+    """Outcome of a bulk user import."""
+
+    users: int
+    accounts: int
+    rejected: List[Tuple[int, str, dict]]
+
+
 class Userservice:
     """
     A service class that manages users:
     - Registers new users
     - Handles login
     - Retrieves user by ID
+    - Imports users and accounts in bulk from CSV
+    - Finds users by name
     """
 
+    # Columns of a bulk import file. Rows sharing a "ref" (the partner's
+    # customer reference) are accounts of the same user; without a ref every
+    # row is a new user. Account columns may be left empty.
+    IMPORT_COLUMNS = ("ref", "username", "surname", "account_id", "currency", "balance")
+    REQUIRED_IMPORT_COLUMNS = ("username", "surname")
+
     @staticmethod
     def get_user(user_id: "User") -> User:
         """
@@ -22,21 +48,190 @@ class Userservice:
         """
         return User.get_user_id(user_id)
 
+    @staticmethod
+    def _new_user_ids(users: List[User], count: int) -> range:
+        """
+        Allocates IDs for new users: from the persisted USER_IDS sequence
+        when one is configured, otherwise above the largest loaded ID.
+
+        :param users: Loaded users (loading them already moved USER_IDS past their IDs)
+        :param count: Number of IDs needed
+        :return: range of new user IDs
+        """
+        if USER_IDS.path is None:
+            first_id = max((u.user_id for u in users), default=0) + 1
+            return range(first_id, first_id + count)
+        return USER_IDS.next_ids(count)
+
     @staticmethod
     def register(args):
         """
         Registers a new user with a unique ID.
-        Loads existing users, generates a new ID, creates the user, and saves the updated list.
+        With a persisted ID sequence, the ID is leased from it and the new
+        record is appended to the users file, so registering costs the same
+        however many users exist; users are only loaded once, to start the
+        sequence above the stored IDs. Without one, existing users are
+        loaded, the ID follows the largest one and the list is saved.
 
         :param args: An object with 'username' and 'surname' attributes.
         """
-        users = FileManager.load_all_users()
-        new_id = max((u.user_id for u in users), default=0) + 1
-        user = User(user_id=new_id, username=args.username, surname=args.surname)
-        users.append(user)
-        FileManager.save_all_users(users)
+        if USER_IDS.path is None:
+            users = FileManager.load_all_users()
+            new_id = Userservice._new_user_ids(users, 1)[0]
+            user = User(user_id=new_id, username=args.username, surname=args.surname)
+            users.append(user)
+            FileManager.save_all_users(users)
+        else:
+            if not os.path.exists(USER_IDS.path):
+                FileManager.load_all_users()
+            new_id = USER_IDS.next_id()
+            user = User(user_id=new_id, username=args.username, surname=args.surname)
+            FileManager.append_user(user)
+        NAME_INDEX.add([user])
         print(f"New user registered: {user.username} {user.surname}, ID: {new_id}")
 
+    @staticmethod
+    def _parse_import_row(row: dict) -> Tuple[str, str, Optional[Tuple[int, str, float]]]:
+        """
+        Validates one import row.
+
+        :param row: CSV row as a dictionary
+        :return: (username, surname, account) where account is
+                 (account_id, currency, balance) or None
+        :raises ValueError: With the reason the row is rejected
+        """
+        username = (row.get("username") or "").strip()
+        surname = (row.get("surname") or "").strip()
+        if not username or not surname:
+            raise ValueError("Username and surname are required")
+        account_id = (row.get("account_id") or "").strip()
+        currency = (row.get("currency") or "").strip()
+        balance = (row.get("balance") or "").strip()
+        if not (account_id or currency or balance):
+            return username, surname, None
+        if not account_id.isdigit() or int(account_id) <= 0:
+            raise ValueError("Account ID must be a positive integer")
+        if len(currency) != 3 or not currency.isalpha() or not currency.isupper():
+            raise ValueError("Currency must be a three-letter code")
+        try:
+            amount = float(balance) if balance else 0.0
+        except ValueError:
+            raise ValueError("Balance must be a number") from None
+        if amount < 0 or not math.isfinite(amount):
+            raise ValueError("Balance must be a non-negative number")
+        return username, surname, (int(account_id), currency, amount)
+
+    @staticmethod
+    def import_users_csv(path: str, report_path: Optional[str] = None) -> ImportResult:
+        """
+        Imports users and accounts from a CSV file in one commit.
+        Rows are streamed and validated first; valid users then get one
+        contiguous range of user IDs, opening balances are posted to the
+        ledger, and the users file is written once. Rejected rows are written
+        to report_path (line number, reason and the original columns).
+
+        :param path: CSV file with IMPORT_COLUMNS (ref and account columns optional)
+        :param report_path: Where to write rejected rows (skipped if None or none rejected)
+        :return: ImportResult with the number of users and accounts imported and the rejected rows
+        :raises ValueError: If a required column is missing
+        """
+        drafts = {}
+        rejected = []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            missing = [c for c in Userservice.REQUIRED_IMPORT_COLUMNS if c not in fieldnames]
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)}")
+            for line_number, row in enumerate(reader, start=2):
+                try:
+                    username, surname, account = Userservice._parse_import_row(row)
+                    ref = (row.get("ref") or "").strip() or f"line:{line_number}"
+                    draft = drafts.get(ref)
+                    if draft is None:
+                        draft = drafts[ref] = (username, surname, {})
+                    elif draft[:2] != (username, surname):
+                        raise ValueError(f"Reference {ref} belongs to another name")
+                    if account is not None:
+                        if account[0] in draft[2]:
+                            raise ValueError(f"Duplicate account ID {account[0]} for {ref}")
+                        draft[2][account[0]] = account
+                except ValueError as e:
+                    rejected.append((line_number, str(e), row))
+
+        account_count = sum(len(d[2]) for d in drafts.values())
+        if drafts:
+            users = FileManager.load_all_users()
+            first_id = Userservice._new_user_ids(users, len(drafts)).start
+            created = []
+            entry_ids = iter(TRANSACTION_IDS.next_ids(account_count))
+            time_stamp_us = now_epoch_us()
+            for user_id, (username, surname, accounts) in enumerate(drafts.values(), first_id):
+                user = User(username=username, surname=surname, user_id=user_id)
+                for account_id, currency, balance in accounts.values():
+                    account = BankAccount(account_id, balance, currency)
+                    user.add_account(account)
+                    LEDGER.open_account(
+                        account.ledger_key,
+                        currency,
+                        to_minor(balance),
+                        next(entry_ids),
+                        time_stamp_us,
+                    )
+                users.append(user)
+                created.append(user)
+            FileManager.save_all_users(users)
+            NAME_INDEX.add(created)
+
+        if rejected and report_path:
+            with open(report_path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["line", "reason", *Userservice.IMPORT_COLUMNS])
+                for line_number, reason, row in rejected:
+                    writer.writerow(
+                        [line_number, reason, *(row.get(c) or "" for c in Userservice.IMPORT_COLUMNS)]
+                    )
+        return ImportResult(len(drafts), account_count, rejected)
+
+    @staticmethod
+    def bulk_import(args):
+        """
+        CLI wrapper for import_users_csv.
+
+        :param args: Parsed arguments with file and optional report path
+        """
+        report_path = args.report or f"{args.file}.rejected.csv"
+        try:
+            result = Userservice.import_users_csv(args.file, report_path)
+        except (OSError, ValueError) as e:
+            print(f"Import error: {e}")
+            return
+        print(f"Imported {result.users} users and {result.accounts} accounts")
+        if result.rejected:
+            print(f"Rejected {len(result.rejected)} rows, see {report_path}")
+
+    @staticmethod
+    def find_users(args):
+        """
+        CLI wrapper that finds users by name prefix or, with typos > 0, by
+        names within that many typos. Reads the names log when there is
+        one, so users are only loaded on the first search.
+
+        :param args: Parsed arguments with name, typos and limit
+        """
+        if not NAME_INDEX.load():
+            NAME_INDEX.reset(FileManager.load_all_users())
+            NAME_INDEX.save()
+        if args.typos > 0:
+            matches = NAME_INDEX.fuzzy(args.name, args.typos, args.limit)
+        else:
+            matches = NAME_INDEX.prefix(args.name, args.limit)
+        if not matches:
+            print("No users found")
+            return
+        for match in matches:
+            print(f"{match.user_id}: {match.username} {match.surname}")
+
     @staticmethod
     def login(args):
         """
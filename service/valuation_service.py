@@ -0,0 +1,156 @@
+"""Values balances held in different currencies in a single base currency."""
+
+from array import array
+from datetime import datetime
+from fractions import Fraction
+from typing import Dict, Iterable, Optional
+
+from models.exchange_rates import RATE_ENGINE, RateTable
+from models.money import from_minor
+from models.transaction import to_epoch_us
+from models.user import User
+from service.file_manager import FileManager
+
+
+class BalanceColumns:
+    """
+    Column store of account balances partitioned by currency.
+    Each currency holds its minor-unit balances in an array('q'), so
+    per-currency totals are computed by the C-level sum() in one pass.
+    """
+
+    def __init__(self) -> None:
+        self.columns: Dict[str, array] = {}
+
+    def add_users(self, users: Iterable[User]) -> "BalanceColumns":
+        """
+        Appends the balances of every account of the given users.
+
+        :param users: Users whose accounts are gathered
+        :return: self, for chaining
+        """
+        columns = self.columns
+        for user in users:
+            for account in user.accounts:
+                column = columns.get(account.currency)
+                if column is None:
+                    column = columns[account.currency] = array("q")
+                column.append(account.balance_minor)
+        return self
+
+    def totals(self) -> Dict[str, int]:
+        """
+        Returns the exact total per currency in minor units.
+
+        :return: Dictionary of currency -> total minor units
+        """
+        return {currency: sum(column) for currency, column in self.columns.items()}
+
+    def value_minor(
+        self, base: str, table: Optional[RateTable] = None, at_us: Optional[int] = None
+    ) -> int:
+        """
+        Converts all balances into the base currency.
+        Totals are converted with exact rates and rounded once (half to even).
+
+        :param base: Target currency code
+        :param table: Rate table to use (defaults to the current RATE_ENGINE table)
+        :param at_us: Use the rates in force at this time (epoch microseconds)
+                      from RATE_ENGINE's history instead of a table
+        :return: Total value in minor units of base
+        :raises ValueError: If a currency has no rate into base
+        """
+        if at_us is None:
+            lookup = (table or RATE_ENGINE.table).fraction
+        else:
+            history = RATE_ENGINE.history
+
+            def lookup(from_currency: str, to_currency: str) -> Optional[Fraction]:
+                return history.rate_at(from_currency, to_currency, at_us)
+
+        value = Fraction(0)
+        for currency, total in self.totals().items():
+            if currency == base:
+                value += total
+                continue
+            rate = lookup(currency, base)
+            if rate is None:
+                raise ValueError(f"No exchange rate from {currency} to {base}")
+            value += total * rate
+        return round(value)
+
+
+class ValuationService:
+    """
+    Service class that values users, groups of users or the whole bank
+    in a chosen base currency using the exchange-rate matrix.
+    """
+
+    @staticmethod
+    def value_users(
+        users: Iterable[User],
+        base: str = "USD",
+        table: Optional[RateTable] = None,
+        at_us: Optional[int] = None,
+    ) -> float:
+        """
+        Values all accounts of the given users in the base currency.
+
+        :param users: Users to value
+        :param base: Target currency code
+        :param table: Rate table to use (defaults to the current one)
+        :param at_us: Value at the rates in force at this time instead
+        :return: Total value in major units of base
+        :raises ValueError: If a currency has no rate into base
+        """
+        return from_minor(BalanceColumns().add_users(users).value_minor(base, table, at_us))
+
+    @staticmethod
+    def value_user(
+        user: User,
+        base: str = "USD",
+        table: Optional[RateTable] = None,
+        at_us: Optional[int] = None,
+    ) -> float:
+        """
+        Values all accounts of one user in the base currency.
+
+        :param user: User to value
+        :param base: Target currency code
+        :param table: Rate table to use (defaults to the current one)
+        :param at_us: Value at the rates in force at this time instead
+        :return: Total value in major units of base
+        """
+        return ValuationService.value_users([user], base, table, at_us)
+
+    @staticmethod
+    def value_bank(base: str = "USD") -> float:
+        """
+        Values every account stored in the bank.
+
+        :param base: Target currency code
+        :return: Total value in major units of base
+        """
+        return ValuationService.value_users(FileManager.load_all_users(), base)
+
+    @staticmethod
+    def valuation(args):
+        """
+        CLI wrapper printing the value of one user or of the whole bank.
+
+        :param args: Parsed arguments object with base, optional user_id and
+                     optional at (ISO time whose rates are used)
+        """
+        users = FileManager.load_all_users()
+        if args.user_id is not None:
+            users = [u for u in users if u.user_id == args.user_id]
+            if not users:
+                print("User not found")
+                return
+        try:
+            at_us = to_epoch_us(datetime.fromisoformat(args.at)) if args.at else None
+            value = ValuationService.value_users(users, args.base, at_us=at_us)
+        except ValueError as e:
+            print(f"Valuation error: {e}")
+            return
+        print(f"Total value: {value} {args.base}")
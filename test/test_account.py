@@ -3,7 +3,9 @@ transfer, exchange rates, serialization, and transaction history.
 """
 
 import unittest
+from datetime import datetime
 from models.account import BankAccount
+from models.transaction import Transaction, to_epoch_us
 
 
 class DepositTests(unittest.TestCase):
@@ -219,6 +221,22 @@ class TransactionTests(unittest.TestCase):
         self.assertEqual(tx[1].transaction_type, "withdraw")
         self.assertEqual(tx[2].transaction_type, "deposit")
 
+    def test_transactions_between(self):
+        """Test time-range filtering with datetime and epoch bounds."""
+        for day in (1, 15, 31):
+            self.account.transactions.append(
+                Transaction(day, 10.0, "deposit", datetime(2024, 3, day), "USD")
+            )
+        march_first = datetime(2024, 3, 1)
+        selected = self.account.get_transactions_between(
+            march_first, datetime(2024, 3, 31)
+        )
+        self.assertEqual([t.transaction_id for t in selected], [1, 15])
+        selected = self.account.get_transactions_between(
+            to_epoch_us(datetime(2024, 3, 2)), to_epoch_us(datetime(2024, 4, 1))
+        )
+        self.assertEqual([t.transaction_id for t in selected], [15, 31])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,162 @@
+"""Unit tests for the ordered account index."""
+
+import os
+import random
+import tempfile
+import unittest
+from models.account import BankAccount
+from models.account_index import AccountIndex, IndexEntry, IndexReader, SortedItems
+from models.ledger import Ledger
+from models.user import User
+
+
+class TestSortedItems(unittest.TestCase):
+    """Unit tests for the bucketed sorted list."""
+
+    def test_matches_a_sorted_list(self):
+        """test random adds and removes against sorted()."""
+        SortedItems.LOAD = 4
+        self.addCleanup(setattr, SortedItems, "LOAD", 512)
+        rng = random.Random(2)
+        items = SortedItems((rng.randrange(50), k, 0) for k in range(30))
+        expected = sorted(items)
+        for k in range(30, 400):
+            if expected and rng.random() < 0.4:
+                item = expected.pop(rng.randrange(len(expected)))
+                items.remove(item)
+            else:
+                item = (rng.randrange(50), k, 0)
+                items.add(item)
+                expected.append(item)
+                expected.sort()
+        self.assertEqual(list(items), expected)
+        self.assertEqual(len(items), len(expected))
+        self.assertEqual(list(items.descending((25,))), [i for i in reversed(expected) if i >= (25,)])
+        with self.assertRaises(ValueError):
+            items.remove((99, 0, 0))
+
+
+class TestAccountIndex(unittest.TestCase):
+    """Unit tests for maintaining and querying the index."""
+
+    def setUp(self):
+        """Create two users with USD and EUR accounts and index them."""
+        self.ledger = Ledger()
+        self.users = []
+        for user_id, balances in ((1, (100, 5)), (2, (50, 70))):
+            user = User("Name", "Surname", user_id)
+            for account_id, (balance, currency) in enumerate(zip(balances, ("USD", "EUR")), 1):
+                account = BankAccount(account_id, balance, currency)
+                account.ledger = self.ledger
+                user.add_account(account)
+            self.users.append(user)
+        self.index = AccountIndex()
+        self.index.reset(self.users)
+
+    def test_queries_follow_mutations(self):
+        """test that deposits, withdrawals and transfers move accounts in the index."""
+        first, second = self.users
+        second.accounts[0].deposit(60, "USD")
+        first.accounts[0].transfer(second.accounts[1], 10, "USD")
+
+        self.assertEqual(
+            self.index.top("balance", "USD"),
+            [IndexEntry(2, 1, 11000), IndexEntry(1, 1, 9000)],
+        )
+        eur_minor = second.accounts[1].balance_minor
+        self.assertEqual(self.index.above("balance", "EUR", 7000), [IndexEntry(2, 2, eur_minor)])
+        self.assertEqual(
+            self.index.top("transactions", "USD", 1), [IndexEntry(2, 1, 1)]
+        )
+        self.assertEqual(self.index.top("balance", "UAN"), [])
+
+    def test_new_accounts_are_tracked(self):
+        """test that track_users picks up accounts created after the rebuild."""
+        account = BankAccount(3, 500, "USD")
+        self.users[0].add_account(account)
+        self.index.track_users(self.users)
+        self.index.track_users(self.users)
+        account.withdraw(100, "USD")
+
+        self.assertEqual(self.index.top("balance", "USD", 1), [IndexEntry(1, 3, 40000)])
+        self.assertEqual(len(account.observers), 2)
+
+    def test_saved_index_answers_the_same(self):
+        """test that IndexReader returns the in-memory answers from the saved columns."""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.index.configure(os.path.join(tmp, "index"))
+            self.index.save()
+            reader = IndexReader(self.index.path)
+            for metric, currency, threshold in (
+                ("balance", "USD", 6000),
+                ("balance", "EUR", 0),
+                ("transactions", "USD", 0),
+            ):
+                self.assertEqual(
+                    reader.top(metric, currency, 1), self.index.top(metric, currency, 1)
+                )
+                self.assertEqual(
+                    reader.above(metric, currency, threshold),
+                    self.index.above(metric, currency, threshold),
+                )
+            self.assertEqual(reader.top("balance", "UAN"), [])
+
+    def _assert_reader_matches(self, index):
+        """Compare IndexReader answers with the in-memory ones."""
+        reader = IndexReader(index.path)
+        for metric in ("balance", "transactions"):
+            for currency in ("USD", "EUR"):
+                self.assertEqual(reader.top(metric, currency), index.top(metric, currency))
+                self.assertEqual(
+                    reader.above(metric, currency, 1, limit=1),
+                    index.above(metric, currency, 1, limit=1),
+                )
+
+    def test_matching_load_appends_changes(self):
+        """test that a load of the saved file sorts nothing and a save only logs changes."""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.index.configure(os.path.join(tmp, "index"))
+            self.index.save((10, 1))
+            loaded = AccountIndex(self.index.path)
+            loaded.attach(self.users, (10, 1))
+            first, second = self.users
+            second.accounts[0].deposit(60, "USD")
+            first.accounts[0].transfer(second.accounts[1], 10, "USD")
+            first.add_account(BankAccount(3, 1, "EUR"))
+            loaded.track_users(self.users)
+            self.assertIsNone(loaded._lists)  # pylint: disable=protected-access
+
+            loaded.save((20, 2))
+            self.assertEqual(IndexReader(loaded.path).manifest["changes"], 4)
+            self._assert_reader_matches(loaded)
+
+            # A second round appends again; the last line per account wins.
+            second.accounts[0].withdraw(50, "USD")
+            loaded.save((30, 3))
+            self.assertEqual(IndexReader(loaded.path).manifest["changes"], 5)
+            self._assert_reader_matches(loaded)
+
+    def test_stale_or_long_log_rewrites_columns(self):
+        """test that a load of another file, or a long changes log, rewrites the columns."""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.index.configure(os.path.join(tmp, "index"))
+            self.index.save((10, 1))
+            stale = AccountIndex(self.index.path)
+            stale.attach(self.users, (11, 1))
+            self.users[0].accounts[0].deposit(5, "USD")
+            stale.save((20, 2))
+            self.assertEqual(IndexReader(stale.path).manifest["changes"], 0)
+            self._assert_reader_matches(stale)
+
+            fresh = AccountIndex(self.index.path)
+            fresh.attach(self.users, (20, 2))
+            fresh.COMPACT_MIN = 1
+            for user in self.users:
+                user.accounts[1].deposit(1, user.accounts[1].currency)
+            fresh.save((30, 3))
+            self.assertEqual(IndexReader(fresh.path).manifest["changes"], 0)
+            self._assert_reader_matches(fresh)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,13 @@
 Unit tests for the AccountService class in the SimpleBankSystem application.
 """
 
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from service.account_service import AccountService
 from models.account import BankAccount
+from models.account_index import AccountIndex
 from models.user import User
 
 
@@ -170,6 +173,65 @@ class TestAccountService(unittest.TestCase):
             AccountService.transfer(args)
             mock_print.assert_called_with("One of the accounts was not found.")
 
+    @patch("service.account_service.FileManager.load_all_users")
+    def test_history_paginates(self, mock_load):
+        """Test CLI history prints one page and the next cursor."""
+        mock_load.return_value = [self.user]
+        for _ in range(3):
+            self.account1.deposit(10.0, "USD")
+        args = MagicMock(
+            user_id=1, account_id=101, since=None, until=None, type=None,
+            limit=2, cursor=None,
+        )
+        with patch("builtins.print") as mock_print:
+            AccountService.history(args)
+            last_line = mock_print.call_args_list[-1][0][0]
+            self.assertTrue(last_line.startswith("Next page: --cursor "))
+
+    @patch("service.account_service.FileManager.verify_totals")
+    def test_verify_totals_reports_drift(self, mock_verify):
+        """Test CLI totals verification prints each drifting currency."""
+        mock_verify.return_value = {"bank": {"USD": -5}}
+        with patch("builtins.print") as mock_print:
+            AccountService.verify_totals(MagicMock())
+            mock_print.assert_called_with("Drift in bank USD: -5 minor units")
+
+    @patch("service.account_service.FileManager.load_all_users")
+    def test_top_accounts(self, _mock_load):
+        """Test CLI top accounts by balance with a minimum."""
+        index = AccountIndex()
+        index.reset([self.user])
+        args = MagicMock(currency="USD", by="balance", limit=5, minimum=400.0)
+        with patch("service.account_service.ACCOUNT_INDEX", index), patch(
+            "builtins.print"
+        ) as mock_print:
+            AccountService.top_accounts(args)
+            mock_print.assert_called_once_with("1. user 1, account 101: 500.0")
+
+    @patch("service.account_service.FileManager.save_account_index")
+    @patch("service.account_service.FileManager.load_all_users")
+    def test_top_accounts_skips_a_stale_saved_index(self, mock_load, mock_save_index):
+        """Test that the saved index is only read when it matches the users file."""
+        args = MagicMock(currency="USD", by="balance", limit=1, minimum=None)
+        with tempfile.TemporaryDirectory() as tmp:
+            index = AccountIndex(os.path.join(tmp, "index"))
+            index.reset([self.user])
+            index.save((10, 1))
+            self.account2.deposit(1000.0, "USD")
+            with patch("service.account_service.ACCOUNT_INDEX", index), patch(
+                "builtins.print"
+            ) as mock_print:
+                with patch("service.account_service.FileManager.users_file_stamp", return_value=(10, 1)):
+                    AccountService.top_accounts(args)
+                mock_print.assert_called_once_with("1. user 1, account 101: 500.0")
+                mock_load.assert_not_called()
+
+                with patch("service.account_service.FileManager.users_file_stamp", return_value=(20, 2)):
+                    AccountService.top_accounts(args)
+                mock_print.assert_called_with("1. user 1, account 102: 1300.0")
+                mock_load.assert_called_once_with()
+                mock_save_index.assert_called_once_with()
+
 
 if __name__ == "__main__":
     unittest.main()
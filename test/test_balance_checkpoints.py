@@ -0,0 +1,105 @@
+"""Unit tests for running-balance checkpoints and balance_at queries."""
+
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from models.account import BankAccount
+from models.balance_checkpoints import BalanceCheckpoints
+from models.transaction import Transaction, to_epoch_us
+
+HOUR_US = 3_600 * 1_000_000
+START = to_epoch_us(datetime(2024, 1, 1))
+
+
+class TestBalanceCheckpoints(unittest.TestCase):
+    """Unit tests for BalanceCheckpoints via BankAccount.balance_at."""
+
+    def setUp(self):
+        """Create an account with 25 hourly deposits of 1..25 after a 100 opening."""
+        self.account = BankAccount(account_id=1, balance=0, currency="USD")
+        total = 0
+        for i in range(1, 26):
+            self.account.transactions.append(
+                Transaction.from_epoch(i, i * 100, "deposit", START + i * HOUR_US, "USD")
+            )
+            total += i * 100
+        self.account.opening_minor = 10000
+        self.account.balance_minor = 10000 + total
+        self.account.restore_checkpoints({"interval": 10, "opening": 10000, "balances": []})
+
+    def expected(self, n):
+        """Balance after the first n deposits."""
+        return 100 + n * (n + 1) / 2
+
+    def test_balance_at_matches_replay(self):
+        """test balance_at against a full replay for every hour."""
+        for n in range(0, 26):
+            with self.subTest(n=n):
+                self.assertEqual(
+                    self.account.balance_at(START + n * HOUR_US), self.expected(n)
+                )
+
+    def test_mismatched_saved_data_is_rebuilt(self):
+        """test that saved checkpoints not matching history are rebuilt."""
+        checkpoints = self.account.balance_checkpoints
+        self.assertEqual(checkpoints.interval, 10)
+        self.assertEqual(list(checkpoints.balances), [15500, 31000])
+        self.assertEqual(checkpoints.opening_minor, 10000)
+
+    def test_incremental_after_operations(self):
+        """test that deposits and withdrawals extend the checkpoints."""
+        checkpoints = BalanceCheckpoints(self.account.transaction_index, interval=4)
+        checkpoints.rebuild(self.account.opening_minor)
+        self.account._checkpoints = checkpoints  # pylint: disable=protected-access
+        self.account.deposit(10, "USD")
+        self.account.withdraw(5, "USD")
+        self.assertEqual(len(checkpoints.balances), 27 // 4)
+        self.assertEqual(
+            self.account.balance_at(datetime(2100, 1, 1)), self.account.get_balance()
+        )
+
+    def test_out_of_order_insert_recomputes(self):
+        """test that an older transaction inserted later fixes later checkpoints."""
+        checkpoints = BalanceCheckpoints(self.account.transaction_index, interval=5)
+        checkpoints.rebuild(self.account.opening_minor)
+        self.account.transactions.append(
+            Transaction.from_epoch(99, 5000, "withdraw", START + 3 * HOUR_US, "USD")
+        )
+        self.assertEqual(
+            checkpoints.balance_at(START + 2 * HOUR_US), int(self.expected(2) * 100)
+        )
+        self.assertEqual(
+            checkpoints.balance_at(START + 25 * HOUR_US),
+            int(self.expected(25) * 100) - 5000,
+        )
+
+    def test_round_trip_through_dict(self):
+        """test checkpoints survive to_dict/from_dict."""
+        restored = BankAccount.from_dict(self.account.to_dict())
+        self.assertEqual(
+            restored.balance_at(START + 17 * HOUR_US), self.expected(17)
+        )
+        self.assertEqual(restored.balance_checkpoints.opening_minor, 10000)
+
+    def test_to_dict_does_not_build_checkpoints(self):
+        """test that unbuilt checkpoints are not written and saved ones pass through."""
+        self.assertNotIn("checkpoints", BankAccount(2, 0.0, "USD").to_dict())
+        saved = self.account.to_dict()
+        with patch.object(BalanceCheckpoints, "rebuild") as rebuild:
+            self.assertIs(BankAccount.from_dict(saved).to_dict()["checkpoints"], saved["checkpoints"])
+        rebuild.assert_not_called()
+
+    def test_saved_opening_must_match_the_account(self):
+        """test that checkpoints saved from another opening are rebuilt from the account's."""
+        self.account.restore_checkpoints({"interval": 10, "opening": 500, "balances": [1, 2]})
+        self.assertEqual(self.account.balance_checkpoints.opening_minor, 10000)
+        self.assertEqual(self.account.balance_at(START + 25 * HOUR_US), self.expected(25))
+
+    def test_invalid_interval(self):
+        """test that a non-positive interval raises ValueError."""
+        with self.assertRaises(ValueError):
+            BalanceCheckpoints(self.account.transaction_index, interval=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
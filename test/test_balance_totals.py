@@ -0,0 +1,120 @@
+"""Unit tests for incrementally maintained balance totals."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.account import BankAccount
+from models.balance_totals import BANK_TOTALS, BalanceTotals
+from models.user import User
+from service.file_manager import FileManager
+
+
+class TestBalanceTotals(unittest.TestCase):
+    """Unit tests for BalanceTotals and its use as an account observer."""
+
+    def setUp(self):
+        """Create a user with a USD and an EUR account."""
+        self.user = User(username="Alice", surname="Smith", user_id=1)
+        self.usd = BankAccount(account_id=1, balance=100.0, currency="USD")
+        self.eur = BankAccount(account_id=2, balance=50.0, currency="EUR")
+        self.user.add_account(self.usd)
+        self.user.add_account(self.eur)
+
+    def test_totals_follow_operations(self):
+        """test deposit, withdraw and transfer update the user's totals."""
+        self.usd.deposit(20, "USD")
+        self.eur.withdraw(10, "EUR")
+        self.usd.transfer(self.eur, 10, "USD")
+        self.assertEqual(self.user.totals.by_currency, {"USD": 11000, "EUR": 4920})
+        self.assertEqual(self.user.verify_totals(), {})
+
+    def test_balance_setter_notifies(self):
+        """test that setting the balance directly is tracked as a delta."""
+        self.usd.balance = 10.0
+        self.assertEqual(self.user.get_balances_by_currency()["USD"], 10.0)
+
+    def test_verify_detects_drift(self):
+        """test that bypassing observers shows up as drift."""
+        self.usd.balance_minor += 5
+        self.assertEqual(self.user.verify_totals(), {"USD": -5})
+
+    def test_merge_and_total(self):
+        """test merging totals and summing across currencies."""
+        bank = BalanceTotals({"USD": 1})
+        bank.merge(self.user.totals)
+        self.assertEqual(bank.to_dict(), {"USD": 10001, "EUR": 5000})
+        self.assertEqual(bank.total(), 15001)
+
+    def test_attached_totals_forward_changes(self):
+        """test that a parent follows its children's changes through the observer path."""
+        bank = BalanceTotals()
+        other = User(username="Bob", surname="Ray", user_id=2)
+        other.add_account(BankAccount(account_id=1, balance=1.0, currency="USD"))
+        bank.reset([self.user.totals, other.totals])
+        self.usd.deposit(5, "USD")
+        other.add_account(BankAccount(account_id=2, balance=2.0, currency="EUR"))
+        self.assertEqual(bank.to_dict(), {"USD": 10600, "EUR": 5200})
+
+        bank.detach(other.totals)
+        other.accounts[0].deposit(1, "USD")
+        self.assertEqual(bank.to_dict(), {"USD": 10500, "EUR": 5000})
+        bank.reset([other.totals])
+        self.assertIsNone(self.user.totals.parent)
+        self.assertEqual(bank.to_dict(), {"USD": 200, "EUR": 200})
+
+
+class TestPersistedTotals(unittest.TestCase):
+    """Unit tests for saving, loading and verifying the totals file."""
+
+    def setUp(self):
+        """Point FileManager at temporary files."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        users_file = os.path.join(self.tmp.name, "users.json")
+        totals_file = os.path.join(self.tmp.name, "totals.json")
+        self.patches = [
+            patch.object(FileManager, "USERS_FILE", users_file),
+            patch.object(FileManager, "TOTALS_FILE", totals_file),
+        ]
+        for p in self.patches:
+            p.start()
+        user = User(username="Bob", surname="Johnson", user_id=7)
+        user.add_account(BankAccount(account_id=1, balance=12.5, currency="USD"))
+        FileManager.save_all_users([user])
+
+    def tearDown(self):
+        """Restore FileManager paths and remove temporary files."""
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_load_totals_without_accounts(self):
+        """test that saved totals can be read on their own."""
+        totals = FileManager.load_totals()
+        self.assertEqual(totals["bank"], {"USD": 1250})
+        self.assertEqual(totals["users"], {"7": {"USD": 1250}})
+
+    def test_verify_consistent_and_drift(self):
+        """test verify mode on consistent and tampered totals."""
+        self.assertEqual(FileManager.verify_totals(), {})
+        users = FileManager.load_all_users()
+        users[0].accounts[0].balance_minor += 1
+        FileManager.save_all_users(users)
+        drift = FileManager.verify_totals()
+        self.assertEqual(drift, {"7": {"USD": -1}, "bank": {"USD": -1}})
+
+    def test_bank_totals_follow_loaded_users(self):
+        """test that bank totals are kept by deltas after load and include new users."""
+        users = FileManager.load_all_users()
+        users[0].accounts[0].deposit(1, "USD")
+        self.assertEqual(BANK_TOTALS.to_dict(), {"USD": 1350})
+        newcomer = User(username="Ann", surname="Lee", user_id=8)
+        newcomer.add_account(BankAccount(account_id=1, balance=2.0, currency="EUR"))
+        users.append(newcomer)
+        FileManager.save_all_users(users)
+        self.assertEqual(FileManager.load_totals()["bank"], {"USD": 1350, "EUR": 200})
+        self.assertEqual(FileManager.verify_totals(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Unit tests for the columnar transaction table writer and reader."""
+
+import os
+import tempfile
+import unittest
+from service.columnar_store import (
+    NO_CORRELATION,
+    NO_COUNTERPARTY,
+    ColumnarReader,
+    ColumnarWriter,
+    CsvWriter,
+    split_transaction_type,
+)
+
+ROWS = [
+    (1, 10, 100, "deposit", NO_COUNTERPARTY, NO_CORRELATION, 500, "USD", 1_000),
+    (1, 10, 101, "transfer_to", 11, 101, 200, "USD", 2_000),
+    (1, 11, 102, "transfer_from", 10, 101, 184, "EUR", 2_000),
+]
+
+
+class TestColumnarStore(unittest.TestCase):
+    """Unit tests for ColumnarWriter, CsvWriter and ColumnarReader."""
+
+    def setUp(self):
+        """Create a temporary output directory."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.directory = os.path.join(self.tmp.name, "columns")
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp.cleanup()
+
+    def test_split_transaction_type(self):
+        """test that transfer types are split into base type and counterparty."""
+        self.assertEqual(split_transaction_type("transfer_to_42"), ("transfer_to", 42))
+        self.assertEqual(split_transaction_type("deposit"), ("deposit", NO_COUNTERPARTY))
+
+    def test_round_trip_over_batches(self):
+        """test that rows written in batches are read back column by column."""
+        with ColumnarWriter(self.directory) as writer:
+            writer.write_rows(ROWS[:2])
+            writer.write_rows(ROWS[2:])
+        with ColumnarReader(self.directory) as reader:
+            self.assertEqual(reader.rows, 3)
+            amounts = reader.column("amount_minor")
+            self.assertEqual(sum(amounts), 884)
+            amounts.release()
+            self.assertEqual(list(reader.column("counterparty")), [-1, 11, 10])
+            self.assertEqual(list(reader.column("correlation_id")), [-1, 101, 101])
+            self.assertEqual(reader.decode("type"), ["deposit", "transfer_to", "transfer_from"])
+            self.assertEqual(reader.decode("currency"), ["USD", "USD", "EUR"])
+
+    def test_counterparties_pair_legs_across_users(self):
+        """test that transfer legs resolve to the peer's user and account."""
+        rows = ROWS + [
+            (2, 10, 103, "transfer_to", 10, 104, 50, "USD", 3_000),
+            (3, 10, 104, "transfer_from", 10, 104, 50, "USD", 3_000),
+            (4, 1, 105, "transfer_to", 2, NO_CORRELATION, 5, "USD", 4_000),
+        ]
+        with ColumnarWriter(self.directory) as writer:
+            writer.write_rows(rows)
+        with ColumnarReader(self.directory) as reader:
+            self.assertEqual(
+                reader.counterparties(),
+                [None, (1, 11), (1, 10), (3, 10), (2, 10), (4, 2)],
+            )
+
+    def test_empty_table(self):
+        """test that a table without rows can be read."""
+        ColumnarWriter(self.directory).close()
+        reader = ColumnarReader(self.directory)
+        self.assertEqual(len(reader.column("user_id")), 0)
+        reader.close()
+
+    def test_csv_fallback(self):
+        """test that the CSV writer emits a header and one line per row."""
+        path = os.path.join(self.directory, "transactions.csv")
+        with CsvWriter(path) as writer:
+            writer.write_rows(ROWS)
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["user_id", "account_id", "transaction_id"])
+        self.assertEqual(lines[2], "1,10,101,transfer_to,11,101,200,USD,2000")
+        self.assertEqual(writer.rows, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
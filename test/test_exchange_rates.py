@@ -0,0 +1,122 @@
+"""Unit tests for the exchange-rate matrix and the hot-reloading rate engine."""
+
+import json
+import os
+import tempfile
+import unittest
+from fractions import Fraction
+from models.exchange_rates import RateEngine, RateTable
+
+
+class TestRateTable(unittest.TestCase):
+    """Unit tests for RateTable lookups and triangulation."""
+
+    def setUp(self):
+        """Build a table with USD as base and one explicit pair."""
+        self.table = RateTable.from_dict(
+            {
+                "base": "USD",
+                "rates": {"EUR": "0.92", "UAN": "39.5"},
+                "pairs": {"GBP/EUR": "1.17"},
+            }
+        )
+
+    def test_direct_rate(self):
+        """test base-to-currency rate is returned exactly."""
+        self.assertEqual(self.table.fraction("USD", "UAN"), Fraction("39.5"))
+        self.assertEqual(self.table.rate("USD", "EUR"), 0.92)
+
+    def test_triangulated_rate(self):
+        """test that cross rates are derived through the base currency."""
+        self.assertEqual(
+            self.table.fraction("EUR", "UAN"), Fraction("39.5") / Fraction("0.92")
+        )
+
+    def test_explicit_pair_and_inverse(self):
+        """test explicit pairs and their implied inverse."""
+        self.assertEqual(self.table.fraction("GBP", "EUR"), Fraction("1.17"))
+        self.assertEqual(self.table.fraction("EUR", "GBP"), 1 / Fraction("1.17"))
+        self.assertIsNone(self.table.fraction("GBP", "USD"))
+
+    def test_unknown_currency(self):
+        """test that unknown currencies return None."""
+        self.assertIsNone(self.table.rate("USD", "JPY"))
+        self.assertIsNone(self.table.row("JPY"))
+
+    def test_row_matches_lookups(self):
+        """test that row() lists rates from every currency into the target."""
+        row = self.table.row("USD")
+        for code, rate in zip(self.table.currencies, row):
+            self.assertEqual(rate, self.table.rate(code, "USD"))
+
+    def test_non_positive_rate_rejected(self):
+        """test that zero or negative rates raise ValueError."""
+        with self.assertRaises(ValueError):
+            RateTable.from_dict({"base": "USD", "rates": {"EUR": "0"}})
+
+
+class TestRateEngine(unittest.TestCase):
+    """Unit tests for loading and hot reloading the rate file."""
+
+    def setUp(self):
+        """Write a temporary rate file."""
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        self._write({"base": "USD", "rates": {"EUR": "0.92"}}, mtime=1_000_000)
+        self.engine = RateEngine(self.path, check_interval=0)
+
+    def tearDown(self):
+        """Remove the temporary rate file."""
+        os.remove(self.path)
+
+    def _write(self, data, mtime):
+        """Write rate data and pin the file mtime."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_reload_on_mtime_change(self):
+        """test that a changed file is swapped in while old tables stay intact."""
+        old_table = self.engine.table
+        self.assertEqual(old_table.rate("USD", "EUR"), 0.92)
+        self._write({"base": "USD", "rates": {"EUR": "0.95"}}, mtime=1_000_001)
+        self.assertEqual(self.engine.table.rate("USD", "EUR"), 0.95)
+        self.assertEqual(old_table.rate("USD", "EUR"), 0.92)
+
+    def test_no_reload_when_unchanged(self):
+        """test that an unchanged mtime keeps the same table object."""
+        table = self.engine.table
+        self.assertFalse(self.engine.refresh())
+        self.assertIs(self.engine.table, table)
+
+    def test_broken_file_keeps_previous_table(self):
+        """test that a malformed update does not replace a working table."""
+        table = self.engine.table
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        os.utime(self.path, (1_000_002, 1_000_002))
+        self.assertIs(self.engine.table, table)
+
+    def test_reloads_are_recorded_in_history(self):
+        """test that each table is kept from its mtime on and survives a restart."""
+        history_path = self.path + ".history.csv"
+        self.addCleanup(lambda: os.path.exists(history_path) and os.remove(history_path))
+        self.engine.configure_history(history_path)
+        self.engine.table  # pylint: disable=pointless-statement
+        self._write({"base": "USD", "rates": {"EUR": "0.95"}}, mtime=2_000_000)
+        self.engine.table  # pylint: disable=pointless-statement
+
+        for engine in (self.engine, RateEngine(self.path, history_path=history_path)):
+            history = engine.history
+            self.assertEqual(history.rate_at("USD", "EUR", 1_500_000_000_000), Fraction("0.92"))
+            self.assertEqual(history.rate_at("EUR", "USD", 2_000_000_000_000), 1 / Fraction("0.95"))
+            self.assertIsNone(history.rate_at("USD", "EUR", 999_999_000_000))
+
+    def test_missing_file_uses_defaults(self):
+        """test that a missing rate file falls back to built-in rates."""
+        engine = RateEngine(self.path + ".missing")
+        self.assertEqual(engine.table.rate("USD", "UAN"), 39.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Unit tests for ExportService."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from models.account import BankAccount
+from models.user import User
+from service.columnar_store import ColumnarReader
+from service.export_service import ExportService
+
+
+class TestExportService(unittest.TestCase):
+    """Unit tests for streaming transaction export."""
+
+    def setUp(self):
+        """Write a users file with a transfer between two accounts."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.users_path = os.path.join(self.tmp.name, "users.json")
+        users = []
+        for user_id in (1, 2, 3):
+            user = User("Name", "Surname", user_id)
+            first = BankAccount(1, 0, "USD")
+            second = BankAccount(2, 0, "USD")
+            user.add_account(first)
+            user.add_account(second)
+            first.deposit(10, "USD")
+            first.transfer(second, 4, "USD")
+            users.append(user)
+        with open(self.users_path, "w", encoding="utf-8") as f:
+            json.dump([u.to_dict(True) for u in users], f, indent=4)
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp.cleanup()
+
+    def test_columnar_export_in_small_chunks(self):
+        """test that exporting chunk by chunk yields every transaction once."""
+        out = os.path.join(self.tmp.name, "columns")
+        count = ExportService.export_transactions(
+            out, users_path=self.users_path, chunk_bytes=200
+        )
+        self.assertEqual(count, 9)
+        with ColumnarReader(out) as reader:
+            self.assertEqual(list(reader.column("user_id")), [1, 1, 1, 2, 2, 2, 3, 3, 3])
+            self.assertEqual(reader.decode("type")[:3], ["deposit", "transfer_to", "transfer_from"])
+            self.assertEqual(list(reader.column("counterparty"))[:3], [-1, 2, 1])
+            self.assertEqual(reader.counterparties()[:3], [None, (1, 2), (1, 1)])
+
+    def test_csv_export(self):
+        """test that the CSV format writes one line per transaction."""
+        out = os.path.join(self.tmp.name, "transactions.csv")
+        count = ExportService.export_transactions(out, "csv", users_path=self.users_path)
+        with open(out, "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), count + 1)
+
+    def test_unknown_format_is_rejected(self):
+        """test that an unknown format raises ValueError."""
+        with self.assertRaises(ValueError):
+            ExportService.export_transactions("out", "parquet", users_path=self.users_path)
+
+    @patch("builtins.print")
+    def test_cli_reports_count(self, mock_print):
+        """test that the CLI prints how many transactions were exported."""
+        out = os.path.join(self.tmp.name, "columns")
+        with patch("service.export_service.FileManager.USERS_FILE", self.users_path):
+            ExportService.export(MagicMock(out=out, format="columnar"))
+        mock_print.assert_called_once_with(f"Exported 9 transactions to {out}")
+
+
+if __name__ == "__main__":
+    unittest.main()
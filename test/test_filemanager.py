@@ -1,8 +1,12 @@
 """Unit tests for the FileManager class in the SimpleBankSystem application."""
 
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open
 import json
+from models.account import BankAccount
+from models.account_index import AccountIndex, IndexEntry, IndexReader
 from service.file_manager import FileManager
 from models.user import User
 
@@ -16,31 +20,41 @@ class TestFileManager(unittest.TestCase):
         self.user2 = User(user_id=2, username="Bob", surname="Johnson")
         self.users = [self.user1, self.user2]
 
+    @patch("service.file_manager.FileManager._users_file_lock")
+    @patch("service.file_manager.os.replace")
+    @patch("service.file_manager.FileManager.save_totals")
     @patch("service.file_manager.os.makedirs")
     @patch("builtins.open", new_callable=mock_open)
     @patch("json.dump")
-    def test_save_all_users(self, mock_json_dump, mock_file, mock_makedirs):
+    def test_save_all_users(
+        self, mock_json_dump, mock_file, mock_makedirs, mock_save_totals, mock_replace, mock_lock
+    ):
         """
         test saving a list of users to a file.
 
         Checks:
         - Directory creation with `os.makedirs`
-        - File is opened correctly
+        - A temporary file is written and renamed over the users file under the lock
         - Data is serialized and written via `json.dump`
         """
         FileManager.save_all_users(self.users)
 
         mock_makedirs.assert_called_once_with("data", exist_ok=True)
-        mock_file.assert_called_once_with(FileManager.USERS_FILE, "w", encoding="utf-8")
+        temp_path = FileManager.USERS_FILE + ".tmp"
+        mock_file.assert_called_once_with(temp_path, "w", encoding="utf-8")
+        mock_replace.assert_called_once_with(temp_path, FileManager.USERS_FILE)
+        mock_lock.assert_called_once_with()
 
         expected_data = [user.to_dict() for user in self.users]
         mock_json_dump.assert_called_once_with(
             expected_data, mock_file(), indent=4, ensure_ascii=False
         )
+        mock_save_totals.assert_called_once_with(self.users)
 
+    @patch("service.file_manager.FileManager._users_file_lock")
     @patch("service.file_manager.os.path.exists", return_value=True)
     @patch("builtins.open", new_callable=mock_open)
-    def test_load_all_users(self, mock_file, _mock_exists):
+    def test_load_all_users(self, mock_file, _mock_exists, _mock_lock):
         """
         test loading users from a file when it exists.
 
@@ -73,5 +87,112 @@ class TestFileManager(unittest.TestCase):
         self.assertEqual(users, [])
 
 
+class TestAppendUser(unittest.TestCase):
+    """Unit tests for adding one user without rewriting the users file."""
+
+    def setUp(self):
+        """Point the users file at a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp.name, "users.json")
+        self.patch = patch.object(FileManager, "USERS_FILE", self.path)
+        self.patch.start()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def _read(self) -> str:
+        """Contents of the users file."""
+        with open(self.path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_append_matches_full_save(self):
+        """test that appending gives the same bytes as writing the whole list."""
+        users = [User("Alice", "Smith", 1), User("Нікіта", "Коваль", 2), User("Bob", "Ray", 3)]
+        for user in users:
+            FileManager.append_user(user)
+        appended = self._read()
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(
+                [u.to_dict(FileManager.EPOCH_TIMESTAMPS) for u in users], f, indent=4, ensure_ascii=False
+            )
+        self.assertEqual(appended, self._read())
+        self.assertEqual([u.user_id for u in FileManager.load_all_users()], [1, 2, 3])
+
+    def test_append_to_empty_list(self):
+        """test appending to a file holding an empty list."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("[]\n")
+        FileManager.append_user(User("Alice", "Smith", 7))
+        self.assertEqual([u.user_id for u in FileManager.load_all_users()], [7])
+
+    def test_saved_account_index_follows_saves_and_appends(self):
+        """test that a reload of the saved users only logs changed accounts in the index."""
+        user = User("Alice", "Smith", 1)
+        user.add_account(BankAccount(1, 100, "USD"))
+        index = AccountIndex(os.path.join(self.tmp.name, "index"))
+        with patch("service.file_manager.ACCOUNT_INDEX", index), patch(
+            "service.file_manager.FileManager.save_totals"
+        ):
+            FileManager.save_all_users([user])
+            FileManager.append_user(User("Bob", "Ray", 2))
+            users = FileManager.load_all_users()
+            self.assertIsNone(index._lists)  # pylint: disable=protected-access
+            users[0].accounts[0].deposit(20, "USD")
+            FileManager.save_all_users(users)
+
+        reader = IndexReader(index.path)
+        self.assertEqual(reader.manifest["changes"], 1)
+        self.assertEqual(reader.top("balance", "USD"), [IndexEntry(1, 1, 12000)])
+
+    def test_edited_users_file_makes_the_saved_index_stale(self):
+        """test that an edited users file is not answered from the saved index until rebuilt."""
+        user = User("Alice", "Smith", 1)
+        user.add_account(BankAccount(1, 100, "USD"))
+        index = AccountIndex(os.path.join(self.tmp.name, "index"))
+        with patch("service.file_manager.ACCOUNT_INDEX", index), patch(
+            "service.file_manager.FileManager.save_totals"
+        ):
+            FileManager.save_all_users([user])
+            self.assertIsNotNone(index.reader(FileManager.users_file_stamp()))
+            data = json.loads(self._read())
+            data[0]["accounts"][0]["balance"] = 250.0
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            self.assertIsNone(index.reader(FileManager.users_file_stamp()))
+
+            FileManager.load_all_users()
+            FileManager.save_account_index()
+
+        reader = index.reader(FileManager.users_file_stamp())
+        self.assertEqual(reader.top("balance", "USD"), [IndexEntry(1, 1, 25000)])
+
+    def test_save_keeps_users_appended_since_load(self):
+        """test that a save after a load does not drop users another process appended."""
+        FileManager.append_user(User("Alice", "Smith", 1))
+        users = FileManager.load_all_users()
+        FileManager.append_user(User("Bob", "Ray", 2))
+        users[0].username = "Alicia"
+        with patch.object(FileManager, "TOTALS_FILE", os.path.join(self.tmp.name, "totals.json")):
+            FileManager.save_all_users(users)
+            FileManager.append_user(User("Нікіта", "Коваль", 3))
+            FileManager.save_all_users(users)
+
+        stored = FileManager.load_all_users()
+        self.assertEqual(
+            [(u.user_id, u.username) for u in stored], [(1, "Alicia"), (2, "Bob"), (3, "Нікіта")]
+        )
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_append_rejects_other_content(self):
+        """test that a file not ending with a list is left alone."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{}")
+        with self.assertRaises(ValueError):
+            FileManager.append_user(User("Alice", "Smith", 7))
+        self.assertEqual(self._read(), "{}")
+
+
 if __name__ == "__main__":
     unittest.main()
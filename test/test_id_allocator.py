@@ -0,0 +1,98 @@
+"""Unit tests for the block-leasing IdAllocator."""
+
+import os
+import tempfile
+import unittest
+from models.account import BankAccount
+from models.id_allocator import IdAllocator
+
+
+class TestIdAllocator(unittest.TestCase):
+    """Unit tests for in-memory and persisted ID allocation."""
+
+    def setUp(self):
+        """Create a temporary directory for state files."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp.name, "ids.json")
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp.cleanup()
+
+    def test_in_memory_sequence(self):
+        """test that an in-memory allocator counts up from 1."""
+        allocator = IdAllocator(block_size=3)
+        self.assertEqual([allocator.next_id() for _ in range(5)], [1, 2, 3, 4, 5])
+
+    def test_two_workers_get_disjoint_blocks(self):
+        """test that allocators sharing a file never hand out the same ID."""
+        first = IdAllocator(self.path, block_size=10)
+        second = IdAllocator(self.path, block_size=10)
+        ids = [first.next_id(), second.next_id(), first.next_id(), second.next_id()]
+        self.assertEqual(ids, [1, 11, 2, 12])
+        self.assertEqual(first.peek(), 21)
+
+    def test_restart_skips_unused_block(self):
+        """test that a new process continues after the last leased block."""
+        IdAllocator(self.path, block_size=10).next_id()
+        self.assertEqual(IdAllocator(self.path, block_size=10).next_id(), 11)
+
+    def test_release_returns_the_unused_block(self):
+        """test that a released block is reused unless another process leased after it."""
+        first = IdAllocator(self.path, block_size=10)
+        first.next_id()
+        first.release()
+        second = IdAllocator(self.path, block_size=10)
+        self.assertEqual(second.next_id(), 2)
+        third = IdAllocator(self.path, block_size=10)
+        third.next_id()
+        second.release()
+        self.assertEqual(IdAllocator(self.path, block_size=10).next_id(), 22)
+        self.assertEqual(second.next_id(), 22 + 10)
+
+    def test_next_ids_contiguous(self):
+        """test bulk allocation inside and beyond the current block."""
+        allocator = IdAllocator(self.path, block_size=10)
+        allocator.next_id()
+        self.assertEqual(allocator.next_ids(3), range(2, 5))
+        self.assertEqual(allocator.next_ids(20), range(11, 31))
+
+    def test_ensure_above(self):
+        """test that ensure_above moves allocation past existing IDs."""
+        allocator = IdAllocator(block_size=10)
+        allocator.next_id()
+        allocator.ensure_above(500)
+        self.assertEqual(allocator.next_id(), 501)
+
+    def test_invalid_block_size(self):
+        """test that a non-positive block size raises ValueError."""
+        with self.assertRaises(ValueError):
+            IdAllocator(block_size=0)
+
+
+class TestTransactionIds(unittest.TestCase):
+    """Unit tests for bank-wide transaction IDs and transfer correlation."""
+
+    def test_ids_unique_across_accounts(self):
+        """test that two accounts never produce the same transaction ID."""
+        first = BankAccount(account_id=1, balance=100, currency="USD")
+        second = BankAccount(account_id=2, balance=100, currency="USD")
+        first.deposit(1, "USD")
+        second.deposit(1, "USD")
+        first.transfer(second, 5, "USD")
+        ids = [t.transaction_id for t in first.transactions + second.transactions]
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_transfer_legs_share_correlation_id(self):
+        """test that both transfer legs carry the same correlation ID."""
+        first = BankAccount(account_id=1, balance=100, currency="USD")
+        second = BankAccount(account_id=2, balance=0, currency="EUR")
+        first.transfer(second, 5, "USD")
+        out_leg, in_leg = first.transactions[-1], second.transactions[-1]
+        self.assertIsNotNone(out_leg.correlation_id)
+        self.assertEqual(out_leg.correlation_id, in_leg.correlation_id)
+        self.assertEqual(out_leg.to_dict()["correlation_id"], out_leg.correlation_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""Unit tests for the idempotency-key store and its use in AccountService."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from models.account import BankAccount
+from service.account_service import AccountService
+from service.idempotency import IdempotencyError, IdempotencyStore
+
+
+class TestIdempotencyStore(unittest.TestCase):
+    """Unit tests for lookup, eviction, expiry and persistence."""
+
+    def setUp(self):
+        """Create a temporary directory for the persisted table."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp.name, "idempotency")
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp.cleanup()
+
+    def test_replay_returns_original_result(self):
+        """test that a known key returns the stored result."""
+        store = IdempotencyStore()
+        self.assertIsNone(store.get("k1", "deposit:1:5"))
+        store.put("k1", "deposit:1:5", "ok")
+        self.assertEqual(store.get("k1", "deposit:1:5"), "ok")
+
+    def test_key_reuse_for_other_request_raises(self):
+        """test that a key used with different parameters is rejected."""
+        store = IdempotencyStore()
+        store.put("k1", "deposit:1:5", "ok")
+        with self.assertRaises(IdempotencyError):
+            store.get("k1", "deposit:1:6")
+
+    def test_memory_is_bounded(self):
+        """test that the least recently used key is evicted from memory."""
+        store = IdempotencyStore(max_entries=2)
+        store.put("a", "f", "1")
+        store.put("b", "f", "2")
+        store.get("a", "f")
+        store.put("c", "f", "3")
+        self.assertIsNone(store.get("b", "f"))
+        self.assertEqual(store.get("a", "f"), "1")
+
+    def test_expired_key_is_forgotten(self):
+        """test that keys older than the TTL are treated as new."""
+        store = IdempotencyStore(ttl=0)
+        store.put("k1", "f", "ok")
+        self.assertIsNone(store.get("k1", "f"))
+
+    def test_persisted_key_survives_eviction_and_restart(self):
+        """test that the on-disk table answers for keys no longer in memory."""
+        store = IdempotencyStore(self.path, max_entries=1)
+        store.put("a", "f", "1")
+        store.put("b", "f", "2")
+        self.assertEqual(store.get("a", "f"), "1")
+        self.assertEqual(IdempotencyStore(self.path).get("b", "f"), "2")
+
+    def test_purge_expired_removes_persisted_keys(self):
+        """test that purge_expired drops expired entries from disk."""
+        store = IdempotencyStore(self.path, ttl=0)
+        store.put("a", "f", "1")
+        self.assertEqual(store.purge_expired(), 1)
+
+    def test_opening_the_table_drops_expired_keys(self):
+        """test that expired keys are removed when another process opens the table."""
+        IdempotencyStore(self.path, ttl=0).put("a", "f", "1")
+        store = IdempotencyStore(self.path)
+        self.assertIsNone(store.get("b", "f"))
+        self.assertEqual(store.purge_expired(), 0)
+
+    def test_reservation_is_claimed_once(self):
+        """test that a key reserved by one process is refused to another until released."""
+        first = IdempotencyStore(self.path)
+        second = IdempotencyStore(self.path)
+        self.assertIsNone(first.reserve("k1", "f"))
+        with self.assertRaises(IdempotencyError):
+            second.reserve("k1", "f")
+        first.release("k1")
+        self.assertIsNone(second.reserve("k1", "f"))
+        second.put("k1", "f", "ok")
+        self.assertEqual(first.reserve("k1", "f"), "ok")
+        with self.assertRaises(IdempotencyError):
+            first.reserve("k1", "other")
+
+    def test_stale_reservation_expires(self):
+        """test that a reservation left by a crashed process blocks only for the lease."""
+        IdempotencyStore(self.path, lease=0).reserve("k1", "f")
+        self.assertIsNone(IdempotencyStore(self.path).reserve("k1", "f"))
+
+
+class TestAccountServiceIdempotency(unittest.TestCase):
+    """Unit tests for idempotent deposits and CLI handlers."""
+
+    def setUp(self):
+        """Use a fresh in-memory store for each test."""
+        patcher = patch.object(AccountService, "IDEMPOTENCY", IdempotencyStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retried_deposit_is_applied_once(self):
+        """test that repeating a deposit with the same key does not double it."""
+        account = BankAccount(1, 0, "USD")
+        first = AccountService.deposit_to_account(account, 10, "USD", "key-1")
+        second = AccountService.deposit_to_account(account, 10, "USD", "key-1")
+        self.assertEqual(first, second)
+        self.assertEqual(account.balance, 10)
+        self.assertEqual(len(account.transactions), 1)
+
+    def test_deposit_without_key_always_applies(self):
+        """test that calls without a key are not deduplicated."""
+        account = BankAccount(1, 0, "USD")
+        AccountService.deposit_to_account(account, 10, "USD")
+        AccountService.deposit_to_account(account, 10, "USD")
+        self.assertEqual(account.balance, 20)
+
+    def test_reused_key_is_reported(self):
+        """test that a key reused for another amount returns an error message."""
+        account = BankAccount(1, 0, "USD")
+        AccountService.deposit_to_account(account, 10, "USD", "key-1")
+        result = AccountService.deposit_to_account(account, 20, "USD", "key-1")
+        self.assertIn("Idempotency error", result)
+        self.assertEqual(account.balance, 10)
+
+    @patch("builtins.print")
+    @patch("service.file_manager.FileManager.save_all_users")
+    @patch("service.file_manager.FileManager.load_all_users")
+    def test_cli_retry_skips_load_and_save(self, mock_load, mock_save, mock_print):
+        """test that a replayed CLI deposit prints the stored result only."""
+        account = BankAccount(1, 0, "USD")
+        user = MagicMock(user_id=1)
+        user.get_account_by_id.return_value = account
+        mock_load.return_value = [user]
+        args = MagicMock(user_id=1, account_id=1, amount=5.0, idempotency_key="cli-1")
+
+        AccountService.deposit(args)
+        AccountService.deposit(args)
+
+        self.assertEqual(mock_load.call_count, 1)
+        self.assertEqual(mock_save.call_count, 1)
+        self.assertEqual(account.balance, 5)
+        self.assertEqual(mock_print.call_args_list[0], mock_print.call_args_list[1])
+
+    @patch("builtins.print")
+    @patch("service.file_manager.FileManager.save_all_users")
+    @patch("service.file_manager.FileManager.load_all_users")
+    def test_cli_key_is_reserved_before_loading(self, mock_load, mock_save, mock_print):
+        """test that a key in use by another run stops the request and an unapplied one is released."""
+        args = MagicMock(user_id=1, account_id=1, amount=5.0, idempotency_key="cli-1")
+        AccountService.IDEMPOTENCY.reserve("cli-1", "deposit:1:1:5.0")
+        AccountService.deposit(args)
+        mock_load.assert_not_called()
+        self.assertIn("Idempotency error", mock_print.call_args.args[0])
+
+        AccountService.IDEMPOTENCY.release("cli-1")
+        mock_load.return_value = []
+        AccountService.deposit(args)
+        mock_print.assert_called_with("User not found")
+        self.assertIsNone(AccountService.IDEMPOTENCY.reserve("cli-1", "deposit:1:1:5.0"))
+        mock_save.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Unit tests for the interest and fee batch."""
+
+import unittest
+from array import array
+from fractions import Fraction
+from unittest.mock import MagicMock, patch
+from models.account import BankAccount
+from models.ledger import Ledger
+from models.money import convert_minor, convert_minor_many
+from models.user import User
+from service.account_service import AccountService
+from service.idempotency import IdempotencyStore
+from service.interest_service import InterestService
+
+RATES = {"USD": (Fraction("0.0365"), 150), "EUR": (Fraction("0.073"), 200)}
+
+
+class TestInterestService(unittest.TestCase):
+    """Unit tests for computing and applying batches."""
+
+    def setUp(self):
+        """Create a user with accounts in two currencies on a fresh ledger."""
+        self.ledger = Ledger()
+        self.user = User("Ann", "Lee", 1)
+        for account_id, balance, currency in (
+            (1, 1000, "USD"),
+            (2, 1, "USD"),
+            (3, 0, "USD"),
+            (4, 500, "EUR"),
+            (5, 70, "UAN"),
+        ):
+            account = BankAccount(account_id, balance, currency)
+            account.ledger = self.ledger
+            self.user.add_account(account)
+        patcher = patch.object(AccountService, "IDEMPOTENCY", IdempotencyStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_convert_minor_many_matches_convert_minor(self):
+        """test that the batch conversion rounds exactly like convert_minor."""
+        rate = Fraction(1, 4)
+        values = array("q", [-7, -2, 0, 2, 6, 10, 14, 12345])
+        self.assertEqual(
+            list(convert_minor_many(values, rate)), [convert_minor(v, rate) for v in values]
+        )
+
+    def test_interest_amounts(self):
+        """test that daily interest is computed per balance and never negative."""
+        amounts = InterestService.interest_amounts(array("q", [100_000, -500, 0]), Fraction("0.0365"))
+        self.assertEqual(list(amounts), [10, 0, 0])
+
+    def test_fee_amounts_never_overdraw(self):
+        """test that the fee is capped at the available balance."""
+        amounts = InterestService.fee_amounts(array("q", [1000, 100, 0]), 150)
+        self.assertEqual(list(amounts), [150, 100, 0])
+
+    def test_interest_batch_applies_in_bulk(self):
+        """test that interest is credited with one journal entry per currency."""
+        summary = InterestService.run_batch([self.user], "interest", days=10, rates=RATES)
+
+        self.assertEqual(summary, {"USD": (1, 100), "EUR": (1, 100)})
+        usd = self.user.get_account_by_id(1)
+        self.assertEqual(usd.balance_minor, 100_100)
+        self.assertEqual(usd.transactions[-1].transaction_type, "interest")
+        self.assertEqual(self.user.get_account_by_id(2).transactions, [])
+        self.assertEqual([e.kind for e in self.ledger.entries], ["interest", "interest"])
+        self.assertEqual(self.ledger.balance("interest:USD"), -100)
+        self.assertEqual(self.user.get_balances_by_currency_minor()["USD"], 100_200)
+
+    def test_fee_batch_debits_accounts(self):
+        """test that fees reduce balances and are booked as fee income."""
+        summary = InterestService.run_batch([self.user], "fee", rates=RATES)
+
+        self.assertEqual(summary["USD"], (2, 250))
+        self.assertEqual(self.user.get_account_by_id(2).balance_minor, 0)
+        self.assertEqual(self.ledger.balance("fees:USD"), 250)
+        self.assertEqual(self.user.get_account_by_id(1).transactions[-1].signed_amount_minor(), -150)
+        self.assertEqual(self.user.get_account_by_id(5).transactions, [])
+
+    def test_unknown_kind_is_rejected(self):
+        """test that only interest and fee batches exist."""
+        with self.assertRaises(ValueError):
+            InterestService.run_batch([self.user], "bonus", rates=RATES)
+
+    @patch("builtins.print")
+    @patch("service.interest_service.FileManager.save_all_users")
+    @patch("service.interest_service.FileManager.load_all_users")
+    def test_cli_saves_once(self, mock_load, mock_save, mock_print):
+        """test that the CLI batch saves the users file once."""
+        mock_load.return_value = [self.user]
+        with patch.object(InterestService, "load_rates", return_value=RATES):
+            InterestService.accrue(MagicMock(kind="fee", days=1))
+        mock_save.assert_called_once_with([self.user])
+        mock_print.assert_any_call("fee USD: 2 accounts, 2.5")
+
+    @patch("builtins.print")
+    @patch("service.interest_service.FileManager.save_all_users")
+    @patch("service.interest_service.FileManager.load_all_users")
+    def test_cli_runs_once_per_day(self, mock_load, mock_save, mock_print):
+        """test that a second accrual of the same kind on the same day changes nothing."""
+        mock_load.return_value = [self.user]
+        with patch.object(InterestService, "load_rates", return_value=RATES):
+            InterestService.accrue(MagicMock(kind="fee", days=1))
+            InterestService.accrue(MagicMock(kind="fee", days=1))
+            InterestService.accrue(MagicMock(kind="interest", days=1))
+
+        self.assertEqual(mock_load.call_count, 2)
+        # One fee of 1.50, then a day of 3.65% interest on the rest.
+        self.assertEqual(self.user.get_account_by_id(1).balance_minor, 99_860)
+        mock_print.assert_any_call("fee batch already ran today")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,278 @@
+"""Unit tests for the double-entry ledger and its use by BankAccount."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from models.account import BankAccount
+from models.ledger import JournalEntry, Ledger, Posting
+from models.user import User
+from service.account_service import AccountService
+from service.file_manager import FileManager
+
+
+def _deposit_entry(entry_id, amount_minor, account="a"):
+    """Builds a balanced deposit entry for tests."""
+    return JournalEntry(
+        entry_id,
+        entry_id,
+        "deposit",
+        (Posting(account, "USD", amount_minor), Posting("external:USD", "USD", -amount_minor)),
+    )
+
+
+class TestLedger(unittest.TestCase):
+    """Unit tests for posting, persistence and replay."""
+
+    def setUp(self):
+        """Create a temporary directory for the journal."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp.name, "ledger.log")
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp.cleanup()
+
+    def test_post_updates_balances(self):
+        """test that posting an entry materializes both sides."""
+        ledger = Ledger()
+        ledger.post(_deposit_entry(1, 500))
+        self.assertEqual(ledger.balance("a"), 500)
+        self.assertEqual(ledger.balance("external:USD"), -500)
+        self.assertEqual(ledger.entry_count, 1)
+
+    def test_unbalanced_entry_is_rejected(self):
+        """test that postings must sum to zero per currency."""
+        ledger = Ledger()
+        entry = JournalEntry(1, 1, "deposit", (Posting("a", "USD", 5),))
+        with self.assertRaises(ValueError):
+            ledger.post(entry)
+        self.assertEqual(ledger.entry_count, 0)
+
+    def test_reload_replays_journal_after_snapshot(self):
+        """test that a new ledger restores balances from snapshot plus journal suffix."""
+        ledger = Ledger(self.path, snapshot_interval=3)
+        for entry_id in range(1, 6):
+            ledger.post(_deposit_entry(entry_id, 100))
+            ledger.flush()
+        self.assertEqual(len(os.listdir(self.path + ".snapshots")), 1)
+
+        restored = Ledger(self.path)
+        restored.load()
+        self.assertEqual(restored.balance("a"), 500)
+        self.assertEqual(restored.entry_count, 5)
+        self.assertEqual(restored.verify(), {})
+
+    def test_point_in_time_stops_at_timestamp(self):
+        """test that balances_at replays only entries up to the given time."""
+        ledger = Ledger(self.path, snapshot_interval=2)
+        for entry_id in range(1, 8):
+            ledger.post(_deposit_entry(entry_id, 100))
+            ledger.flush()
+        ledger.post(_deposit_entry(8, 100))
+        self.assertEqual(ledger.balances_at(3)["a"], 300)
+        self.assertEqual(ledger.balances_at(6)["a"], 600)
+        self.assertEqual(ledger.balances_at(8)["a"], 800)
+        self.assertEqual(ledger.balance("a"), 800)
+
+    def test_point_in_time_includes_entries_flushed_out_of_order(self):
+        """test that balances_at filters on the time stamp, not on journal order."""
+        ledger = Ledger(self.path, snapshot_interval=2)
+        postings = _deposit_entry(0, 100).postings
+        for entry_id, time_stamp_us in ((1, 10), (2, 30), (3, 20), (4, 5)):
+            ledger.post(JournalEntry(entry_id, time_stamp_us, "deposit", postings))
+            ledger.flush()
+        ledger.post(JournalEntry(5, 1, "deposit", postings))
+        self.assertEqual(ledger.balances_at(1)["a"], 100)
+        self.assertEqual(ledger.balances_at(10)["a"], 300)
+        self.assertEqual(ledger.balances_at(25)["a"], 400)
+        self.assertEqual(ledger.balances_at(30)["a"], 500)
+
+    def test_old_snapshots_are_pruned(self):
+        """test that only snapshots_kept snapshots are retained."""
+        ledger = Ledger(self.path, snapshot_interval=1, snapshots_kept=2)
+        for entry_id in range(1, 6):
+            ledger.post(_deposit_entry(entry_id, 100))
+            ledger.flush()
+        names = sorted(os.listdir(self.path + ".snapshots"))
+        self.assertEqual(len(names), 2)
+        self.assertTrue(names[-1].startswith("000000000005-5"))
+        self.assertEqual(ledger.balances_at(1)["a"], 100)
+
+    def test_load_seeks_past_snapshot(self):
+        """test that journal lines covered by a snapshot are not parsed again."""
+        ledger = Ledger(self.path, snapshot_interval=2)
+        for entry_id in range(1, 4):
+            ledger.post(_deposit_entry(entry_id, 100))
+        ledger.flush()
+        with open(self.path, "r+b") as f:
+            f.write(b"#")
+        restored = Ledger(self.path)
+        restored.load()
+        self.assertEqual(restored.balance("a"), 300)
+
+    def test_torn_final_line_is_truncated(self):
+        """test that a partially written last entry is dropped on load."""
+        ledger = Ledger(self.path)
+        ledger.post(_deposit_entry(1, 100))
+        ledger.flush()
+        with open(self.path, "ab") as f:
+            f.write(b'{"id":2,"ts":2,"ki')
+        restored = Ledger(self.path)
+        restored.load()
+        restored.post(_deposit_entry(3, 50))
+        restored.flush()
+
+        reloaded = Ledger(self.path)
+        reloaded.load()
+        self.assertEqual(reloaded.balance("a"), 150)
+        self.assertEqual(reloaded.entry_count, 2)
+
+    def test_flush_applies_entries_of_other_processes(self):
+        """test that a flush after another process's append keeps counts and offsets exact."""
+        first = Ledger(self.path, snapshot_interval=3)
+        second = Ledger(self.path, snapshot_interval=3)
+        first.load()
+        second.load()
+        first.post(_deposit_entry(1, 100))
+        second.post(_deposit_entry(2, 50))
+        second.flush()
+        first.post(_deposit_entry(3, 10))
+        first.flush()
+        self.assertEqual(first.balance("a"), 160)
+        self.assertEqual(first.entry_count, 3)
+
+        restored = Ledger(self.path)
+        restored.load()
+        self.assertEqual(restored.balance("a"), 160)
+        self.assertEqual(restored.entry_count, 3)
+        self.assertEqual(restored.verify(), {})
+
+    def test_in_memory_journal_is_bounded(self):
+        """test that an in-memory ledger folds old entries instead of keeping them all."""
+        ledger = Ledger(memory_entries=4)
+        for entry_id in range(1, 11):
+            ledger.post(_deposit_entry(entry_id, 100))
+        self.assertLessEqual(len(ledger.entries), 4)
+        self.assertEqual(ledger.balance("a"), 1000)
+        self.assertEqual(ledger.entry_count, 10)
+        self.assertEqual(ledger.verify(), {})
+        self.assertEqual(ledger.balances_at(9)["a"], 900)
+        with self.assertRaises(ValueError):
+            ledger.balances_at(2)
+
+    def test_tab_in_field_is_rejected(self):
+        """test that entries that cannot be written as one journal line are refused."""
+        ledger = Ledger()
+        with self.assertRaises(ValueError):
+            ledger.post(_deposit_entry(1, 100, account="bad\tkey"))
+
+    @patch("builtins.print")
+    def test_cli_prints_balances_at_time(self, mock_print):
+        """test that ledger-balances --at prints the recovered balances."""
+        ledger = Ledger(self.path)
+        ledger.post(_deposit_entry(1, 100))
+        ledger.post(_deposit_entry(2_000_000, 100))
+        ledger.flush()
+        with patch("service.account_service.LEDGER", ledger):
+            AccountService.ledger_balances(MagicMock(at="1970-01-01T00:00:01+00:00"))
+        mock_print.assert_any_call("a: 1.0")
+
+    def test_verify_reports_drift(self):
+        """test that a materialized balance differing from the journal is reported."""
+        ledger = Ledger(self.path)
+        ledger.post(_deposit_entry(1, 100))
+        ledger.flush()
+        ledger.balances["a"] += 7
+        self.assertEqual(ledger.verify(), {"a": 7})
+
+
+class TestAccountPostings(unittest.TestCase):
+    """Unit tests for the journal entries BankAccount operations post."""
+
+    def setUp(self):
+        """Attach two accounts to a fresh ledger."""
+        self.ledger = Ledger()
+        self.usd = BankAccount(1, 0, "USD")
+        self.eur = BankAccount(2, 0, "EUR")
+        for account in (self.usd, self.eur):
+            account.ledger = self.ledger
+
+    def test_deposit_and_withdraw_post_against_external(self):
+        """test that cash movements post one balanced entry each."""
+        self.usd.deposit(100, "USD")
+        self.usd.withdraw(40, "USD")
+        self.assertEqual([e.kind for e in self.ledger.entries], ["deposit", "withdraw"])
+        self.assertEqual(self.ledger.balance(self.usd.ledger_key), self.usd.balance_minor)
+        self.assertEqual(self.ledger.balance("external:USD"), -6000)
+
+    def test_transfer_is_one_entry_with_fx_legs(self):
+        """test that a cross-currency transfer is one entry balanced per currency."""
+        self.usd.deposit(100, "USD")
+        self.usd.transfer(self.eur, 50, "USD")
+        entry = self.ledger.entries[-1]
+        self.assertEqual(entry.kind, "transfer")
+        self.assertTrue(entry.is_balanced())
+        self.assertEqual(entry.entry_id, self.eur.transactions[-1].correlation_id)
+        self.assertEqual(self.ledger.balance(self.eur.ledger_key), self.eur.balance_minor)
+        self.assertEqual(self.ledger.balance("fx:USD"), 5000)
+
+    def test_balance_setter_posts_adjustment(self):
+        """test that setting the balance directly is journaled against equity."""
+        self.usd.balance = 12.5
+        self.assertEqual(self.ledger.entries[-1].kind, "adjustment")
+        self.assertEqual(self.ledger.balance("equity:USD"), -1250)
+
+    def test_user_scopes_ledger_keys(self):
+        """test that accounts added to a user get user-scoped ledger keys."""
+        user = User("Ann", "Lee", 7)
+        user.add_account(self.usd)
+        self.assertEqual(self.usd.ledger_key, "user:7/account:1")
+
+
+class TestMaterializeFromLedger(unittest.TestCase):
+    """Unit tests for reconciling loaded balances with the ledger."""
+
+    def setUp(self):
+        """Patch FileManager to use a ledger journaled in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.ledger = Ledger(os.path.join(self.tmp.name, "ledger.log"))
+        patcher = patch("service.file_manager.LEDGER", self.ledger)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_legacy_account_is_opened_and_stale_balance_corrected(self):
+        """test that unseen accounts are opened and stale balances follow the ledger."""
+        user = User("Ann", "Lee", 1)
+        user.add_account(BankAccount(1, 10, "USD"))
+        FileManager.materialize_from_ledger([user])
+        self.assertEqual(self.ledger.balance("user:1/account:1"), 1000)
+        self.assertEqual(self.ledger.entries[-1].kind, "open")
+
+        stale = User("Ann", "Lee", 1)
+        stale.add_account(BankAccount(1, 3, "USD"))
+        FileManager.materialize_from_ledger([stale])
+        self.assertEqual(stale.accounts[0].balance_minor, 1000)
+        self.assertEqual(stale.get_total_balance_minor(), 1000)
+
+    @patch("service.file_manager.TRANSACTION_IDS")
+    def test_matching_load_changes_nothing(self, ids):
+        """test that loading accounts the ledger agrees with allocates no IDs and bumps no versions."""
+        ids.next_ids.return_value = range(1, 2)
+        user = User("Ann", "Lee", 1)
+        user.add_account(BankAccount(1, 10, "USD"))
+        FileManager.materialize_from_ledger([user])
+        ids.reset_mock()
+
+        loaded = User("Ann", "Lee", 1)
+        loaded.add_account(BankAccount(1, 10, "USD"))
+        version = loaded.version
+        FileManager.materialize_from_ledger([loaded])
+        self.assertEqual(ids.mock_calls, [])
+        self.assertEqual(loaded.version, version)
+        self.assertEqual(self.ledger.entry_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Unit tests for the integer minor-unit money helpers."""
+
+import unittest
+from fractions import Fraction
+from models.money import convert_minor, from_minor, to_minor
+from models.account import BankAccount
+
+
+class TestMoney(unittest.TestCase):
+    """Unit tests for to_minor, from_minor and convert_minor."""
+
+    def test_to_minor(self):
+        """test conversion of ints and floats to minor units."""
+        self.assertEqual(to_minor(12), 1200)
+        self.assertEqual(to_minor(12.34), 1234)
+        self.assertEqual(to_minor(0.1 + 0.2), 30)
+
+    def test_from_minor(self):
+        """test conversion of minor units back to floats."""
+        self.assertEqual(from_minor(1234), 12.34)
+        self.assertIsInstance(from_minor(0), float)
+
+    def test_convert_rounds_half_to_even(self):
+        """test that exact halves round to the even cent."""
+        self.assertEqual(convert_minor(1, Fraction(1, 2)), 0)
+        self.assertEqual(convert_minor(3, Fraction(1, 2)), 2)
+        self.assertEqual(convert_minor(5, Fraction(3, 10)), 2)
+
+    def test_convert_negative_amount(self):
+        """test that negative amounts round symmetrically."""
+        self.assertEqual(convert_minor(-3, Fraction(1, 2)), -2)
+        self.assertEqual(convert_minor(-7, Fraction(1, 3)), -2)
+
+    def test_no_drift_over_many_operations(self):
+        """test that many small deposits keep an exact balance."""
+        account = BankAccount(account_id=1, balance=0, currency="USD")
+        for _ in range(1000):
+            account.deposit(0.1, "USD")
+        self.assertEqual(account.balance_minor, 10000)
+        self.assertEqual(account.get_balance(), 100.0)
+
+    def test_transfer_conversion_is_exact(self):
+        """test that cross-currency transfers use exact rational rates."""
+        usd = BankAccount(account_id=1, balance=100, currency="USD")
+        uan = BankAccount(account_id=2, balance=0, currency="UAN")
+        usd.transfer(uan, 0.01, "USD")
+        # 1 cent * 39.5 = 39.5 kopecks -> rounds half to even = 40
+        self.assertEqual(uan.balance_minor, 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
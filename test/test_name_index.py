@@ -0,0 +1,91 @@
+"""Unit tests for prefix and typo-tolerant name search."""
+
+import os
+import tempfile
+import unittest
+from models.name_index import NameIndex, edit_distance, normalize_name
+from models.user import User
+
+
+def _ids(matches):
+    """User IDs of a search result."""
+    return [m.user_id for m in matches]
+
+
+class TestNameIndex(unittest.TestCase):
+    """Unit tests for the name index."""
+
+    def setUp(self):
+        """Create an index over Latin and Cyrillic names."""
+        self.index = NameIndex()
+        self.index.reset(
+            [
+                User("Alice", "Smith", 1),
+                User("Alicia", "Smyth", 2),
+                User("Нікіта", "Коваль", 3),
+                User("Ann", "Lee", 4),
+                User("Anna", "Smith", 5),
+            ]
+        )
+
+    def test_normalization(self):
+        """test that case and composed/decomposed letters do not matter."""
+        self.assertEqual(normalize_name(" НІКІТА "), "нікіта")
+        self.assertEqual(normalize_name("René"), normalize_name("René"))
+
+    def test_edit_distance(self):
+        """test insertions, deletions, substitutions and swaps, and the limit."""
+        self.assertEqual(edit_distance("smith", "smyth", 2), 1)
+        self.assertEqual(edit_distance("smith", "smiht", 2), 1)
+        self.assertEqual(edit_distance("ann", "anna", 2), 1)
+        self.assertEqual(edit_distance("alice", "bob", 2), 3)
+
+    def test_prefix_search(self):
+        """test that each query word must prefix a username or surname."""
+        self.assertEqual(_ids(self.index.prefix("ali")), [1, 2])
+        self.assertEqual(_ids(self.index.prefix("sm an")), [5])
+        self.assertEqual(_ids(self.index.prefix("ніК")), [3])
+        self.assertEqual(_ids(self.index.prefix("an")), [4, 5])
+        self.assertEqual(_ids(self.index.prefix("smith", limit=1)), [1])
+        self.assertEqual(self.index.prefix("zed"), [])
+        self.assertEqual(self.index.prefix("  "), [])
+
+    def test_fuzzy_search(self):
+        """test that typos are tolerated and closer matches come first."""
+        self.assertEqual(_ids(self.index.fuzzy("smiht")), [1, 5])
+        self.assertEqual(_ids(self.index.fuzzy("smith")), [1, 5, 2])
+        self.assertEqual(_ids(self.index.fuzzy("Нікта Ковал")), [3])
+        self.assertEqual(_ids(self.index.fuzzy("alcie smith", max_distance=2)), [1, 2])
+        self.assertEqual([m.distance for m in self.index.fuzzy("alicia smith", 2)], [1, 2])
+        self.assertEqual(self.index.fuzzy("zzzzz"), [])
+
+    def test_add_and_rename(self):
+        """test that registered and renamed users are found incrementally."""
+        self.index.add([User("Олена", "Smith", 6)])
+        self.index.add([User("Bob", "Ray", 4)])
+        self.assertEqual(_ids(self.index.prefix("ол")), [6])
+        self.assertEqual(_ids(self.index.prefix("smith")), [1, 5, 6])
+        self.assertEqual(self.index.prefix("lee"), [])
+        self.assertEqual(_ids(self.index.fuzzy("rey")), [4])
+
+    def test_log_round_trip(self):
+        """test that the log is rewritten, appended to and survives a torn line."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "names.tsv")
+            self.assertFalse(NameIndex(path).load())
+            self.index.configure(path)
+            self.index.save()
+            self.index.add([User("Олена", "Шевченко", 6)])
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("7\tTorn")
+
+            reloaded = NameIndex(path)
+            self.assertTrue(reloaded.load())
+            self.assertEqual(len(reloaded), 6)
+            self.assertEqual(_ids(reloaded.fuzzy("шевченко")), [6])
+            with open(path, "rb") as f:
+                self.assertTrue(f.read().endswith(b"\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
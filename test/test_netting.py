@@ -0,0 +1,104 @@
+"""Unit tests for netted transfer batches."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.account import BankAccount
+from models.ledger import Ledger
+from models.user import User
+from service.netting import NettingService
+
+
+class TestNettingService(unittest.TestCase):
+    """Unit tests for NettingService.settle."""
+
+    def setUp(self):
+        """Create three USD accounts and one EUR account on a fresh ledger."""
+        self.ledger = Ledger()
+        self.user = User("Ann", "Lee", 1)
+        for account_id, balance, currency in ((1, 10, "USD"), (2, 0, "USD"), (3, 5, "USD"), (4, 0, "EUR")):
+            account = BankAccount(account_id, balance, currency)
+            account.ledger = self.ledger
+            self.user.add_account(account)
+        self.a, self.b, self.c, self.eur = self.user.accounts
+
+    def test_cycle_nets_to_one_write_per_changed_account(self):
+        """test that offsetting transfers are all recorded but balances change once."""
+        result = NettingService.settle(
+            [(self.a, self.b, 8), (self.b, self.c, 8), (self.c, self.a, 6)]
+        )
+
+        self.assertEqual(result.applied, [0, 1, 2])
+        self.assertEqual(result.rejected, {})
+        self.assertEqual((result.balance_writes, result.gross_balance_writes), (2, 6))
+        self.assertEqual([acc.balance_minor for acc in (self.a, self.b, self.c)], [800, 0, 700])
+        self.assertEqual(len(self.b.transactions), 2)
+        self.assertEqual(self.ledger.entries[-1].kind, "netting")
+        self.assertEqual(
+            {(p.account, p.amount_minor) for p in self.ledger.entries[-1].postings},
+            {(self.a.ledger_key, -200), (self.c.ledger_key, 200)},
+        )
+
+    def test_funds_are_checked_against_net_position(self):
+        """test that a transfer larger than the balance passes when inflows cover it."""
+        result = NettingService.settle([(self.b, self.c, 3), (self.a, self.b, 4)])
+
+        self.assertEqual(result.applied, [0, 1])
+        self.assertEqual(self.b.balance_minor, 100)
+
+    def test_uncovered_transfers_are_dropped_latest_first(self):
+        """test that a short account loses its latest transfers and dependents follow."""
+        result = NettingService.settle(
+            [(self.c, self.a, 4), (self.c, self.b, 4), (self.b, self.a, 3)]
+        )
+
+        self.assertEqual(result.applied, [0])
+        self.assertEqual(
+            result.rejected,
+            {1: "Insufficient funds for transfer.", 2: "Insufficient funds for transfer."},
+        )
+        self.assertEqual(self.c.balance_minor, 100)
+        self.assertEqual(self.b.transactions, [])
+
+    def test_cross_currency_and_invalid_transfers(self):
+        """test FX legs in the netting entry and per-transfer validation."""
+        result = NettingService.settle(
+            [(self.a, self.eur, 5), (self.a, self.b, -1), (self.a, self.b, 0.004)]
+        )
+
+        self.assertEqual(
+            result.rejected,
+            {
+                1: "The transfer amount must be greater than 0..",
+                2: "The transfer amount must be greater than 0..",
+            },
+        )
+        self.assertEqual(self.eur.balance_minor, self.eur.transactions[0].amount_minor)
+        self.assertEqual(self.ledger.balance("fx:USD"), 500)
+        self.assertTrue(self.ledger.entries[-1].is_balanced())
+        self.assertEqual(
+            self.a.transactions[0].correlation_id, self.eur.transactions[0].correlation_id
+        )
+
+    @patch("builtins.print")
+    @patch("service.netting.FileManager.save_all_users")
+    @patch("service.netting.FileManager.load_all_users")
+    def test_cli_reports_saved_writes(self, mock_load, mock_save, mock_print):
+        """test that the CLI applies a CSV batch, saves once and reports the reduction."""
+        mock_load.return_value = [self.user]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "batch.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("user_id,from_id,to_user_id,to_id,amount\n1,1,1,2,5\n1,2,1,1,5\n1,9,1,1,1\n")
+            NettingService.settle_batch(type("Args", (), {"file": path}))
+
+        mock_save.assert_called_once_with([self.user])
+        mock_print.assert_any_call("Line 4: One of the accounts was not found.")
+        mock_print.assert_called_with(
+            "2 transfers applied, 1 rejected; 0 balance writes instead of 4 (4 saved)"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
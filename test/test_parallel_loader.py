@@ -0,0 +1,77 @@
+"""Unit tests for splitting and parallel parsing of users files."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.account import BankAccount
+from models.user import User
+from service.file_manager import FileManager
+from service.parallel_loader import load_users_parallel, split_user_chunks
+
+
+def _make_users(count):
+    """Builds users with one account and a few transactions each."""
+    users = []
+    for user_id in range(1, count + 1):
+        user = User("Name", "Sur\nname", user_id)
+        account = BankAccount(user_id * 10, 0, "USD")
+        user.add_account(account)
+        for amount in (5, 7.25, 12):
+            account.deposit(amount, "USD")
+        account.withdraw(3, "USD")
+        users.append(user)
+    return users
+
+
+class TestParallelLoader(unittest.TestCase):
+    """Unit tests for load_users_parallel and its helpers."""
+
+    def setUp(self):
+        """Write a users file in the layout FileManager uses."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp.name, "users.json")
+        self.users = _make_users(12)
+        self.expected = [u.to_dict(True) for u in self.users]
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.expected, f, indent=4, ensure_ascii=False)
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp.cleanup()
+
+    def test_chunks_cover_file_at_user_boundaries(self):
+        """test that ranges are contiguous and each parses to whole users."""
+        chunks = split_user_chunks(self.path, 5)
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], os.path.getsize(self.path))
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end, start)
+
+    def test_parallel_load_matches_from_dict(self):
+        """test that users built from chunks equal those from User.from_dict."""
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                loaded = load_users_parallel(self.path, workers)
+                self.assertEqual([u.to_dict(True) for u in loaded], self.expected)
+                self.assertEqual(loaded[3].get_total_balance_minor(), 2125)
+
+    def test_compact_file_is_loaded_as_one_chunk(self):
+        """test that files in another layout still load, without splitting."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.expected, f)
+        self.assertEqual(len(split_user_chunks(self.path, 4)), 1)
+        loaded = load_users_parallel(self.path, 4)
+        self.assertEqual(len(loaded), 12)
+
+    def test_file_manager_parallel_load(self):
+        """test that FileManager.load_all_users_parallel reads USERS_FILE."""
+        with patch.object(FileManager, "USERS_FILE", self.path):
+            users = FileManager.load_all_users_parallel(workers=1)
+        self.assertEqual([u.user_id for u in users], list(range(1, 13)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+"""Unit tests for standing orders and the payment scheduler."""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from models.account import BankAccount
+from models.transaction import to_epoch_us
+from models.user import User
+from service.account_service import AccountService
+from service.idempotency import IdempotencyError, IdempotencyStore
+from service.payment_scheduler import DAY_US, PaymentScheduler, SchedulerService, StandingOrder
+
+START = to_epoch_us(datetime(2025, 1, 31, 9, 0))
+
+
+class TestStandingOrder(unittest.TestCase):
+    """Unit tests for occurrence arithmetic."""
+
+    def test_monthly_due_times_keep_the_day(self):
+        """test that monthly orders clamp to short months and return to the anchor day."""
+        order = StandingOrder(1, 1, 1, 1, 2, 10.0, "monthly", START)
+        self.assertEqual(order.due_at(1), to_epoch_us(datetime(2025, 2, 28, 9, 0)))
+        self.assertEqual(order.due_at(2), to_epoch_us(datetime(2025, 3, 31, 9, 0)))
+        self.assertEqual(order.due_at(12), to_epoch_us(datetime(2026, 1, 31, 9, 0)))
+
+    def test_runs_until(self):
+        """test counting the occurrences due at or before a time."""
+        monthly = StandingOrder(1, 1, 1, 1, 2, 10.0, "monthly", START)
+        self.assertEqual(monthly.runs_until(START - 1), 0)
+        self.assertEqual(monthly.runs_until(START), 1)
+        self.assertEqual(monthly.runs_until(to_epoch_us(datetime(2025, 3, 31, 8, 59))), 2)
+        self.assertEqual(monthly.runs_until(to_epoch_us(datetime(2025, 3, 31, 9, 0))), 3)
+        weekly = StandingOrder(2, 1, 1, 1, 2, 10.0, "weekly", START)
+        self.assertEqual(weekly.runs_until(START + 15 * DAY_US), 3)
+
+
+class TestPaymentScheduler(unittest.TestCase):
+    """Unit tests for the heap and the order log."""
+
+    def setUp(self):
+        """Create a scheduler backed by a temporary log."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = os.path.join(self.tmp.name, "schedules.log")
+        self.scheduler = PaymentScheduler(self.path)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmp.cleanup()
+
+    def test_orders_pop_in_due_order(self):
+        """test that due orders come out earliest first and future ones stay queued."""
+        late = self.scheduler.add(1, 1, 2, 5.0, "daily", START + 2)
+        early = self.scheduler.add(1, 1, 2, 5.0, "daily", START)
+        self.scheduler.add(1, 1, 2, 5.0, "daily", START + DAY_US)
+
+        self.assertEqual(self.scheduler.pop_due(START + 2), early)
+        self.assertEqual(self.scheduler.pop_due(START + 2), late)
+        self.assertIsNone(self.scheduler.pop_due(START + 2))
+
+    def test_cancelled_and_advanced_orders_skip_stale_entries(self):
+        """test that cancelled orders never come out and advanced ones come out once per run."""
+        first = self.scheduler.add(1, 1, 2, 5.0, "daily", START)
+        second = self.scheduler.add(1, 1, 2, 5.0, "daily", START)
+        self.assertTrue(self.scheduler.cancel(second.order_id))
+        self.assertFalse(self.scheduler.cancel(second.order_id))
+
+        self.scheduler.advance(self.scheduler.pop_due(START), 1)
+        self.assertIsNone(self.scheduler.pop_due(START + DAY_US - 1))
+        self.assertEqual(self.scheduler.pop_due(START + DAY_US).order_id, first.order_id)
+
+    def test_log_survives_reload_and_torn_tail(self):
+        """test that orders, runs and cancellations are read back and a torn line is cut off."""
+        first = self.scheduler.add(1, 1, 2, 5.0, "weekly", START)
+        second = self.scheduler.add(2, 3, 4, 7.5, "monthly", START, to_user_id=1)
+        self.scheduler.advance(self.scheduler.pop_due(START), 1)
+        self.scheduler.flush()
+        self.scheduler.cancel(second.order_id)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"order_id": 9, "us')
+
+        reloaded = PaymentScheduler(self.path)
+        reloaded.load()
+        self.assertEqual(reloaded.orders, {first.order_id: first._replace(runs=1)})
+        self.assertEqual(reloaded.add(1, 1, 2, 1.0, "daily", START).order_id, 3)
+        with open(self.path, "rb") as f:
+            self.assertTrue(f.read().endswith(b"\n"))
+
+    def test_processes_sharing_the_log_see_each_other(self):
+        """test that IDs do not collide and a flush or rewrite keeps other processes' changes."""
+        self.scheduler.add(1, 1, 2, 5.0, "daily", START)
+        runner, other = PaymentScheduler(self.path), PaymentScheduler(self.path)
+        runner.load()
+        other.load()
+        kept = other.add(1, 1, 2, 5.0, "daily", START)
+        cancelled = runner.add(1, 1, 2, 5.0, "daily", START)
+        self.assertEqual([kept.order_id, cancelled.order_id], [2, 3])
+
+        for _ in range(3):
+            runner.advance(runner.pop_due(START), 1)
+        other.cancel(cancelled.order_id)
+        # Large enough a log that the flush rewrites it.
+        runner._lines = 10_000  # pylint: disable=protected-access
+        runner.flush()
+
+        reloaded = PaymentScheduler(self.path)
+        reloaded.load()
+        self.assertEqual({i: o.runs for i, o in reloaded.orders.items()}, {1: 1, 2: 1})
+        self.assertNotIn(cancelled.order_id, runner.orders)
+
+    def test_invalid_orders_are_rejected(self):
+        """test that the amount and period are validated."""
+        with self.assertRaises(ValueError):
+            self.scheduler.add(1, 1, 2, 0, "daily", START)
+        with self.assertRaises(ValueError):
+            self.scheduler.add(1, 1, 2, 5.0, "hourly", START)
+
+
+class TestSchedulerService(unittest.TestCase):
+    """Unit tests for executing due occurrences."""
+
+    def setUp(self):
+        """Create two users and fresh scheduler and idempotency state."""
+        self.tenant = User("Ann", "Lee", 1)
+        self.tenant.add_account(BankAccount(1, 100, "USD"))
+        self.landlord = User("Bob", "Ray", 2)
+        self.landlord.add_account(BankAccount(1, 0, "USD"))
+        self.users = [self.tenant, self.landlord]
+        self.scheduler = PaymentScheduler()
+        patches = [
+            patch.object(SchedulerService, "SCHEDULER", self.scheduler),
+            patch.object(AccountService, "IDEMPOTENCY", IdempotencyStore()),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_catch_up_pays_every_missed_occurrence(self):
+        """test that occurrences missed during downtime are all paid in due order."""
+        self.scheduler.add(1, 1, 1, 30.0, "monthly", START, to_user_id=2)
+        now = to_epoch_us(datetime(2025, 3, 31, 12, 0))
+
+        executions = SchedulerService.run_due(self.users, now)
+
+        self.assertEqual([e.run for e in executions], [0, 1, 2])
+        self.assertTrue(all(e.succeeded for e in executions))
+        self.assertEqual(self.landlord.get_account_by_id(1).balance, 90)
+        self.assertEqual(SchedulerService.run_due(self.users, now), [])
+
+    def test_without_catch_up_only_latest_is_paid(self):
+        """test that catch_up=False pays one occurrence and skips the missed ones."""
+        order = self.scheduler.add(1, 1, 1, 30.0, "monthly", START, to_user_id=2)
+        now = to_epoch_us(datetime(2025, 3, 31, 12, 0))
+
+        executions = SchedulerService.run_due(self.users, now, catch_up=False)
+
+        self.assertEqual([e.run for e in executions], [2])
+        self.assertEqual(self.scheduler.orders[order.order_id].runs, 3)
+        self.assertEqual(self.tenant.get_account_by_id(1).balance, 70)
+
+    def test_failures_are_reported_and_not_retried(self):
+        """test that insufficient funds fail the occurrence and the order moves on."""
+        self.scheduler.add(1, 1, 1, 60.0, "daily", START, to_user_id=2)
+        self.scheduler.add(1, 1, 5, 1.0, "daily", START)
+
+        executions = SchedulerService.run_due(self.users, START + DAY_US)
+
+        self.assertEqual([e.succeeded for e in executions], [True, False, False, False])
+        self.assertIn("Insufficient funds", executions[2].result)
+        self.assertEqual(executions[1].result, "One of the accounts was not found.")
+        self.assertEqual(self.tenant.get_account_by_id(1).balance, 40)
+
+    def test_max_payments_leaves_rest_due(self):
+        """test that a limited run stops and the next run continues."""
+        for _ in range(3):
+            self.scheduler.add(1, 1, 1, 1.0, "daily", START, to_user_id=2)
+
+        self.assertEqual(len(SchedulerService.run_due(self.users, START, max_payments=2)), 2)
+        self.assertEqual(len(SchedulerService.run_due(self.users, START)), 1)
+
+    def test_recorded_occurrence_is_not_paid_twice(self):
+        """test that an occurrence whose key was recorded is skipped but advanced."""
+        order = self.scheduler.add(1, 1, 1, 30.0, "daily", START, to_user_id=2)
+        AccountService.IDEMPOTENCY.put(f"schedule:{order.order_id}:0", f"schedule:{order.order_id}:0", "done")
+
+        executions = SchedulerService.run_due(self.users, START)
+
+        self.assertEqual(executions[0].result, "done")
+        self.assertEqual(self.tenant.get_account_by_id(1).balance, 100)
+        self.assertEqual(self.scheduler.orders[order.order_id].runs, 1)
+
+    def test_interrupted_occurrence_is_reported_not_paid(self):
+        """test that an occurrence reserved by an interrupted run fails instead of paying again."""
+        order = self.scheduler.add(1, 1, 1, 30.0, "daily", START, to_user_id=2)
+        key = f"schedule:{order.order_id}:0"
+        AccountService.IDEMPOTENCY.reserve(key, key)
+
+        executions = SchedulerService.run_due(self.users, START)
+
+        self.assertFalse(executions[0].succeeded)
+        self.assertIn("still being applied", executions[0].result)
+        self.assertEqual(self.tenant.get_account_by_id(1).balance, 100)
+        self.assertEqual(self.scheduler.orders[order.order_id].runs, 1)
+
+    def test_recorded_failure_is_not_retried(self):
+        """test that a recorded failure is replayed as failed after the order log is lost."""
+        self.scheduler.add(1, 1, 1, 500.0, "daily", START, to_user_id=2)
+        SchedulerService.record(SchedulerService.run_due(self.users, START))
+        self.tenant.get_account_by_id(1).deposit(1000, "USD")
+
+        # A crash before flush() leaves the order due again.
+        self.scheduler = PaymentScheduler()
+        self.scheduler.add(1, 1, 1, 500.0, "daily", START, to_user_id=2)
+        with patch.object(SchedulerService, "SCHEDULER", self.scheduler):
+            executions = SchedulerService.run_due(self.users, START)
+
+        self.assertFalse(executions[0].succeeded)
+        self.assertIn("Insufficient funds", executions[0].result)
+        self.assertEqual(self.tenant.get_account_by_id(1).balance, 1100)
+
+    @patch("builtins.print")
+    @patch("service.payment_scheduler.FileManager.save_all_users")
+    @patch("service.payment_scheduler.FileManager.load_all_users")
+    def test_cli_run_saves_once_and_records_keys(self, mock_load, mock_save, mock_print):
+        """test that the CLI run saves once and remembers the applied occurrences."""
+        mock_load.return_value = self.users
+        order = self.scheduler.add(1, 1, 1, 10.0, "daily", START, to_user_id=2)
+        key = f"schedule:{order.order_id}:1"
+
+        def save(_users):
+            # Keys are still only reserved while the users are saved.
+            with self.assertRaises(IdempotencyError):
+                AccountService.IDEMPOTENCY.reserve(key, key)
+
+        mock_save.side_effect = save
+        with patch("service.payment_scheduler.now_epoch_us", return_value=START + DAY_US):
+            SchedulerService.run(MagicMock(limit=None, no_catch_up=False))
+
+        mock_save.assert_called_once_with(self.users)
+        mock_print.assert_called_with("2 payments executed, 0 failed")
+        self.assertIsNotNone(AccountService.IDEMPOTENCY.get(key, key))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Unit tests for the historical exchange-rate store."""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from fractions import Fraction
+from models.account import BankAccount
+from models.exchange_rates import RateTable
+from models.rate_history import RateHistory
+from models.transaction import Transaction, to_epoch_us
+
+JAN_1 = to_epoch_us(datetime(2024, 1, 1))
+FEB_1 = to_epoch_us(datetime(2024, 2, 1))
+MAR_1 = to_epoch_us(datetime(2024, 3, 1))
+
+
+class TestRateHistory(unittest.TestCase):
+    """Unit tests for RateHistory lookups."""
+
+    def setUp(self):
+        """Record two USD/EUR rates and one USD/UAN rate."""
+        self.history = RateHistory(base="USD")
+        self.history.add_rate("USD", "EUR", FEB_1, Fraction("0.95"))
+        self.history.add_rate("USD", "EUR", JAN_1, Fraction("0.92"))
+        self.history.add_rate("USD", "UAN", JAN_1, Fraction("39.5"))
+
+    def test_rate_at_picks_latest_effective(self):
+        """test binary search returns the rate in force at the given time."""
+        self.assertEqual(self.history.rate_at("USD", "EUR", JAN_1), Fraction("0.92"))
+        self.assertEqual(
+            self.history.rate_at("USD", "EUR", FEB_1 - 1), Fraction("0.92")
+        )
+        self.assertEqual(self.history.rate_at("USD", "EUR", MAR_1), Fraction("0.95"))
+
+    def test_before_first_rate(self):
+        """test that times before any recorded rate return None."""
+        self.assertIsNone(self.history.rate_at("USD", "EUR", JAN_1 - 1))
+
+    def test_inverse_and_triangulated(self):
+        """test inverse pairs and triangulation through the base currency."""
+        self.assertEqual(
+            self.history.rate_at("EUR", "USD", MAR_1), 1 / Fraction("0.95")
+        )
+        self.assertEqual(
+            self.history.rate_at("EUR", "UAN", MAR_1),
+            Fraction("39.5") / Fraction("0.95"),
+        )
+
+    def test_cache_hits_within_interval(self):
+        """test that repeated lookups in one interval hit the cache."""
+        self.history.rate_at("USD", "EUR", FEB_1)
+        self.history.rate_at("USD", "EUR", MAR_1)
+        self.assertEqual(self.history.hits, 1)
+        self.assertEqual(self.history.misses, 1)
+
+    def test_add_rate_invalidates_cache(self):
+        """test that new rates are visible after a cached lookup."""
+        self.history.rate_at("USD", "EUR", MAR_1)
+        self.history.add_rate("USD", "EUR", MAR_1, Fraction("0.9"))
+        self.assertEqual(self.history.rate_at("USD", "EUR", MAR_1), Fraction("0.9"))
+
+    def test_derived_answer_ends_where_direct_series_starts(self):
+        """test that a cached inverse or triangulated rate does not hide a later direct rate."""
+        self.history.add_rate("EUR", "USD", MAR_1, Fraction("1.1"))
+        self.history.add_rate("EUR", "UAN", MAR_1, Fraction("45"))
+        self.assertEqual(self.history.rate_at("EUR", "USD", FEB_1), 1 / Fraction("0.95"))
+        self.assertEqual(self.history.rate_at("EUR", "USD", MAR_1), Fraction("1.1"))
+        self.assertEqual(
+            self.history.rate_at("EUR", "UAN", FEB_1), Fraction("39.5") / Fraction("0.95")
+        )
+        self.assertEqual(self.history.rate_at("EUR", "UAN", MAR_1), Fraction("45"))
+
+    def test_add_table_records_only_what_differs(self):
+        """test that a rate table is recorded as base rates plus overriding pairs."""
+        table = RateTable(
+            "USD",
+            {"EUR": Fraction("0.95"), "UAN": Fraction("39.5")},
+            {("EUR", "UAN"): Fraction("42")},
+        )
+        added = self.history.add_table(table, MAR_1)
+        self.assertEqual(added, [("EUR", "UAN", Fraction("42"))])
+        for a in table.currencies:
+            for b in table.currencies:
+                self.assertEqual(self.history.rate_at(a, b, MAR_1), table.fraction(a, b))
+        self.assertEqual(self.history.add_table(table, MAR_1 + 1), [])
+
+    def test_revalue_transaction(self):
+        """test revaluing a transaction at its own time and as of a later date."""
+        tx = Transaction.from_epoch(1, 10000, "deposit", JAN_1, "USD")
+        self.assertEqual(self.history.revalue(tx, "EUR"), 9200)
+        self.assertEqual(self.history.revalue(tx, "EUR", at_us=MAR_1), 9500)
+
+    def test_from_csv(self):
+        """test loading rates from a CSV file."""
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
+            f.write("from_currency,to_currency,effective,rate\n")
+            f.write("USD,EUR,2024-01-01,0.92\n")
+            f.write(f"USD,EUR,{FEB_1},0.95\n")
+        try:
+            history = RateHistory.from_csv(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(history.rate_at("USD", "EUR", MAR_1), Fraction("0.95"))
+
+
+class TestTransferRecordsRate(unittest.TestCase):
+    """Unit tests for the rate recorded on transfer transactions."""
+
+    def test_transfer_records_rate_and_round_trips(self):
+        """test both transfer legs store the applied rate and it survives to_dict."""
+        usd = BankAccount(account_id=1, balance=100, currency="USD")
+        eur = BankAccount(account_id=2, balance=0, currency="EUR")
+        usd.transfer(eur, 10, "USD")
+        out_leg = usd.get_transactions()[-1]
+        in_leg = eur.get_transactions()[-1]
+        self.assertEqual(out_leg.exchange_rate, Fraction("0.92"))
+        self.assertEqual(in_leg.exchange_rate, Fraction("0.92"))
+        restored = Transaction.from_dict(in_leg.to_dict())
+        self.assertEqual(restored.exchange_rate, Fraction("0.92"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+"""Unit tests for the reconciliation job."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from models.account import BankAccount
+from models.user import User
+from service import reconciliation
+from service.reconciliation import ReconciliationService, pair_legs
+
+
+def _users_data():
+    """Builds three consistent users, each with a transfer between two accounts."""
+    data = []
+    for user_id in (1, 2, 3):
+        user = User("Name", "Surname", user_id)
+        first = BankAccount(1, 5, "USD")
+        second = BankAccount(2, 0, "EUR")
+        user.add_account(first)
+        user.add_account(second)
+        first.deposit(10, "USD")
+        first.transfer(second, 4, "USD")
+        data.append(user.to_dict(True))
+    return data
+
+
+class TestReconciliation(unittest.TestCase):
+    """Unit tests for ReconciliationService.run."""
+
+    def setUp(self):
+        """Point the job at a temporary users file and state directory."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.users_path = os.path.join(self.tmp.name, "users.json")
+        self.data = _users_data()
+        self._write()
+        for name, value in (
+            ("STATE_DIR", os.path.join(self.tmp.name, "state")),
+            ("REPORT_FILE", os.path.join(self.tmp.name, "report.csv")),
+            ("CHUNK_BYTES", 400),
+        ):
+            patcher = patch.object(ReconciliationService, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp.cleanup()
+
+    def _write(self):
+        """Writes self.data in the FileManager layout."""
+        with open(self.users_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=4)
+
+    def _run(self, **kwargs):
+        """Runs the job in-process on the temporary users file."""
+        return ReconciliationService.run(workers=1, users_path=self.users_path, **kwargs)
+
+    def test_consistent_bank_has_no_discrepancies(self):
+        """test that untouched data reconciles and an empty report is written."""
+        self.assertEqual(self._run(), [])
+        with open(ReconciliationService.REPORT_FILE, "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 1)
+
+    def test_balance_and_leg_problems_are_reported(self):
+        """test that a wrong balance and a missing transfer leg are found."""
+        self.data[1]["accounts"][0]["balance"] = 99.0
+        del self.data[2]["accounts"][1]["transactions"][0]
+        self.data[2]["accounts"][1]["checkpoints"] = None
+        self._write()
+
+        found = {(d.kind, d.user_id, d.account_id) for d in self._run()}
+
+        self.assertIn(("balance", 2, 1), found)
+        self.assertIn(("unmatched_leg", 3, 1), found)
+        self.assertNotIn(("balance", 1, 1), found)
+
+    def test_drift_is_found_after_a_save(self):
+        """test that a save between the drift and the run does not hide a wrong balance."""
+        user = User("Name", "Surname", 4)
+        account = BankAccount(1, 0, "USD")
+        user.add_account(account)
+        account.deposit(100, "USD")
+        data = user.to_dict(True)
+        data["accounts"][0]["balance"] = 999.0
+        # An unrelated save: load the drifted user and write it back.
+        self.data.append(User.from_dict(data).to_dict(True))
+        self._write()
+
+        found = self._run(full=True)
+
+        self.assertEqual(
+            [(d.kind, d.user_id, d.expected, d.actual) for d in found],
+            [("balance", 4, 10000, 99900)],
+        )
+
+    def test_legacy_legs_pair_across_separate_stamps(self):
+        """test that baseline transfers, stamped once per leg, pair without an opening balance."""
+
+        def leg(transaction_id, amount, kind, currency, time_stamp):
+            return {
+                "transaction_id": transaction_id,
+                "amount": amount,
+                "transaction_type": kind,
+                "currency": currency,
+                "time_stamp": time_stamp,
+            }
+
+        self.data = [
+            {
+                "user_id": 1,
+                "username": "Name",
+                "surname": "Surname",
+                "accounts": [
+                    {
+                        "account_id": 102,
+                        "balance": 40.0,
+                        "currency": "USD",
+                        "transactions": [
+                            leg(1, 100.0, "deposit", "USD", "2025-04-25T20:59:46.078051"),
+                            leg(2, 50.0, "transfer_to_103", "USD", "2025-04-25T21:03:01.473927"),
+                            leg(4, 10.0, "transfer_to_104", "USD", "2025-04-25T21:04:00.000010"),
+                        ],
+                    },
+                    {
+                        "account_id": 103,
+                        "balance": 1975.0,
+                        "currency": "UAN",
+                        "transactions": [
+                            leg(3, 1975.0, "transfer_from_102", "UAN", "2025-04-25T21:03:01.473946"),
+                        ],
+                    },
+                    {
+                        "account_id": 104,
+                        # Drift: the transactions only explain 10.0.
+                        "balance": 15.0,
+                        "currency": "USD",
+                        "transactions": [
+                            leg(5, 10.0, "transfer_from_102", "USD", "2025-04-25T21:04:00.000031"),
+                        ],
+                    },
+                ],
+            }
+        ]
+        # A load and save must not turn the drift into an opening balance.
+        self.data = [User.from_dict(self.data[0]).to_dict(True)]
+        self._write()
+
+        found = self._run(full=True)
+
+        self.assertEqual(
+            [(d.kind, d.account_id, d.expected, d.actual) for d in found],
+            [("balance", 104, 1000, 1500)],
+        )
+
+    def test_rerun_only_checks_modified_users(self):
+        """test that users with an unchanged digest are not rechecked."""
+        self._run()
+        self.data[0]["accounts"][0]["balance"] = 1.0
+        self.data[0]["version"] += 1
+        self._write()
+        with patch.object(reconciliation, "_check_user", wraps=reconciliation._check_user) as check:
+            found = self._run()
+        self.assertEqual([c.args[0]["user_id"] for c in check.call_args_list], [1])
+        self.assertEqual([(d.kind, d.user_id) for d in found], [("balance", 1)])
+
+    def test_interrupted_run_resumes_remaining_chunks(self):
+        """test that finished chunks are not checked again after a failure."""
+        original = reconciliation.reconcile_chunk
+        calls = []
+
+        def failing_second_chunk(chunk):
+            calls.append(chunk[1])
+            if len(calls) == 2:
+                raise RuntimeError("worker died")
+            return original(chunk)
+
+        with patch.object(reconciliation, "reconcile_chunk", failing_second_chunk):
+            with self.assertRaises(RuntimeError):
+                self._run()
+        with patch.object(reconciliation, "reconcile_chunk", wraps=original) as resumed:
+            self.assertEqual(self._run(), [])
+        self.assertNotIn(calls[0], [c.args[0][1] for c in resumed.call_args_list])
+        self.assertEqual(resumed.call_count, 2)
+
+    def test_pair_legs_flags_duplicates(self):
+        """test that a key with two transfer_to legs is unmatched."""
+        legs = [["c:1", "transfer_to", 1, 1, 5], ["c:1", "transfer_to", 2, 1, 5]]
+        issues, local = pair_legs(legs)
+        self.assertEqual(len(issues), 2)
+        self.assertEqual(local, set())
+
+    @patch("builtins.print")
+    def test_cli_summary(self, mock_print):
+        """test that the CLI prints the discrepancy count."""
+        self.data[0]["accounts"][0]["balance"] = 1.0
+        self._write()
+        with patch("service.reconciliation.FileManager.USERS_FILE", self.users_path):
+            ReconciliationService.reconcile(MagicMock(workers=1, full=True))
+        mock_print.assert_called_once_with(
+            f"1 discrepancies, see {ReconciliationService.REPORT_FILE}"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
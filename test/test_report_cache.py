@@ -0,0 +1,110 @@
+"""Unit tests for the ReportCache and cached user summaries."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.account import BankAccount
+from models.user import User
+from service.file_manager import FileManager
+from service.report_cache import ReportCache
+from service.report_service import ReportService
+
+
+class TestReportCache(unittest.TestCase):
+    """Unit tests for LRU behaviour, byte budget and statistics."""
+
+    def test_hit_and_miss(self):
+        """test hit/miss accounting and hit ratio."""
+        cache = ReportCache()
+        self.assertIsNone(cache.get(1, 1))
+        cache.put(1, 1, "report")
+        self.assertEqual(cache.get(1, 1), "report")
+        self.assertEqual(cache.stats()["hit_ratio"], 0.5)
+
+    def test_new_version_replaces_old(self):
+        """test that storing a newer version drops the stale one."""
+        cache = ReportCache()
+        cache.put(1, 1, "old")
+        cache.put(1, 2, "new")
+        self.assertIsNone(cache.get(1, 1))
+        self.assertEqual(cache.get(1, 2), "new")
+        self.assertEqual(cache.size_bytes, 3)
+
+    def test_lru_eviction_by_bytes(self):
+        """test that least recently used reports are evicted over budget."""
+        cache = ReportCache(max_bytes=10)
+        cache.put(1, 1, "aaaa")
+        cache.put(2, 1, "bbbb")
+        cache.get(1, 1)
+        cache.put(3, 1, "cccc")
+        self.assertIsNone(cache.get(2, 1))
+        self.assertEqual(cache.get(1, 1), "aaaa")
+        self.assertEqual(cache.evictions, 1)
+
+    def test_unicode_size_and_oversized(self):
+        """test byte sizes use UTF-8 and oversized reports are skipped."""
+        cache = ReportCache(max_bytes=4)
+        cache.put(1, 1, "Іван")
+        self.assertIsNone(cache.get(1, 1))
+        cache.put(2, 1, "Ів")
+        self.assertEqual(cache.size_bytes, 4)
+
+    def test_invalidate(self):
+        """test explicit invalidation of one user."""
+        cache = ReportCache()
+        cache.put(1, 1, "x", options="text")
+        cache.put(1, 1, "y", options="csv")
+        cache.invalidate(1)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+class TestCachedSummary(unittest.TestCase):
+    """Unit tests for ReportService.cached_summary with real files."""
+
+    def setUp(self):
+        """Save one user to temporary files and use a fresh cache."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.patches = [
+            patch.object(FileManager, "USERS_FILE", os.path.join(self.tmp.name, "u.json")),
+            patch.object(FileManager, "TOTALS_FILE", os.path.join(self.tmp.name, "t.json")),
+            patch.object(ReportService, "CACHE", ReportCache()),
+        ]
+        for p in self.patches:
+            p.start()
+        user = User(username="Alice", surname="Smith", user_id=1)
+        user.add_account(BankAccount(account_id=101, balance=10.0, currency="USD"))
+        FileManager.save_all_users([user])
+
+    def tearDown(self):
+        """Restore patched attributes and remove temporary files."""
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_second_call_hits_without_loading_users(self):
+        """test that an unchanged user is served from the cache."""
+        first = ReportService.cached_summary(1)
+        with patch.object(FileManager, "load_all_users") as mock_load:
+            second = ReportService.cached_summary(1)
+            mock_load.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(ReportService.CACHE.hits, 1)
+
+    def test_mutation_invalidates(self):
+        """test that a saved mutation produces a fresh report."""
+        ReportService.cached_summary(1)
+        users = FileManager.load_all_users()
+        users[0].accounts[0].deposit(5.0, "USD")
+        FileManager.save_all_users(users)
+        summary = ReportService.cached_summary(1)
+        self.assertIn("balance: 15.0 USD", summary)
+        self.assertEqual(ReportService.CACHE.hits, 0)
+
+    def test_missing_user(self):
+        """test that an unknown user returns None."""
+        self.assertIsNone(ReportService.cached_summary(42))
+
+
+if __name__ == "__main__":
+    unittest.main()
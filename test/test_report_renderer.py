@@ -0,0 +1,83 @@
+"""Unit tests for the streaming ReportRenderer."""
+
+import csv
+import io
+import json
+import unittest
+from datetime import datetime
+from models.account import BankAccount
+from models.report_renderer import BufferedLineWriter, ReportRenderer
+from models.transaction import Transaction, to_epoch_us
+from models.user import User
+
+
+class TestReportRenderer(unittest.TestCase):
+    """Unit tests for text, JSON and CSV rendering with filters."""
+
+    def setUp(self):
+        """Create a user with one account holding five daily deposits."""
+        self.user = User(username="Олена", surname="Шевченко", user_id=3)
+        self.account = BankAccount(account_id=301, balance=0, currency="UAN")
+        for day in range(1, 6):
+            self.account.transactions.append(
+                Transaction(day, float(day), "deposit", datetime(2024, 5, day), "UAN")
+            )
+        self.user.add_account(self.account)
+
+    def render(self, **kwargs):
+        """Render the report into a string."""
+        stream = io.StringIO()
+        ReportRenderer(**kwargs).render(self.user, stream)
+        return stream.getvalue()
+
+    def test_text_matches_summary_layout(self):
+        """test the text report layout."""
+        output = self.render()
+        self.assertIn("=== User report ===", output)
+        self.assertIn("Name: Олена Шевченко", output)
+        self.assertEqual(output.count("Amount:"), 5)
+
+    def test_since_and_limit_with_pages(self):
+        """test since filter and pagination in the text report."""
+        since = to_epoch_us(datetime(2024, 5, 2))
+        first = self.render(since_us=since, limit=2)
+        second = self.render(since_us=since, limit=2, page=2)
+        self.assertIn("Amount: 2.0", first)
+        self.assertIn("Amount: 3.0", first)
+        self.assertNotIn("Amount: 4.0", first)
+        self.assertIn("Amount: 4.0", second)
+        self.assertIn("Amount: 5.0", second)
+
+    def test_json_output(self):
+        """test that JSON output parses and keeps Unicode names."""
+        data = json.loads(self.render(output_format="json", limit=3))
+        self.assertEqual(data["surname"], "Шевченко")
+        self.assertEqual(len(data["accounts"][0]["transactions"]), 3)
+
+    def test_csv_output(self):
+        """test that CSV output has a header and one row per transaction."""
+        rows = list(csv.reader(io.StringIO(self.render(output_format="csv"))))
+        self.assertEqual(rows[0][0], "user_id")
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][:3], ["3", "301", "1"])
+
+    def test_invalid_options(self):
+        """test that unknown formats and pages without a limit are rejected."""
+        with self.assertRaises(ValueError):
+            ReportRenderer(output_format="xml")
+        with self.assertRaises(ValueError):
+            ReportRenderer(page=2)
+
+    def test_buffered_writer_batches_writes(self):
+        """test that writes reach the stream in chunks."""
+        stream = io.StringIO()
+        writer = BufferedLineWriter(stream, buffer_size=3)
+        writer.write("a")
+        writer.write("b")
+        self.assertEqual(stream.getvalue(), "")
+        writer.write("c")
+        self.assertEqual(stream.getvalue(), "abc")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Unit tests for the ReportService CLI handler."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from models.account import BankAccount
+from models.user import User
+from service.report_service import ReportService
+
+
+class TestReportService(unittest.TestCase):
+    """Unit tests for ReportService.report."""
+
+    def setUp(self):
+        """Create a user with one account and one deposit."""
+        self.user = User(username="Alice", surname="Smith", user_id=1)
+        account = BankAccount(account_id=101, balance=10.0, currency="USD")
+        account.deposit(5.0, "USD")
+        self.user.add_account(account)
+
+    def make_args(self, **overrides):
+        """Build CLI arguments with defaults for every option."""
+        values = dict(
+            user_id=1, format="csv", since=None, until=None, limit=None, page=1,
+            output=None,
+        )
+        values.update(overrides)
+        return MagicMock(**values)
+
+    @patch("service.report_service.FileManager.load_all_users", return_value=[])
+    def test_user_not_found(self, _mock_load):
+        """test report for a missing user."""
+        with patch("builtins.print") as mock_print:
+            ReportService.report(self.make_args())
+            mock_print.assert_called_with("User not found")
+
+    @patch("service.report_service.FileManager.load_all_users")
+    def test_invalid_page(self, mock_load):
+        """test that an invalid page is reported instead of raising."""
+        mock_load.return_value = [self.user]
+        with patch("builtins.print") as mock_print:
+            ReportService.report(self.make_args(page=2))
+            mock_print.assert_called_with(
+                "Report error: Page must be >= 1 and requires a limit"
+            )
+
+    @patch("service.report_service.FileManager.load_all_users")
+    def test_report_to_file(self, mock_load):
+        """test writing a CSV report to a file."""
+        mock_load.return_value = [self.user]
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        os.close(handle)
+        try:
+            with patch("builtins.print"):
+                ReportService.report(self.make_args(output=path))
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        finally:
+            os.remove(path)
+        self.assertEqual(len(lines), 2)
+        self.assertRegex(lines[1], r"^1,101,\d+,deposit,5\.0,USD,")
+
+
+if __name__ == "__main__":
+    unittest.main()
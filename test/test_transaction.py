@@ -1,9 +1,17 @@
 """Unit tests for the Transaction class, including serialization,
 validation, and utility methods."""
 
+import os
+import time
 import unittest
-from datetime import datetime
-from models.transaction import Transaction
+from datetime import datetime, timezone
+from models.transaction import (
+    Transaction,
+    from_epoch_us,
+    now_epoch_us,
+    parse_time_stamp,
+    to_epoch_us,
+)
 
 
 def generate_transaction_data(
@@ -187,5 +195,75 @@ class TestTransaction(unittest.TestCase):  # pylint: disable=too-many-public-met
             Transaction(1, 100.0, "", datetime.now(), "USD")
 
 
+class TestEpochTimestamps(unittest.TestCase):
+    """Unit tests for epoch-microsecond time stamp storage."""
+
+    def test_epoch_round_trip(self):
+        """test that datetime -> epoch -> datetime is exact."""
+        moment = datetime(2024, 2, 29, 23, 59, 59, 123456)
+        self.assertEqual(from_epoch_us(to_epoch_us(moment)), moment)
+
+    def test_epoch_is_utc_and_monotonic_across_dst(self):
+        """test that values are real UTC epochs, whatever the local time zone."""
+        if not hasattr(time, "tzset"):
+            self.skipTest("time.tzset is not available")
+        previous = os.environ.get("TZ")
+
+        def restore():
+            if previous is None:
+                os.environ.pop("TZ", None)
+            else:
+                os.environ["TZ"] = previous
+            time.tzset()
+
+        self.addCleanup(restore)
+        os.environ["TZ"] = "EET-2EEST,M3.5.0/3,M10.5.0/4"
+        time.tzset()
+
+        self.assertLess(abs(now_epoch_us() - time.time_ns() // 1000), 1_000_000)
+        aware = datetime(2024, 7, 1, 9, 0, tzinfo=timezone.utc)
+        self.assertEqual(to_epoch_us(aware), 1_719_824_400_000_000)
+        self.assertEqual(to_epoch_us(aware.astimezone().replace(tzinfo=None)), to_epoch_us(aware))
+        # 03:30 local happens twice on 2024-10-27; the second one is later.
+        first = to_epoch_us(datetime(2024, 10, 27, 3, 30))
+        second = to_epoch_us(datetime(2024, 10, 27, 3, 30, fold=1))
+        self.assertEqual(second - first, 3_600_000_000)
+        self.assertEqual(from_epoch_us(first), datetime(2024, 10, 27, 3, 30))
+
+    def test_parse_iso_and_epoch(self):
+        """test that legacy ISO strings and epoch ints parse to the same value."""
+        us = to_epoch_us(datetime(2023, 5, 17, 10, 30))
+        self.assertEqual(parse_time_stamp("2023-05-17T10:30:00"), us)
+        self.assertEqual(parse_time_stamp(us), us)
+
+    def test_parse_invalid_type(self):
+        """test that unsupported time stamp types raise TypeError."""
+        with self.assertRaises(TypeError):
+            parse_time_stamp(None)
+
+    def test_to_dict_epoch(self):
+        """test that to_dict(epoch=True) stores integer microseconds."""
+        data = Transaction(
+            1, 100.0, "deposit", datetime(2023, 5, 17, 10, 30), "USD"
+        ).to_dict(epoch=True)
+        self.assertIsInstance(data["time_stamp"], int)
+        restored = Transaction.from_dict(data)
+        self.assertEqual(restored.time_stamp, datetime(2023, 5, 17, 10, 30))
+
+    def test_from_epoch_lazy_datetime(self):
+        """test that from_epoch defers datetime construction until accessed."""
+        us = to_epoch_us(datetime(2023, 1, 1, 12, 0))
+        tx = Transaction.from_epoch(1, 10.0, "deposit", us, "USD")
+        self.assertIsNone(tx._time_stamp)  # pylint: disable=protected-access
+        self.assertEqual(tx.time_stamp, datetime(2023, 1, 1, 12, 0))
+
+    def test_occurred_between(self):
+        """test integer range check is inclusive at start, exclusive at end."""
+        us = to_epoch_us(datetime(2023, 1, 1))
+        tx = Transaction.from_epoch(1, 10.0, "deposit", us, "USD")
+        self.assertTrue(tx.occurred_between(us, us + 1))
+        self.assertFalse(tx.occurred_between(us - 1, us))
+
+
 if __name__ == "__main__":
     unittest.main()
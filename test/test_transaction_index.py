@@ -0,0 +1,71 @@
+"""Unit tests for the time-ordered transaction index and paginated queries."""
+
+import unittest
+from datetime import datetime
+from models.account import BankAccount
+from models.transaction import Transaction, to_epoch_us
+
+
+def day(n):
+    """Return epoch microseconds for March n, 2024."""
+    return to_epoch_us(datetime(2024, 3, n))
+
+
+class TestTransactionIndex(unittest.TestCase):
+    """Unit tests for TransactionIndex via BankAccount.query_transactions."""
+
+    def setUp(self):
+        """Create an account with transactions on March 1..10, one out of order."""
+        self.account = BankAccount(account_id=1, balance=0, currency="USD")
+        order = [1, 2, 3, 5, 6, 4, 7, 8, 9, 10]
+        for i, d in enumerate(order, start=1):
+            kind = "deposit" if d % 2 else "withdraw"
+            self.account.transactions.append(
+                Transaction.from_epoch(i, d * 100, kind, day(d), "USD")
+            )
+
+    def test_range_is_sorted_and_half_open(self):
+        """test range results come back in time order with an exclusive end."""
+        items = self.account.get_transactions_between(day(3), day(7))
+        self.assertEqual([t.time_stamp_us for t in items], [day(3), day(4), day(5), day(6)])
+
+    def test_filters(self):
+        """test type prefix and amount bounds."""
+        page = self.account.query_transactions(
+            transaction_type="deposit", min_amount=3, max_amount=7
+        )
+        self.assertEqual([t.amount for t in page.items], [3.0, 5.0, 7.0])
+
+    def test_pagination(self):
+        """test that cursors walk through all results exactly once."""
+        seen = []
+        cursor = None
+        while True:
+            page = self.account.query_transactions(limit=3, cursor=cursor)
+            seen.extend(t.time_stamp_us for t in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, [day(d) for d in range(1, 11)])
+
+    def test_pagination_with_equal_timestamps(self):
+        """test cursors stay correct when several transactions share a time."""
+        for i in range(3):
+            self.account.transactions.append(
+                Transaction.from_epoch(20 + i, 100, "deposit", day(10), "USD")
+            )
+        first = self.account.query_transactions(start=day(10), limit=2)
+        second = self.account.query_transactions(start=day(10), cursor=first.next_cursor)
+        ids = [t.transaction_id for t in first.items + second.items]
+        self.assertEqual(sorted(ids), [10, 20, 21, 22])
+
+    def test_index_picks_up_new_transactions(self):
+        """test that operations after the first query are indexed."""
+        self.account.query_transactions()
+        self.account.deposit(1, "USD")
+        page = self.account.query_transactions(start=day(11))
+        self.assertEqual(len(page.items), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
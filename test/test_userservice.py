@@ -1,7 +1,13 @@
 """Unit tests for the Userservice class responsible for user registration and login."""
 
+import csv
+import json
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
+from models.id_allocator import IdAllocator
+from service.file_manager import FileManager
 from service.user_service import Userservice
 from models.user import User
 
@@ -32,6 +38,23 @@ class TestUserService(unittest.TestCase):
         self.assertEqual(saved_users[1].surname, "Johnson")
         self.assertEqual(saved_users[1].user_id, 2)
 
+    @patch("service.user_service.FileManager.load_all_users")
+    def test_find_users(self, mock_load):
+        """test that the CLI finds users by prefix and with typos."""
+        mock_load.return_value = self.users + [User(user_id=2, username="Нікіта", surname="Коваль")]
+
+        mock_args = MagicMock(typos=0, limit=20)
+        with patch("builtins.print") as mock_print:
+            mock_args.name = "нік"
+            Userservice.find_users(mock_args)
+            mock_print.assert_called_with("2: Нікіта Коваль")
+            mock_args.name, mock_args.typos = "Smiht", 1
+            Userservice.find_users(mock_args)
+            mock_print.assert_called_with("1: Alice Smith")
+            mock_args.name = "Bob"
+            Userservice.find_users(mock_args)
+            mock_print.assert_called_with("No users found")
+
     @patch("service.user_service.FileManager.load_all_users")
     def test_login_success(self, mock_load):
         """test successful login when user ID exists."""
@@ -121,5 +144,143 @@ class TestUserService(unittest.TestCase):
         self.assertIsInstance(saved_users[-1], User)
 
 
+
+class TestRegisterWithSequence(unittest.TestCase):
+    """Unit tests for registering users with a persisted ID sequence."""
+
+    def setUp(self):
+        """Use a temporary users file and ID sequence."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.users_path = os.path.join(self.tmp.name, "users.json")
+        with open(self.users_path, "w", encoding="utf-8") as f:
+            json.dump([User("Alice", "Smith", 5).to_dict()], f, indent=4)
+        self.ids = IdAllocator(os.path.join(self.tmp.name, "user_ids.json"), block_size=1)
+        patches = [
+            patch.object(FileManager, "USERS_FILE", self.users_path),
+            patch("service.user_service.USER_IDS", self.ids),
+            patch("service.file_manager.USER_IDS", self.ids),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmp.cleanup()
+
+    @patch("builtins.print")
+    def test_register_appends_without_loading(self, _mock_print):
+        """test that users are loaded once to start the sequence, then only appended."""
+        with patch.object(FileManager, "load_all_users", wraps=FileManager.load_all_users) as mock_load:
+            Userservice.register(MagicMock(username="Bob", surname="Ray"))
+            Userservice.register(MagicMock(username="Олена", surname="Коваль"))
+            self.assertEqual(mock_load.call_count, 1)
+        with patch.object(FileManager, "save_all_users") as mock_save:
+            Userservice.register(MagicMock(username="Ann", surname="Lee"))
+            mock_save.assert_not_called()
+
+        users = FileManager.load_all_users()
+        self.assertEqual([u.user_id for u in users], [5, 6, 7, 8])
+        self.assertEqual((users[2].username, users[2].surname), ("Олена", "Коваль"))
+        self.assertEqual(self.ids.peek(), 9)
+
+    @patch("builtins.print")
+    def test_sequence_is_not_reset_by_lower_ids(self, _mock_print):
+        """test that a leased ID is never handed out again, even if the users file lost it."""
+        Userservice.register(MagicMock(username="Bob", surname="Ray"))
+        with open(self.users_path, "w", encoding="utf-8") as f:
+            json.dump([], f)
+        Userservice.register(MagicMock(username="Ann", surname="Lee"))
+        self.assertEqual([u.user_id for u in FileManager.load_all_users()], [7])
+
+
+class TestBulkImport(unittest.TestCase):
+    """Unit tests for importing users and accounts from CSV."""
+
+    def setUp(self):
+        """Create a temporary directory for the CSV and report files."""
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.csv_path = os.path.join(self.tmp.name, "partner.csv")
+        self.report_path = os.path.join(self.tmp.name, "rejected.csv")
+
+    def tearDown(self):
+        """Remove temporary files."""
+        self.tmp.cleanup()
+
+    def _write_csv(self, rows):
+        """Writes the import file with the standard header."""
+        with open(self.csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["ref", "username", "surname", "account_id", "currency", "balance"])
+            writer.writerows(rows)
+
+    @patch("service.user_service.FileManager.save_all_users")
+    @patch("service.user_service.FileManager.load_all_users")
+    def test_import_allocates_contiguous_ids_and_saves_once(self, mock_load, mock_save):
+        """test that valid users get consecutive IDs and are saved in one write."""
+        mock_load.return_value = [User(user_id=7, username="Zoe", surname="Last")]
+        self._write_csv(
+            [
+                ["c1", "Ann", "Lee", "1", "USD", "10.50"],
+                ["c1", "Ann", "Lee", "2", "EUR", ""],
+                ["c2", "Bob", "Ray", "", "", ""],
+                ["", "Cid", "Moe", "1", "UAN", "3"],
+            ]
+        )
+
+        result = Userservice.import_users_csv(self.csv_path, self.report_path)
+
+        self.assertEqual((result.users, result.accounts, result.rejected), (3, 3, []))
+        self.assertEqual(mock_save.call_count, 1)
+        saved = mock_save.call_args[0][0]
+        self.assertEqual([u.user_id for u in saved], [7, 8, 9, 10])
+        self.assertEqual(saved[1].get_balances_by_currency(), {"USD": 10.5, "EUR": 0.0})
+        self.assertFalse(os.path.exists(self.report_path))
+
+    @patch("service.user_service.FileManager.save_all_users")
+    @patch("service.user_service.FileManager.load_all_users", return_value=[])
+    def test_invalid_rows_are_reported(self, _mock_load, mock_save):
+        """test that invalid rows are skipped and written to the report."""
+        self._write_csv(
+            [
+                ["c1", "Ann", "Lee", "1", "USD", "5"],
+                ["c2", "", "Ray", "", "", ""],
+                ["c3", "Cid", "Moe", "x", "USD", "1"],
+                ["c4", "Dan", "Poe", "1", "usd", "1"],
+                ["c5", "Eve", "Fox", "1", "USD", "-2"],
+                ["c1", "Ann", "Lee", "1", "USD", "9"],
+                ["c1", "Ann", "Other", "2", "USD", "9"],
+            ]
+        )
+
+        result = Userservice.import_users_csv(self.csv_path, self.report_path)
+
+        self.assertEqual(result.users, 1)
+        self.assertEqual([line for line, _reason, _row in result.rejected], [3, 4, 5, 6, 7, 8])
+        self.assertEqual(len(mock_save.call_args[0][0]), 1)
+        with open(self.report_path, "r", encoding="utf-8") as f:
+            report = list(csv.reader(f))
+        self.assertEqual(report[0][:2], ["line", "reason"])
+        self.assertEqual(report[2][0], "4")
+        self.assertIn("Account ID", report[2][1])
+
+    def test_missing_column_raises(self):
+        """test that a file without the required columns is refused."""
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write("name,balance\nAnn,1\n")
+        with self.assertRaises(ValueError):
+            Userservice.import_users_csv(self.csv_path)
+
+    @patch("service.user_service.FileManager.save_all_users")
+    @patch("service.user_service.FileManager.load_all_users", return_value=[])
+    def test_cli_prints_summary(self, _mock_load, _mock_save):
+        """test that the CLI prints the number of imported and rejected rows."""
+        self._write_csv([["c1", "Ann", "Lee", "1", "USD", "5"], ["c2", "", "", "", "", ""]])
+        with patch("builtins.print") as mock_print:
+            Userservice.bulk_import(MagicMock(file=self.csv_path, report=self.report_path))
+        mock_print.assert_any_call("Imported 1 users and 1 accounts")
+        mock_print.assert_any_call(f"Rejected 1 rows, see {self.report_path}")
+
+
 if __name__ == "__main__":
     unittest.main()
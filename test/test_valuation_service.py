@@ -0,0 +1,80 @@
+"""Unit tests for the ValuationService and BalanceColumns."""
+
+import unittest
+from fractions import Fraction
+from unittest.mock import patch, MagicMock
+from models.account import BankAccount
+from models.exchange_rates import RateTable
+from models.rate_history import RateHistory
+from models.user import User
+from service.valuation_service import BalanceColumns, ValuationService
+
+TABLE = RateTable.from_dict({"base": "USD", "rates": {"EUR": "0.8", "UAN": "40"}})
+
+
+class TestValuationService(unittest.TestCase):
+    """Unit tests for base-currency valuation."""
+
+    def setUp(self):
+        """Create two users with accounts in three currencies."""
+        self.alice = User(user_id=1, username="Alice", surname="Smith")
+        self.alice.add_account(BankAccount(1, 100.0, "USD"))
+        self.alice.add_account(BankAccount(2, 80.0, "EUR"))
+        self.bob = User(user_id=2, username="Bob", surname="Johnson")
+        self.bob.add_account(BankAccount(3, 400.0, "UAN"))
+
+    def test_columns_totals(self):
+        """test per-currency totals in minor units."""
+        columns = BalanceColumns().add_users([self.alice, self.bob])
+        self.assertEqual(columns.totals(), {"USD": 10000, "EUR": 8000, "UAN": 40000})
+
+    def test_value_user(self):
+        """test valuation of one user in USD and EUR."""
+        self.assertEqual(ValuationService.value_user(self.alice, "USD", TABLE), 200.0)
+        self.assertEqual(ValuationService.value_user(self.alice, "EUR", TABLE), 160.0)
+
+    def test_value_users(self):
+        """test valuation of a list of users."""
+        self.assertEqual(
+            ValuationService.value_users([self.alice, self.bob], "USD", TABLE), 210.0
+        )
+
+    def test_unknown_currency_raises(self):
+        """test that a currency without a rate raises ValueError."""
+        self.bob.add_account(BankAccount(4, 1.0, "GBP"))
+        with self.assertRaises(ValueError):
+            ValuationService.value_user(self.bob, "USD", TABLE)
+
+    def test_value_at_past_rates(self):
+        """test that at_us values balances with the rates recorded for that time."""
+        history = RateHistory("USD")
+        history.add_rate("USD", "EUR", 0, Fraction("0.8"))
+        history.add_rate("USD", "EUR", 1_000, Fraction("0.5"))
+        engine = MagicMock(history=history)
+        with patch("service.valuation_service.RATE_ENGINE", engine):
+            self.assertEqual(ValuationService.value_user(self.alice, "USD", at_us=999), 200.0)
+            self.assertEqual(ValuationService.value_user(self.alice, "USD", at_us=1_000), 260.0)
+
+    @patch("service.valuation_service.FileManager.load_all_users")
+    def test_cli_user_not_found(self, mock_load):
+        """test CLI valuation for a missing user."""
+        mock_load.return_value = [self.alice]
+        args = MagicMock(user_id=99, base="USD", at=None)
+        with patch("builtins.print") as mock_print:
+            ValuationService.valuation(args)
+            mock_print.assert_called_with("User not found")
+
+    @patch("service.valuation_service.FileManager.load_all_users")
+    def test_cli_user_valuation(self, mock_load):
+        """test CLI valuation of a single user."""
+        carol = User(user_id=3, username="Carol", surname="White")
+        carol.add_account(BankAccount(5, 25.5, "USD"))
+        mock_load.return_value = [self.alice, carol]
+        args = MagicMock(user_id=3, base="USD", at=None)
+        with patch("builtins.print") as mock_print:
+            ValuationService.valuation(args)
+            mock_print.assert_called_with("Total value: 25.5 USD")
+
+
+if __name__ == "__main__":
+    unittest.main()
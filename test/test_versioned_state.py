@@ -0,0 +1,119 @@
+"""Unit tests for copy-on-write snapshots of users and accounts."""
+
+import io
+import unittest
+from models.account import BankAccount
+from models.ledger import Ledger
+from models.report_renderer import ReportRenderer
+from models.user import User
+from models.versioned_state import BankState, UserState, VersionedStore
+
+
+def _user(user_id: int, balance: float, ledger: Ledger) -> User:
+    """Builds a user with one USD account on the given ledger."""
+    user = User("Ann", "Lee", user_id)
+    account = BankAccount(1, balance, "USD")
+    account.ledger = ledger
+    user.add_account(account)
+    return user
+
+
+class TestVersionedStore(unittest.TestCase):
+    """Unit tests for the multi-version map."""
+
+    def test_snapshot_sees_values_as_of_its_version(self):
+        """test that later puts and new keys are invisible to an open snapshot."""
+        store = VersionedStore()
+        store.put("a", 1)
+        with store.snapshot() as snap:
+            store.put("a", 2)
+            store.put("b", 3)
+            self.assertEqual(snap.get("a"), 1)
+            self.assertIsNone(snap.get("b"))
+            self.assertEqual(list(snap.values()), [1])
+        with store.snapshot() as snap:
+            self.assertEqual(list(snap.values()), [2, 3])
+
+    def test_old_versions_are_collected_when_readers_leave(self):
+        """test that values kept for a snapshot are dropped once it closes."""
+        store = VersionedStore()
+        store.put("a", 1)
+        with store.snapshot() as first:
+            store.put("a", 2)
+            with store.snapshot() as second:
+                store.put("a", 3)
+                store.put("a", 4)
+                self.assertEqual((first.get("a"), second.get("a")), (1, 2))
+                self.assertEqual(store.retained_versions(), 2)
+            self.assertEqual(store.retained_versions(), 1)
+        self.assertEqual(store.retained_versions(), 0)
+        store.put("a", 5)
+        self.assertEqual(store.retained_versions(), 0)
+
+    def test_none_deletes(self):
+        """test that a deleted key is skipped by later snapshots only."""
+        store = VersionedStore()
+        store.put("a", 1)
+        with store.snapshot() as before:
+            store.put("a", None)
+            with store.snapshot() as after:
+                self.assertEqual(list(before.values()), [1])
+                self.assertEqual(list(after.values()), [])
+
+
+class TestBankState(unittest.TestCase):
+    """Unit tests for snapshots of live users."""
+
+    def setUp(self):
+        """Create a bank state with two users."""
+        self.ledger = Ledger()
+        self.bank = BankState([_user(1, 10, self.ledger), _user(2, 5, self.ledger)])
+
+    def test_writes_during_a_snapshot_are_not_seen(self):
+        """test that a reader keeps a consistent view while deposits continue."""
+        with self.bank.snapshot() as snap:
+            with self.bank.write(1) as user:
+                user.accounts[0].deposit(7, "USD")
+            state = snap.get(1)
+            self.assertEqual(state.accounts[0].balance_minor, 1000)
+            self.assertEqual(state.accounts[0].transactions, [])
+            self.assertEqual(sum(u.get_total_balance_minor() for u in snap.values()), 1500)
+        with self.bank.snapshot() as snap:
+            account = snap.get(1).accounts[0]
+            self.assertEqual(account.balance_minor, 1700)
+            self.assertEqual(len(account.transactions), 1)
+
+    def test_failed_write_still_publishes_partial_change(self):
+        """test that the live user's state is republished even if the block raises."""
+        with self.assertRaises(RuntimeError):
+            with self.bank.write(2) as user:
+                user.accounts[0].deposit(1, "USD")
+                raise RuntimeError("boom")
+        with self.bank.snapshot() as snap:
+            self.assertEqual(snap.get(2).get_total_balance(), 6)
+
+    def test_transfer_to_another_user_publishes_both(self):
+        """test that a cross-user transfer shows up for both users in one version."""
+        with self.bank.snapshot() as before:
+            with self.bank.write(1) as user:
+                user.accounts[0].transfer(self.bank.users[2].accounts[0], 4, "USD")
+            self.assertEqual(sum(u.get_total_balance_minor() for u in before.values()), 1500)
+        with self.bank.snapshot() as after:
+            self.assertEqual(after.get(1).get_total_balance(), 6)
+            self.assertEqual(after.get(2).get_total_balance(), 9)
+            self.assertEqual(len(after.get(2).accounts[0].transactions), 1)
+        self.assertEqual(after.version, before.version + 1)
+
+    def test_snapshot_renders_like_a_user(self):
+        """test that ReportRenderer produces the same report for a state and its user."""
+        user = self.bank.users[1]
+        with self.bank.write(1):
+            user.accounts[0].deposit(3, "USD")
+        live, frozen = io.StringIO(), io.StringIO()
+        ReportRenderer().render(user, live)
+        ReportRenderer().render(UserState.from_user(user), frozen)
+        self.assertEqual(frozen.getvalue(), live.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()